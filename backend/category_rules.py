@@ -3,6 +3,12 @@ Reglas de clasificación de proyectos por categorías.
 Fácilmente modificable para ajustar keywords y umbrales.
 """
 
+from backend.metrics import BUCKETS_CPU, histograma, instrumentar
+
+# Tiempo de cada clasificación por keywords (también la de eventos CMF)
+CLASIFICACION_SEGUNDOS = histograma('clasificacion_duration_seconds', 'Duración de cada clasificación por keywords',
+                                    ['funcion'], BUCKETS_CPU)
+
 # Umbral mínimo para categoría principal (1 match en ~20 keywords = 0.05)
 UMBRAL_CATEGORIA_PRINCIPAL = 0.05
 
@@ -79,6 +85,7 @@ CATEGORIA_DEFAULT_COLOR = "#9ca3af"  # gris claro
 CATEGORIA_DEFAULT_COLOR_NAME = "gray"
 
 
+@instrumentar(CLASIFICACION_SEGUNDOS)
 def clasificar_proyecto(nombre: str, descripcion: str = "") -> dict:
     """
     Clasifica un proyecto en base a keywords encontradas.
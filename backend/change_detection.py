@@ -0,0 +1,203 @@
+"""
+Detección de cambios por hash de contenido para proyectos SEIA.
+Cada registro del listado se normaliza y se resume en un hash estable;
+solo los registros cuyo hash cambió se comparan campo a campo.
+"""
+
+import hashlib
+import json
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Campos del listado SEIA que se siguen para detectar cambios.
+# Se excluyen los campos derivados (clasificación, colores) y la descripción
+# de la ficha, que no vienen en el listado.
+CAMPOS_SEGUIMIENTO = [
+    'nombre',
+    'titular',
+    'tipo',
+    'region',
+    'comuna',
+    'inversion',
+    'inversion_formato',
+    'fecha_presentacion',
+    'fecha_ingreso',
+    'link_ficha',
+    'estado',
+    'tipo_proyecto',
+    'sector_economico',
+    'razon_ingreso',
+]
+
+
+def normalizar_valor(valor: Any) -> str:
+    """Normaliza un valor del listado para comparación (texto sin espacios extremos)."""
+    if valor is None:
+        return ''
+    return str(valor).strip()
+
+
+def calcular_hash_contenido(proyecto: Dict[str, Any]) -> str:
+    """Calcula un hash estable (SHA-1) de los campos seguidos de un proyecto."""
+    normalizado = [normalizar_valor(proyecto.get(campo)) for campo in CAMPOS_SEGUIMIENTO]
+    payload = json.dumps(normalizado, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def diff_campos(anterior: Dict[str, Any], nuevo: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    Compara campo a campo dos versiones de un proyecto.
+    Retorna lista de {campo, valor_anterior, valor_nuevo} con los campos que cambiaron.
+    """
+    cambios = []
+    for campo in CAMPOS_SEGUIMIENTO:
+        valor_anterior = normalizar_valor(anterior.get(campo))
+        valor_nuevo = normalizar_valor(nuevo.get(campo))
+        if valor_anterior != valor_nuevo:
+            cambios.append({
+                'campo': campo,
+                'valor_anterior': valor_anterior,
+                'valor_nuevo': valor_nuevo,
+            })
+    return cambios
+
+
+# Códigos hasta 18 dígitos caben en un entero de 64 bits con signo
+_MAX_DIGITOS_CODIGO = 18
+_LARGO_HASH = 20  # SHA-1 en bytes
+_SIN_HASH = bytes(_LARGO_HASH)
+
+
+def _codigo_numerico(codigo: str) -> Optional[int]:
+    """El código como entero si su texto es exactamente str(entero) (sin ceros a la izquierda)."""
+    if (codigo.isascii() and codigo.isdigit() and len(codigo) <= _MAX_DIGITOS_CODIGO
+            and (codigo == '0' or codigo[0] != '0')):
+        return int(codigo)
+    return None
+
+
+def _hash_a_bytes(content_hash: Optional[str]) -> bytes:
+    try:
+        valor = bytes.fromhex(content_hash) if content_hash else _SIN_HASH
+    except ValueError:
+        return _SIN_HASH
+    return valor if len(valor) == _LARGO_HASH else _SIN_HASH
+
+
+class IndiceProyectosSeia:
+    """
+    Índice compacto de los proyectos SEIA guardados, para el cruce con el listado:
+    membresía, lead_id, estado y hash de contenido por código, sin tener el
+    raw_data en memoria.
+
+    - Los códigos numéricos van como enteros en un array ordenado (búsqueda binaria),
+      con lead_id, estado y hash en arrays paralelos: el estado como índice a la
+      lista de estados distintos (unas decenas) y el hash como 20 bytes.
+    - Los códigos no numéricos (raros) van en un dict aparte.
+    - raw_data se pide a cargar_raw(lead_id) solo para los proyectos que cambiaron.
+
+    Se arma con agregar(), idealmente en orden de código, y cerrar().
+    """
+
+    __slots__ = ('_codigos', '_lead_ids', '_estados', '_hashes', '_nombres_estado',
+                 '_id_estado', '_otros', '_cargar_raw', '_ordenado')
+
+    def __init__(self, cargar_raw: Callable[[int], Optional[Dict[str, Any]]]):
+        self._codigos = array('q')
+        self._lead_ids = array('q')
+        self._estados = array('H')
+        self._hashes = bytearray()
+        self._nombres_estado: List[str] = []
+        self._id_estado: Dict[str, int] = {}
+        self._otros: Dict[str, Tuple[int, int, bytes]] = {}  # código no numérico -> (lead_id, estado, hash)
+        self._cargar_raw = cargar_raw
+        self._ordenado = True
+
+    @classmethod
+    def desde_proyectos(cls, proyectos: Dict[str, Dict]) -> 'IndiceProyectosSeia':
+        """Índice sobre un dict {codigo: {lead_id, estado, raw_data, content_hash}} ya en memoria."""
+        por_lead = {p.get('lead_id'): p.get('raw_data') or {} for p in proyectos.values()}
+        indice = cls(por_lead.get)
+        for codigo, proyecto in proyectos.items():
+            content_hash = proyecto.get('content_hash') or calcular_hash_contenido(proyecto.get('raw_data') or {})
+            indice.agregar(codigo, proyecto.get('lead_id'), proyecto.get('estado') or '', content_hash)
+        return indice.cerrar()
+
+    def _id_de_estado(self, estado: str) -> int:
+        id_estado = self._id_estado.get(estado)
+        if id_estado is None:
+            id_estado = self._id_estado[estado] = len(self._nombres_estado)
+            self._nombres_estado.append(sys.intern(estado))
+        return id_estado
+
+    def agregar(self, codigo: str, lead_id: int, estado: str, content_hash: Optional[str]) -> None:
+        """Agrega un proyecto; si el código se repite, gana el último (como en un dict)."""
+        codigo = str(codigo)
+        id_estado = self._id_de_estado(estado or '')
+        digest = _hash_a_bytes(content_hash)
+        numero = _codigo_numerico(codigo)
+        if numero is None:
+            self._otros[codigo] = (lead_id, id_estado, digest)
+            return
+        if self._codigos and numero <= self._codigos[-1]:
+            if numero == self._codigos[-1]:
+                # Repetido seguido: se reemplaza en el lugar
+                self._lead_ids[-1] = lead_id
+                self._estados[-1] = id_estado
+                self._hashes[-_LARGO_HASH:] = digest
+                return
+            self._ordenado = False
+        self._codigos.append(numero)
+        self._lead_ids.append(lead_id)
+        self._estados.append(id_estado)
+        self._hashes += digest
+
+    def cerrar(self) -> 'IndiceProyectosSeia':
+        """Ordena por código si los proyectos no llegaron ordenados; retorna el índice."""
+        if self._ordenado:
+            return self
+        # sorted es estable: entre códigos repetidos, el último agregado queda al final y gana
+        orden = sorted(range(len(self._codigos)), key=self._codigos.__getitem__)
+        posiciones = [p for i, p in enumerate(orden)
+                      if i + 1 == len(orden) or self._codigos[orden[i + 1]] != self._codigos[p]]
+        self._codigos = array('q', (self._codigos[p] for p in posiciones))
+        self._lead_ids = array('q', (self._lead_ids[p] for p in posiciones))
+        self._estados = array('H', (self._estados[p] for p in posiciones))
+        self._hashes = bytearray(b''.join(
+            self._hashes[p * _LARGO_HASH:(p + 1) * _LARGO_HASH] for p in posiciones))
+        self._ordenado = True
+        return self
+
+    def buscar(self, codigo: str) -> Optional[Tuple[int, str, Optional[str]]]:
+        """(lead_id, estado, content_hash) del proyecto guardado, o None si no existe."""
+        numero = _codigo_numerico(codigo)
+        if numero is None:
+            encontrado = self._otros.get(codigo)
+            if encontrado is None:
+                return None
+            lead_id, id_estado, digest = encontrado
+        else:
+            posicion = bisect_left(self._codigos, numero)
+            if posicion == len(self._codigos) or self._codigos[posicion] != numero:
+                return None
+            lead_id, id_estado = self._lead_ids[posicion], self._estados[posicion]
+            digest = bytes(self._hashes[posicion * _LARGO_HASH:(posicion + 1) * _LARGO_HASH])
+        return lead_id, self._nombres_estado[id_estado], digest.hex() if digest != _SIN_HASH else None
+
+    def __contains__(self, codigo: object) -> bool:
+        return isinstance(codigo, str) and self.buscar(codigo) is not None
+
+    def __len__(self) -> int:
+        return len(self._codigos) + len(self._otros)
+
+    def raw_data(self, lead_id: int) -> Dict[str, Any]:
+        """raw_data guardado del proyecto (se lee bajo demanda, solo para los que cambiaron)."""
+        return self._cargar_raw(lead_id) or {}
+
+    def bytes_aprox(self) -> int:
+        """Memoria aproximada del índice (arrays, hashes y tablas auxiliares)."""
+        return (sys.getsizeof(self._codigos) + sys.getsizeof(self._lead_ids) + sys.getsizeof(self._estados)
+                + sys.getsizeof(self._hashes) + sys.getsizeof(self._otros)
+                + sum(sys.getsizeof(e) for e in self._nombres_estado))
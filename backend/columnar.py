@@ -0,0 +1,263 @@
+"""
+Exportación columnar de leads (Parquet o Arrow IPC stream) para análisis masivo.
+
+La tabla leads se lee en lotes (fetchmany) y cada lote se convierte en un
+RecordBatch con los campos calientes de raw_data como columnas tipadas
+(inversion_millones float64, categorias_secundarias list<string>, created_at
+timestamp) y las columnas categóricas (source, industria, estado, región...)
+codificadas como diccionario. Ningún paso materializa la tabla completa: la
+memoria queda acotada por el tamaño del lote.
+
+Los campos fríos de raw_data (blob raw_extra) no se exportan; la descripción
+completa solo con incluir_descripcion=True.
+
+Uso (desde la raíz del proyecto; requiere pyarrow, ver requirements-optional.txt):
+    python -m backend.columnar --salida leads.parquet
+    python -m backend.columnar --salida leads.arrow --formato arrow --source seia
+    python -m backend.columnar --salida data/leads_parquet --particionar source mes
+"""
+
+import argparse
+import sqlite3
+import time
+from typing import Iterator, List, Optional, Sequence
+
+import orjson
+
+from backend.config import DB_PATH
+from backend.storage import CAMPOS_HOT, CAMPOS_JSON, descomprimir_texto
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional (requirements-optional.txt)
+    pa = None
+
+FORMATOS = ('parquet', 'arrow')
+TIPOS_CONTENIDO = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+# Filas por lote: también es el tamaño del row group de Parquet
+TAMANO_LOTE = 16384
+COMPRESION_PARQUET = 'zstd'
+
+# Columnas con pocos valores distintos: se codifican como diccionario
+CATEGORICAS = {'source', 'sector', 'tipo', 'region', 'comuna', 'estado', 'industria', 'razon_ingreso'}
+
+# Columnas por las que se puede particionar (mes = YYYY-MM de created_at)
+PARTICIONES = ('source', 'mes')
+
+_COLUMNAS_BASE = ['id', 'source', 'project_name', 'date', 'sector', 'description', 'created_at']
+_FORMATO_CREATED_AT = '%Y-%m-%d %H:%M:%S'
+
+
+class PyarrowNoDisponible(RuntimeError):
+    pass
+
+
+def disponible() -> bool:
+    return pa is not None
+
+
+def _requerir_pyarrow():
+    if pa is None:
+        raise PyarrowNoDisponible("pyarrow no está instalado (ver requirements-optional.txt)")
+
+
+def _tipo(columna: str):
+    if columna == 'id':
+        return pa.int64()
+    if columna == 'created_at':
+        return pa.timestamp('s')
+    if columna in CAMPOS_JSON:
+        return pa.list_(pa.string())
+    if columna in CATEGORICAS:
+        return pa.dictionary(pa.int32(), pa.string())
+    if CAMPOS_HOT.get(columna) == 'REAL':
+        return pa.float64()
+    return pa.string()
+
+
+def _columnas(incluir_descripcion: bool) -> List[str]:
+    columnas = _COLUMNAS_BASE + list(CAMPOS_HOT)
+    return columnas + ['descripcion_completa'] if incluir_descripcion else columnas
+
+
+def esquema(incluir_descripcion: bool = False, particionar: Sequence[str] = ()):
+    """Esquema Arrow de la exportación (con la columna mes si se particiona por ella)."""
+    _requerir_pyarrow()
+    campos = [pa.field(c, _tipo(c)) for c in _columnas(incluir_descripcion)]
+    if 'mes' in particionar:
+        campos.append(pa.field('mes', pa.string()))
+    return pa.schema(campos)
+
+
+def _array(columna: str, valores: list):
+    if columna == 'created_at':
+        # TEXT de SQLite ('YYYY-MM-DD HH:MM:SS') -> timestamp; lo que no calce queda nulo
+        return pc.strptime(pa.array(valores, pa.string()), format=_FORMATO_CREATED_AT, unit='s',
+                           error_is_null=True)
+    if columna in CAMPOS_JSON:
+        return pa.array([orjson.loads(v) if v else None for v in valores], pa.list_(pa.string()))
+    if columna == 'descripcion_completa':
+        return pa.array([descomprimir_texto(v) for v in valores], pa.string())
+    tipo = _tipo(columna)
+    if pa.types.is_dictionary(tipo):
+        return pa.array(valores, pa.string()).dictionary_encode()
+    return pa.array(valores, tipo)
+
+
+def iter_lotes(source: Optional[str] = None, incluir_descripcion: bool = False,
+               tamano_lote: int = TAMANO_LOTE, particionar: Sequence[str] = ()) -> Iterator:
+    """
+    RecordBatches de leads (orden por id), de a tamano_lote filas. source filtra por
+    fuente sin distinguir mayúsculas. Se puede consumir desde otro thread (StreamingResponse).
+    """
+    _requerir_pyarrow()
+    columnas = _columnas(incluir_descripcion)
+    schema = esquema(incluir_descripcion, particionar)
+    select = ', '.join(f'l.{c}' for c in columnas if c != 'descripcion_completa')
+    join = ''
+    if incluir_descripcion:
+        select += ', d.descripcion'
+        join = 'LEFT JOIN lead_descripciones d ON d.lead_id = l.id'
+    where, parametros = ('WHERE LOWER(l.source) = LOWER(?)', [source]) if source else ('', [])
+
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    try:
+        cursor = conn.execute(f'''
+            SELECT {select} FROM leads l {join} {where} ORDER BY l.id
+        ''', parametros)
+        while True:
+            filas = cursor.fetchmany(tamano_lote)
+            if not filas:
+                return
+            arrays = [_array(columna, list(valores)) for columna, valores in zip(columnas, zip(*filas))]
+            if 'mes' in particionar:
+                arrays.append(pc.utf8_slice_codeunits(arrays[columnas.index('created_at')].cast(pa.string()), 0, 7))
+            yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+    finally:
+        conn.close()
+
+
+def _escritor(formato: str, destino, schema):
+    if formato == 'parquet':
+        return pq.ParquetWriter(destino, schema, compression=COMPRESION_PARQUET)
+    if formato == 'arrow':
+        return pa.ipc.new_stream(destino, schema)
+    raise ValueError(f"Formato inválido: {formato!r} (opciones: {', '.join(FORMATOS)})")
+
+
+def exportar(destino: str, formato: str = 'parquet', source: Optional[str] = None,
+             incluir_descripcion: bool = False, tamano_lote: int = TAMANO_LOTE) -> int:
+    """Escribe la exportación en un archivo; retorna la cantidad de filas."""
+    _requerir_pyarrow()
+    filas = 0
+    with _escritor(formato, destino, esquema(incluir_descripcion)) as escritor:
+        for lote in iter_lotes(source, incluir_descripcion, tamano_lote):
+            escritor.write_batch(lote)
+            filas += lote.num_rows
+    return filas
+
+
+def exportar_particionado(directorio: str, particionar: Sequence[str] = PARTICIONES,
+                          source: Optional[str] = None, incluir_descripcion: bool = False,
+                          tamano_lote: int = TAMANO_LOTE) -> int:
+    """
+    Dataset Parquet particionado estilo Hive (p. ej. source=SEIA/mes=2025-01/part-0.parquet).
+    Retorna la cantidad de filas.
+    """
+    _requerir_pyarrow()
+    desconocidas = [p for p in particionar if p not in PARTICIONES]
+    if desconocidas:
+        raise ValueError(f"Particiones inválidas: {desconocidas} (opciones: {', '.join(PARTICIONES)})")
+    schema = esquema(incluir_descripcion, particionar)
+    filas = [0]
+
+    def contar(lotes):
+        for lote in lotes:
+            filas[0] += lote.num_rows
+            yield lote
+
+    if 'source' in particionar:
+        # Las claves de partición van como texto en la ruta: source sin diccionario
+        schema = schema.set(schema.get_field_index('source'), pa.field('source', pa.string()))
+    particion = ds.partitioning(pa.schema([pa.field(p, pa.string()) for p in particionar]), flavor='hive')
+    lotes = (lote.cast(schema) for lote in iter_lotes(source, incluir_descripcion, tamano_lote, particionar))
+    ds.write_dataset(contar(lotes), directorio, format='parquet', schema=schema, partitioning=particion,
+                     existing_data_behavior='delete_matching',
+                     file_options=ds.ParquetFileFormat().make_write_options(compression=COMPRESION_PARQUET))
+    return filas[0]
+
+
+class _SalidaEnTrozos:
+    """Archivo de solo escritura que acumula lo escrito hasta que se retira con vaciar()."""
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+        self._posicion = 0
+        self.closed = False
+
+    def write(self, datos) -> int:
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self) -> int:
+        return self._posicion
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vaciar(self) -> bytes:
+        datos = b''.join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def generar_bytes(formato: str = 'parquet', source: Optional[str] = None,
+                  incluir_descripcion: bool = False, tamano_lote: int = TAMANO_LOTE) -> Iterator[bytes]:
+    """La exportación como chunks de bytes (uno por lote) para un StreamingResponse."""
+    _requerir_pyarrow()
+    salida = _SalidaEnTrozos()
+    escritor = _escritor(formato, pa.PythonFile(salida, mode='w'), esquema(incluir_descripcion))
+    try:
+        for lote in iter_lotes(source, incluir_descripcion, tamano_lote):
+            escritor.write_batch(lote)
+            datos = salida.vaciar()
+            if datos:
+                yield datos
+    finally:
+        escritor.close()
+    yield salida.vaciar()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Exporta leads a Parquet o Arrow IPC stream')
+    parser.add_argument('--salida', required=True, help='Archivo (o directorio si se particiona)')
+    parser.add_argument('--formato', choices=FORMATOS, default='parquet')
+    parser.add_argument('--source', help='Solo una fuente (ej: seia)')
+    parser.add_argument('--particionar', nargs='+', choices=PARTICIONES,
+                        help='Dataset Parquet particionado por estas columnas')
+    parser.add_argument('--descripcion', action='store_true', help='Incluir la descripción completa')
+    parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas por lote / row group')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if args.particionar:
+        if args.formato != 'parquet':
+            parser.error('--particionar solo está disponible para --formato parquet')
+        total = exportar_particionado(args.salida, args.particionar, args.source, args.descripcion, args.lote)
+    else:
+        total = exportar(args.salida, args.formato, args.source, args.descripcion, args.lote)
+    print(f"📦 {total:,} leads exportados a {args.salida} en {time.perf_counter() - inicio:.1f}s")
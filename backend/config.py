@@ -16,3 +16,46 @@ ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', '')
 JWT_SECRET = os.getenv('JWT_SECRET', API_SECRET or 'dev-secret-change-in-production')
 JWT_EXPIRATION_HOURS = int(os.getenv('JWT_EXPIRATION_HOURS', '24'))
 
+
+# Profiler por muestreo (backend/profiler.py): directorio de perfiles, perfilar todos los runs,
+# permitir perfilar requests con el header X-Profile, e intervalo de muestreo
+PROFILES_DIR = os.getenv('PROFILES_DIR', os.path.join(os.path.dirname(DB_PATH) or '.', 'perfiles'))
+PROFILE_RUNS = os.getenv('PROFILE_RUNS', '').lower() in ('1', 'true', 'yes')
+PROFILE_REQUESTS = os.getenv('PROFILE_REQUESTS', '').lower() in ('1', 'true', 'yes')
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '10'))
+
+# Logging (backend/logs.py): nivel general, niveles por módulo ("scrapers.seia=DEBUG,backend.database=WARNING"),
+# formato de consola ('texto' o 'json') y archivo JSON con rotación para buscar por ejecución ('' = sin archivo)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'texto').lower()
+LOG_FILE = os.getenv('LOG_FILE', os.path.join(os.path.dirname(DB_PATH) or '.', 'logs', 'masterscraper.jsonl'))
+LOG_FILE_MAX_MB = float(os.getenv('LOG_FILE_MAX_MB', '20'))
+
+# Reporte con IA (backend/resumen_ia.py): endpoint compatible con OpenAI ('' = api.openai.com; apuntar a
+# backend/openai_stub_server.py para pruebas sin conexión), modelo, presupuesto de tokens por llamada,
+# llamadas en paralelo, reintentos y timeout por llamada, leads incluidos (los de mayor score) y
+# días que se conserva un resumen en cache sin volver a usarse
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', '')
+REPORT_MODEL = os.getenv('REPORT_MODEL', 'gpt-4')
+REPORT_CHUNK_TOKENS = int(os.getenv('REPORT_CHUNK_TOKENS', '6000'))
+REPORT_CONCURRENCY = int(os.getenv('REPORT_CONCURRENCY', '4'))
+REPORT_MAX_RETRIES = int(os.getenv('REPORT_MAX_RETRIES', '3'))
+REPORT_TIMEOUT_S = float(os.getenv('REPORT_TIMEOUT_S', '60'))
+REPORT_MAX_LEADS = int(os.getenv('REPORT_MAX_LEADS', '2000'))
+REPORT_CACHE_DIAS = int(os.getenv('REPORT_CACHE_DIAS', '30'))
+
+# Envío de emails (backend/correo.py): servidor SMTP (backend/smtp_stub_server.py para pruebas sin conexión,
+# con SMTP_STARTTLS=false), usuario (por defecto EMAIL_FROM; vacío = sin login), conexiones del pool,
+# segundos sin uso tras los que una conexión se verifica con NOOP, timeout, workers, intentos por
+# email y emails tomados por lote
+SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', 'true').lower() in ('1', 'true', 'yes')
+SMTP_USER = os.getenv('SMTP_USER', EMAIL_FROM)
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', '2'))
+SMTP_IDLE_S = float(os.getenv('SMTP_IDLE_S', '60'))
+SMTP_TIMEOUT_S = float(os.getenv('SMTP_TIMEOUT_S', '30'))
+EMAIL_WORKERS = int(os.getenv('EMAIL_WORKERS', '2'))
+EMAIL_MAX_INTENTOS = int(os.getenv('EMAIL_MAX_INTENTOS', '5'))
+EMAIL_LOTE = int(os.getenv('EMAIL_LOTE', '50'))
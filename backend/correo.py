@@ -0,0 +1,413 @@
+"""
+Envío de emails con outbox: quien envía solo encola y workers en threads entregan
+por un pool de conexiones SMTP persistentes.
+
+- encolar_email() inserta una fila por destinatario en email_outbox y despierta a
+  los workers; nunca espera al servidor SMTP (generar un reporte no depende del correo).
+- Cada worker toma un lote: los destinatarios con emails pendientes (hasta EMAIL_LOTE)
+  y todos sus pendientes. Varios pendientes para una misma persona salen como un solo
+  digest.
+- Pool: cada conexión hace STARTTLS y login una vez y se reutiliza entre envíos. Si
+  lleva más de SMTP_IDLE_S sin usarse se verifica con NOOP, y se reconecta si el
+  servidor la cerró.
+- Reintentos con backoff exponencial hasta EMAIL_MAX_INTENTOS; un destinatario
+  rechazado (respuesta 5xx) falla sin reintentar.
+
+Sin conexión: python -m backend.smtp_stub_server y SMTP_HOST=127.0.0.1 SMTP_PORT=8025 SMTP_STARTTLS=false.
+
+Uso (desde la raíz del proyecto):
+    python -m backend.correo --estado
+    python -m backend.correo --procesar        # entrega los pendientes sin levantar la API
+"""
+
+import argparse
+import logging
+import queue
+import smtplib
+import sqlite3
+import ssl
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from email.message import EmailMessage
+from typing import Dict, Iterable, List, NamedTuple, Union
+
+from backend import metrics
+from backend.config import (
+    DB_PATH, EMAIL_FROM, EMAIL_LOTE, EMAIL_MAX_INTENTOS, EMAIL_PASSWORD, EMAIL_WORKERS, SMTP_HOST,
+    SMTP_IDLE_S, SMTP_POOL_SIZE, SMTP_PORT, SMTP_STARTTLS, SMTP_TIMEOUT_S, SMTP_USER
+)
+
+logger = logging.getLogger(__name__)
+
+ESTADOS = ('pendiente', 'enviando', 'enviado', 'fallido')
+
+# Espera entre intentos: BACKOFF_BASE_S * 2^(intentos - 1), hasta BACKOFF_MAX_S
+BACKOFF_BASE_S = 30
+BACKOFF_MAX_S = 3600
+# Cada cuánto revisa un worker sin trabajo si hay reintentos vencidos
+INTERVALO_SONDEO_S = 5.0
+
+ENVIOS_TOTAL = metrics.contador('email_deliveries_total', 'Emails del outbox procesados', ['resultado'])
+CONEXIONES_TOTAL = metrics.contador('smtp_connections_opened_total', 'Conexiones SMTP abiertas por el pool')
+
+
+class Pendiente(NamedTuple):
+    id: int
+    destinatario: str
+    asunto: str
+    cuerpo: str
+    intentos: int
+    created_at: str
+
+
+# --- Outbox ---
+
+def crear_tabla_outbox(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            destinatario TEXT NOT NULL,
+            asunto TEXT NOT NULL,
+            cuerpo TEXT NOT NULL,
+            estado TEXT NOT NULL DEFAULT 'pendiente',
+            intentos INTEGER NOT NULL DEFAULT 0,
+            proximo_intento TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            enviado_at TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_email_outbox_pendientes ON email_outbox(estado, proximo_intento)
+    ''')
+
+
+def _separar_destinatarios(destinatarios: Union[str, Iterable[str]]) -> List[str]:
+    if isinstance(destinatarios, str):
+        destinatarios = destinatarios.split(',')
+    vistos = dict.fromkeys(d.strip() for d in destinatarios if d and d.strip())
+    return list(vistos)
+
+
+def encolar_email(destinatarios: Union[str, Iterable[str]], asunto: str, cuerpo: str) -> List[int]:
+    """
+    Encola un email para cada destinatario (lista o texto separado por comas) y
+    retorna los ids. Sin EMAIL_FROM configurado no encola nada.
+    """
+    destinatarios = _separar_destinatarios(destinatarios)
+    if not EMAIL_FROM or not destinatarios:
+        return []
+
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        cursor = conn.cursor()
+        ids = []
+        for destinatario in destinatarios:
+            cursor.execute('''
+                INSERT INTO email_outbox (destinatario, asunto, cuerpo) VALUES (?, ?, ?)
+            ''', (destinatario, asunto, cuerpo))
+            ids.append(cursor.lastrowid)
+        conn.commit()
+    finally:
+        conn.close()
+    _despertar.set()
+    return ids
+
+
+def _tomar_lote(limite: int = EMAIL_LOTE) -> List[Pendiente]:
+    """Marca como 'enviando' los pendientes vencidos de hasta `limite` destinatarios (todos los de cada uno)."""
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        cursor = conn.cursor()
+        # BEGIN IMMEDIATE: dos workers no pueden tomar las mismas filas
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('''
+            SELECT id, destinatario, asunto, cuerpo, intentos, created_at FROM email_outbox
+            WHERE estado = 'pendiente' AND proximo_intento <= CURRENT_TIMESTAMP
+              AND destinatario IN (
+                  SELECT DISTINCT destinatario FROM email_outbox
+                  WHERE estado = 'pendiente' AND proximo_intento <= CURRENT_TIMESTAMP
+                  ORDER BY id LIMIT ?
+              )
+            ORDER BY id
+        ''', (limite,))
+        lote = [Pendiente(*fila) for fila in cursor.fetchall()]
+        cursor.executemany("UPDATE email_outbox SET estado = 'enviando' WHERE id = ?", [(p.id,) for p in lote])
+        conn.commit()
+        return lote
+    finally:
+        conn.close()
+
+
+def _registrar(enviados: List[int], reintentos: Dict[int, str], fallidos: Dict[int, str]):
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            UPDATE email_outbox SET estado = 'enviado', intentos = intentos + 1, error = NULL,
+                   enviado_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', [(id_,) for id_ in enviados])
+        cursor.executemany('''
+            UPDATE email_outbox SET estado = 'fallido', intentos = intentos + 1, error = ? WHERE id = ?
+        ''', [(error, id_) for id_, error in fallidos.items()])
+        cursor.executemany('''
+            UPDATE email_outbox
+            SET estado = 'pendiente', intentos = intentos + 1, error = ?,
+                proximo_intento = datetime('now', '+' || MIN(? * (1 << intentos), ?) || ' seconds')
+            WHERE id = ?
+        ''', [(error, BACKOFF_BASE_S, BACKOFF_MAX_S, id_) for id_, error in reintentos.items()])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def recuperar_en_curso() -> int:
+    """Vuelve a 'pendiente' lo que quedó 'enviando' por un proceso que terminó a mitad de un lote."""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        cursor = conn.execute("UPDATE email_outbox SET estado = 'pendiente' WHERE estado = 'enviando'")
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+
+def get_outbox(limit: int = 50) -> Dict:
+    """Conteo por estado y los últimos emails del outbox (sin el cuerpo)."""
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    try:
+        conteos = {estado: 0 for estado in ESTADOS}
+        conteos.update(conn.execute('SELECT estado, COUNT(*) FROM email_outbox GROUP BY estado').fetchall())
+        emails = conn.execute('''
+            SELECT id, destinatario, asunto, estado, intentos, proximo_intento, error, created_at, enviado_at
+            FROM email_outbox ORDER BY id DESC LIMIT ?
+        ''', (limit,)).fetchall()
+        return {'conteos': conteos, 'emails': [dict(fila) for fila in emails]}
+    finally:
+        conn.close()
+
+
+# --- Pool SMTP ---
+
+class PoolSMTP:
+    """Conexiones SMTP persistentes (hasta `tamano` en uso a la vez), abiertas a demanda."""
+
+    def __init__(self, tamano: int = SMTP_POOL_SIZE, idle_s: float = SMTP_IDLE_S):
+        self.idle_s = idle_s
+        self._libres: queue.LifoQueue = queue.LifoQueue()
+        self._cupos = threading.BoundedSemaphore(max(1, tamano))
+
+    def _conectar(self) -> smtplib.SMTP:
+        conexion = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT_S)
+        try:
+            if SMTP_STARTTLS:
+                conexion.starttls(context=ssl.create_default_context())
+            if SMTP_USER and EMAIL_PASSWORD:
+                conexion.login(SMTP_USER, EMAIL_PASSWORD)
+        except Exception:
+            self._descartar(conexion)
+            raise
+        CONEXIONES_TOTAL.inc()
+        return conexion
+
+    @staticmethod
+    def _descartar(conexion: smtplib.SMTP):
+        try:
+            conexion.quit()
+        except (smtplib.SMTPException, OSError):
+            conexion.close()
+
+    def _tomar(self) -> smtplib.SMTP:
+        while True:
+            try:
+                conexion, ultimo_uso = self._libres.get_nowait()
+            except queue.Empty:
+                return self._conectar()
+            if time.monotonic() - ultimo_uso < self.idle_s:
+                return conexion
+            # Sin uso hace rato: el servidor pudo haberla cerrado por inactividad
+            try:
+                if conexion.noop()[0] == 250:
+                    return conexion
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._descartar(conexion)
+
+    @contextmanager
+    def conexion(self):
+        """Una conexión lista para enviar; vuelve al pool si el bloque no falló por la conexión."""
+        with self._cupos:
+            conexion = self._tomar()
+            try:
+                yield conexion
+            except BaseException as e:
+                # SMTPException hereda de OSError: solo la desconexión y los errores de socket invalidan la conexión
+                if isinstance(e, smtplib.SMTPServerDisconnected) or (
+                        isinstance(e, OSError) and not isinstance(e, smtplib.SMTPException)):
+                    self._descartar(conexion)
+                    raise
+                # Error de protocolo (p. ej. destinatario rechazado): la sesión queda a mitad de transacción
+                try:
+                    conexion.rset()
+                except (smtplib.SMTPException, OSError):
+                    self._descartar(conexion)
+                    raise
+                self._libres.put((conexion, time.monotonic()))
+                raise
+            self._libres.put((conexion, time.monotonic()))
+
+    def cerrar(self):
+        while True:
+            try:
+                conexion, _ = self._libres.get_nowait()
+            except queue.Empty:
+                return
+            self._descartar(conexion)
+
+
+_pool = PoolSMTP()
+
+
+def _armar_mensaje(destinatario: str, pendientes: List[Pendiente]) -> EmailMessage:
+    """El email de un destinatario: el pendiente tal cual, o un digest si hay varios."""
+    mensaje = EmailMessage()
+    mensaje['From'] = EMAIL_FROM
+    mensaje['To'] = destinatario
+    if len(pendientes) == 1:
+        mensaje['Subject'] = pendientes[0].asunto
+        mensaje.set_content(pendientes[0].cuerpo)
+        return mensaje
+    mensaje['Subject'] = f"{pendientes[-1].asunto} (+{len(pendientes) - 1} anteriores)"
+    secciones = [f"=== {p.asunto} ({p.created_at} UTC) ===\n\n{p.cuerpo}" for p in reversed(pendientes)]
+    mensaje.set_content('\n\n'.join(secciones))
+    return mensaje
+
+
+def _enviar(mensaje: EmailMessage):
+    # Un reintento inmediato con otra conexión si el servidor cortó la que se tomó del pool
+    for intento in range(2):
+        try:
+            with _pool.conexion() as conexion:
+                conexion.send_message(mensaje)
+            return
+        except smtplib.SMTPServerDisconnected:
+            if intento:
+                raise
+
+
+def _es_permanente(error: Exception) -> bool:
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False  # credenciales: se reintenta, puede corregirse la configuración
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(codigo >= 500 for codigo, _ in error.recipients.values())
+    codigo = getattr(error, 'smtp_code', None)
+    return isinstance(codigo, int) and codigo >= 500
+
+
+def procesar_lote(limite: int = EMAIL_LOTE) -> int:
+    """Toma un lote del outbox y lo entrega. Retorna cuántos emails del outbox procesó."""
+    lote = _tomar_lote(limite)
+    if not lote:
+        return 0
+
+    por_destinatario: Dict[str, List[Pendiente]] = defaultdict(list)
+    for pendiente in lote:
+        por_destinatario[pendiente.destinatario].append(pendiente)
+
+    enviados: List[int] = []
+    reintentos: Dict[int, str] = {}
+    fallidos: Dict[int, str] = {}
+    for destinatario, pendientes in por_destinatario.items():
+        ids = [p.id for p in pendientes]
+        try:
+            _enviar(_armar_mensaje(destinatario, pendientes))
+            enviados += ids
+            ENVIOS_TOTAL.labels('enviado').inc(len(ids))
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            for pendiente in pendientes:
+                if _es_permanente(e) or pendiente.intentos + 1 >= EMAIL_MAX_INTENTOS:
+                    fallidos[pendiente.id] = error
+                else:
+                    reintentos[pendiente.id] = error
+            resultado = 'fallido' if fallidos.keys() & set(ids) else 'reintento'
+            ENVIOS_TOTAL.labels(resultado).inc(len(ids))
+            logger.warning("Error al enviar email", extra={'destinatario': destinatario, 'emails': len(ids),
+                                                          'resultado': resultado, 'error': error})
+    _registrar(enviados, reintentos, fallidos)
+    if enviados:
+        logger.info("Emails enviados", extra={'emails': len(enviados), 'destinatarios': len(por_destinatario)})
+    return len(lote)
+
+
+# --- Workers ---
+
+_despertar = threading.Event()
+_detener = threading.Event()
+_workers: List[threading.Thread] = []
+_lock = threading.Lock()
+
+
+def _trabajar():
+    while not _detener.is_set():
+        _despertar.clear()
+        try:
+            procesados = procesar_lote()
+        except Exception:
+            logger.exception("Error en el worker de email")
+            procesados = 0
+        if not procesados:
+            _despertar.wait(INTERVALO_SONDEO_S)
+
+
+def iniciar_workers(cantidad: int = EMAIL_WORKERS):
+    """Inicia los workers del outbox (idempotente), retomando lo que quedó a mitad de envío."""
+    with _lock:
+        if _workers:
+            return
+        recuperados = recuperar_en_curso()
+        if recuperados:
+            logger.info("%d emails retomados del outbox", recuperados)
+        _detener.clear()
+        for i in range(max(1, cantidad)):
+            worker = threading.Thread(target=_trabajar, name=f'email-{i}', daemon=True)
+            worker.start()
+            _workers.append(worker)
+
+
+def detener_workers(timeout: float = 10.0):
+    """Detiene los workers (terminan el lote en curso) y cierra las conexiones del pool."""
+    with _lock:
+        _detener.set()
+        _despertar.set()
+        for worker in _workers:
+            worker.join(timeout)
+        _workers.clear()
+        _pool.cerrar()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Outbox de emails')
+    parser.add_argument('--estado', action='store_true', help='Conteo por estado y últimos emails')
+    parser.add_argument('--procesar', action='store_true', help='Entrega los pendientes vencidos y termina')
+    args = parser.parse_args()
+
+    if args.procesar:
+        total = 0
+        while True:
+            procesados = procesar_lote()
+            if not procesados:
+                break
+            total += procesados
+        _pool.cerrar()
+        print(f"📧 {total} emails procesados")
+    outbox = get_outbox(20)
+    print(' '.join(f"{estado}={cantidad}" for estado, cantidad in outbox['conteos'].items()))
+    if args.estado:
+        for email in outbox['emails']:
+            print(f"  #{email['id']} {email['estado']:<9} {email['destinatario']:<30} {email['asunto'][:40]}"
+                  f"{'  ' + email['error'] if email['error'] else ''}")
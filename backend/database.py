@@ -1,12 +1,52 @@
+import logging
 import sqlite3
 import json
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Any, Dict, Iterator, List, Optional
 from backend.config import DB_PATH
+from backend.dedup import clave_natural, asegurar_indice_unico
+from backend.similarity import crear_tablas as crear_tablas_similitud, indexar_lead
+from backend.serialization import SQL_LEAD_JSON, lead_json
+from backend.search import crear_indice_fts, reconstruir_indice_fts
+from backend.stats import crear_tablas_stats, recalcular_stats
+from backend.storage import (
+    COLUMNAS_RAW, COLUMNAS_RAW_SQL, codificar_lead, reconstruir_raw_data, descomprimir_texto,
+    crear_tablas_storage, guardar_descripcion, migrar_filas_legacy, RawDataPerezoso
+)
+from backend.metrics import BUCKETS_BD, histograma, instrumentar
+from backend.change_detection import IndiceProyectosSeia
+from backend.correo import crear_tabla_outbox
+from backend.resumen_ia import crear_tabla_cache as crear_tabla_cache_reporte
+from backend.vocabulario import clave, completar_ids, crear_tablas_vocabulario, id_estado, id_industria
 import os
 
-def init_db():
-    """Crea las tablas si no existen."""
+logger = logging.getLogger(__name__)
+
+# Latencia de cada función pública de este módulo (conexión + consultas + commit)
+DB_SEGUNDOS = histograma('db_query_duration_seconds', 'Duración de las funciones de backend/database.py',
+                         ['funcion'], BUCKETS_BD)
+
+
+def _ensure_column(cursor, table: str, column: str, definition: str):
+    """Agrega una columna a una tabla existente si aún no está definida."""
+    cursor.execute(f'PRAGMA table_info({table})')
+    columns = {row[1] for row in cursor.fetchall()}
+    if column not in columns:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
+def _descripcion_lead(raw_data: dict) -> str:
+    """Construye la descripción resumida de un lead SEIA a partir de su raw_data."""
+    return f"Titular: {raw_data.get('titular', 'N/A')}. Región: {raw_data.get('region', 'N/A')}, {raw_data.get('comuna', 'N/A')}. Inversión: {raw_data.get('inversion_formato', 'N/A')}. Estado: {raw_data.get('estado', 'N/A')}."
+
+
+@instrumentar(DB_SEGUNDOS)
+def init_db() -> Dict:
+    """
+    Crea las tablas si no existen y aplica las migraciones pendientes.
+    Retorna {filas_migradas, compactacion}: filas convertidas al formato compacto y
+    resultado de la fusión de duplicados (None si el índice único ya existía).
+    """
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
     
     conn = sqlite3.connect(DB_PATH)
@@ -26,6 +66,12 @@ def init_db():
         )
     ''')
     
+    # Hash del contenido normalizado (detección de cambios SEIA)
+    _ensure_column(cursor, 'leads', 'content_hash', 'TEXT')
+    
+    # Columnas tipadas + blob comprimido + tabla de descripciones
+    crear_tablas_storage(cursor)
+    
     # Tabla de runs
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS runs (
@@ -38,6 +84,27 @@ def init_db():
         )
     ''')
     
+    # Memoria del proceso al iniciar cada run y pico muestreado durante el run (metrics.MuestreoRSS; NULL si no está disponible)
+    _ensure_column(cursor, 'runs', 'rss_inicio_mb', 'REAL')
+    _ensure_column(cursor, 'runs', 'rss_pico_mb', 'REAL')
+    
+    # Perfil por etapa de cada run (ver scrapers/servicios.py: Metricas.medir)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS run_metrics (
+            run_id INTEGER NOT NULL,
+            etapa TEXT NOT NULL,
+            wall_segundos REAL DEFAULT 0,
+            cpu_segundos REAL DEFAULT 0,
+            llamadas INTEGER DEFAULT 0,
+            requests INTEGER DEFAULT 0,
+            bytes INTEGER DEFAULT 0,
+            reintentos INTEGER DEFAULT 0,
+            cache_hits INTEGER DEFAULT 0,
+            filas INTEGER DEFAULT 0,
+            PRIMARY KEY (run_id, etapa)
+        )
+    ''')
+    
     # Tabla de cambios de estado
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS estado_changes (
@@ -52,33 +119,139 @@ def init_db():
         )
     ''')
     
+    # Tabla de cambios por campo (generaliza estado_changes a todos los campos seguidos)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS field_changes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lead_id INTEGER,
+            codigo_seia TEXT,
+            project_name TEXT,
+            campo TEXT NOT NULL,
+            valor_anterior TEXT,
+            valor_nuevo TEXT,
+            detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            seen BOOLEAN DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_field_changes_lead ON field_changes(lead_id)
+    ''')
+    
+    # Documentos CMF ya procesados (relevantes o no), para el scraping incremental
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cmf_documentos (
+            documento_id TEXT PRIMARY KEY,
+            fecha TEXT,
+            entidad TEXT,
+            materia TEXT,
+            tipo_evento TEXT,
+            categoria_evento TEXT,
+            relevante BOOLEAN DEFAULT 0,
+            processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Vocabulario de estados e industrias: ids y banderas para filtrar sin comparar texto
+    crear_tablas_vocabulario(cursor)
+    
+    # Búsqueda full-text (FTS5) sincronizada con triggers
+    crear_indice_fts(cursor)
+    
+    # Estadísticas pre-agregadas para el dashboard
+    crear_tablas_stats(cursor)
+    
+    # Índice MinHash/LSH de casi-duplicados
+    crear_tablas_similitud(cursor)
+    
+    # Respuestas del modelo del reporte con IA, por hash del contenido
+    crear_tabla_cache_reporte(cursor)
+    
+    # Outbox de emails (entrega asíncrona con reintentos)
+    crear_tabla_outbox(cursor)
+    
+    # Filas con raw_data JSON de versiones anteriores -> formato compacto
+    filas_migradas = migrar_filas_legacy(cursor)
+    if filas_migradas:
+        reconstruir_indice_fts(cursor)
+        recalcular_stats(cursor)
+        logger.info("%d leads migrados al formato compacto", filas_migradas)
+    
+    # Filas sin estado_id / industria_id (BD anteriores al vocabulario)
+    ids_completados = completar_ids(cursor)
+    if ids_completados:
+        logger.info("%d ids de estado/industria asignados", ids_completados)
+    
+    # Clave natural única por fuente (fusiona duplicados históricos la primera vez)
+    compactacion = asegurar_indice_unico(conn)
+    if compactacion and compactacion['filas_eliminadas']:
+        logger.info("Se fusionaron %d leads duplicados (%d grupos)",
+                    compactacion['filas_eliminadas'], compactacion['grupos_duplicados'])
+    
     conn.commit()
     conn.close()
+    return {
+        'filas_migradas': filas_migradas,
+        'compactacion': compactacion
+    }
 
+@instrumentar(DB_SEGUNDOS)
 def save_leads(source: str, leads: List[Dict]) -> int:
-    """Guarda leads en la base de datos."""
+    """
+    Guarda leads en la base de datos.
+    Usa INSERT ... ON CONFLICT sobre (source, natural_key): si el lead ya existe
+    se actualizan sus campos y se conserva su created_at original.
+    raw_data se guarda en formato compacto (ver backend/storage.py).
+    """
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
+    columnas_insert = ', '.join(['source', 'project_name', 'date', 'sector', 'description',
+                                 'content_hash', 'natural_key', 'estado_id', 'industria_id'] + COLUMNAS_RAW)
+    placeholders = ', '.join('?' * (9 + len(COLUMNAS_RAW)))
+    actualizar = ',\n                '.join(
+        f'{c} = excluded.{c}'
+        for c in ['project_name', 'date', 'sector', 'description', 'content_hash',
+                  'estado_id', 'industria_id'] + COLUMNAS_RAW
+    )
+    
+    # Ids del vocabulario antes de empezar a escribir (los nuevos se crean en su propia transacción)
+    codificados = [codificar_lead(lead) for lead in leads]
+    ids_vocabulario = [(id_estado(columnas['estado']), id_industria(columnas['industria']))
+                       for columnas, _ in codificados]
+    
     saved_count = 0
-    for lead in leads:
-        cursor.execute('''
-            INSERT INTO leads (source, project_name, date, sector, description, raw_data)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
+    for lead, (columnas, descripcion), (estado_id, industria_id) in zip(leads, codificados, ids_vocabulario):
+        cursor.execute(f'''
+            INSERT INTO leads ({columnas_insert})
+            VALUES ({placeholders})
+            ON CONFLICT(source, natural_key) DO UPDATE SET
+                {actualizar}
+            RETURNING id
+        ''', [
             source,
             lead.get('project_name', ''),
             lead.get('date', ''),
             lead.get('sector', ''),
             lead.get('description', ''),
-            json.dumps(lead.get('raw_data', {}))
-        ))
+            lead.get('content_hash'),
+            clave_natural(source, lead),
+            estado_id,
+            industria_id
+        ] + [columnas[c] for c in COLUMNAS_RAW])
+        lead_id = cursor.fetchone()[0]
+        guardar_descripcion(cursor, lead_id, descripcion)
+        indexar_lead(
+            cursor, lead_id, source,
+            lead.get('project_name', '') or '',
+            columnas['titular'] or ''
+        )
         saved_count += 1
     
     conn.commit()
     conn.close()
     return saved_count
 
+@instrumentar(DB_SEGUNDOS)
 def create_run(source: str) -> int:
     """Crea un nuevo run y retorna su ID."""
     conn = sqlite3.connect(DB_PATH)
@@ -94,6 +267,7 @@ def create_run(source: str) -> int:
     conn.close()
     return run_id
 
+@instrumentar(DB_SEGUNDOS)
 def update_run(run_id: int, status: str, total_leads: int = 0):
     """Actualiza el estado de un run."""
     conn = sqlite3.connect(DB_PATH)
@@ -108,73 +282,260 @@ def update_run(run_id: int, status: str, total_leads: int = 0):
     conn.commit()
     conn.close()
 
-def get_latest_leads(limit: int = 500, sort_by: str = None, sort_order: str = 'desc') -> List[Dict]:
-    """Obtiene los ultimos leads."""
+# Columnas de leads para reconstruir un lead completo
+_COLUMNAS_LEAD_SQL = f'l.id, l.source, l.project_name, l.date, l.sector, l.description, l.created_at, {COLUMNAS_RAW_SQL}'
+
+
+def _select_leads(include_descripcion: bool) -> str:
+    """SELECT base de leads, con la descripción completa solo si se pide."""
+    if include_descripcion:
+        return f'''
+            SELECT {_COLUMNAS_LEAD_SQL}, d.descripcion
+            FROM leads l
+            LEFT JOIN lead_descripciones d ON d.lead_id = l.id
+        '''
+    return f'''
+        SELECT {_COLUMNAS_LEAD_SQL}, NULL AS descripcion
+        FROM leads l
+    '''
+
+
+def _row_to_lead(row) -> Dict:
+    """Convierte una fila de _select_leads en el dict de lead que usa la API."""
+    return {
+        'id': row['id'],
+        'source': row['source'],
+        'project_name': row['project_name'],
+        'date': row['date'],
+        'sector': row['sector'],
+        'description': row['description'],
+        'raw_data': reconstruir_raw_data(row, descomprimir_texto(row['descripcion'])),
+        'created_at': row['created_at']
+    }
+
+
+@instrumentar(DB_SEGUNDOS)
+def get_latest_leads(limit: int = 500, sort_by: str = None, sort_order: str = 'desc',
+                     include_descripcion: bool = False) -> List[Dict]:
+    """
+    Obtiene los ultimos leads.
+    La descripción completa (tabla aparte) solo se carga con include_descripcion=True.
+    """
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
     # Query simple sin ordenamiento complejo
-    cursor.execute('''
-        SELECT source, project_name, date, sector, description, raw_data, created_at
-        FROM leads
-        ORDER BY created_at DESC
+    cursor.execute(_select_leads(include_descripcion) + '''
+        ORDER BY l.created_at DESC
         LIMIT ?
     ''', (limit,))
     
     rows = cursor.fetchall()
     conn.close()
     
-    leads = []
-    for row in rows:
-        leads.append({
-            'source': row['source'],
-            'project_name': row['project_name'],
-            'date': row['date'],
-            'sector': row['sector'],
-            'description': row['description'],
-            'raw_data': json.loads(row['raw_data']) if row['raw_data'] else {},
-            'created_at': row['created_at']
-        })
-    
+    return [_row_to_lead(row) for row in rows]
+
+# Filas por fetchmany de los iteradores
+BATCH_SIZE = 1000
+
+# Filtros de iter_leads -> condición SQL (estado e industria por clave del vocabulario)
+_FILTROS_LEADS = {
+    'source': 'LOWER(l.source) = LOWER(?)',
+    'industria': 'l.industria_id = (SELECT id FROM industrias WHERE clave = ?)',
+    'estado': 'l.estado_id = (SELECT id FROM estados WHERE clave = ?)',
+}
+
+# Valor del filtro -> parámetro SQL
+_VALORES_FILTROS = {'industria': clave, 'estado': clave}
+
+# Filtros booleanos de iter_leads -> condición SQL
+_FILTROS_BANDERA = {
+    'con_codigo_seia': "l.codigo_seia IS NOT NULL AND l.codigo_seia != ''",
+    'estado_elegible': 'l.estado_id IN (SELECT id FROM estados WHERE is_valido = 1 AND is_excluido = 0)',
+}
+
+# Órdenes de iter_leads
+_ORDENES_LEADS = {
+    'reciente': 'l.created_at DESC',
+    'fuente': 'UPPER(l.source), l.created_at DESC',
+    'id': 'l.id',
+}
+
+
+def _en_lotes(cursor, batch_size: int, metrica=None) -> Iterator:
+    """Filas del cursor, leídas de a batch_size con fetchmany (observando cada lote en metrica)."""
+    while True:
+        if metrica is not None:
+            with metrica.tiempo():
+                filas = cursor.fetchmany(batch_size)
+        else:
+            filas = cursor.fetchmany(batch_size)
+        if not filas:
+            return
+        yield from filas
+
+
+def _row_to_lead_perezoso(row) -> Dict:
+    """Como _row_to_lead, pero raw_data se decodifica solo si se usa (RawDataPerezoso)."""
+    return {
+        'id': row['id'],
+        'source': row['source'],
+        'project_name': row['project_name'],
+        'date': row['date'],
+        'sector': row['sector'],
+        'description': row['description'],
+        'raw_data': RawDataPerezoso(row, row['descripcion']),
+        'created_at': row['created_at']
+    }
+
+
+def iter_leads(filtros: Optional[Dict[str, Any]] = None, batch_size: int = BATCH_SIZE,
+               include_descripcion: bool = False, orden: str = 'reciente') -> Iterator[Dict]:
+    """
+    Recorre los leads en memoria constante: lee de a batch_size filas (fetchmany)
+    y raw_data es un RawDataPerezoso, que lee los campos calientes de las columnas
+    y descomprime el resto solo si se pide (dict(lead['raw_data']) da un dict normal).
+
+    filtros: source (sin distinguir mayúsculas), industria y estado (por clave: sin
+        distinguir mayúsculas ni espacios), con_codigo_seia (True: solo leads con código
+        SEIA) y estado_elegible (True: solo estados válidos y no excluidos, ver vocabulario)
+    orden: 'reciente' (created_at DESC), 'fuente' (fuente y luego reciente) o 'id'
+
+    La conexión queda abierta mientras se consume y se cierra al agotar o cerrar el
+    iterador. Se puede consumir desde otro thread (p. ej. dentro de un StreamingResponse).
+    """
+    filtros = dict(filtros or {})
+    if orden not in _ORDENES_LEADS:
+        raise ValueError(f"Orden inválido: {orden!r} (opciones: {', '.join(_ORDENES_LEADS)})")
+    condiciones, parametros = [], []
+    for bandera, condicion in _FILTROS_BANDERA.items():
+        if filtros.pop(bandera, False):
+            condiciones.append(condicion)
+    for campo, valor in filtros.items():
+        if campo not in _FILTROS_LEADS:
+            raise ValueError(f"Filtro desconocido: {campo!r}")
+        condiciones.append(_FILTROS_LEADS[campo])
+        parametros.append(_VALORES_FILTROS[campo](valor) if campo in _VALORES_FILTROS else valor)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    try:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(_select_leads(include_descripcion) + f'''
+            {where}
+            ORDER BY {_ORDENES_LEADS[orden]}
+        ''', parametros)
+        for row in _en_lotes(cursor, batch_size, DB_SEGUNDOS.labels(funcion='iter_leads')):
+            yield _row_to_lead_perezoso(row)
+    finally:
+        conn.close()
+
+
+@instrumentar(DB_SEGUNDOS)
+def get_lead_counts_by_source() -> Dict[str, int]:
+    """Cantidad de leads por fuente (en mayúsculas, como se agrupan en el reporte Markdown)."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        SELECT UPPER(source), COUNT(*) FROM leads GROUP BY UPPER(source)
+    ''')
+
+    rows = cursor.fetchall()
+    conn.close()
+
+    return {row[0]: row[1] for row in rows}
+
+
+@instrumentar(DB_SEGUNDOS)
+def load_lead_descripciones(leads: List[Dict]) -> List[Dict]:
+    """
+    Agrega descripcion_completa al raw_data de unos pocos leads (p. ej. el top de un
+    reporte, recorrido sin descripciones) con una sola consulta. Modifica y retorna los leads.
+    """
+    ids = [lead['id'] for lead in leads]
+    if not ids:
+        return leads
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    placeholders = ','.join('?' * len(ids))
+    cursor.execute(f'''
+        SELECT lead_id, descripcion FROM lead_descripciones WHERE lead_id IN ({placeholders})
+    ''', ids)
+
+    descripciones = {row[0]: descomprimir_texto(row[1]) for row in cursor.fetchall()}
+    conn.close()
+
+    for lead in leads:
+        descripcion = descripciones.get(lead['id'])
+        if descripcion:
+            if not isinstance(lead['raw_data'], dict):
+                lead['raw_data'] = dict(lead['raw_data'])
+            lead['raw_data']['descripcion_completa'] = descripcion
     return leads
 
-def get_leads_by_source(source: str, limit: int = 100) -> List[Dict]:
+@instrumentar(DB_SEGUNDOS)
+def get_latest_leads_json(limit: int = 500, include_descripcion: bool = False) -> List[bytes]:
+    """
+    Igual que get_latest_leads, pero retorna cada lead ya serializado a JSON
+    (modo passthrough para /leads, ver backend/serialization.py).
+    """
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    
+    descripcion = 'd.descripcion' if include_descripcion else 'NULL AS descripcion'
+    join = 'LEFT JOIN lead_descripciones d ON d.lead_id = l.id' if include_descripcion else ''
+    cursor.execute(f'''
+        SELECT {SQL_LEAD_JSON}, {descripcion}
+        FROM leads l
+        {join}
+        ORDER BY l.created_at DESC
+        LIMIT ?
+    ''', (limit,))
+    
+    rows = cursor.fetchall()
+    conn.close()
+    
+    return [lead_json(row) for row in rows]
+
+@instrumentar(DB_SEGUNDOS)
+def get_leads_by_source(source: str, limit: int = 100, include_descripcion: bool = False) -> List[Dict]:
     """Obtiene leads filtrados por fuente."""
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT source, project_name, date, sector, description, raw_data, created_at
-        FROM leads
-        WHERE source = ?
-        ORDER BY created_at DESC
+    cursor.execute(_select_leads(include_descripcion) + '''
+        WHERE l.source = ?
+        ORDER BY l.created_at DESC
         LIMIT ?
     ''', (source, limit))
     
     rows = cursor.fetchall()
     conn.close()
     
-    leads = []
-    for row in rows:
-        leads.append({
-            'source': row['source'],
-            'project_name': row['project_name'],
-            'date': row['date'],
-            'sector': row['sector'],
-            'description': row['description'],
-            'raw_data': json.loads(row['raw_data']) if row['raw_data'] else {},
-            'created_at': row['created_at']
-        })
-    
-    return leads
+    return [_row_to_lead(row) for row in rows]
 
-def get_all_leads_for_report() -> List[Dict]:
-    """Obtiene todos los leads recientes para generar reporte."""
-    return get_latest_leads(limit=500)
 
+@instrumentar(DB_SEGUNDOS)
+def get_lead_descripcion(lead_id: int) -> Optional[str]:
+    """Obtiene la descripción completa de un lead (cargada bajo demanda)."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT descripcion FROM lead_descripciones WHERE lead_id = ?
+    ''', (lead_id,))
+    
+    row = cursor.fetchone()
+    conn.close()
+    return descomprimir_texto(row[0]) if row else None
 
+@instrumentar(DB_SEGUNDOS)
 def get_existing_project_names(source: str) -> set:
     """Obtiene los nombres de proyectos existentes para una fuente específica."""
     conn = sqlite3.connect(DB_PATH)
@@ -190,6 +551,7 @@ def get_existing_project_names(source: str) -> set:
     return {row[0] for row in rows if row[0]}
 
 
+@instrumentar(DB_SEGUNDOS)
 def get_existing_seia_codes() -> set:
     """Obtiene los códigos SEIA de proyectos ya scrapeados."""
     conn = sqlite3.connect(DB_PATH)
@@ -197,97 +559,243 @@ def get_existing_seia_codes() -> set:
     
     # Buscar tanto 'seia' como 'SEIA' por si acaso
     cursor.execute('''
-        SELECT raw_data FROM leads WHERE LOWER(source) = 'seia'
+        SELECT codigo_seia FROM leads
+        WHERE LOWER(source) = 'seia' AND codigo_seia IS NOT NULL AND codigo_seia != ''
     ''')
     
     rows = cursor.fetchall()
     conn.close()
     
-    codes = set()
-    for row in rows:
-        if row[0]:
-            try:
-                data = json.loads(row[0])
-                codigo = data.get('codigo_seia')
-                if codigo:
-                    codes.add(str(codigo))
-            except:
-                pass
-    
-    return codes
+    return {str(row[0]) for row in rows}
 
 
+@instrumentar(DB_SEGUNDOS)
 def get_existing_seia_projects() -> Dict[str, Dict]:
     """
     Obtiene los proyectos SEIA existentes con su estado actual.
-    Retorna dict: {codigo_seia: {lead_id, estado, project_name, raw_data}}
+    Retorna dict: {codigo_seia: {lead_id, estado, project_name, raw_data, content_hash}}
+    raw_data es un RawDataPerezoso: el blob comprimido se decodifica solo en los
+    proyectos cuyo contenido cambió (o sin content_hash), no en toda la tabla.
     """
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT id, project_name, raw_data FROM leads WHERE LOWER(source) = 'seia'
+
+    cursor.execute(f'''
+        SELECT id, project_name, date, content_hash, {COLUMNAS_RAW_SQL}
+        FROM leads
+        WHERE LOWER(source) = 'seia' AND codigo_seia IS NOT NULL AND codigo_seia != ''
     ''')
-    
-    rows = cursor.fetchall()
-    conn.close()
-    
+
     projects = {}
-    for row in rows:
-        if row['raw_data']:
-            try:
-                data = json.loads(row['raw_data'])
-                codigo = data.get('codigo_seia')
-                if codigo:
-                    projects[str(codigo)] = {
-                        'lead_id': row['id'],
-                        'project_name': row['project_name'],
-                        'estado': data.get('estado', ''),
-                        'raw_data': data
-                    }
-            except:
-                pass
-    
+    for row in _en_lotes(cursor, BATCH_SIZE):
+        projects[str(row['codigo_seia'])] = {
+            'lead_id': row['id'],
+            'project_name': row['project_name'],
+            'estado': row['estado'] or '',
+            'raw_data': RawDataPerezoso(row),
+            'content_hash': row['content_hash']
+        }
+    conn.close()
+
     return projects
 
 
-def update_lead_estado(lead_id: int, nuevo_estado: str, raw_data: dict):
-    """Actualiza el estado de un lead existente."""
+@instrumentar(DB_SEGUNDOS)
+def get_seia_project_index() -> IndiceProyectosSeia:
+    """
+    Índice compacto de los proyectos SEIA existentes (código -> lead_id, estado,
+    content_hash) para el cruce con el listado. No lee raw_data: el scraper lo pide
+    con get_lead_raw_data solo para los proyectos que cambiaron (o sin content_hash).
+    """
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
+
+    cursor.execute('''
+        SELECT codigo_seia, id, estado, content_hash
+        FROM leads
+        WHERE LOWER(source) = 'seia' AND codigo_seia IS NOT NULL AND codigo_seia != ''
+        ORDER BY CAST(codigo_seia AS INTEGER), id
+    ''')
+
+    indice = IndiceProyectosSeia(get_lead_raw_data)
+    for codigo, lead_id, estado, content_hash in _en_lotes(cursor, BATCH_SIZE):
+        indice.agregar(str(codigo), lead_id, estado or '', content_hash)
+    conn.close()
+
+    return indice.cerrar()
+
+
+@instrumentar(DB_SEGUNDOS)
+def get_lead_raw_data(lead_id: int) -> Optional[Dict]:
+    """raw_data de un lead (sin la descripción completa), o None si no existe."""
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+
+    cursor.execute(f'''
+        SELECT project_name, date, {COLUMNAS_RAW_SQL} FROM leads WHERE id = ?
+    ''', (lead_id,))
+
+    row = cursor.fetchone()
+    conn.close()
+    return reconstruir_raw_data(row) if row else None
+
+
+@instrumentar(DB_SEGUNDOS)
+def update_lead_fields(lead_id: int, raw_data: dict, content_hash: str):
+    """Actualiza raw_data, descripción, nombre y hash de un lead cuyo contenido cambió."""
+    project_name = raw_data.get('nombre', '')
+    date = raw_data.get('fecha_presentacion', '')
+    columnas, descripcion = codificar_lead({
+        'project_name': project_name,
+        'date': date,
+        'raw_data': raw_data
+    })
+    asignaciones = ', '.join(f'{c} = ?' for c in COLUMNAS_RAW)
+    estado_id, industria_id = id_estado(columnas['estado']), id_industria(columnas['industria'])
     
-    # Actualizar raw_data con el nuevo estado
-    raw_data['estado'] = nuevo_estado
-    
-    # Actualizar también la descripción
-    description = f"Titular: {raw_data.get('titular', 'N/A')}. Región: {raw_data.get('region', 'N/A')}, {raw_data.get('comuna', 'N/A')}. Inversión: {raw_data.get('inversion_formato', 'N/A')}. Estado: {nuevo_estado}."
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
     
-    cursor.execute('''
+    cursor.execute(f'''
         UPDATE leads
-        SET raw_data = ?, description = ?
+        SET project_name = ?, date = ?, description = ?, content_hash = ?,
+            estado_id = ?, industria_id = ?, {asignaciones}
         WHERE id = ?
-    ''', (json.dumps(raw_data), description, lead_id))
+    ''', [
+        project_name,
+        date,
+        _descripcion_lead(raw_data),
+        content_hash,
+        estado_id,
+        industria_id
+    ] + [columnas[c] for c in COLUMNAS_RAW] + [lead_id])
+    guardar_descripcion(cursor, lead_id, descripcion)
+    
+    cursor.execute('SELECT source FROM leads WHERE id = ?', (lead_id,))
+    row = cursor.fetchone()
+    if row:
+        indexar_lead(cursor, lead_id, row[0], project_name or '', columnas['titular'] or '')
     
     conn.commit()
     conn.close()
 
 
+@instrumentar(DB_SEGUNDOS)
+def save_field_changes(lead_id: int, codigo_seia: str, project_name: str, cambios: List[Dict]):
+    """Guarda los cambios por campo detectados para un lead."""
+    if not cambios:
+        return
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    cursor.executemany('''
+        INSERT INTO field_changes (lead_id, codigo_seia, project_name, campo, valor_anterior, valor_nuevo)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', [
+        (lead_id, codigo_seia, project_name, c['campo'], c['valor_anterior'], c['valor_nuevo'])
+        for c in cambios
+    ])
+    
+    conn.commit()
+    conn.close()
+
+
+@instrumentar(DB_SEGUNDOS)
+def get_cmf_documentos_procesados() -> set:
+    """Obtiene los ids de documentos CMF ya procesados."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute('SELECT documento_id FROM cmf_documentos')
+    ids = {row[0] for row in cursor.fetchall()}
+    conn.close()
+    return ids
+
+
+@instrumentar(DB_SEGUNDOS)
+def save_cmf_documentos(documentos: List[Dict]):
+    """Registra documentos CMF procesados (upsert por documento_id)."""
+    if not documentos:
+        return
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.executemany('''
+        INSERT INTO cmf_documentos (documento_id, fecha, entidad, materia, tipo_evento, categoria_evento, relevante)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(documento_id) DO UPDATE SET
+            tipo_evento = excluded.tipo_evento,
+            categoria_evento = excluded.categoria_evento,
+            relevante = excluded.relevante,
+            processed_at = CURRENT_TIMESTAMP
+    ''', [
+        (d['documento_id'], d.get('fecha'), d.get('entidad'), d.get('materia'),
+         d.get('tipo_evento'), d.get('categoria_evento'), 1 if d.get('relevante') else 0)
+        for d in documentos
+    ])
+    conn.commit()
+    conn.close()
+
+
+@instrumentar(DB_SEGUNDOS)
+def get_recent_field_changes(limit: int = 50, campo: Optional[str] = None) -> List[Dict]:
+    """Obtiene los cambios por campo recientes, opcionalmente filtrados por campo."""
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    
+    query = '''
+        SELECT id, lead_id, codigo_seia, project_name, campo, valor_anterior, valor_nuevo, detected_at, seen
+        FROM field_changes
+    '''
+    params = []
+    if campo:
+        query += ' WHERE campo = ?'
+        params.append(campo)
+    query += ' ORDER BY detected_at DESC, id DESC LIMIT ?'
+    params.append(limit)
+    
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    conn.close()
+    
+    return [
+        {
+            'id': row['id'],
+            'lead_id': row['lead_id'],
+            'codigo_seia': row['codigo_seia'],
+            'project_name': row['project_name'],
+            'campo': row['campo'],
+            'valor_anterior': row['valor_anterior'],
+            'valor_nuevo': row['valor_nuevo'],
+            'detected_at': row['detected_at'],
+            'seen': bool(row['seen'])
+        }
+        for row in rows
+    ]
+
+
+@instrumentar(DB_SEGUNDOS)
 def save_estado_change(lead_id: int, codigo_seia: str, project_name: str, 
                        estado_anterior: str, estado_nuevo: str):
     """Guarda un registro de cambio de estado."""
+    ids = (id_estado(estado_anterior), id_estado(estado_nuevo))
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     cursor.execute('''
-        INSERT INTO estado_changes (lead_id, codigo_seia, project_name, estado_anterior, estado_nuevo)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (lead_id, codigo_seia, project_name, estado_anterior, estado_nuevo))
+        INSERT INTO estado_changes (lead_id, codigo_seia, project_name, estado_anterior, estado_nuevo,
+                                    estado_anterior_id, estado_nuevo_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (lead_id, codigo_seia, project_name, estado_anterior, estado_nuevo, *ids))
     
     conn.commit()
     conn.close()
 
 
+@instrumentar(DB_SEGUNDOS)
 def get_recent_estado_changes(limit: int = 20) -> List[Dict]:
     """Obtiene los cambios de estado recientes."""
     conn = sqlite3.connect(DB_PATH)
@@ -295,9 +803,11 @@ def get_recent_estado_changes(limit: int = 20) -> List[Dict]:
     cursor = conn.cursor()
     
     cursor.execute('''
-        SELECT id, lead_id, codigo_seia, project_name, estado_anterior, estado_nuevo, detected_at, seen
-        FROM estado_changes
-        ORDER BY detected_at DESC
+        SELECT c.id, c.lead_id, c.codigo_seia, c.project_name, c.estado_anterior, c.estado_nuevo,
+               c.detected_at, c.seen, e.is_aprobado
+        FROM estado_changes c
+        LEFT JOIN estados e ON e.id = c.estado_nuevo_id
+        ORDER BY c.detected_at DESC
         LIMIT ?
     ''', (limit,))
     
@@ -315,12 +825,13 @@ def get_recent_estado_changes(limit: int = 20) -> List[Dict]:
             'estado_nuevo': row['estado_nuevo'],
             'detected_at': row['detected_at'],
             'seen': bool(row['seen']),
-            'is_aprobado': 'aprobado' in (row['estado_nuevo'] or '').lower()
+            'is_aprobado': bool(row['is_aprobado'])
         })
     
     return changes
 
 
+@instrumentar(DB_SEGUNDOS)
 def mark_estado_changes_seen(change_ids: List[int]):
     """Marca cambios de estado como vistos."""
     if not change_ids:
@@ -338,37 +849,23 @@ def mark_estado_changes_seen(change_ids: List[int]):
     conn.close()
 
 
+@instrumentar(DB_SEGUNDOS)
 def get_all_leads_for_markdown() -> List[Dict]:
     """Obtiene todos los leads con información completa para exportar a markdown."""
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
-    cursor.execute('''
-        SELECT id, source, project_name, date, sector, description, raw_data, created_at
-        FROM leads
-        ORDER BY source, created_at DESC
+    cursor.execute(_select_leads(include_descripcion=True) + '''
+        ORDER BY l.source, l.created_at DESC
     ''')
     
     rows = cursor.fetchall()
     conn.close()
     
-    leads = []
-    for row in rows:
-        raw_data = json.loads(row['raw_data']) if row['raw_data'] else {}
-        leads.append({
-            'id': row['id'],
-            'source': row['source'],
-            'project_name': row['project_name'],
-            'date': row['date'],
-            'sector': row['sector'],
-            'description': row['description'],
-            'raw_data': raw_data,
-            'created_at': row['created_at']
-        })
-    
-    return leads
+    return [_row_to_lead(row) for row in rows]
 
+@instrumentar(DB_SEGUNDOS)
 def get_recent_runs(limit: int = 10) -> List[Dict]:
     """Obtiene el historial reciente de ejecuciones de scrapers."""
     conn = sqlite3.connect(DB_PATH)
@@ -399,14 +896,92 @@ def get_recent_runs(limit: int = 10) -> List[Dict]:
     return runs
 
 
+# Campos de cada etapa en run_metrics (mismos que Metricas.etapas())
+COLUMNAS_RUN_METRICS = ('wall_segundos', 'cpu_segundos', 'llamadas', 'requests', 'bytes',
+                        'reintentos', 'cache_hits', 'filas')
+
+@instrumentar(DB_SEGUNDOS)
+def save_run_metrics(run_id: int, etapas: Dict[str, Dict], rss_inicio_mb: Optional[float] = None,
+                     rss_pico_mb: Optional[float] = None):
+    """Guarda el perfil por etapa de un run ({etapa: {wall_segundos, cpu_segundos, ...}}) y su memoria."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    columnas = ', '.join(COLUMNAS_RUN_METRICS)
+    marcadores = ', '.join('?' for _ in COLUMNAS_RUN_METRICS)
+    cursor.executemany(f'''
+        INSERT OR REPLACE INTO run_metrics (run_id, etapa, {columnas})
+        VALUES (?, ?, {marcadores})
+    ''', [
+        (run_id, etapa, *(campos.get(c, 0) for c in COLUMNAS_RUN_METRICS))
+        for etapa, campos in etapas.items()
+    ])
+    cursor.execute('''
+        UPDATE runs SET rss_inicio_mb = ?, rss_pico_mb = ? WHERE id = ?
+    ''', (rss_inicio_mb, rss_pico_mb, run_id))
+    
+    conn.commit()
+    conn.close()
+
+@instrumentar(DB_SEGUNDOS)
+def get_run_profile(run_id: int) -> Optional[Dict]:
+    """
+    Perfil de un run: datos del run y sus etapas ordenadas por tiempo de pared.
+    Cada etapa incluye su porcentaje del tiempo total del run (las etapas de un
+    pipeline corren solapadas y las fichas en varios threads, así que pueden sumar más de 100%).
+    Retorna None si el run no existe.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT id, source, status, total_leads, started_at, completed_at, rss_inicio_mb, rss_pico_mb
+        FROM runs
+        WHERE id = ?
+    ''', (run_id,))
+    run = cursor.fetchone()
+    if run is None:
+        conn.close()
+        return None
+    
+    cursor.execute(f'''
+        SELECT etapa, {', '.join(COLUMNAS_RUN_METRICS)}
+        FROM run_metrics
+        WHERE run_id = ?
+        ORDER BY wall_segundos DESC
+    ''', (run_id,))
+    etapas = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    
+    total = next((e['wall_segundos'] for e in etapas if e['etapa'] == 'total'), None)
+    for etapa in etapas:
+        etapa['wall_segundos'] = round(etapa['wall_segundos'], 4)
+        etapa['cpu_segundos'] = round(etapa['cpu_segundos'], 4)
+        etapa['porcentaje_total'] = round(100 * etapa['wall_segundos'] / total, 1) if total else None
+    
+    return {
+        **dict(run),
+        'etapas': etapas,
+    }
+
+
+@instrumentar(DB_SEGUNDOS)
 def clear_all_data():
-    """Elimina todos los datos de leads, runs y estado_changes."""
+    """Elimina todos los datos de leads, runs, cambios e índice de similitud."""
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     cursor.execute('DELETE FROM leads')
+    cursor.execute('DELETE FROM lead_descripciones')
     cursor.execute('DELETE FROM runs')
+    cursor.execute('DELETE FROM run_metrics')
     cursor.execute('DELETE FROM estado_changes')
+    cursor.execute('DELETE FROM field_changes')
+    cursor.execute('DELETE FROM lead_minhash')
+    cursor.execute('DELETE FROM lead_lsh')
+    cursor.execute('DELETE FROM lead_links')
+    cursor.execute('DELETE FROM cmf_documentos')
     
     conn.commit()
     conn.close()
@@ -0,0 +1,200 @@
+"""
+Deduplicación de leads por clave natural.
+Cada fuente define una clave natural (codigo_seia para SEIA, id de documento
+para CMF) que se indexa como única junto a la fuente. Incluye el job de
+compactación que fusiona duplicados históricos.
+
+Uso manual (desde la raíz del proyecto):
+    python -m backend.dedup
+"""
+
+import hashlib
+import os
+import sqlite3
+from typing import Dict, Optional
+
+from backend.config import DB_PATH
+from backend.similarity import eliminar_de_indice
+from backend.storage import (
+    COLUMNAS_RAW, COLUMNAS_RAW_SQL, descomprimir_texto, guardar_descripcion, reconstruir_raw_data,
+)
+
+
+# Columnas que se copian desde la fila más reciente al fusionar duplicados
+_COLUMNAS_FUSION = ', '.join(
+    ['project_name', 'date', 'sector', 'description', 'content_hash', 'estado_id', 'industria_id'] + COLUMNAS_RAW
+)
+
+
+def clave_natural(source: str, lead: Dict) -> Optional[str]:
+    """
+    Obtiene la clave natural de un lead según su fuente.
+    - SEIA: codigo_seia
+    - Hechos Esenciales (CMF): id del documento
+    - Fallback: hash de nombre + fecha, para fuentes sin identificador propio
+    """
+    raw_data = lead.get('raw_data') or {}
+    source_norm = (source or '').strip().lower()
+
+    if source_norm == 'seia':
+        codigo = raw_data.get('codigo_seia')
+        if codigo:
+            return str(codigo)
+    elif source_norm in ('hechos_esenciales', 'hechos esenciales', 'cmf'):
+        documento_id = raw_data.get('documento_id')
+        if documento_id:
+            return str(documento_id)
+
+    nombre = (lead.get('project_name') or '').strip().lower()
+    fecha = (lead.get('date') or '').strip()
+    if not nombre:
+        return None
+    return 'h:' + hashlib.sha1(f"{nombre}|{fecha}".encode('utf-8')).hexdigest()
+
+
+def _backfill_claves(cursor) -> int:
+    """Calcula la clave natural de los leads que aún no la tienen."""
+    cursor.execute(f'''
+        SELECT id, source, project_name, date, {COLUMNAS_RAW_SQL} FROM leads WHERE natural_key IS NULL
+    ''')
+    nombres = [d[0] for d in cursor.description]
+    updates = []
+    for fila in cursor.fetchall():
+        row = dict(zip(nombres, fila))
+        clave = clave_natural(row['source'], {
+            'project_name': row['project_name'],
+            'date': row['date'],
+            'raw_data': reconstruir_raw_data(row)
+        })
+        lead_id = row['id']
+        if clave:
+            updates.append((clave, lead_id))
+
+    cursor.executemany('UPDATE leads SET natural_key = ? WHERE id = ?', updates)
+    return len(updates)
+
+
+def compactar_duplicados(conn: sqlite3.Connection) -> Dict[str, int]:
+    """
+    Fusiona leads duplicados (misma fuente y clave natural) dentro de una transacción.
+    Se conserva la fila con el created_at más antiguo y se le copian los campos
+    de la fila más reciente. Los cambios registrados se reasignan a la fila conservada.
+    No hace commit ni VACUUM.
+    """
+    cursor = conn.cursor()
+    claves_calculadas = _backfill_claves(cursor)
+
+    cursor.execute('''
+        SELECT source, natural_key FROM leads
+        WHERE natural_key IS NOT NULL
+        GROUP BY source, natural_key
+        HAVING COUNT(*) > 1
+    ''')
+    grupos = cursor.fetchall()
+
+    eliminados = 0
+    for source, clave in grupos:
+        cursor.execute('''
+            SELECT id, created_at FROM leads
+            WHERE source = ? AND natural_key = ?
+            ORDER BY created_at ASC, id ASC
+        ''', (source, clave))
+        filas = cursor.fetchall()
+
+        conservado_id, primer_created_at = filas[0]
+        mas_reciente_id = max(filas, key=lambda f: (f[1] or '', f[0]))[0]
+        duplicados = [f[0] for f in filas if f[0] != conservado_id]
+
+        if mas_reciente_id != conservado_id:
+            cursor.execute(f'''
+                UPDATE leads
+                SET ({_COLUMNAS_FUSION}) = (
+                    SELECT {_COLUMNAS_FUSION} FROM leads WHERE id = ?
+                ), created_at = ?
+                WHERE id = ?
+            ''', (mas_reciente_id, primer_created_at, conservado_id))
+            cursor.execute('''
+                SELECT descripcion FROM lead_descripciones WHERE lead_id = ?
+            ''', (mas_reciente_id,))
+            fila_desc = cursor.fetchone()
+            if fila_desc:
+                guardar_descripcion(cursor, conservado_id, descomprimir_texto(fila_desc[0]))
+
+        placeholders = ','.join('?' * len(duplicados))
+        for tabla in ('estado_changes', 'field_changes'):
+            cursor.execute(f'''
+                UPDATE {tabla} SET lead_id = ? WHERE lead_id IN ({placeholders})
+            ''', [conservado_id] + duplicados)
+        cursor.execute(f'DELETE FROM leads WHERE id IN ({placeholders})', duplicados)
+        eliminar_de_indice(cursor, duplicados)
+        eliminados += len(duplicados)
+
+    return {
+        'claves_calculadas': claves_calculadas,
+        'grupos_duplicados': len(grupos),
+        'filas_eliminadas': eliminados,
+    }
+
+
+def asegurar_indice_unico(conn: sqlite3.Connection, compactar: bool = False) -> Optional[Dict[str, int]]:
+    """
+    Asegura la columna natural_key y el índice único (source, natural_key).
+    Si el índice aún no existe (o compactar=True) fusiona primero los duplicados,
+    ya que de lo contrario la creación del índice fallaría.
+    Retorna el resultado de la compactación, o None si no fue necesaria.
+    """
+    cursor = conn.cursor()
+    cursor.execute('PRAGMA table_info(leads)')
+    if 'natural_key' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute('ALTER TABLE leads ADD COLUMN natural_key TEXT')
+
+    cursor.execute('''
+        SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_leads_natural_key'
+    ''')
+    if cursor.fetchone() and not compactar:
+        return None
+
+    resultado = compactar_duplicados(conn)
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_leads_natural_key ON leads(source, natural_key)
+    ''')
+    return resultado
+
+
+def compactar_leads(vacuum: bool = True) -> Dict[str, int]:
+    """
+    Job de compactación: fusiona duplicados existentes, asegura el índice único
+    y ejecuta VACUUM. Retorna las filas recuperadas y el tamaño de la BD antes/después.
+    """
+    from backend.database import init_db
+
+    tamano_antes = os.path.getsize(DB_PATH) if os.path.exists(DB_PATH) else 0
+
+    # init_db crea el esquema y, en una BD sin índice, ya realiza la primera fusión
+    compactacion_init = init_db()['compactacion'] or {}
+    resultado = {
+        clave: compactacion_init.get(clave, 0)
+        for clave in ('claves_calculadas', 'grupos_duplicados', 'filas_eliminadas')
+    }
+
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        adicional = asegurar_indice_unico(conn, compactar=True)
+        conn.commit()
+        if vacuum:
+            conn.execute('VACUUM')
+    finally:
+        conn.close()
+
+    for clave, valor in adicional.items():
+        resultado[clave] += valor
+    resultado['bytes_antes'] = tamano_antes
+    resultado['bytes_despues'] = os.path.getsize(DB_PATH)
+    return resultado
+
+
+if __name__ == '__main__':
+    resultado = compactar_leads()
+    print(f"🧹 Compactación completada: {resultado['filas_eliminadas']} filas duplicadas eliminadas "
+          f"en {resultado['grupos_duplicados']} grupos")
+    print(f"   Tamaño BD: {resultado['bytes_antes']:,} → {resultado['bytes_despues']:,} bytes")
@@ -0,0 +1,275 @@
+"""
+Logging estructurado para la API y los scrapers.
+
+- Los módulos usan `logger = logging.getLogger(__name__)` y pasan los datos como
+  campos: logger.warning("Error al obtener descripción", extra={'url': url, 'error': str(e)}).
+- configurar_logging() instala en la raíz un QueueHandler: quien loguea solo
+  formatea el mensaje y lo encola; un QueueListener (thread aparte) escribe en
+  consola y en el archivo JSON. Un print a stdout, en cambio, bloquea el thread
+  del scraper mientras la terminal o el pipe consumen la línea.
+- Cada registro lleva el run_id y la fuente de la ejecución en curso (ver
+  contexto_run); los pools de threads la heredan con en_contexto().
+- Niveles por módulo: LOG_LEVELS="scrapers.seia=DEBUG,backend.database=WARNING".
+
+El archivo (LOG_FILE, una línea JSON por registro, con rotación) es el que se
+consulta por ejecución: GET /runs/{id}/logs o `python -m backend.logs --run-id 12`.
+"""
+
+import argparse
+import atexit
+import contextvars
+import functools
+import glob
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+import orjson
+
+from backend.config import LOG_FILE, LOG_FILE_MAX_MB, LOG_FORMAT, LOG_LEVEL, LOG_LEVELS
+
+# (run_id, source) de la ejecución en curso en este thread/contexto
+_RUN_ACTUAL: contextvars.ContextVar = contextvars.ContextVar('run_actual', default=None)
+
+# Atributos propios de LogRecord: el resto son campos pasados con extra=
+_ATRIBUTOS_RECORD = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {
+    'message', 'asctime', 'run_id', 'source',
+}
+
+ARCHIVOS_RESPALDO = 5
+
+# Librerías que loguean cada request en INFO (TestClient, cliente de OpenAI); LOG_LEVELS las sobrescribe
+NIVELES_LIBRERIAS = {'httpx': 'WARNING', 'httpcore': 'WARNING'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+
+
+@contextmanager
+def contexto_run(run_id: Optional[int], source: Optional[str] = None):
+    """Asocia los registros del bloque (y de los threads lanzados con en_contexto) a una ejecución."""
+    token = _RUN_ACTUAL.set((run_id, source))
+    try:
+        yield
+    finally:
+        _RUN_ACTUAL.reset(token)
+
+
+def en_contexto(funcion: Callable) -> Callable:
+    """
+    Envuelve funcion para correrla en un pool de threads con el run_id/source de quien
+    la envuelve (los threads del pool no heredan los contextvars del que envía el trabajo).
+    """
+    contexto = contextvars.copy_context()
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        # Una copia por llamada: un mismo Context no se puede usar en dos threads a la vez
+        return contexto.copy().run(funcion, *args, **kwargs)
+    return envoltura
+
+
+class FiltroRun(logging.Filter):
+    """Agrega run_id y source al registro (en el thread que loguea, donde vive el contexto)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        run = _RUN_ACTUAL.get()
+        if not hasattr(record, 'run_id'):
+            record.run_id = run[0] if run else None
+        if not hasattr(record, 'source'):
+            record.source = run[1] if run else None
+        return True
+
+
+class _HandlerCola(logging.handlers.QueueHandler):
+    """
+    QueueHandler que deja el mensaje resuelto y la traza como texto, sin formatear el
+    registro completo: el formato (JSON o texto) lo aplica cada destino en el listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro: ts, nivel, logger, mensaje, run_id, source, thread y los extra."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+            'run_id': getattr(record, 'run_id', None),
+            'source': getattr(record, 'source', None),
+            'thread': record.threadName,
+        }
+        for clave, valor in record.__dict__.items():
+            if clave not in _ATRIBUTOS_RECORD and not clave.startswith('_'):
+                datos[clave] = valor
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            datos['excepcion'] = record.exc_text
+        return orjson.dumps(datos, default=str).decode()
+
+
+class FormatoTexto(logging.Formatter):
+    """Formato legible para la consola: hora, nivel, logger, [run N] mensaje y los extra como clave=valor."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s', datefmt='%H:%M:%S')
+
+    def format(self, record: logging.LogRecord) -> str:
+        linea = super().format(record)
+        extras = ' '.join(f'{clave}={valor}' for clave, valor in record.__dict__.items()
+                          if clave not in _ATRIBUTOS_RECORD and not clave.startswith('_'))
+        run_id = getattr(record, 'run_id', None)
+        if run_id is not None:
+            linea = linea.replace(': ', f': [run {run_id}] ', 1)
+        if extras:
+            primera, salto, resto = linea.partition('\n')
+            linea = f'{primera}  {extras}{salto}{resto}'
+        return linea
+
+
+def _parsear_niveles(texto: str) -> Dict[str, str]:
+    """'scrapers.seia=DEBUG,backend.database=WARNING' -> {'scrapers.seia': 'DEBUG', ...}"""
+    niveles = {}
+    for parte in texto.split(','):
+        modulo, _, nivel = parte.partition('=')
+        if modulo.strip() and nivel.strip():
+            niveles[modulo.strip()] = nivel.strip().upper()
+    return niveles
+
+
+def configurar_logging(nivel: str = LOG_LEVEL, niveles_modulo: str = LOG_LEVELS, formato: str = LOG_FORMAT,
+                       archivo: Optional[str] = LOG_FILE) -> None:
+    """
+    Instala el logging de la aplicación (idempotente: solo la primera llamada tiene efecto).
+
+    nivel: nivel de la raíz; niveles_modulo: excepciones por logger ("modulo=NIVEL,...");
+    formato: 'texto' o 'json' para la consola (el archivo siempre es JSON);
+    archivo: ruta del archivo JSON con rotación ('' = sin archivo).
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+
+        destinos: List[logging.Handler] = []
+        consola = logging.StreamHandler(sys.stderr)
+        consola.setFormatter(FormatoJSON() if formato == 'json' else FormatoTexto())
+        destinos.append(consola)
+        if archivo:
+            try:
+                os.makedirs(os.path.dirname(archivo) or '.', exist_ok=True)
+                en_archivo = logging.handlers.RotatingFileHandler(
+                    archivo, maxBytes=int(LOG_FILE_MAX_MB * 1024 * 1024), backupCount=ARCHIVOS_RESPALDO,
+                    encoding='utf-8', delay=True)
+                en_archivo.setFormatter(FormatoJSON())
+                destinos.append(en_archivo)
+            except OSError as e:
+                print(f"⚠️ No se pudo abrir el archivo de logs {archivo}: {e}", file=sys.stderr)
+
+        cola = queue.SimpleQueue()
+        handler = _HandlerCola(cola)
+        handler.addFilter(FiltroRun())
+
+        raiz = logging.getLogger()
+        raiz.handlers = [handler]
+        raiz.setLevel(nivel.upper())
+        for modulo, nivel_modulo in {**NIVELES_LIBRERIAS, **_parsear_niveles(niveles_modulo)}.items():
+            logging.getLogger(modulo).setLevel(nivel_modulo)
+
+        _listener = logging.handlers.QueueListener(cola, *destinos, respect_handler_level=True)
+        _listener.start()
+        atexit.register(detener_logging)
+
+
+def detener_logging() -> None:
+    """Vacía la cola y detiene el listener (se llama al salir del proceso)."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _archivos_log(archivo: str) -> List[str]:
+    """El archivo y sus respaldos de rotación, del más antiguo al más reciente."""
+    respaldos = sorted(glob.glob(glob.escape(archivo) + '.[0-9]*'),
+                       key=lambda ruta: int(ruta.rsplit('.', 1)[1]), reverse=True)
+    return respaldos + ([archivo] if os.path.exists(archivo) else [])
+
+
+def leer_logs(archivo: str = LOG_FILE) -> Iterator[Dict]:
+    """Registros del archivo JSON (y sus respaldos), en orden cronológico."""
+    for ruta in _archivos_log(archivo):
+        with open(ruta, 'rb') as f:
+            for linea in f:
+                try:
+                    yield orjson.loads(linea)
+                except orjson.JSONDecodeError:
+                    continue  # línea truncada por una rotación o un corte
+
+
+def buscar_logs(run_id: Optional[int] = None, nivel: Optional[str] = None, texto: Optional[str] = None,
+                limite: int = 1000, archivo: str = LOG_FILE) -> List[Dict]:
+    """
+    Registros que cumplen los filtros (los últimos `limite`): run_id exacto, nivel
+    mínimo (p. ej. WARNING) y texto contenido en el mensaje (sin distinguir mayúsculas).
+    """
+    minimo = logging.getLevelName(nivel.upper()) if nivel else 0
+    if not isinstance(minimo, int):
+        raise ValueError(f"Nivel inválido: {nivel!r}")
+    texto = texto.lower() if texto else None
+    resultado: List[Dict] = []
+    for registro in leer_logs(archivo):
+        if run_id is not None and registro.get('run_id') != run_id:
+            continue
+        if minimo and logging.getLevelName(registro.get('nivel', 'NOTSET')) < minimo:
+            continue
+        if texto and texto not in str(registro.get('mensaje', '')).lower():
+            continue
+        resultado.append(registro)
+        if len(resultado) > limite:
+            del resultado[0]
+    return resultado
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Busca en el archivo de logs JSON')
+    parser.add_argument('--run-id', type=int)
+    parser.add_argument('--nivel', help='Nivel mínimo (DEBUG, INFO, WARNING, ERROR)')
+    parser.add_argument('--texto', help='Texto contenido en el mensaje')
+    parser.add_argument('--limite', type=int, default=200)
+    parser.add_argument('--archivo', default=LOG_FILE)
+    parser.add_argument('--json', action='store_true', help='Una línea JSON por registro')
+    args = parser.parse_args()
+
+    for registro in buscar_logs(args.run_id, args.nivel, args.texto, args.limite, args.archivo):
+        if args.json:
+            print(orjson.dumps(registro).decode())
+            continue
+        extras = {k: v for k, v in registro.items()
+                  if k not in ('ts', 'nivel', 'logger', 'mensaje', 'run_id', 'source', 'thread', 'excepcion')}
+        run = f"[run {registro['run_id']}] " if registro.get('run_id') is not None else ''
+        linea = f"{registro['ts']} {registro['nivel']:<7} {registro['logger']}: {run}{registro['mensaje']}"
+        if extras:
+            linea += '  ' + ' '.join(f'{k}={v}' for k, v in extras.items())
+        print(linea)
+        if registro.get('excepcion'):
+            print(registro['excepcion'])
@@ -1,40 +1,58 @@
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from backend.database import (
-    init_db, save_leads, create_run, update_run, get_latest_leads, 
-    get_all_leads_for_report, get_recent_runs, get_existing_seia_projects,
-    update_lead_estado, save_estado_change, get_recent_estado_changes,
-    get_all_leads_for_markdown, clear_all_data
+    init_db, create_run, update_run, get_latest_leads_json, 
+    get_recent_runs, get_recent_field_changes,
+    get_recent_estado_changes, get_lead_descripcion, iter_leads, get_lead_counts_by_source,
+    load_lead_descripciones, clear_all_data, save_run_metrics, get_run_profile
 )
 from datetime import datetime
+from typing import Dict, Iterable, List
+from backend.middleware import CompressionMiddleware, CacheControlMiddleware, MetricsMiddleware, ProfilingMiddleware
+from backend.profiler import listar_perfiles, perfilar, ruta_perfil, validar_id
+from backend.logs import buscar_logs, configurar_logging, contexto_run
+from backend import metrics
 from backend.auth import AuthMiddleware, verify_credentials, create_access_token, verify_token
 from backend.report import generate_report_with_ai, send_email_report
-from backend.config import EMAIL_TO, JWT_EXPIRATION_HOURS
+from backend.correo import detener_workers, get_outbox, iniciar_workers
+from backend.config import EMAIL_TO, JWT_EXPIRATION_HOURS, PROFILE_REQUESTS, PROFILE_RUNS
 from backend.scoring import get_top_proyectos
+from backend.dedup import compactar_leads
+from backend.search import search_leads
+from backend.stats import get_stats
+from backend.serialization import respuesta_lista
+from backend.similarity import buscar_similares, buscar_similares_texto, vincular_fuentes, get_vinculos
 from backend.category_rules import CATEGORIAS, CATEGORIA_DEFAULT, CATEGORIA_DEFAULT_COLOR, CATEGORIA_DEFAULT_COLOR_NAME
-import traceback
+from backend import columnar
+from contextlib import nullcontext
+import itertools
 import json
+import logging
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 import threading
+import time
 import os
 
+# Logging estructurado (backend/logs.py): antes de cargar los plugins, que ya loguean
+configurar_logging()
+logger = logging.getLogger(__name__)
+
 # Modelo para login
 class LoginRequest(BaseModel):
     username: str
     password: str
 
-# Importar scrapers explícitamente
-from scrapers.seia.scraper import run_seia
-from scrapers.hechos_esenciales.scraper import run_hechos_esenciales
+# Scrapers: plugins incluidos + los declarados como entry point (scrapers/registro.py)
+from scrapers.framework import Contexto
+from scrapers.registro import descubrir_plugins
+from scrapers.servicios import Servicios
 
-# Definir dict de scrapers en main.py para legibilidad y debugging
-SCRAPERS = {
-    'seia': run_seia,
-    'hechos_esenciales': run_hechos_esenciales,
-}
+SCRAPERS = descubrir_plugins()
+# Sesión HTTP, rate limiter y cache compartidos por todas las fuentes y ejecuciones
+SERVICIOS = Servicios()
 
 # Variable global para almacenar el progreso de scrapers activos
 scraper_progress = {}
@@ -42,10 +60,26 @@ scraper_progress = {}
 scraper_cancel = {}
 # Variable global para almacenar resultados de scrapers
 scraper_results = {}
-# Thread pool para ejecutar scrapers
-executor = ThreadPoolExecutor(max_workers=2)
-
-app = FastAPI(title="Master Scraper API")
+# Thread pool para ejecutar scrapers (una fuente por thread)
+executor = ThreadPoolExecutor(max_workers=max(2, len(SCRAPERS)))
+
+# Métricas de ejecuciones de scrapers (GET /metrics)
+RUNS_TOTAL = metrics.contador('scraper_runs_total', 'Ejecuciones de scrapers terminadas', ['source', 'status'])
+RUN_SEGUNDOS = metrics.histograma('scraper_run_duration_seconds', 'Duración de cada ejecución de un scraper',
+                                  ['source'], (1, 5, 15, 30, 60, 120, 300, 600, 1200, 3600))
+RUN_PAGINAS = metrics.histograma('scraper_run_pages', 'Páginas de listado recorridas por ejecución',
+                                 ['source'], metrics.BUCKETS_CONTEO)
+RUN_FICHAS = metrics.histograma('scraper_run_fichas', 'Fichas/documentos descargados por ejecución',
+                                ['source'], metrics.BUCKETS_CONTEO)
+RUN_LEADS = metrics.histograma('scraper_run_leads', 'Leads nuevos guardados por ejecución',
+                               ['source'], metrics.BUCKETS_CONTEO)
+RUNS_ACTIVOS = metrics.gauge('scraper_runs_active', 'Scrapers ejecutándose ahora')
+metrics.gauge('scraper_executor_queue_depth', 'Ejecuciones esperando un thread libre del executor',
+              funcion=lambda: executor._work_queue.qsize())
+metrics.gauge('scraper_host_rate_limit_rps', 'Tasa actual del limitador adaptativo por host', ['host'],
+              funcion=lambda: {(host, ): estado['tasa_rps'] for host, estado in SERVICIOS.resumen_hosts().items()})
+
+app = FastAPI(title="Master Scraper API", default_response_class=ORJSONResponse)
 
 # Configurar CORS para permitir frontend Next.js (local y producción)
 ALLOWED_ORIGINS = [
@@ -67,17 +101,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profiling de requests con X-Profile: 1 (sin PROFILE_REQUESTS no se agrega y no cuesta nada).
+# Va por dentro de la autenticación: un request sin token no inicia el muestreo ni escribe perfiles
+if PROFILE_REQUESTS:
+    app.add_middleware(ProfilingMiddleware)
+
 # Agregar middleware de autenticación
 from backend.config import API_SECRET
 if API_SECRET:
     app.add_middleware(AuthMiddleware)
 else:
-    print("⚠️  WARNING: API_SECRET no configurado. La API está sin protección.")
+    logger.warning("API_SECRET no configurado. La API está sin protección.")
 
-# Inicializar base de datos al iniciar
+# Cache-Control por endpoint y compresión gzip/Brotli (la compresión va por fuera
+# de todo lo demás para comprimir también las respuestas de error y CORS)
+app.add_middleware(CacheControlMiddleware)
+app.add_middleware(CompressionMiddleware)
+# Métricas por ruta: por fuera de todo, mide también autenticación y compresión
+app.add_middleware(MetricsMiddleware)
+
+# Inicializar base de datos al iniciar (y los workers que entregan el outbox de emails)
 @app.on_event("startup")
 def startup_event():
     init_db()
+    iniciar_workers()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    detener_workers()
 
 @app.get("/")
 async def root():
@@ -89,6 +140,14 @@ async def health():
     """Health check para Docker/monitoreo."""
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def get_metrics():
+    """Métricas en formato de exposición de Prometheus (backend/metrics.py)."""
+    try:
+        return PlainTextResponse(metrics.exponer(), headers={'Content-Type': metrics.CONTENT_TYPE})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al exponer métricas: {str(e)}")
+
 @app.post("/login")
 async def login(request: LoginRequest):
     """
@@ -115,10 +174,26 @@ async def verify_token_endpoint():
     """
     return {"valid": True}
 
-def run_scraper_thread(source: str, run_id: int):
-    """Ejecuta el scraper en un thread separado."""
+def _observar_run(source: str, resultado: Dict):
+    """Registra en /metrics los conteos de una ejecución terminada (o cancelada)."""
+    metricas_run = resultado.get('metricas', {})
+    RUN_LEADS.labels(source).observe(resultado['total_leads'])
+    if 'paginas' in metricas_run:
+        RUN_PAGINAS.labels(source).observe(metricas_run['paginas'])
+    if 'fichas' in metricas_run:
+        RUN_FICHAS.labels(source).observe(metricas_run['fichas'])
+
+def run_scraper_thread(source: str, run_id: int, perfilar_run: bool = False):
+    """
+    Ejecuta el scraper en un thread separado.
+    Con perfilar_run (o PROFILE_RUNS) se perfila por muestreo: GET /profiles/run-{run_id}.
+    """
     global scraper_progress, scraper_cancel, scraper_results
     
+    inicio = time.perf_counter()
+    memoria = metrics.MuestreoRSS().iniciar()  # RSS al iniciar y pico muestreado durante el run
+    RUNS_ACTIVOS.inc()
+    ctx = None
     try:
         # Función callback para actualizar progreso
         def update_progress(percent, message):
@@ -128,61 +203,35 @@ def run_scraper_thread(source: str, run_id: int):
         def check_cancel():
             return scraper_cancel.get(source, False)
         
-        # Ejecutar scraper con parámetros adicionales según el tipo
-        scraper_func = SCRAPERS[source]
+        ctx = Contexto(source, SERVICIOS, run_id=run_id,
+                       progress_callback=update_progress, cancel_callback=check_cancel)
+        perfil = perfilar(f'run-{run_id}') if perfilar_run or PROFILE_RUNS else nullcontext()
+        with contexto_run(run_id, source), perfil, ctx.metricas.medir('total'):
+            logger.info("Iniciando scraper %s", source)
+            resultado = SCRAPERS[source].ejecutar(ctx)
+        total_leads = resultado['total_leads']
+        _observar_run(source, resultado)
         
-        estado_changes_count = 0
-        
-        if source == 'seia':
-            # Obtener proyectos existentes con su estado actual
-            existing_projects = get_existing_seia_projects()
-            print(f"📊 Encontrados {len(existing_projects)} proyectos SEIA existentes en BD")
-            
-            # El scraper SEIA retorna {new_leads: [...], estado_changes: [...]}
-            result = scraper_func(existing_projects=existing_projects, progress_callback=update_progress, cancel_callback=check_cancel)
-            leads = result.get('new_leads', [])
-            estado_changes = result.get('estado_changes', [])
-            
-            # Procesar cambios de estado
-            for change in estado_changes:
-                # Actualizar el lead existente con el nuevo estado
-                update_lead_estado(
-                    change['lead_id'],
-                    change['estado_nuevo'],
-                    change['raw_data']
-                )
-                # Registrar el cambio
-                save_estado_change(
-                    change['lead_id'],
-                    change['codigo_seia'],
-                    change['project_name'],
-                    change['estado_anterior'],
-                    change['estado_nuevo']
-                )
-            
-            estado_changes_count = len(estado_changes)
-            if estado_changes_count > 0:
-                print(f"🔄 Se detectaron {estado_changes_count} cambios de estado")
-        else:
-            leads = scraper_func()
-        
-        # Verificar si fue cancelado
-        if scraper_cancel.get(source, False):
-            update_run(run_id, 'cancelled', len(leads) if isinstance(leads, list) else 0)
+        # Verificar si fue cancelado (lo ya guardado por lotes se conserva)
+        if resultado['cancelado'] or scraper_cancel.get(source, False):
+            update_run(run_id, 'cancelled', total_leads)
+            logger.info("Scraper %s cancelado", source, extra={'run_id': run_id, 'source': source,
+                                                               'total_leads': total_leads})
             scraper_progress[source] = {"percent": 0, "message": "Cancelado"}
             scraper_results[source] = {
                 "status": "cancelled",
                 "source": source,
-                "total_leads": len(leads) if isinstance(leads, list) else 0,
+                "total_leads": total_leads,
                 "run_id": run_id
             }
             return
         
-        # Guardar leads nuevos en BD
-        total_leads = save_leads(source, leads) if leads else 0
-        
         # Actualizar run
         update_run(run_id, 'completed', total_leads)
+        logger.info("Scraper %s completado", source, extra={
+            'run_id': run_id, 'source': source, 'total_leads': total_leads,
+            'segundos': round(time.perf_counter() - inicio, 1), 'metricas': resultado['metricas'],
+        })
         
         # Limpiar progreso
         scraper_progress[source] = {"percent": 100, "message": "Completado"}
@@ -191,7 +240,9 @@ def run_scraper_thread(source: str, run_id: int):
             "status": "success",
             "source": source,
             "total_leads": total_leads,
-            "estado_changes": estado_changes_count,
+            "estado_changes": resultado['estado_changes'],
+            "field_changes": resultado['field_changes'],
+            "metricas": resultado['metricas'],
             "run_id": run_id
         }
     except Exception as e:
@@ -203,7 +254,7 @@ def run_scraper_thread(source: str, run_id: int):
         
         # Limpiar progreso con error
         scraper_progress[source] = {"percent": 0, "message": f"Error: {str(e)}"}
-        traceback.print_exc()
+        logger.exception("Error en scraper %s", source, extra={'run_id': run_id, 'source': source})
         
         scraper_results[source] = {
             "status": "error",
@@ -211,13 +262,25 @@ def run_scraper_thread(source: str, run_id: int):
             "error": str(e),
             "run_id": run_id
         }
+    finally:
+        memoria.detener()
+        # Perfil por etapa (también de runs con error o cancelados): GET /runs/{id}/profile
+        if ctx is not None:
+            try:
+                save_run_metrics(run_id, ctx.metricas.etapas(), memoria.inicio_mb, memoria.pico_mb)
+            except Exception as e:
+                logger.warning("No se pudo guardar el perfil del run %s: %s", run_id, e)
+        RUNS_ACTIVOS.dec()
+        RUN_SEGUNDOS.labels(source).observe(time.perf_counter() - inicio)
+        RUNS_TOTAL.labels(source, (scraper_results.get(source) or {}).get("status", "error")).inc()
 
 
 @app.post("/scrape/{source}")
-async def scrape_source(source: str):
+async def scrape_source(source: str, profile: bool = Query(False)):
     """
     Ejecuta un scraper específico en background y retorna inmediatamente.
     El progreso se puede consultar con GET /scrape-progress/{source}
+    Con ?profile=true la ejecución se perfila (GET /profiles/run-{run_id}).
     """
     global scraper_progress, scraper_cancel, scraper_results
     
@@ -237,7 +300,7 @@ async def scrape_source(source: str):
     run_id = create_run(source)
     
     # Ejecutar scraper en thread separado
-    executor.submit(run_scraper_thread, source, run_id)
+    executor.submit(run_scraper_thread, source, run_id, profile)
     
     # Retornar inmediatamente
     return {
@@ -249,52 +312,38 @@ async def scrape_source(source: str):
 
 
 @app.post("/scrape-all")
-async def scrape_all():
+async def scrape_all(profile: bool = Query(False)):
     """
-    Ejecuta todos los scrapers disponibles.
+    Ejecuta todos los scrapers disponibles en paralelo (un thread por fuente,
+    compartiendo sesión HTTP y rate limiter) y espera a que terminen.
     """
     results = []
     total_leads_all = 0
     errors = []
     
-    for source, scraper_func in SCRAPERS.items():
-        try:
-            # Crear registro de run
-            run_id = create_run(source)
-            
-            # Ejecutar scraper
-            leads = scraper_func()
-            
-            # Guardar leads en BD
-            total_leads = save_leads(source, leads)
-            total_leads_all += total_leads
-            
-            # Actualizar run
-            update_run(run_id, 'completed', total_leads)
-            
-            results.append({
-                "source": source,
-                "status": "success",
-                "total_leads": total_leads,
-                "run_id": run_id
-            })
-        except Exception as e:
-            try:
-                update_run(run_id, 'error', 0)
-            except:
-                pass
-            
-            error_detail = str(e)
-            traceback.print_exc()
+    runs = {}
+    for source in SCRAPERS:
+        scraper_progress[source] = {"percent": 0, "message": "Iniciando..."}
+        scraper_cancel[source] = False
+        scraper_results[source] = None
+        runs[source] = create_run(source)
+    
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(
+        loop.run_in_executor(executor, run_scraper_thread, source, run_id, profile)
+        for source, run_id in runs.items()
+    ))
+    
+    for source, run_id in runs.items():
+        resultado = scraper_results.get(source) or {"status": "error", "source": source, "error": "Sin resultado", "run_id": run_id}
+        if resultado["status"] == "error":
             errors.append({
                 "source": source,
-                "error": error_detail
-            })
-            results.append({
-                "source": source,
-                "status": "error",
-                "error": error_detail
+                "error": resultado["error"]
             })
+        else:
+            total_leads_all += resultado.get("total_leads", 0)
+        results.append(resultado)
     
     return {
         "status": "success" if not errors else "partial",
@@ -307,20 +356,18 @@ async def scrape_all():
 @app.post("/report")
 async def generate_report():
     """
-    Genera reporte con IA y lo envía por email.
+    Genera reporte con IA y lo encola para enviarlo por email a EMAIL_TO (uno o varios, separados por coma).
     """
     try:
-        # Obtener leads recientes
-        leads = get_all_leads_for_report()
-        
-        if not leads:
+        if not get_lead_counts_by_source():
             return {
                 "status": "error",
                 "message": "No hay leads disponibles para generar reporte"
             }
         
-        # Generar reporte con IA
-        report = generate_report_with_ai(leads)
+        # Generar reporte con IA: map-reduce sobre todos los leads (los de mayor score),
+        # con llamadas en paralelo y esperas de red: fuera del event loop
+        report = await asyncio.to_thread(generate_report_with_ai, iter_leads())
         
         if report.startswith("Error"):
             return {
@@ -328,38 +375,85 @@ async def generate_report():
                 "message": report
             }
         
-        # Enviar por email
-        email_sent = False
+        # Encolar el email (lo entregan los workers del outbox: no se espera al servidor SMTP)
+        email_queued = False
         if EMAIL_TO:
-            email_sent = send_email_report(report, EMAIL_TO)
+            email_queued = send_email_report(report, EMAIL_TO)
         
         return {
             "status": "success",
-            "email_sent": email_sent,
+            "email_queued": email_queued,
             "report_preview": report[:500] + "..." if len(report) > 500 else report
         }
     except Exception as e:
         error_detail = str(e)
-        traceback.print_exc()
+        logger.exception("Error al generar reporte")
         raise HTTPException(status_code=500, detail=f"Error al generar reporte: {error_detail}")
 
 
+@app.get("/email/outbox")
+async def get_email_outbox(limit: int = Query(50, ge=1, le=500)):
+    """Estado del outbox de emails: conteo por estado y los últimos emails (sin el cuerpo)."""
+    try:
+        return get_outbox(limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener el outbox: {str(e)}")
+
+
 @app.get("/leads")
 async def get_leads(
-    limit: int = Query(10000, ge=1, le=50000)
+    limit: int = Query(10000, ge=1, le=50000),
+    include_descripcion: bool = Query(True)
 ):
     """
     Obtiene los leads recientes.
     Sin límite práctico (hasta 50,000 para evitar problemas de memoria).
+    Con include_descripcion=false se omite la descripción completa
+    (se puede pedir bajo demanda en /leads/{id}/descripcion).
+    Los leads llegan ya serializados desde la BD (passthrough, sin jsonable_encoder).
     """
     try:
-        leads = get_latest_leads(limit)
+        leads = get_latest_leads_json(limit, include_descripcion=include_descripcion)
+        return respuesta_lista("leads", leads)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener leads: {str(e)}")
+
+
+@app.get("/search")
+async def search(
+    q: str = Query(..., min_length=1),
+    source: str = Query(None),
+    industria: str = Query(None),
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0)
+):
+    """
+    Búsqueda full-text sobre nombre, descripción, titular y descripción completa.
+    Ranking BM25, insensible a tildes, con filtros opcionales por fuente e industria.
+    """
+    try:
+        results = search_leads(q, source, industria, limit, offset)
         return {
-            "leads": leads,
-            "total": len(leads)
+            "query": q,
+            "results": results,
+            "total": len(results)
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al obtener leads: {str(e)}")
+        logger.exception("Error en la búsqueda")
+        raise HTTPException(status_code=500, detail=f"Error en la búsqueda: {str(e)}")
+
+
+@app.get("/stats")
+async def stats():
+    """
+    Estadísticas agregadas para el dashboard: conteos e inversión por
+    industria, región, estado, fuente y mes (pre-calculadas, no recorre leads).
+    """
+    try:
+        return get_stats()
+    except Exception as e:
+        logger.exception("Error al obtener estadísticas")
+        raise HTTPException(status_code=500, detail=f"Error al obtener estadísticas: {str(e)}")
 
 
 @app.get("/runs")
@@ -377,6 +471,56 @@ async def get_runs(limit: int = Query(10, ge=1, le=100)):
         raise HTTPException(status_code=500, detail=f"Error al obtener runs: {str(e)}")
 
 
+@app.get("/runs/{run_id}/profile")
+async def get_run_profile_endpoint(run_id: int):
+    """
+    Perfil de un run: tiempo de pared y CPU, requests, bytes, reintentos, cache hits
+    y filas escritas por etapa (listado, parse, fichas, guardado...), más la memoria
+    del proceso al iniciar y al terminar.
+    """
+    try:
+        perfil = get_run_profile(run_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener perfil: {str(e)}")
+    if perfil is None:
+        raise HTTPException(status_code=404, detail="Run no encontrado")
+    return perfil
+
+@app.get("/runs/{run_id}/logs")
+async def get_run_logs(run_id: int, nivel: str = Query(None), q: str = Query(None),
+                       limit: int = Query(500, ge=1, le=10000)):
+    """
+    Registros de log de un run (archivo JSON de LOG_FILE), incluidos los de los threads
+    de descarga. Filtros opcionales: nivel mínimo (?nivel=WARNING) y texto en el mensaje (?q=).
+    """
+    try:
+        # Recorre el archivo y sus respaldos: fuera del event loop
+        registros = await asyncio.to_thread(buscar_logs, run_id, nivel, q, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al buscar logs: {str(e)}")
+    return {"run_id": run_id, "registros": registros, "total": len(registros)}
+
+@app.get("/profiles")
+async def get_profiles():
+    """Perfiles por muestreo guardados (runs con ?profile=true o PROFILE_RUNS, requests con X-Profile)."""
+    try:
+        perfiles = listar_perfiles()
+        return {"perfiles": perfiles, "total": len(perfiles)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al listar perfiles: {str(e)}")
+
+@app.get("/profiles/{perfil_id}")
+async def download_profile(perfil_id: str):
+    """Descarga un perfil en formato collapsed stacks (flamegraph.pl, speedscope, inferno)."""
+    if not validar_id(perfil_id):
+        raise HTTPException(status_code=400, detail="Id de perfil inválido")
+    ruta = ruta_perfil(perfil_id)
+    if not os.path.exists(ruta):
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return FileResponse(ruta, media_type="text/plain", filename=f"{perfil_id}.folded")
+
 @app.get("/scrape-progress/{source}")
 async def get_scrape_progress(source: str):
     """
@@ -417,35 +561,57 @@ async def get_estado_changes(limit: int = Query(20, ge=1, le=100)):
         raise HTTPException(status_code=500, detail=f"Error al obtener cambios de estado: {str(e)}")
 
 
-@app.get("/export/markdown")
-async def export_markdown():
+@app.get("/field-changes")
+async def get_field_changes(
+    limit: int = Query(50, ge=1, le=500),
+    campo: str = Query(None)
+):
     """
-    Genera y retorna un reporte completo en formato Markdown para análisis con ChatGPT.
+    Obtiene los cambios por campo recientes de proyectos SEIA (inversión, titular, estado, etc.).
     """
     try:
-        leads = get_all_leads_for_markdown()
-        estado_changes = get_recent_estado_changes(50)
-        top_projects = get_top_proyectos(leads, 20)
-        
-        # Generar el contenido Markdown
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        md_content = f"""# Reporte Master Scraper
+        changes = get_recent_field_changes(limit, campo)
+        return {
+            "changes": changes,
+            "total": len(changes)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener cambios por campo: {str(e)}")
+
+
+# Tamaño aproximado (caracteres) de cada chunk del reporte Markdown en streaming
+MARKDOWN_CHUNK_CHARS = 64 * 1024
+
+
+def _generar_markdown(leads: Iterable[Dict], totales_por_fuente: Dict[str, int],
+                      estado_changes: List[Dict], top_projects: List[Dict]):
+    """
+    Genera el reporte Markdown por partes (generador), para que StreamingResponse
+    y la compresión en streaming envíen el contenido a medida que se construye.
+    leads debe venir ordenado por fuente (iter_leads(orden='fuente')): cada sección
+    se escribe a medida que llegan sus leads, sin agruparlos en memoria.
+    """
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    
+    md_content = f"""# Reporte Master Scraper
 **Generado:** {now}
 
 ---
 
 ## Resumen Ejecutivo
 
-- **Total de proyectos:** {len(leads)}
+- **Total de proyectos:** {sum(totales_por_fuente.values())}
 - **Cambios de estado recientes:** {len(estado_changes)}
 - **Top proyectos seleccionados:** {len(top_projects)}
 
 """
-        
-        # Sección TOP 20 PROYECTOS
-        if top_projects:
-            md_content += """---
+    
+    yield md_content
+    md_content = ""
+    
+    # Sección TOP 20 PROYECTOS
+    if top_projects:
+        md_content += """---
 
 ## Top 20 Proyectos Más Relevantes
 
@@ -457,117 +623,122 @@ Proyectos seleccionados según criterios de:
 | # | Proyecto | Score | Inversión (USD MM) | Estado | Industria | Explicación |
 |---|----------|-------|-------------------|--------|-----------|-------------|
 """
-            for p in top_projects:
-                raw = p.get('raw_data', {})
-                inv = raw.get('inversion_millones', 'N/A')
-                inv_str = f"{inv:,.1f}" if isinstance(inv, (int, float)) else str(inv)
-                md_content += f"| {p['ranking']} | {p['project_name'][:40]}... | {p['score_total']} | {inv_str} | {raw.get('estado', 'N/A')[:20]} | {raw.get('industria', 'N/A')} | {p.get('explicacion', '')} |\n"
-            
-            md_content += "\n### Detalle de Top 20 Proyectos\n\n"
-            
-            for p in top_projects:
-                raw = p.get('raw_data', {})
-                md_content += f"""#### {p['ranking']}. {p['project_name']}
+        for p in top_projects:
+            raw = p.get('raw_data', {})
+            inv = raw.get('inversion_millones', 'N/A')
+            inv_str = f"{inv:,.1f}" if isinstance(inv, (int, float)) else str(inv)
+            md_content += f"| {p['ranking']} | {p['project_name'][:40]}... | {p['score_total']} | {inv_str} | {raw.get('estado', 'N/A')[:20]} | {raw.get('industria', 'N/A')} | {p.get('explicacion', '')} |\n"
+        
+        md_content += "\n### Detalle de Top 20 Proyectos\n\n"
+        
+        for p in top_projects:
+            raw = p.get('raw_data', {})
+            md_content += f"""#### {p['ranking']}. {p['project_name']}
 
 - **Score Total:** {p['score_total']} (Inversión: {p.get('score_inversion', 0)}, Estado: {p.get('score_estado', 0)})
 - **Explicación:** {p.get('explicacion', 'N/A')}
 """
-                if raw.get('titular'):
-                    md_content += f"- **Titular:** {raw['titular']}\n"
-                if raw.get('region'):
-                    md_content += f"- **Región:** {raw['region']}"
-                    if raw.get('comuna'):
-                        md_content += f", {raw['comuna']}"
-                    md_content += "\n"
-                if raw.get('inversion_millones'):
-                    md_content += f"- **Inversión:** US$ {raw['inversion_millones']:,.2f} MM\n"
-                if raw.get('estado'):
-                    md_content += f"- **Estado:** {raw['estado']}\n"
-                if raw.get('industria'):
-                    md_content += f"- **Industria:** {raw['industria']}\n"
-                if raw.get('categorias_secundarias'):
-                    md_content += f"- **Categorías secundarias:** {', '.join(raw['categorias_secundarias'])}\n"
-                if raw.get('tipo'):
-                    md_content += f"- **Tipo:** {raw['tipo']}\n"
-                if raw.get('link_ficha'):
-                    md_content += f"- **Link SEIA:** {raw['link_ficha']}\n"
-                if raw.get('descripcion_completa'):
-                    desc = raw['descripcion_completa'][:500] + "..." if len(raw.get('descripcion_completa', '')) > 500 else raw.get('descripcion_completa', '')
-                    md_content += f"\n**Descripción:** {desc}\n"
+            if raw.get('titular'):
+                md_content += f"- **Titular:** {raw['titular']}\n"
+            if raw.get('region'):
+                md_content += f"- **Región:** {raw['region']}"
+                if raw.get('comuna'):
+                    md_content += f", {raw['comuna']}"
                 md_content += "\n"
-        
-        # Sección de cambios de estado
-        if estado_changes:
-            md_content += """---
+            if raw.get('inversion_millones'):
+                md_content += f"- **Inversión:** US$ {raw['inversion_millones']:,.2f} MM\n"
+            if raw.get('estado'):
+                md_content += f"- **Estado:** {raw['estado']}\n"
+            if raw.get('industria'):
+                md_content += f"- **Industria:** {raw['industria']}\n"
+            if raw.get('categorias_secundarias'):
+                md_content += f"- **Categorías secundarias:** {', '.join(raw['categorias_secundarias'])}\n"
+            if raw.get('tipo'):
+                md_content += f"- **Tipo:** {raw['tipo']}\n"
+            if raw.get('link_ficha'):
+                md_content += f"- **Link SEIA:** {raw['link_ficha']}\n"
+            if raw.get('descripcion_completa'):
+                desc = raw['descripcion_completa'][:500] + "..." if len(raw.get('descripcion_completa', '')) > 500 else raw.get('descripcion_completa', '')
+                md_content += f"\n**Descripción:** {desc}\n"
+            md_content += "\n"
+    
+    yield md_content
+    md_content = ""
+    
+    # Sección de cambios de estado
+    if estado_changes:
+        md_content += """---
 
 ## Cambios de Estado Recientes (Proyectos SEIA)
 
 | Proyecto | Estado Anterior | Estado Nuevo | Fecha Detección |
 |----------|-----------------|--------------|-----------------|
 """
-            for change in estado_changes:
-                is_aprobado = "✅ " if change.get('is_aprobado') else ""
-                md_content += f"| {change['project_name'][:50]}... | {change['estado_anterior']} | {is_aprobado}{change['estado_nuevo']} | {change['detected_at']} |\n"
-            
-            md_content += "\n"
-        
-        # Agrupar leads por fuente
-        leads_by_source = {}
-        for lead in leads:
-            source = lead['source'].upper()
-            if source not in leads_by_source:
-                leads_by_source[source] = []
-            leads_by_source[source].append(lead)
+        for change in estado_changes:
+            is_aprobado = "✅ " if change.get('is_aprobado') else ""
+            md_content += f"| {change['project_name'][:50]}... | {change['estado_anterior']} | {is_aprobado}{change['estado_nuevo']} | {change['detected_at']} |\n"
         
-        # Generar sección para cada fuente
-        for source, source_leads in leads_by_source.items():
+        md_content += "\n"
+    
+    # Una sección por fuente (los leads llegan ordenados por fuente)
+    fuente_actual = None
+    i = 0
+    for lead in leads:
+        source = lead['source'].upper()
+        if source != fuente_actual:
+            fuente_actual, i = source, 0
             md_content += f"""---
 
 ## Proyectos {source}
 
-**Total:** {len(source_leads)} proyectos
+**Total:** {totales_por_fuente.get(source, 0)} proyectos
 
 """
-            for i, lead in enumerate(source_leads, 1):
-                raw = lead.get('raw_data', {})
-                
-                md_content += f"""### {i}. {lead['project_name']}
+        i += 1
+        raw = lead.get('raw_data', {})
+        
+        md_content += f"""### {i}. {lead['project_name']}
 
 """
-                
-                # Información básica
-                if raw.get('titular'):
-                    md_content += f"- **Titular:** {raw['titular']}\n"
-                if raw.get('region'):
-                    md_content += f"- **Región:** {raw['region']}"
-                    if raw.get('comuna'):
-                        md_content += f", {raw['comuna']}"
-                    md_content += "\n"
-                if raw.get('inversion_millones'):
-                    md_content += f"- **Inversión:** US$ {raw['inversion_millones']:,.2f} MM\n"
-                if raw.get('estado'):
-                    md_content += f"- **Estado:** {raw['estado']}\n"
-                if raw.get('industria'):
-                    md_content += f"- **Industria:** {raw['industria']}\n"
-                if raw.get('categorias_secundarias'):
-                    md_content += f"- **Categorías secundarias:** {', '.join(raw['categorias_secundarias'])}\n"
-                if lead.get('date'):
-                    md_content += f"- **Fecha Presentación:** {lead['date']}\n"
-                if raw.get('tipo'):
-                    md_content += f"- **Tipo:** {raw['tipo']}\n"
-                if raw.get('codigo_seia'):
-                    md_content += f"- **Código SEIA:** {raw['codigo_seia']}\n"
-                if raw.get('link_ficha'):
-                    md_content += f"- **Link SEIA:** {raw['link_ficha']}\n"
-                
-                # Descripción completa
-                if raw.get('descripcion_completa'):
-                    md_content += f"\n**Descripción del Proyecto:**\n\n{raw['descripcion_completa']}\n"
-                
-                md_content += "\n---\n\n"
         
-        # Agregar instrucciones para ChatGPT al final
-        md_content += """
+        # Información básica
+        if raw.get('titular'):
+            md_content += f"- **Titular:** {raw['titular']}\n"
+        if raw.get('region'):
+            md_content += f"- **Región:** {raw['region']}"
+            if raw.get('comuna'):
+                md_content += f", {raw['comuna']}"
+            md_content += "\n"
+        if raw.get('inversion_millones'):
+            md_content += f"- **Inversión:** US$ {raw['inversion_millones']:,.2f} MM\n"
+        if raw.get('estado'):
+            md_content += f"- **Estado:** {raw['estado']}\n"
+        if raw.get('industria'):
+            md_content += f"- **Industria:** {raw['industria']}\n"
+        if raw.get('categorias_secundarias'):
+            md_content += f"- **Categorías secundarias:** {', '.join(raw['categorias_secundarias'])}\n"
+        if lead.get('date'):
+            md_content += f"- **Fecha Presentación:** {lead['date']}\n"
+        if raw.get('tipo'):
+            md_content += f"- **Tipo:** {raw['tipo']}\n"
+        if raw.get('codigo_seia'):
+            md_content += f"- **Código SEIA:** {raw['codigo_seia']}\n"
+        if raw.get('link_ficha'):
+            md_content += f"- **Link SEIA:** {raw['link_ficha']}\n"
+        
+        # Descripción completa
+        if raw.get('descripcion_completa'):
+            md_content += f"\n**Descripción del Proyecto:**\n\n{raw['descripcion_completa']}\n"
+        
+        md_content += "\n---\n\n"
+        
+        # Se emite por bloques para no armar el reporte completo en memoria
+        if len(md_content) >= MARKDOWN_CHUNK_CHARS:
+            yield md_content
+            md_content = ""
+
+    # Agregar instrucciones para ChatGPT al final
+    md_content += """
 ## Instrucciones para Análisis
 
 Este reporte contiene información de proyectos de inversión en Chile. Por favor analiza:
@@ -581,12 +752,34 @@ Este reporte contiene información de proyectos de inversión en Chile. Por favo
 
 Genera un informe ejecutivo con los hallazgos más importantes.
 """
+    yield md_content
+
+
+def _top_proyectos(limit: int) -> List[Dict]:
+    """Top por score en streaming (solo campos calientes, estado elegible filtrado en SQL) con sus descripciones."""
+    return load_lead_descripciones(get_top_proyectos(iter_leads({'estado_elegible': True}, orden='fuente'), limit))
+
+
+@app.get("/export/markdown")
+async def export_markdown():
+    """
+    Genera y retorna un reporte completo en formato Markdown para análisis con ChatGPT.
+    """
+    try:
+        # Dos pasadas en streaming sobre leads (memoria constante con cualquier tamaño de BD):
+        # el top por score (solo campos calientes, con el estado elegible filtrado en SQL por
+        # estado_id) y luego el listado completo al enviar. Las consultas recorren toda la
+        # tabla: van en un thread para no bloquear el event loop
+        totales_por_fuente = await asyncio.to_thread(get_lead_counts_by_source)
+        estado_changes = await asyncio.to_thread(get_recent_estado_changes, 50)
+        top_projects = await asyncio.to_thread(_top_proyectos, 20)
         
         # Retornar como archivo descargable
         filename = f"master_scraper_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
         
         return StreamingResponse(
-            iter([md_content]),
+            _generar_markdown(iter_leads(include_descripcion=True, orden='fuente'), totales_por_fuente,
+                              estado_changes, top_projects),
             media_type="text/markdown",
             headers={
                 "Content-Disposition": f"attachment; filename={filename}",
@@ -595,10 +788,46 @@ Genera un informe ejecutivo con los hallazgos más importantes.
         )
         
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Error al generar reporte")
         raise HTTPException(status_code=500, detail=f"Error al generar reporte: {str(e)}")
 
 
+async def _exportar_columnar(formato: str, source: str, descripcion: bool):
+    if not columnar.disponible():
+        raise HTTPException(status_code=501, detail="Exportación columnar no disponible: falta pyarrow")
+    try:
+        # El primer lote se genera antes de responder: un error de lectura todavía es un 500
+        chunks = columnar.generar_bytes(formato, source, descripcion)
+        primero = await asyncio.to_thread(next, chunks)
+    except Exception as e:
+        logger.exception("Error al exportar leads", extra={'formato': formato})
+        raise HTTPException(status_code=500, detail=f"Error al exportar leads: {str(e)}")
+
+    extension = 'parquet' if formato == 'parquet' else 'arrows'
+    filename = f"leads_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return StreamingResponse(
+        itertools.chain([primero], chunks),
+        media_type=columnar.TIPOS_CONTENIDO[formato],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+@app.get("/export/parquet")
+async def export_parquet(source: str = Query(None), descripcion: bool = Query(False)):
+    """
+    Exporta leads a Parquet (zstd) en streaming, un row group por lote: campos de
+    raw_data como columnas tipadas y las categóricas con diccionario. Filtro opcional
+    por fuente; ?descripcion=true agrega la descripción completa.
+    """
+    return await _exportar_columnar('parquet', source, descripcion)
+
+
+@app.get("/export/arrow")
+async def export_arrow(source: str = Query(None), descripcion: bool = Query(False)):
+    """Igual que /export/parquet, como Arrow IPC stream (pyarrow.ipc.open_stream, pandas, Polars, DuckDB)."""
+    return await _exportar_columnar('arrow', source, descripcion)
+
+
 @app.delete("/clear-all")
 async def clear_all():
     """
@@ -609,24 +838,121 @@ async def clear_all():
         result = clear_all_data()
         return result
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Error al limpiar datos")
         raise HTTPException(status_code=500, detail=f"Error al limpiar datos: {str(e)}")
 
 
+@app.post("/maintenance/compact")
+async def compact_leads():
+    """
+    Fusiona leads duplicados (misma fuente y clave natural) y ejecuta VACUUM.
+    Retorna cuántas filas se recuperaron y el tamaño de la BD antes/después.
+    """
+    try:
+        # Fusión de duplicados y VACUUM: pueden tardar minutos, fuera del event loop
+        return await asyncio.to_thread(compactar_leads)
+    except Exception as e:
+        logger.exception("Error al compactar leads")
+        raise HTTPException(status_code=500, detail=f"Error al compactar leads: {str(e)}")
+
+
+@app.get("/leads/{lead_id}/descripcion")
+async def get_descripcion(lead_id: int):
+    """
+    Obtiene la descripción completa de un lead (se almacena aparte y se carga bajo demanda).
+    """
+    descripcion = get_lead_descripcion(lead_id)
+    if descripcion is None:
+        raise HTTPException(status_code=404, detail="Descripción no encontrada")
+    return {"lead_id": lead_id, "descripcion_completa": descripcion}
+
+
+@app.get("/leads/{lead_id}/similar")
+async def get_similar_leads(
+    lead_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    umbral: float = Query(0.4, ge=0.0, le=1.0)
+):
+    """
+    Obtiene leads casi-duplicados de un lead (índice MinHash/LSH sobre nombre y titular).
+    """
+    try:
+        similares = buscar_similares(lead_id, limit, umbral)
+        return {
+            "lead_id": lead_id,
+            "similares": similares,
+            "total": len(similares)
+        }
+    except Exception as e:
+        logger.exception("Error al buscar similares")
+        raise HTTPException(status_code=500, detail=f"Error al buscar similares: {str(e)}")
+
+
+@app.get("/similar")
+async def get_similar_by_text(
+    nombre: str = Query(..., min_length=1),
+    titular: str = Query(''),
+    limit: int = Query(10, ge=1, le=100),
+    umbral: float = Query(0.4, ge=0.0, le=1.0)
+):
+    """
+    Busca leads parecidos a un nombre de proyecto (y opcionalmente titular).
+    """
+    try:
+        similares = buscar_similares_texto(nombre, titular, limit, umbral)
+        return {
+            "similares": similares,
+            "total": len(similares)
+        }
+    except Exception as e:
+        logger.exception("Error al buscar similares")
+        raise HTTPException(status_code=500, detail=f"Error al buscar similares: {str(e)}")
+
+
+@app.post("/similarity/link")
+async def link_sources():
+    """
+    Ejecuta el job de vinculación entre fuentes (SEIA <-> Hechos Esenciales).
+    """
+    try:
+        # Reconstruye el índice LSH y vincula todas las fuentes: fuera del event loop
+        return await asyncio.to_thread(vincular_fuentes)
+    except Exception as e:
+        logger.exception("Error al vincular fuentes")
+        raise HTTPException(status_code=500, detail=f"Error al vincular fuentes: {str(e)}")
+
+
+@app.get("/similarity/links")
+async def get_source_links(limit: int = Query(100, ge=1, le=1000)):
+    """
+    Obtiene los vínculos entre fuentes detectados, ordenados por similitud.
+    """
+    try:
+        links = get_vinculos(limit)
+        return {
+            "links": links,
+            "total": len(links)
+        }
+    except Exception as e:
+        logger.exception("Error al obtener vínculos")
+        raise HTTPException(status_code=500, detail=f"Error al obtener vínculos: {str(e)}")
+
+
 @app.get("/top-projects")
 async def get_top_projects(limit: int = Query(20, ge=1, le=50)):
     """
     Obtiene los top N proyectos más relevantes según el scoring.
     """
     try:
-        leads = get_all_leads_for_markdown()
-        top_projects = get_top_proyectos(leads, limit)
-        return {
+        # Recorre todos los leads elegibles: en un thread para no bloquear el event loop
+        top_projects = await asyncio.to_thread(_top_proyectos, limit)
+        # Respuesta directa: evita el jsonable_encoder sobre los leads completos
+        return ORJSONResponse({
             "projects": top_projects,
             "total": len(top_projects)
-        }
+        })
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Error al obtener top proyectos")
         raise HTTPException(status_code=500, detail=f"Error al obtener top proyectos: {str(e)}")
 
 
@@ -0,0 +1,406 @@
+"""
+Métricas en proceso con el formato de exposición de texto de Prometheus (0.0.4),
+sin dependencias ni servicios externos: GET /metrics entrega el texto y un
+Prometheus (o cualquier agente compatible) lo recolecta.
+
+- contador(), gauge() e histograma() registran una métrica en REGISTRO (si ya
+  existe una con ese nombre se retorna la misma, así un módulo recargado no la duplica).
+- Con etiquetas: METRICA.labels('GET', '/leads').inc(). Cada combinación se crea
+  una vez; conviene resolverla fuera del camino caliente y guardar el hijo.
+- Un gauge puede calcularse al exponer con funcion=... (p. ej. la cola de un executor).
+- @instrumentar(HISTOGRAMA) observa la duración de cada llamada a una función.
+
+El costo por observación es un bisect sobre los buckets y un lock sin contención
+(~1-2 µs), despreciable frente a una consulta SQL o un request HTTP.
+"""
+
+import functools
+import math
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # no existe en Windows
+    resource = None
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Buckets por defecto de Prometheus (segundos)
+BUCKETS_DEFAULT = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Consultas SQLite: de sub-milisegundo a varios segundos (exports completos)
+BUCKETS_BD = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+# Funciones CPU por registro (clasificación, parseo)
+BUCKETS_CPU = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01)
+# Conteos por ejecución (páginas, fichas, leads)
+BUCKETS_CONTEO = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+def _formatear(valor: float) -> str:
+    if valor == math.inf:
+        return '+Inf'
+    if valor == -math.inf:
+        return '-Inf'
+    if isinstance(valor, float) and valor.is_integer() and abs(valor) < 1e15:
+        return str(int(valor))
+    return repr(valor)
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas_texto(nombres: Sequence[str], valores: Sequence[str], extra: str = '') -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return '{' + ','.join(partes) + '}' if partes else ''
+
+
+class _ValorContador:
+    __slots__ = ('valor', '_lock')
+
+    def __init__(self):
+        self.valor = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, valor: float = 1):
+        with self._lock:
+            self.valor += valor
+
+
+class _ValorGauge(_ValorContador):
+    __slots__ = ()
+
+    def set(self, valor: float):
+        self.valor = valor
+
+    def dec(self, valor: float = 1):
+        self.inc(-valor)
+
+
+class _ValorHistograma:
+    __slots__ = ('buckets', 'conteos', 'suma', 'total', '_lock')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.conteos = [0] * (len(buckets) + 1)  # el último es +Inf
+        self.suma = 0.0
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def observe(self, valor: float):
+        i = bisect_left(self.buckets, valor)
+        with self._lock:
+            self.conteos[i] += 1
+            self.suma += valor
+            self.total += 1
+
+    @contextmanager
+    def tiempo(self):
+        """Observa la duración del bloque en segundos."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - inicio)
+
+
+class _Metrica:
+    tipo = ''
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._hijos: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.etiquetas:
+            self._sin_etiquetas = self.labels()
+
+    def _nuevo_valor(self):
+        raise NotImplementedError
+
+    def labels(self, *valores, **por_nombre):
+        """Valor para una combinación de etiquetas (posicionales o por nombre)."""
+        if por_nombre:
+            valores = tuple(str(por_nombre[n]) for n in self.etiquetas)
+        else:
+            valores = tuple(str(v) for v in valores)
+        hijo = self._hijos.get(valores)
+        if hijo is None:
+            if len(valores) != len(self.etiquetas):
+                raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}, recibió {valores}")
+            with self._lock:
+                hijo = self._hijos.setdefault(valores, self._nuevo_valor())
+        return hijo
+
+    def _muestras(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._hijos.items())
+
+    def exponer(self) -> List[str]:
+        lineas = [f'# HELP {self.nombre} {_escapar(self.ayuda)}', f'# TYPE {self.nombre} {self.tipo}']
+        for valores, hijo in self._muestras():
+            lineas.append(f'{self.nombre}{_etiquetas_texto(self.etiquetas, valores)} {_formatear(hijo.valor)}')
+        return lineas
+
+
+class Contador(_Metrica):
+    tipo = 'counter'
+
+    def _nuevo_valor(self):
+        return _ValorContador()
+
+    def inc(self, valor: float = 1):
+        self._sin_etiquetas.inc(valor)
+
+
+class Gauge(_Metrica):
+    """
+    Valor que sube y baja. Con funcion, se calcula al exponer: sin etiquetas
+    retorna un número; con etiquetas, un dict {(valores de etiquetas): número}.
+    """
+
+    tipo = 'gauge'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                 funcion: Optional[Callable] = None):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.funcion = funcion
+
+    def _nuevo_valor(self):
+        return _ValorGauge()
+
+    def set(self, valor: float):
+        self._sin_etiquetas.set(valor)
+
+    def inc(self, valor: float = 1):
+        self._sin_etiquetas.inc(valor)
+
+    def dec(self, valor: float = 1):
+        self._sin_etiquetas.dec(valor)
+
+    def _muestras(self):
+        if self.funcion is None:
+            return super()._muestras()
+        try:
+            resultado = self.funcion()
+        except Exception:
+            return []  # una métrica calculada que falla no debe romper /metrics
+        if not self.etiquetas:
+            resultado = {(): resultado}
+        muestras = []
+        for valores, valor in sorted(resultado.items()):
+            gauge = _ValorGauge()
+            gauge.set(float(valor))
+            muestras.append((tuple(str(v) for v in valores), gauge))
+        return muestras
+
+
+class Histograma(_Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                 buckets: Sequence[float] = BUCKETS_DEFAULT):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(nombre, ayuda, etiquetas)
+
+    def _nuevo_valor(self):
+        return _ValorHistograma(self.buckets)
+
+    def observe(self, valor: float):
+        self._sin_etiquetas.observe(valor)
+
+    def tiempo(self):
+        return self._sin_etiquetas.tiempo()
+
+    def exponer(self) -> List[str]:
+        lineas = [f'# HELP {self.nombre} {_escapar(self.ayuda)}', f'# TYPE {self.nombre} {self.tipo}']
+        for valores, hijo in self._muestras():
+            with hijo._lock:
+                conteos, suma, total = list(hijo.conteos), hijo.suma, hijo.total
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (math.inf,), conteos):
+                acumulado += conteo
+                le = f'le="{_formatear(float(limite))}"'
+                lineas.append(f'{self.nombre}_bucket{_etiquetas_texto(self.etiquetas, valores, le)} {acumulado}')
+            etiquetas = _etiquetas_texto(self.etiquetas, valores)
+            lineas.append(f'{self.nombre}_sum{etiquetas} {_formatear(suma)}')
+            lineas.append(f'{self.nombre}_count{etiquetas} {total}')
+        return lineas
+
+
+class Registro:
+    """Conjunto de métricas expuestas juntas."""
+
+    def __init__(self):
+        self._metricas: Dict[str, _Metrica] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, metrica: _Metrica) -> _Metrica:
+        with self._lock:
+            existente = self._metricas.get(metrica.nombre)
+            if existente is not None:
+                if type(existente) is not type(metrica) or existente.etiquetas != metrica.etiquetas:
+                    raise ValueError(f"Métrica {metrica.nombre} ya registrada con otro tipo o etiquetas")
+                if isinstance(metrica, Gauge) and metrica.funcion is not None:
+                    existente.funcion = metrica.funcion
+                return existente
+            self._metricas[metrica.nombre] = metrica
+            return metrica
+
+    def exponer(self) -> str:
+        with self._lock:
+            metricas = sorted(self._metricas.values(), key=lambda m: m.nombre)
+        lineas = []
+        for metrica in metricas:
+            lineas.extend(metrica.exponer())
+        return '\n'.join(lineas) + '\n'
+
+
+REGISTRO = Registro()
+
+
+def contador(nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Contador:
+    return REGISTRO.registrar(Contador(nombre, ayuda, etiquetas))
+
+
+def gauge(nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+          funcion: Optional[Callable] = None) -> Gauge:
+    return REGISTRO.registrar(Gauge(nombre, ayuda, etiquetas, funcion))
+
+
+def histograma(nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+               buckets: Sequence[float] = BUCKETS_DEFAULT) -> Histograma:
+    return REGISTRO.registrar(Histograma(nombre, ayuda, etiquetas, buckets))
+
+
+def exponer() -> str:
+    """Todas las métricas de REGISTRO en formato de texto de Prometheus."""
+    return REGISTRO.exponer()
+
+
+def instrumentar(metrica: Histograma, **etiquetas):
+    """
+    Decorador que observa en `metrica` la duración de cada llamada (también si
+    lanza una excepción). Si el histograma tiene una etiqueta 'funcion' y no se
+    indica, se usa el nombre de la función decorada:
+
+        DB_SEGUNDOS = histograma('db_query_duration_seconds', '...', ['funcion'], BUCKETS_BD)
+
+        @instrumentar(DB_SEGUNDOS)
+        def get_latest_leads(...): ...
+    """
+    def decorador(funcion):
+        valores = dict(etiquetas)
+        if 'funcion' in metrica.etiquetas:
+            valores.setdefault('funcion', funcion.__name__)
+        hijo = metrica.labels(**valores) if metrica.etiquetas else metrica._sin_etiquetas
+        reloj = time.perf_counter
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            inicio = reloj()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                hijo.observe(reloj() - inicio)
+        return envoltura
+    return decorador
+
+
+def rss_pico_mb() -> Optional[float]:
+    """Memoria residente máxima del proceso desde que partió (MB), o None si no se puede medir."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss viene en KB en Linux y en bytes en macOS
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+try:
+    _PAGINA_MB = os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+except (AttributeError, ValueError, OSError):  # sin sysconf (Windows)
+    _PAGINA_MB = None
+
+
+def rss_actual_mb() -> Optional[float]:
+    """Memoria residente actual del proceso (MB) desde /proc/self/statm, o None fuera de Linux."""
+    if _PAGINA_MB is None:
+        return None
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return round(int(f.read().split()[1]) * _PAGINA_MB, 1)
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class MuestreoRSS:
+    """
+    Memoria de un intervalo (p. ej. un run): RSS al iniciar y pico dentro del intervalo.
+
+    ru_maxrss es el pico de toda la vida del proceso: después de un run grande, todos
+    los siguientes reportarían el mismo valor. Por eso un thread lee /proc/self/statm
+    cada `intervalo` segundos y guarda el máximo. Sin /proc (macOS) no se conoce el RSS
+    inicial, y el pico solo si ru_maxrss creció durante el intervalo; si no, quedan en None.
+    El RSS es del proceso completo: incluye runs concurrentes y requests de la API.
+
+        with MuestreoRSS() as memoria:
+            ...
+        memoria.inicio_mb, memoria.pico_mb
+
+    (o iniciar() y detener() cuando el intervalo no cabe en un bloque with)
+    """
+
+    def __init__(self, intervalo: float = 0.25):
+        self.intervalo = intervalo
+        self.inicio_mb: Optional[float] = None
+        self.pico_mb: Optional[float] = None
+        self._pico_proceso_inicio: Optional[float] = None
+        self._detener = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _muestrear(self):
+        rss = rss_actual_mb()
+        if rss is not None and (self.pico_mb is None or rss > self.pico_mb):
+            self.pico_mb = rss
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            self._muestrear()
+
+    def __enter__(self) -> 'MuestreoRSS':
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+        return False
+
+    def iniciar(self) -> 'MuestreoRSS':
+        """Mide el RSS inicial y arranca el thread de muestreo."""
+        self.inicio_mb = rss_actual_mb()
+        if self.inicio_mb is None:
+            self._pico_proceso_inicio = rss_pico_mb()
+        else:
+            self.pico_mb = self.inicio_mb
+            self._thread = threading.Thread(target=self._bucle, name='muestreo-rss', daemon=True)
+            self._thread.start()
+        return self
+
+    def detener(self):
+        """Toma la última muestra y detiene el thread (se puede llamar más de una vez)."""
+        if self._thread is not None:
+            self._detener.set()
+            self._thread.join()
+            self._thread = None
+            self._muestrear()
+        elif self._pico_proceso_inicio is not None:
+            pico = rss_pico_mb()
+            self.pico_mb = pico if pico is not None and pico > self._pico_proceso_inicio else None
+            self._pico_proceso_inicio = None
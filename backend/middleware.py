@@ -0,0 +1,371 @@
+"""
+Middlewares HTTP de la API: compresión de respuestas, headers Cache-Control
+(con ETag y 304 en las respuestas que se revalidan), métricas por ruta y
+profiling de requests a pedido.
+
+Todos son ASGI puro (no BaseHTTPMiddleware): CompressionMiddleware necesita
+comprimir respuestas en streaming chunk a chunk, sin acumular el cuerpo completo
+en memoria.
+Usa Brotli si el paquete `brotli` está instalado (requirements-optional.txt) y
+el cliente lo acepta; si no, gzip.
+"""
+
+import gzip
+import hashlib
+import re
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from backend.metrics import contador, histograma
+from backend.profiler import perfilar
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional
+    brotli = None
+
+# Tamaño mínimo para comprimir: por debajo, el overhead no compensa
+COMPRESION_MINIMO_BYTES = 1024
+GZIP_NIVEL = 6
+BROTLI_CALIDAD = 5
+
+# Tipos de contenido que vale la pena comprimir
+TIPOS_COMPRIMIBLES = (
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/x-ndjson',
+    'text/',
+)
+
+# Política de cache por endpoint: (método, prefijo de ruta, Cache-Control).
+# Se aplica la primera regla que coincide. La API requiere autenticación, por lo
+# que todo lo cacheable es `private` (solo el navegador, no proxies compartidos).
+# Solo lo estático lleva max-age: leads, stats, búsquedas y top cambian con cada
+# scrape o /clear-all, y el dashboard los consulta cada 30 s.
+CACHE_CONTROL_REGLAS: List[Tuple[str, str, str]] = [
+    ('GET', '/category-colors', 'private, max-age=86400'),
+    ('GET', '/scrape-progress', 'no-store'),
+    ('GET', '/verify-token', 'no-store'),
+    ('GET', '/health', 'no-store'),
+    ('GET', '/metrics', 'no-store'),
+    ('GET', '/profiles', 'no-store'),
+    ('GET', '/export', 'no-store'),
+]
+# Resto de GET (/leads, /stats, /top-projects, /search...): el navegador guarda la
+# respuesta pero la revalida siempre con If-None-Match (ETag); si no cambió, 304 sin cuerpo
+CACHE_CONTROL_GET_DEFAULT = 'private, no-cache'
+# POST/DELETE y errores
+CACHE_CONTROL_DEFAULT = 'no-store'
+
+
+class _Compresor:
+    """Compresor incremental con la misma interfaz para gzip y Brotli."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._br = brotli.Compressor(quality=BROTLI_CALIDAD)
+        else:
+            # wbits=31: formato gzip (cabecera + CRC) en modo streaming
+            self._zlib = zlib.compressobj(GZIP_NIVEL, zlib.DEFLATED, 31)
+
+    def comprimir(self, datos: bytes) -> bytes:
+        if self.encoding == 'br':
+            return self._br.process(datos)
+        return self._zlib.compress(datos)
+
+    def vaciar(self) -> bytes:
+        """Emite lo pendiente sin cerrar el stream (para que el cliente reciba cada chunk)."""
+        if self.encoding == 'br':
+            return self._br.flush()
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def terminar(self) -> bytes:
+        if self.encoding == 'br':
+            return self._br.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+def elegir_encoding(accept_encoding: str) -> Optional[str]:
+    """Elige 'br' o 'gzip' según Accept-Encoding (respeta q=0). None si no acepta ninguno."""
+    aceptados: Dict[str, float] = {}
+    for parte in accept_encoding.split(','):
+        nombre, _, parametros = parte.strip().partition(';')
+        calidad = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith('q='):
+            try:
+                calidad = float(parametros[2:])
+            except ValueError:
+                calidad = 0.0
+        aceptados[nombre.strip().lower()] = calidad
+
+    comodin = aceptados.get('*', 0.0)
+    candidatos = (['br'] if brotli is not None else []) + ['gzip']
+    for encoding in candidatos:
+        if aceptados.get(encoding, comodin) > 0:
+            return encoding
+    return None
+
+
+def comprimir_bytes(datos: bytes, encoding: str) -> bytes:
+    """Comprime un cuerpo completo (respuestas que no son streaming)."""
+    if encoding == 'br':
+        return brotli.compress(datos, quality=BROTLI_CALIDAD)
+    return gzip.compress(datos, compresslevel=GZIP_NIVEL)
+
+
+class CompressionMiddleware:
+    """
+    Comprime respuestas con gzip/Brotli a partir de minimum_size bytes.
+    - Respuestas de un solo mensaje: se comprimen completas con Content-Length.
+    - Respuestas en streaming: se acumula solo hasta superar minimum_size y
+      luego cada chunk se comprime y se envía de inmediato (sin Content-Length).
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESION_MINIMO_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        encoding = elegir_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        pendiente = b''
+        compresor: Optional[_Compresor] = None
+        omitir = False
+
+        async def enviar_inicio(headers_comprimidos: bool, content_length: Optional[int]):
+            headers = MutableHeaders(raw=inicio['headers'])
+            headers.add_vary_header('Accept-Encoding')
+            if headers_comprimidos:
+                headers['Content-Encoding'] = encoding
+                if content_length is None:
+                    del headers['Content-Length']
+                else:
+                    headers['Content-Length'] = str(content_length)
+            await send(inicio)
+
+        async def send_wrapper(message):
+            nonlocal inicio, pendiente, compresor, omitir
+
+            if message['type'] == 'http.response.start':
+                headers = Headers(raw=message['headers'])
+                tipo = headers.get('content-type', '')
+                omitir = (
+                    'content-encoding' in headers
+                    or not tipo.startswith(TIPOS_COMPRIMIBLES)
+                )
+                inicio = message
+                if omitir:
+                    await send(message)
+                return
+
+            if message['type'] != 'http.response.body' or omitir:
+                await send(message)
+                return
+
+            cuerpo = message.get('body', b'')
+            mas = message.get('more_body', False)
+
+            if compresor is None:
+                pendiente += cuerpo
+                if len(pendiente) < self.minimum_size:
+                    if mas:
+                        return
+                    # Respuesta completa y pequeña: se envía tal cual
+                    await enviar_inicio(False, None)
+                    await send({'type': 'http.response.body', 'body': pendiente})
+                    return
+                if not mas:
+                    # Cuerpo completo en memoria: compresión de una vez
+                    comprimido = comprimir_bytes(pendiente, encoding)
+                    await enviar_inicio(True, len(comprimido))
+                    await send({'type': 'http.response.body', 'body': comprimido})
+                    return
+                compresor = _Compresor(encoding)
+                await enviar_inicio(True, None)
+                cuerpo, pendiente = pendiente, b''
+
+            if mas:
+                salida = compresor.comprimir(cuerpo) + compresor.vaciar()
+            else:
+                salida = compresor.comprimir(cuerpo) + compresor.terminar()
+            await send({'type': 'http.response.body', 'body': salida, 'more_body': mas})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def cache_control_para(method: str, path: str) -> str:
+    """Valor de Cache-Control para un endpoint según CACHE_CONTROL_REGLAS."""
+    for metodo, prefijo, valor in CACHE_CONTROL_REGLAS:
+        if method != metodo:
+            continue
+        if path == prefijo or path.startswith(prefijo.rstrip('/') + '/'):
+            return valor
+    return CACHE_CONTROL_GET_DEFAULT if method == 'GET' else CACHE_CONTROL_DEFAULT
+
+
+def calcular_etag(cuerpo: bytes) -> str:
+    """ETag débil del cuerpo sin comprimir (débil: la compresión cambia los bytes, no el contenido)."""
+    return 'W/"' + hashlib.blake2b(cuerpo, digest_size=16).hexdigest() + '"'
+
+
+def etag_coincide(if_none_match: str, etag: str) -> bool:
+    """Si el If-None-Match del request incluye el ETag (comparación débil, acepta '*')."""
+    valor = etag[2:]
+    for candidato in if_none_match.split(','):
+        candidato = candidato.strip()
+        if candidato == '*' or candidato.removeprefix('W/') == valor:
+            return True
+    return False
+
+
+class CacheControlMiddleware:
+    """
+    Agrega Cache-Control a las respuestas que no lo definen (ASGI puro: no
+    re-envuelve el cuerpo como hace BaseHTTPMiddleware).
+    En las respuestas GET que se revalidan (no-cache) agrega un ETag del cuerpo y
+    responde 304 sin cuerpo si coincide con el If-None-Match del request. Las
+    respuestas en streaming (más de un mensaje) pasan sin ETag.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get('if-none-match')
+        inicio = None  # http.response.start retenido hasta tener el cuerpo para el ETag
+
+        async def send_wrapper(message):
+            nonlocal inicio
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(raw=message['headers'])
+                if 'cache-control' not in headers:
+                    if 200 <= message['status'] < 300:
+                        headers['Cache-Control'] = cache_control_para(scope['method'], scope['path'])
+                    else:
+                        headers['Cache-Control'] = CACHE_CONTROL_DEFAULT
+                if (scope['method'] == 'GET' and message['status'] == 200 and 'etag' not in headers
+                        and 'no-cache' in headers['Cache-Control']):
+                    inicio = message
+                    return
+                await send(message)
+                return
+
+            if inicio is None or message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            retenido, inicio = inicio, None
+            if message.get('more_body', False):
+                await send(retenido)  # streaming: sin ETag
+                await send(message)
+                return
+
+            etag = calcular_etag(message.get('body', b''))
+            headers = MutableHeaders(raw=retenido['headers'])
+            headers['ETag'] = etag
+            if if_none_match and etag_coincide(if_none_match, etag):
+                for nombre in ('content-length', 'content-type'):
+                    if nombre in headers:
+                        del headers[nombre]
+                await send({'type': 'http.response.start', 'status': 304, 'headers': retenido['headers']})
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+            await send(retenido)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+HTTP_REQUESTS = contador('http_requests_total', 'Requests HTTP atendidos por la API',
+                         ['method', 'route', 'status'])
+HTTP_SEGUNDOS = histograma('http_request_duration_seconds',
+                           'Duración de los requests HTTP (hasta el último byte de la respuesta)',
+                           ['method', 'route'])
+HTTP_BYTES = contador('http_response_bytes_total', 'Bytes enviados en el cuerpo de las respuestas',
+                      ['method', 'route'])
+
+
+class MetricsMiddleware:
+    """
+    Registra requests, duración y bytes por ruta. La ruta es la plantilla
+    (/leads/{lead_id}/similar), no el path concreto, para que la cantidad de
+    series no crezca con los ids; los paths sin ruta cuentan como 'sin_ruta'.
+    Va por fuera de todo: la duración incluye autenticación y compresión.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status = 500
+        enviados = 0
+
+        async def send_wrapper(message):
+            nonlocal status, enviados
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                enviados += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # El router de FastAPI deja la ruta resuelta en el mismo scope
+            ruta = getattr(scope.get('route'), 'path', None) or 'sin_ruta'
+            metodo = scope['method']
+            HTTP_REQUESTS.labels(metodo, ruta, status).inc()
+            HTTP_SEGUNDOS.labels(metodo, ruta).observe(time.perf_counter() - inicio)
+            HTTP_BYTES.labels(metodo, ruta).inc(enviados)
+
+
+class ProfilingMiddleware:
+    """
+    Perfila los requests que traen el header `X-Profile: 1` (backend/profiler.py) y
+    responde el id del perfil en `X-Profile-Id` (descargar con GET /profiles/{id}).
+    Solo se agrega con PROFILE_REQUESTS activo. Muestrea todos los threads mientras
+    dura el request (el event loop y los workers que generan respuestas en streaming),
+    así que los requests concurrentes también aparecen.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or Headers(scope=scope).get('x-profile') not in ('1', 'true'):
+            await self.app(scope, receive, send)
+            return
+
+        ruta = re.sub(r'[^A-Za-z0-9]+', '-', scope['path']).strip('-')[:40] or 'raiz'
+        perfil_id = f"req-{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{ruta}"
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                MutableHeaders(raw=message['headers'])['X-Profile-Id'] = perfil_id
+            await send(message)
+
+        with perfilar(perfil_id, todos_los_threads=True):
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,137 @@
+"""
+Servidor HTTP local compatible con POST /v1/chat/completions de OpenAI, para generar
+el reporte con IA (backend/resumen_ia.py) sin conexión ni costo.
+
+- Responde de forma determinista: la cantidad de leads del prompt y las primeras
+  líneas de leads ([id] ...) o de los resúmenes recibidos.
+- Simula la ventana de contexto (400 context_length_exceeded si el prompt más
+  max_tokens no cabe), latencia y errores transitorios (429 con Retry-After y 500).
+- Cuenta las llamadas recibidas (servidor.solicitudes) para verificar la cache.
+
+Uso (desde la raíz del proyecto):
+    python -m backend.openai_stub_server --puerto 8767 --latencia 0.5 --errores 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8767/v1 OPENAI_API_KEY=prueba python -m uvicorn backend.main:app
+"""
+
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+import orjson
+
+from backend.resumen_ia import estimar_tokens
+
+CONTEXTO_DEFAULT = 8192
+LINEAS_RESPUESTA = 5
+
+
+def _responder_prompt(contenido: str) -> str:
+    """Respuesta determinista: los primeros leads ([id] ...) o las primeras líneas de los resúmenes."""
+    lineas = [linea.strip() for linea in contenido.splitlines() if linea.strip()]
+    leads = [linea for linea in lineas if linea.startswith('[')]
+    if leads:
+        destacados = '\n'.join(f"- {linea[:100]}" for linea in leads[:LINEAS_RESPUESTA])
+        return f"Resumen de {len(leads)} leads.\nDestacados:\n{destacados}"
+    bloques = [bloque.strip() for bloque in contenido.split('---') if bloque.strip()]
+    primeras = '\n'.join(f"- {bloque.splitlines()[0][:100]}" for bloque in bloques[:LINEAS_RESPUESTA])
+    return f"Combinación de {len(bloques)} bloques.\n{primeras}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    latencia = 0.0
+    errores = 0.0
+    contexto = CONTEXTO_DEFAULT
+    azar = random.Random(0)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._responder(404, {'error': {'message': 'Not Found', 'type': 'invalid_request_error'}})
+            return
+        cuerpo = orjson.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        with self.server.lock:
+            self.server.solicitudes += 1
+            fallar = self.azar.random() < self.errores
+            limitar = self.azar.random() < 0.5
+        if self.latencia:
+            time.sleep(self.latencia)
+
+        if fallar:
+            with self.server.lock:
+                self.server.errores_enviados += 1
+            if limitar:
+                self._responder(429, {'error': {'message': 'Rate limit reached', 'type': 'requests'}},
+                                {'Retry-After': '1'})
+            else:
+                self._responder(500, {'error': {'message': 'Internal server error', 'type': 'server_error'}})
+            return
+
+        mensajes = cuerpo.get('messages', [])
+        max_tokens = cuerpo.get('max_tokens') or 0
+        tokens_prompt = sum(estimar_tokens(m.get('content') or '') + 4 for m in mensajes)
+        if tokens_prompt + max_tokens > self.contexto:
+            self._responder(400, {'error': {
+                'message': f"This model's maximum context length is {self.contexto} tokens. However, you "
+                           f"requested {tokens_prompt + max_tokens} tokens",
+                'type': 'invalid_request_error', 'code': 'context_length_exceeded'}})
+            return
+
+        texto = _responder_prompt((mensajes[-1].get('content') or '') if mensajes else '')
+        tokens_respuesta = estimar_tokens(texto)
+        self._responder(200, {
+            'id': f'chatcmpl-stub-{self.server.solicitudes}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': cuerpo.get('model', 'stub'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': texto}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': tokens_prompt, 'completion_tokens': tokens_respuesta,
+                      'total_tokens': tokens_prompt + tokens_respuesta},
+        })
+
+    def _responder(self, status: int, datos: dict, headers: dict = None):
+        cuerpo = orjson.dumps(datos)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        for nombre, valor in (headers or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format, *args):
+        pass  # Silencioso: el reporte ya loguea sus llamadas
+
+
+def iniciar_servidor(puerto: int = 0, latencia: float = 0.0, errores: float = 0.0,
+                     contexto: int = CONTEXTO_DEFAULT, semilla: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Inicia el servidor en un thread (puerto 0 = puerto libre aleatorio).
+    Retorna (servidor, base_url con /v1); detener con servidor.shutdown().
+    """
+    handler = type('OpenAIStubHandler', (_Handler,), {
+        'latencia': latencia, 'errores': errores, 'contexto': contexto, 'azar': random.Random(semilla),
+    })
+    servidor = ThreadingHTTPServer(('127.0.0.1', puerto), handler)
+    servidor.lock = threading.Lock()
+    servidor.solicitudes = 0
+    servidor.errores_enviados = 0
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f'http://127.0.0.1:{servidor.server_address[1]}/v1'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor local compatible con la API de chat de OpenAI')
+    parser.add_argument('--puerto', type=int, default=8767)
+    parser.add_argument('--latencia', type=float, default=0.0, help='Segundos por respuesta')
+    parser.add_argument('--errores', type=float, default=0.0, help='Fracción de respuestas 429/500 (0.1 = 10%%)')
+    parser.add_argument('--contexto', type=int, default=CONTEXTO_DEFAULT, help='Ventana de contexto en tokens')
+    args = parser.parse_args()
+
+    servidor, base_url = iniciar_servidor(args.puerto, args.latencia, args.errores, args.contexto)
+    print(f"🧪 Servidor OpenAI local en {base_url} (Ctrl+C para detener)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
@@ -0,0 +1,229 @@
+"""
+Profiler por muestreo, opcional, para ejecuciones de scrapers y requests lentos
+en producción.
+
+Un thread aparte toma cada `intervalo` segundos la pila de los threads vigilados
+(sys._current_frames) y cuenta cuántas veces aparece cada pila. El resultado se
+guarda en formato "collapsed stacks" (una línea `thread;func (archivo);... N`),
+que entienden flamegraph.pl, speedscope e inferno.
+
+Es tiempo de pared: una función que espera (el rate limiter, una ficha, SQLite)
+aparece tanto como una que calcula. Las pilas de threads ociosos (un event loop
+en select, un worker de pool sin trabajo) se descartan.
+
+Sin perfilar no hay costo: no hay thread de muestreo ni hooks en el intérprete.
+
+Uso:
+    with perfilar('run-12'):
+        ...
+    python -m backend.profiler data/perfiles/run-12.folded   # resumen de las pilas más frecuentes
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from backend.config import PROFILE_INTERVAL_MS, PROFILES_DIR
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_DEFAULT = PROFILE_INTERVAL_MS / 1000
+MAX_PROFUNDIDAD = 80
+
+# Ids de perfil válidos (también son el nombre del archivo: nada de rutas)
+_ID_VALIDO = re.compile(r'^[A-Za-z0-9_.-]{1,100}$')
+# Sufijo numérico de los nombres de thread (ThreadPoolExecutor-3_1 -> ThreadPoolExecutor)
+_SUFIJO_THREAD = re.compile(r'[-_]\d+(_\d+)?$')
+# Frames donde un thread está ocioso (esperando trabajo, no esperando algo del request/run)
+_FRAMES_OCIOSOS = {
+    ('selectors.py', 'select'),
+    ('thread.py', '_worker'),
+    ('queue.py', 'get'),
+}
+
+_RAIZ_PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+
+def _archivo_corto(ruta: str) -> str:
+    if ruta.startswith(_RAIZ_PROYECTO):
+        return ruta[len(_RAIZ_PROYECTO):]
+    return os.path.basename(ruta)
+
+
+class MuestreadorPila:
+    """
+    Muestrea las pilas de Python de los threads vigilados en un thread aparte.
+
+    hilos: idents a vigilar; None = todos. Con incluir_nuevos, también los threads
+    creados después de iniciar (p. ej. los pools de descarga de un scraper).
+    """
+
+    def __init__(self, intervalo: float = INTERVALO_DEFAULT, hilos: Optional[Iterable[int]] = None,
+                 incluir_nuevos: bool = True):
+        self.intervalo = intervalo
+        self.hilos: Optional[Set[int]] = set(hilos) if hilos is not None else None
+        self.incluir_nuevos = incluir_nuevos
+        self.pilas: Counter = Counter()
+        self.muestras = 0
+        self.inicio = 0.0
+        self.duracion = 0.0
+        self._existentes: Set[int] = set()
+        self._nombres: Dict[int, str] = {}
+        self._detener = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._etiquetas: Dict[object, str] = {}  # code object -> "func (archivo)"
+
+    def iniciar(self):
+        self._existentes = set(sys._current_frames())
+        self.inicio = time.perf_counter()
+        self._thread = threading.Thread(target=self._bucle, name='muestreador-pila', daemon=True)
+        self._thread.start()
+
+    def detener(self) -> Counter:
+        self._detener.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duracion = time.perf_counter() - self.inicio
+        return self.pilas
+
+    def _vigilado(self, ident: int) -> bool:
+        if self.hilos is None or ident in self.hilos:
+            return True
+        return self.incluir_nuevos and ident not in self._existentes
+
+    def _etiqueta(self, code) -> str:
+        etiqueta = self._etiquetas.get(code)
+        if etiqueta is None:
+            etiqueta = f"{code.co_name} ({_archivo_corto(code.co_filename)})"
+            self._etiquetas[code] = etiqueta
+        return etiqueta
+
+    def _nombre_thread(self, ident: int) -> str:
+        nombre = self._nombres.get(ident)
+        if nombre is None:
+            self._nombres = {t.ident: _SUFIJO_THREAD.sub('', t.name) for t in threading.enumerate()}
+            nombre = self._nombres.get(ident, 'thread')
+        return nombre
+
+    @staticmethod
+    def _ocioso(frame) -> bool:
+        # Se ignoran los frames de threading.py (wait/acquire) para ver qué está esperando
+        while frame is not None and frame.f_code.co_filename.endswith('threading.py'):
+            frame = frame.f_back
+        if frame is None:
+            return True
+        code = frame.f_code
+        return (os.path.basename(code.co_filename), code.co_name) in _FRAMES_OCIOSOS
+
+    def _bucle(self):
+        propio = threading.get_ident()
+        while not self._detener.wait(self.intervalo):
+            for ident, frame in sys._current_frames().items():
+                if ident == propio or not self._vigilado(ident) or self._ocioso(frame):
+                    continue
+                marcos = []
+                while frame is not None and len(marcos) < MAX_PROFUNDIDAD:
+                    marcos.append(self._etiqueta(frame.f_code))
+                    frame = frame.f_back
+                marcos.append(self._nombre_thread(ident))
+                self.pilas[';'.join(reversed(marcos))] += 1
+            self.muestras += 1
+
+
+def validar_id(perfil_id: str) -> bool:
+    return bool(_ID_VALIDO.match(perfil_id))
+
+
+def ruta_perfil(perfil_id: str) -> str:
+    if not validar_id(perfil_id):
+        raise ValueError(f"Id de perfil inválido: {perfil_id!r}")
+    return os.path.join(PROFILES_DIR, f'{perfil_id}.folded')
+
+
+def guardar_perfil(perfil_id: str, pilas: Counter) -> str:
+    """Escribe las pilas en formato collapsed (de la más frecuente a la menos) y retorna la ruta."""
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    ruta = ruta_perfil(perfil_id)
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        for pila, conteo in pilas.most_common():
+            f.write(f'{pila} {conteo}\n')
+    os.replace(temporal, ruta)
+    return ruta
+
+
+@contextmanager
+def perfilar(perfil_id: str, intervalo: float = INTERVALO_DEFAULT, todos_los_threads: bool = False):
+    """
+    Perfila el bloque y guarda el resultado como `<perfil_id>.folded` en PROFILES_DIR.
+    Vigila el thread actual y los que se creen mientras dura el bloque (o todos).
+    Produce el MuestreadorPila (muestras, duracion y pilas quedan disponibles al salir).
+    """
+    muestreador = MuestreadorPila(intervalo, None if todos_los_threads else [threading.get_ident()])
+    muestreador.iniciar()
+    try:
+        yield muestreador
+    finally:
+        pilas = muestreador.detener()
+        try:
+            guardar_perfil(perfil_id, pilas)
+            logger.info("Perfil %s: %d muestras en %.1fs", perfil_id, muestreador.muestras, muestreador.duracion)
+        except OSError as e:
+            logger.warning("No se pudo guardar el perfil %s: %s", perfil_id, e)
+
+
+def listar_perfiles() -> List[Dict]:
+    """Perfiles guardados, del más reciente al más antiguo."""
+    if not os.path.isdir(PROFILES_DIR):
+        return []
+    perfiles = []
+    for nombre in os.listdir(PROFILES_DIR):
+        if not nombre.endswith('.folded'):
+            continue
+        info = os.stat(os.path.join(PROFILES_DIR, nombre))
+        perfiles.append({
+            'id': nombre[:-len('.folded')],
+            'bytes': info.st_size,
+            'creado': datetime.fromtimestamp(info.st_mtime).isoformat(timespec='seconds'),
+        })
+    return sorted(perfiles, key=lambda p: p['creado'], reverse=True)
+
+
+def resumen(ruta: str, top: int = 15) -> List[str]:
+    """Funciones con más muestras propias (hoja de la pila) y totales (en cualquier nivel)."""
+    propias: Counter = Counter()
+    totales: Counter = Counter()
+    total = 0
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for linea in f:
+            pila, _, conteo = linea.rstrip('\n').rpartition(' ')
+            conteo = int(conteo)
+            marcos = pila.split(';')[1:]  # sin el nombre del thread
+            total += conteo
+            if marcos:
+                propias[marcos[-1]] += conteo
+            for marco in set(marcos):
+                totales[marco] += conteo
+    if not total:
+        return ["0 muestras"]
+    lineas = [f"{total} muestras", "", "propias:"]
+    lineas += [f"  {100 * n / total:5.1f}%  {marco}" for marco, n in propias.most_common(top)]
+    lineas += ["", "totales:"]
+    lineas += [f"  {100 * n / total:5.1f}%  {marco}" for marco, n in totales.most_common(top)]
+    return lineas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Resumen de un perfil en formato collapsed stacks')
+    parser.add_argument('archivo')
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+    print('\n'.join(resumen(args.archivo, args.top)))
@@ -0,0 +1,396 @@
+"""
+Reporte con IA sobre todos los leads, en map-reduce con presupuesto de tokens.
+
+1. Ranking: los leads se recorren en streaming y se quedan los REPORT_MAX_LEADS de
+   mayor prioridad según backend/scoring.py (estado elegible, score total, inversión).
+2. Partes: cada lead es una línea compacta; las líneas se agrupan por industria (en
+   orden de id) y se empaquetan en partes de hasta REPORT_CHUNK_TOKENS tokens de
+   entrada. Un lead nuevo solo cambia la última parte de su industria (y la del
+   lead que sale del ranking, si lo hay).
+3. Map: las partes se resumen en paralelo (REPORT_CONCURRENCY llamadas a la vez; el
+   cliente de OpenAI reintenta 429, 5xx y timeouts con backoff). Una parte que falla
+   se omite y el reporte lo indica.
+4. Reduce: los resúmenes parciales se combinan en el reporte final; si no caben en
+   una llamada, primero se combinan por grupos (en niveles).
+
+Cada resumen (map y reduce) se guarda en la tabla reporte_cache por hash del contenido
+(modelo, mensajes, max_tokens, temperatura): las partes que no cambiaron no se vuelven
+a enviar. La llamada final no se cachea: cada reporte se redacta de nuevo sobre los
+resúmenes, aunque los leads no hayan cambiado.
+
+Sin conexión: OPENAI_BASE_URL apuntando a backend/openai_stub_server.py.
+"""
+
+import functools
+import hashlib
+import heapq
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import orjson
+from openai import OpenAI
+
+from backend.config import (
+    DB_PATH, OPENAI_API_KEY, OPENAI_BASE_URL, REPORT_CACHE_DIAS, REPORT_CHUNK_TOKENS,
+    REPORT_CONCURRENCY, REPORT_MAX_LEADS, REPORT_MAX_RETRIES, REPORT_MODEL, REPORT_TIMEOUT_S
+)
+from backend.logs import en_contexto
+from backend.scoring import calcular_score_inversion, calcular_score_total
+from backend.vocabulario import info_estado
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken es opcional (requirements-optional.txt)
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+SISTEMA = "Eres un analista experto en identificar oportunidades de proyectos, financiamiento y M&A."
+
+# Tokens de salida: resumen de una parte (o de un grupo de resúmenes) y reporte final
+TOKENS_PARCIAL = 600
+TOKENS_FINAL = 2000
+TEMPERATURA_PARCIAL = 0.2
+TEMPERATURA_FINAL = 0.7
+
+# Tokens que agrega el formato de chat por mensaje, y margen por el error de la estimación
+TOKENS_POR_MENSAJE = 4
+MARGEN_TOKENS = 200
+
+# Caracteres de la descripción corta que entran en la línea de cada lead
+LARGO_DESCRIPCION = 240
+
+_CRITERIOS = """Criterios de relevancia:
+- Proyectos nuevos o recientes
+- Alta inversión o impacto económico
+- Sectores estratégicos (energía, infraestructura, tecnología, minería)
+- Oportunidades de financiamiento o M&A"""
+
+_INSTRUCCIONES_PARTE = f"""Analiza estos leads de proyectos de la industria {{industria}}. Cada línea es:
+[id] nombre | fuente | región | estado | titular | inversión | score | descripción
+
+{_CRITERIOS}
+
+Responde en menos de 250 palabras:
+- Los 5 leads más relevantes: [id], nombre, inversión y por qué
+- Patrones de la industria (regiones, titulares, etapas)
+- Riesgos u oportunidades a seguir
+
+Leads:
+{{leads}}"""
+
+_INSTRUCCIONES_COMBINAR = """Combina estos resúmenes parciales de leads de proyectos en uno solo de menos de
+250 palabras. Conserva los [id], nombres y montos de los leads más relevantes y los patrones por industria.
+
+{resumenes}"""
+
+_INSTRUCCIONES_FINAL = f"""Estos son resúmenes por industria de {{total}} leads de proyectos (los de mayor
+score según inversión y estado){{omitidas}}.
+
+{_CRITERIOS}
+
+Resúmenes:
+{{resumenes}}
+
+Genera un reporte en formato texto con:
+1. Resumen ejecutivo (2-3 líneas)
+2. Top 5 leads más relevantes con justificación
+3. Análisis por sector
+4. Recomendaciones de seguimiento
+
+Formato el reporte de manera profesional y concisa."""
+
+
+class Parte(NamedTuple):
+    industria: str
+    lineas: Tuple[str, ...]
+    prioridad: tuple  # la del mejor lead de la parte: orden en que entran al reduce
+
+
+class Llamada(NamedTuple):
+    texto: str
+    en_cache: bool
+    tokens_entrada: int = 0
+    tokens_salida: int = 0
+
+
+class ResultadoReporte(NamedTuple):
+    texto: str
+    leads: int
+    partes: int
+    partes_en_cache: int
+    partes_fallidas: int
+    llamadas: int  # enviadas al modelo (sin contar las respondidas desde la cache)
+    tokens_entrada: int
+    tokens_salida: int
+    segundos: float
+
+
+# --- Tokens ---
+
+@functools.lru_cache(maxsize=1)
+def _codificador():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding('cl100k_base')
+    except Exception:
+        return None  # sin conexión no puede descargar el vocabulario la primera vez
+
+
+def estimar_tokens(texto: str) -> int:
+    """Tokens del texto (tiktoken si está instalado; si no, por exceso: ~3 caracteres por token)."""
+    codificador = _codificador()
+    if codificador is not None:
+        return len(codificador.encode(texto))
+    return len(texto) // 3 + 1
+
+
+def _tokens_mensajes(mensajes: Sequence[Dict[str, str]]) -> int:
+    return sum(estimar_tokens(m['content']) + TOKENS_POR_MENSAJE for m in mensajes)
+
+
+def _mensajes(contenido: str) -> List[Dict[str, str]]:
+    return [{"role": "system", "content": SISTEMA}, {"role": "user", "content": contenido}]
+
+
+# --- Ranking y partes ---
+
+def _prioridad(lead: Dict) -> tuple:
+    """Estado elegible, score total (el de calcular_score_total) e inversión, sin copiar el lead."""
+    raw = lead.get('raw_data', {})
+    info = info_estado(raw.get('estado'))
+    inversion = raw.get('inversion_millones')
+    return info.is_elegible, calcular_score_inversion(inversion) + info.score, inversion or 0
+
+
+def rankear_leads(leads: Iterable[Dict], limite: int = REPORT_MAX_LEADS) -> List[Dict]:
+    """
+    Los `limite` leads de mayor prioridad, con score (acepta un iterador: memoria
+    acotada por limite). Solo los elegidos pasan por calcular_score_total.
+    """
+    return [calcular_score_total(lead) for lead in heapq.nlargest(limite, leads, key=_prioridad)]
+
+
+def linea_lead(lead: Dict) -> str:
+    """Línea compacta del lead para el prompt (la industria va en el encabezado de la parte)."""
+    raw = lead.get('raw_data', {})
+    campos = [f"[{lead.get('id')}] {lead.get('project_name') or 'Sin nombre'}", lead.get('source') or '']
+    campos += [str(raw[campo]) for campo in ('region', 'estado', 'titular') if raw.get(campo)]
+    if raw.get('inversion_millones'):
+        campos.append(f"USD {raw['inversion_millones']:,.1f} MM")
+    campos.append(f"score {lead['score_total']}")
+    descripcion = ' '.join((lead.get('description') or '').split())[:LARGO_DESCRIPCION]
+    if descripcion:
+        campos.append(descripcion)
+    return ' | '.join(campos)
+
+
+def armar_partes(leads: Iterable[Dict], presupuesto: int = REPORT_CHUNK_TOKENS) -> List[Parte]:
+    """
+    Agrupa los leads (con score) por industria y los empaqueta en partes cuyo prompt
+    completo no pasa de `presupuesto` tokens. Partes ordenadas por prioridad.
+    """
+    grupos: Dict[str, List[Dict]] = {}
+    for lead in leads:
+        industria = lead.get('raw_data', {}).get('industria') or 'Otros'
+        grupos.setdefault(industria, []).append(lead)
+
+    partes = []
+    for industria, del_grupo in grupos.items():
+        disponible = (presupuesto - MARGEN_TOKENS
+                      - _tokens_mensajes(_mensajes(_INSTRUCCIONES_PARTE.format(industria=industria, leads=''))))
+        # Orden de id: los leads nuevos quedan al final y las partes anteriores no cambian
+        del_grupo.sort(key=lambda lead: lead.get('id') or 0)
+        lineas: List[str] = []
+        usados = 0
+        mejor = None
+        for lead in del_grupo:
+            linea = linea_lead(lead)
+            tokens = estimar_tokens(linea) + 1
+            if tokens > disponible:
+                linea = linea[:disponible * 3]
+                tokens = disponible
+            if lineas and usados + tokens > disponible:
+                partes.append(Parte(industria, tuple(lineas), mejor))
+                lineas, usados, mejor = [], 0, None
+            lineas.append(linea)
+            usados += tokens
+            prioridad = _prioridad(lead)
+            mejor = prioridad if mejor is None else max(mejor, prioridad)
+        if lineas:
+            partes.append(Parte(industria, tuple(lineas), mejor))
+
+    partes.sort(key=lambda parte: parte.prioridad, reverse=True)
+    return partes
+
+
+# --- Cache ---
+
+def crear_tabla_cache(cursor):
+    """Respuestas del modelo por hash de la llamada (ver _hash_llamada)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS reporte_cache (
+            hash TEXT PRIMARY KEY,
+            modelo TEXT NOT NULL,
+            respuesta TEXT NOT NULL,
+            tokens_entrada INTEGER,
+            tokens_salida INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            usado_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _hash_llamada(modelo: str, mensajes: Sequence[Dict[str, str]], max_tokens: int, temperatura: float) -> str:
+    return hashlib.sha256(orjson.dumps([modelo, mensajes, max_tokens, temperatura])).hexdigest()
+
+
+def _leer_cache(clave_hash: str) -> Optional[str]:
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        fila = conn.execute('SELECT respuesta FROM reporte_cache WHERE hash = ?', (clave_hash,)).fetchone()
+        if fila:
+            conn.execute('UPDATE reporte_cache SET usado_at = CURRENT_TIMESTAMP WHERE hash = ?', (clave_hash,))
+            conn.commit()
+        return fila[0] if fila else None
+    finally:
+        conn.close()
+
+
+def _guardar_cache(clave_hash: str, modelo: str, llamada: Llamada):
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        conn.execute('''
+            INSERT OR REPLACE INTO reporte_cache (hash, modelo, respuesta, tokens_entrada, tokens_salida)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (clave_hash, modelo, llamada.texto, llamada.tokens_entrada, llamada.tokens_salida))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def limpiar_cache(dias: int = REPORT_CACHE_DIAS) -> int:
+    """Borra las respuestas que no se usan hace más de `dias` días. Retorna cuántas."""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        cursor = conn.execute("DELETE FROM reporte_cache WHERE usado_at < datetime('now', ?)", (f'-{dias} days',))
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+
+# --- Llamadas ---
+
+def crear_cliente() -> OpenAI:
+    return OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL or None,
+                  max_retries=REPORT_MAX_RETRIES, timeout=REPORT_TIMEOUT_S)
+
+
+def _completar(cliente: OpenAI, contenido: str, max_tokens: int, temperatura: float,
+               cachear: bool = True) -> Llamada:
+    """Una llamada al modelo, respondida desde la cache si ya se hizo con el mismo contenido."""
+    mensajes = _mensajes(contenido)
+    clave_hash = _hash_llamada(REPORT_MODEL, mensajes, max_tokens, temperatura)
+    if cachear:
+        en_cache = _leer_cache(clave_hash)
+        if en_cache is not None:
+            return Llamada(en_cache, True)
+
+    respuesta = cliente.chat.completions.create(model=REPORT_MODEL, messages=mensajes,
+                                                max_tokens=max_tokens, temperature=temperatura)
+    uso = respuesta.usage
+    llamada = Llamada(respuesta.choices[0].message.content or '', False,
+                      uso.prompt_tokens if uso else 0, uso.completion_tokens if uso else 0)
+    if cachear and llamada.texto:
+        _guardar_cache(clave_hash, REPORT_MODEL, llamada)
+    return llamada
+
+
+def _agrupar(resumenes: List[str], disponible: int) -> List[List[str]]:
+    """Resúmenes en grupos que caben en una llamada (al menos de a dos, para que el reduce avance)."""
+    grupos: List[List[str]] = [[]]
+    usados = 0
+    for resumen in resumenes:
+        tokens = estimar_tokens(resumen) + 2
+        if len(grupos[-1]) >= 2 and usados + tokens > disponible:
+            grupos.append([])
+            usados = 0
+        grupos[-1].append(resumen)
+        usados += tokens
+    return grupos
+
+
+def generar_reporte(leads: Iterable[Dict], cliente: Optional[OpenAI] = None) -> ResultadoReporte:
+    """
+    Reporte ejecutivo de los leads (lista o iterador como database.iter_leads) en
+    map-reduce. Lanza ValueError si no hay leads y RuntimeError si ninguna parte se pudo resumir.
+    """
+    inicio = time.perf_counter()
+    cliente = cliente or crear_cliente()
+    limpiar_cache()
+
+    rankeados = rankear_leads(leads)
+    if not rankeados:
+        raise ValueError("No hay leads para generar el reporte")
+    partes = armar_partes(rankeados)
+    llamadas: List[Llamada] = []
+
+    def resumir_parte(parte: Parte) -> Optional[Llamada]:
+        try:
+            return _completar(cliente, _INSTRUCCIONES_PARTE.format(industria=parte.industria,
+                                                                   leads='\n'.join(parte.lineas)),
+                              TOKENS_PARCIAL, TEMPERATURA_PARCIAL)
+        except Exception as e:
+            logger.warning("No se pudo resumir una parte del reporte",
+                           extra={'industria': parte.industria, 'leads': len(parte.lineas), 'error': str(e)})
+            return None
+
+    def combinar(grupo: List[str]) -> Llamada:
+        return _completar(cliente, _INSTRUCCIONES_COMBINAR.format(resumenes='\n\n---\n\n'.join(grupo)),
+                          TOKENS_PARCIAL, TEMPERATURA_PARCIAL)
+
+    with ThreadPoolExecutor(max_workers=max(1, REPORT_CONCURRENCY), thread_name_prefix='reporte-ia') as pool:
+        # Map
+        resultados = list(pool.map(en_contexto(resumir_parte), partes))
+        parciales = [r for r in resultados if r is not None]
+        llamadas += parciales
+        fallidas = len(resultados) - len(parciales)
+        resumenes = [r.texto for r in parciales if r.texto]
+        if not resumenes:
+            raise RuntimeError(f"No se pudo resumir ninguna de las {len(partes)} partes")
+
+        # Reduce: en niveles hasta que los resúmenes quepan en la llamada final
+        omitidas = f" ({fallidas} de {len(partes)} partes no se pudieron resumir)" if fallidas else ''
+        while True:
+            contenido = _INSTRUCCIONES_FINAL.format(total=len(rankeados), omitidas=omitidas,
+                                                    resumenes='\n\n---\n\n'.join(resumenes))
+            exceso = _tokens_mensajes(_mensajes(contenido)) + MARGEN_TOKENS - REPORT_CHUNK_TOKENS
+            if exceso <= 0 or len(resumenes) == 1:
+                break
+            disponible = (REPORT_CHUNK_TOKENS - MARGEN_TOKENS
+                          - _tokens_mensajes(_mensajes(_INSTRUCCIONES_COMBINAR.format(resumenes=''))))
+            combinados = list(pool.map(en_contexto(combinar), _agrupar(resumenes, disponible)))
+            llamadas += combinados
+            resumenes = [c.texto for c in combinados]
+
+    final = _completar(cliente, contenido, TOKENS_FINAL, TEMPERATURA_FINAL, cachear=False)
+    llamadas.append(final)
+
+    resultado = ResultadoReporte(
+        texto=final.texto,
+        leads=len(rankeados),
+        partes=len(partes),
+        partes_en_cache=sum(1 for r in parciales if r.en_cache),
+        partes_fallidas=fallidas,
+        llamadas=sum(1 for llamada in llamadas if not llamada.en_cache),
+        tokens_entrada=sum(llamada.tokens_entrada for llamada in llamadas),
+        tokens_salida=sum(llamada.tokens_salida for llamada in llamadas),
+        segundos=round(time.perf_counter() - inicio, 3),
+    )
+    logger.info("Reporte con IA generado", extra={k: v for k, v in resultado._asdict().items() if k != 'texto'})
+    return resultado
@@ -3,12 +3,10 @@ Funciones de scoring para selección de Top 20 proyectos.
 Implementación determinista y reproducible.
 """
 
-from typing import List, Dict, Any
-from backend.scoring_rules import (
-    ESTADOS_VALIDOS, ESTADOS_EXCLUIDOS,
-    MONTO_MINIMO_USD_MM, INDUSTRIAS_ESTRATEGICAS, MONTO_MINIMO_ESTRATEGICAS_USD_MM,
-    SCORE_INVERSION, SCORE_ESTADO, TOP_N_PROYECTOS
-)
+import heapq
+from typing import Any, Dict, Iterable, Iterator, List
+from backend.scoring_rules import SCORE_INVERSION, TOP_N_PROYECTOS
+from backend.vocabulario import info_estado, info_industria
 
 
 def normalizar_estado(estado: str) -> str:
@@ -20,21 +18,17 @@ def normalizar_estado(estado: str) -> str:
 
 def es_estado_valido(estado: str) -> bool:
     """Verifica si el estado está en la lista de estados válidos."""
-    estado_norm = normalizar_estado(estado).lower()
-    return any(ev.lower() in estado_norm for ev in ESTADOS_VALIDOS)
+    return info_estado(estado).is_valido
 
 
 def es_estado_excluido(estado: str) -> bool:
     """Verifica si el estado está en la lista de estados excluidos."""
-    estado_norm = normalizar_estado(estado).lower()
-    return any(ee.lower() in estado_norm for ee in ESTADOS_EXCLUIDOS)
+    return info_estado(estado).is_excluido
 
 
 def get_monto_minimo(categoria: str) -> float:
     """Obtiene el monto mínimo según la categoría del proyecto."""
-    if categoria in INDUSTRIAS_ESTRATEGICAS:
-        return MONTO_MINIMO_ESTRATEGICAS_USD_MM
-    return MONTO_MINIMO_USD_MM
+    return info_industria(categoria).monto_minimo
 
 
 def calcular_score_inversion(inversion_mm: float) -> int:
@@ -50,12 +44,7 @@ def calcular_score_inversion(inversion_mm: float) -> int:
 
 def calcular_score_estado(estado: str) -> int:
     """Calcula el score por estado del proyecto."""
-    estado_norm = normalizar_estado(estado).lower()
-    
-    for estado_key, puntos in SCORE_ESTADO.items():
-        if estado_key.lower() in estado_norm:
-            return puntos
-    return 0
+    return info_estado(estado).score
 
 
 def calcular_score_total(lead: Dict[str, Any]) -> Dict[str, Any]:
@@ -76,9 +65,10 @@ def calcular_score_total(lead: Dict[str, Any]) -> Dict[str, Any]:
     categoria = raw_data.get('industria', 'Otros')
     nombre = lead.get('project_name', '')
     
-    # Calcular scores
+    # Calcular scores (banderas del estado precalculadas en el vocabulario)
+    info = info_estado(estado)
     score_inv = calcular_score_inversion(inversion_mm)
-    score_est = calcular_score_estado(estado)
+    score_est = info.score
     score_total = score_inv + score_est
     
     # Generar explicación
@@ -90,13 +80,8 @@ def calcular_score_total(lead: Dict[str, Any]) -> Dict[str, Any]:
     elif inversion_mm and inversion_mm >= 50:
         explicacion_parts.append("inversión media")
     
-    estado_lower = estado.lower() if estado else ""
-    if "calificación" in estado_lower:
-        explicacion_parts.append("etapa temprana")
-    elif "admitido" in estado_lower:
-        explicacion_parts.append("en tramitación")
-    elif "aprobado" in estado_lower:
-        explicacion_parts.append("aprobado")
+    if info.etapa:
+        explicacion_parts.append(info.etapa)
     
     explicacion = " + ".join(explicacion_parts) if explicacion_parts else "Sin características destacadas"
     
@@ -109,64 +94,63 @@ def calcular_score_total(lead: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def filtrar_elegibles(leads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def iter_elegibles(leads: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
     """
-    Aplica filtros duros para determinar proyectos elegibles.
+    Aplica filtros duros para determinar proyectos elegibles, a medida que se recorren
+    los leads (acepta una lista o un iterador como database.iter_leads).
     
     Filtros:
     1. Estado válido (no excluido)
     2. Inversión >= monto mínimo (según categoría)
     """
-    elegibles = []
-    
     for lead in leads:
         raw_data = lead.get('raw_data', {})
         estado = raw_data.get('estado', '')
         inversion_mm = raw_data.get('inversion_millones')
         categoria = raw_data.get('industria', 'Otros')
         
-        # Filtro 1: Estado
-        if es_estado_excluido(estado):
-            continue
-        if not es_estado_valido(estado):
+        # Filtro 1: Estado (válido y no excluido)
+        if not info_estado(estado).is_elegible:
             continue
         
         # Filtro 2: Inversión mínima
-        monto_minimo = get_monto_minimo(categoria)
+        monto_minimo = info_industria(categoria).monto_minimo
         if inversion_mm is None or inversion_mm < monto_minimo:
             continue
         
-        elegibles.append(lead)
-    
-    return elegibles
+        yield lead
 
 
-def get_top_proyectos(leads: List[Dict[str, Any]], limit: int = None) -> List[Dict[str, Any]]:
+def filtrar_elegibles(leads: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Lista de los proyectos elegibles (ver iter_elegibles)."""
+    return list(iter_elegibles(leads))
+
+
+def get_top_proyectos(leads: Iterable[Dict[str, Any]], limit: int = None) -> List[Dict[str, Any]]:
     """
     Obtiene los top N proyectos ordenados por score.
     
     1. Filtra proyectos elegibles
     2. Calcula score para cada uno
-    3. Ordena por score descendente
+    3. Ordena por score descendente (estable: a igual score, el orden de llegada)
     4. Retorna los primeros N
+    
+    Con un iterador (database.iter_leads) corre en memoria constante: solo se
+    conservan los N mejores en un heap.
     """
     if limit is None:
         limit = TOP_N_PROYECTOS
     
-    # Filtrar elegibles
-    elegibles = filtrar_elegibles(leads)
-    
-    # Calcular scores
-    con_score = [calcular_score_total(lead) for lead in elegibles]
-    
-    # Ordenar por score descendente
-    ordenados = sorted(con_score, key=lambda x: x['score_total'], reverse=True)
+    con_score = (calcular_score_total(lead) for lead in iter_elegibles(leads))
+    ordenados = heapq.nlargest(limit, con_score, key=lambda x: x['score_total'])
     
-    # Agregar ranking
-    for i, proyecto in enumerate(ordenados[:limit], 1):
+    # Agregar ranking (y raw_data como dict normal si venía perezoso, para serializarlo)
+    for i, proyecto in enumerate(ordenados, 1):
         proyecto['ranking'] = i
+        if not isinstance(proyecto.get('raw_data', {}), dict):
+            proyecto['raw_data'] = dict(proyecto['raw_data'])
     
-    return ordenados[:limit]
+    return ordenados
 
 
 def generar_resumen_top_proyectos(top_proyectos: List[Dict[str, Any]]) -> str:
@@ -0,0 +1,147 @@
+"""
+Búsqueda full-text sobre leads con SQLite FTS5.
+La tabla virtual leads_fts indexa project_name, description, titular y
+descripcion_completa, se mantiene sincronizada con triggers y usa el
+tokenizador unicode61 con remove_diacritics (los datos están en español).
+"""
+
+import re
+import sqlite3
+from typing import Dict, List, Optional
+
+from backend.config import DB_PATH
+from backend.storage import descomprimir_texto
+
+# Pesos BM25 por columna: project_name, description, titular, descripcion_completa
+PESOS_BM25 = (10.0, 2.0, 5.0, 1.0)
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def crear_indice_fts(cursor):
+    """
+    Crea la tabla FTS5 y sus triggers; la primera vez indexa los leads existentes.
+    La columna descripcion_completa la mantiene storage.guardar_descripcion, porque
+    la descripción se guarda comprimida y los triggers no pueden leerla.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'leads_fts'")
+    existia = cursor.fetchone() is not None
+
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS leads_fts USING fts5(
+            project_name, description, titular, descripcion_completa,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    ''')
+
+    # Los triggers se recrean siempre para que reflejen la definición actual
+    for trigger in ('leads_fts_ai', 'leads_fts_ad', 'leads_fts_au',
+                    'descripciones_fts_ai', 'descripciones_fts_au'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+
+    cursor.execute('''
+        CREATE TRIGGER leads_fts_ai AFTER INSERT ON leads BEGIN
+            INSERT INTO leads_fts (rowid, project_name, description, titular)
+            VALUES (new.id, new.project_name, new.description, new.titular);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER leads_fts_ad AFTER DELETE ON leads BEGIN
+            DELETE FROM leads_fts WHERE rowid = old.id;
+        END
+    ''')
+    # UPDATE (no DELETE + INSERT) para conservar la descripción ya indexada
+    cursor.execute('''
+        CREATE TRIGGER leads_fts_au AFTER UPDATE ON leads BEGIN
+            UPDATE leads_fts
+            SET project_name = new.project_name, description = new.description, titular = new.titular
+            WHERE rowid = old.id;
+        END
+    ''')
+
+    if not existia:
+        reconstruir_indice_fts(cursor)
+
+
+def reconstruir_indice_fts(cursor):
+    """Reindexa todos los leads en leads_fts."""
+    cursor.execute('DELETE FROM leads_fts')
+    cursor.execute('''
+        INSERT INTO leads_fts (rowid, project_name, description, titular)
+        SELECT id, project_name, description, titular FROM leads
+    ''')
+    cursor.execute('SELECT lead_id, descripcion FROM lead_descripciones')
+    for lead_id, blob in cursor.fetchall():
+        cursor.execute('''
+            UPDATE leads_fts SET descripcion_completa = ? WHERE rowid = ?
+        ''', (descomprimir_texto(blob), lead_id))
+
+
+def construir_consulta_fts(q: str) -> Optional[str]:
+    """
+    Convierte el texto libre del usuario en una consulta FTS5 segura:
+    cada término se cita (evita errores de sintaxis) y se busca por prefijo.
+    """
+    terminos = _TOKEN.findall(q or '')
+    if not terminos:
+        return None
+    return ' '.join(f'"{t}"*' for t in terminos)
+
+
+def search_leads(q: str, source: Optional[str] = None, industria: Optional[str] = None,
+                 limit: int = 20, offset: int = 0) -> List[Dict]:
+    """
+    Busca leads por texto con ranking BM25 y snippet resaltado.
+    Filtros opcionales por fuente e industria.
+    """
+    consulta = construir_consulta_fts(q)
+    if not consulta:
+        return []
+
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+
+    pesos = ', '.join(str(p) for p in PESOS_BM25)
+    query = f'''
+        SELECT l.id, l.source, l.project_name, l.date, l.sector, l.created_at,
+               l.industria, l.estado, l.region, l.inversion_millones, l.link_ficha,
+               bm25(leads_fts, {pesos}) AS score,
+               snippet(leads_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet
+        FROM leads_fts
+        JOIN leads l ON l.id = leads_fts.rowid
+        WHERE leads_fts MATCH ?
+    '''
+    params = [consulta]
+    if source:
+        query += ' AND LOWER(l.source) = LOWER(?)'
+        params.append(source)
+    if industria:
+        query += ' AND l.industria = ?'
+        params.append(industria)
+    query += ' ORDER BY score LIMIT ? OFFSET ?'
+    params.extend([limit, offset])
+
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    conn.close()
+
+    return [
+        {
+            'id': row['id'],
+            'source': row['source'],
+            'project_name': row['project_name'],
+            'date': row['date'],
+            'sector': row['sector'],
+            'created_at': row['created_at'],
+            'industria': row['industria'],
+            'estado': row['estado'],
+            'region': row['region'],
+            'inversion_millones': row['inversion_millones'],
+            'link_ficha': row['link_ficha'],
+            # bm25() retorna valores negativos: más negativo = más relevante
+            'score': round(-row['score'], 4),
+            'snippet': row['snippet'],
+        }
+        for row in rows
+    ]
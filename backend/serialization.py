@@ -0,0 +1,64 @@
+"""
+Serialización JSON rápida para las respuestas de la API.
+ORJSONResponse (fastapi.responses) es la clase de respuesta por defecto de la
+app. Los endpoints de listas grandes devuelven además una respuesta ya
+serializada: cada lead se arma como JSON en SQLite (columnas y campos calientes)
+y solo el blob frío pasa por Python, así se evita construir el árbol de dicts y
+el jsonable_encoder de FastAPI.
+"""
+
+from typing import Any, Iterable, Mapping
+
+import orjson
+from fastapi.responses import Response
+
+from backend.storage import campos_frios, descomprimir_texto, sql_campos_calientes_json
+
+# Columnas para serializar un lead directamente desde SQLite (alias l = leads, d = lead_descripciones)
+SQL_LEAD_JSON = f'''
+    json_object(
+        'id', l.id, 'source', l.source, 'project_name', l.project_name, 'date', l.date,
+        'sector', l.sector, 'description', l.description, 'created_at', l.created_at
+    ) AS lead_json,
+    {sql_campos_calientes_json('l')} AS calientes_json,
+    l.project_name, l.date, l.industria, l.raw_extra
+'''
+
+
+def dumps(obj: Any) -> bytes:
+    """Serializa a JSON (bytes UTF-8) con orjson."""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _unir_objetos(a: bytes, b: bytes) -> bytes:
+    """Une dos objetos JSON serializados con claves disjuntas."""
+    if a == b'{}':
+        return b
+    if b == b'{}':
+        return a
+    return a[:-1] + b',' + b[1:]
+
+
+def lead_json(row: Mapping) -> bytes:
+    """
+    Serializa una fila de SQL_LEAD_JSON (más la columna descripcion) al mismo
+    JSON que produce _row_to_lead, sin decodificar el JSON armado por SQLite.
+    """
+    frios = campos_frios(row, descomprimir_texto(row['descripcion']))
+    raw_data = _unir_objetos(row['calientes_json'].encode('utf-8'), dumps(frios))
+    return row['lead_json'].encode('utf-8')[:-1] + b',"raw_data":' + raw_data + b'}'
+
+
+def respuesta_lista(clave: str, fragmentos: Iterable[bytes], **extra: Any) -> Response:
+    """
+    Respuesta {clave: [...], total: N, **extra} a partir de elementos ya serializados.
+    """
+    fragmentos = list(fragmentos)
+    cuerpo = (
+        b'{"' + clave.encode('utf-8') + b'":[' + b','.join(fragmentos) + b'],'
+        + b'"total":' + str(len(fragmentos)).encode('ascii')
+    )
+    if extra:
+        cuerpo += b',' + dumps(extra)[1:-1]
+    return Response(content=cuerpo + b'}', media_type='application/json')
+
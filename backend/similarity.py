@@ -0,0 +1,337 @@
+"""
+Detección de casi-duplicados entre fuentes con MinHash + LSH.
+Un mismo proyecto puede aparecer como ingreso SEIA y como hecho esencial CMF
+con nombres distintos. Se indexa project_name + titular como shingles
+normalizados, se guarda la firma MinHash de cada lead y se reparten las
+firmas en buckets LSH para buscar candidatos sin comparar todos contra todos.
+
+Uso manual (desde la raíz del proyecto):
+    python -m backend.similarity
+"""
+
+import hashlib
+import random
+import re
+import sqlite3
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.config import DB_PATH
+
+# Parámetros MinHash / LSH.
+# Con 20 bandas de 3 filas el umbral efectivo es ~(1/20)^(1/3) ≈ 0.37 de Jaccard.
+NUM_PERMUTACIONES = 60
+BANDAS = 20
+FILAS_POR_BANDA = NUM_PERMUTACIONES // BANDAS
+SHINGLE_K = 3
+
+# Similitud mínima estimada para reportar un par
+UMBRAL_SIMILITUD = 0.4
+
+# Buckets con más leads que esto se ignoran en el job de vinculación
+# (corresponden a shingles demasiado comunes y generarían pares cuadráticos)
+MAX_LEADS_POR_BUCKET = 200
+
+_PRIMO = (1 << 61) - 1
+_rng = random.Random(20240115)
+_PERMUTACIONES = [
+    (_rng.randrange(1, _PRIMO), _rng.randrange(0, _PRIMO))
+    for _ in range(NUM_PERMUTACIONES)
+]
+
+STOPWORDS = {
+    'de', 'del', 'la', 'las', 'el', 'los', 'y', 'e', 'en', 'a', 'al', 'para', 'por', 'con',
+    'proyecto', 'sa', 's', 'spa', 'ltda', 'limitada', 'sociedad', 'anonima', 'cia', 'compania',
+}
+
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+
+
+def normalizar_texto(texto: str) -> List[str]:
+    """Normaliza un texto a tokens: minúsculas, sin tildes, sin puntuación ni stopwords."""
+    if not texto:
+        return []
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return [t for t in _NO_ALFANUMERICO.split(texto) if t and t not in STOPWORDS]
+
+
+def _hash64(valor: str) -> int:
+    return int.from_bytes(hashlib.blake2b(valor.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def shingles(nombre: str, titular: str = '') -> Set[int]:
+    """
+    Calcula los shingles hasheados de un lead:
+    k-gramas de caracteres del nombre normalizado + tokens del titular.
+    """
+    tokens = normalizar_texto(nombre)
+    texto = ' '.join(tokens)
+    resultado = set()
+    if len(texto) <= SHINGLE_K:
+        if texto:
+            resultado.add(_hash64(texto))
+    else:
+        for i in range(len(texto) - SHINGLE_K + 1):
+            resultado.add(_hash64(texto[i:i + SHINGLE_K]))
+    for token in normalizar_texto(titular):
+        resultado.add(_hash64('t:' + token))
+    return resultado
+
+
+def calcular_firma(nombre: str, titular: str = '') -> Optional[List[int]]:
+    """Calcula la firma MinHash de un lead. Retorna None si no hay texto indexable."""
+    hashes = shingles(nombre, titular)
+    if not hashes:
+        return None
+    hashes = list(hashes)
+    return [min([(a * h + b) % _PRIMO for h in hashes]) for a, b in _PERMUTACIONES]
+
+
+def buckets_lsh(firma: List[int]) -> List[Tuple[int, int]]:
+    """Reparte una firma en (banda, bucket) para la búsqueda LSH."""
+    resultado = []
+    for banda in range(BANDAS):
+        filas = firma[banda * FILAS_POR_BANDA:(banda + 1) * FILAS_POR_BANDA]
+        clave = ','.join(str(v) for v in filas)
+        # Enteros con signo de 63 bits para caber en INTEGER de SQLite
+        resultado.append((banda, _hash64(clave) >> 1))
+    return resultado
+
+
+def similitud_estimada(firma_a: List[int], firma_b: List[int]) -> float:
+    """Estima la similitud de Jaccard entre dos firmas MinHash."""
+    iguales = sum(1 for a, b in zip(firma_a, firma_b) if a == b)
+    return iguales / NUM_PERMUTACIONES
+
+
+def _empaquetar(firma: List[int]) -> bytes:
+    return array('Q', firma).tobytes()
+
+
+def _desempaquetar(blob: bytes) -> List[int]:
+    firma = array('Q')
+    firma.frombytes(blob)
+    return firma.tolist()
+
+
+def crear_tablas(cursor):
+    """Crea las tablas del índice de similitud."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS lead_minhash (
+            lead_id INTEGER PRIMARY KEY,
+            source TEXT,
+            firma BLOB NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS lead_lsh (
+            banda INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            lead_id INTEGER NOT NULL,
+            source TEXT
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_lead_lsh_bucket ON lead_lsh(banda, bucket)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_lead_lsh_lead ON lead_lsh(lead_id)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS lead_links (
+            lead_id_a INTEGER NOT NULL,
+            lead_id_b INTEGER NOT NULL,
+            similitud REAL NOT NULL,
+            detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (lead_id_a, lead_id_b)
+        )
+    ''')
+
+
+def eliminar_de_indice(cursor, lead_ids: Iterable[int]):
+    """Elimina leads del índice de similitud y de los vínculos."""
+    lead_ids = list(lead_ids)
+    if not lead_ids:
+        return
+    placeholders = ','.join('?' * len(lead_ids))
+    cursor.execute(f'DELETE FROM lead_minhash WHERE lead_id IN ({placeholders})', lead_ids)
+    cursor.execute(f'DELETE FROM lead_lsh WHERE lead_id IN ({placeholders})', lead_ids)
+    cursor.execute(f'''
+        DELETE FROM lead_links WHERE lead_id_a IN ({placeholders}) OR lead_id_b IN ({placeholders})
+    ''', lead_ids + lead_ids)
+
+
+def indexar_lead(cursor, lead_id: int, source: str, nombre: str, titular: str = ''):
+    """Calcula y guarda la firma MinHash y los buckets LSH de un lead (reemplaza los anteriores)."""
+    cursor.execute('DELETE FROM lead_lsh WHERE lead_id = ?', (lead_id,))
+    firma = calcular_firma(nombre, titular)
+    if firma is None:
+        cursor.execute('DELETE FROM lead_minhash WHERE lead_id = ?', (lead_id,))
+        return
+
+    cursor.execute('''
+        INSERT OR REPLACE INTO lead_minhash (lead_id, source, firma) VALUES (?, ?, ?)
+    ''', (lead_id, source, _empaquetar(firma)))
+    cursor.executemany('''
+        INSERT INTO lead_lsh (banda, bucket, lead_id, source) VALUES (?, ?, ?, ?)
+    ''', [(banda, bucket, lead_id, source) for banda, bucket in buckets_lsh(firma)])
+
+
+def indexar_pendientes(conn: sqlite3.Connection) -> int:
+    """Indexa los leads que aún no tienen firma MinHash. Retorna cuántos se indexaron."""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT l.id, l.source, l.project_name, l.titular
+        FROM leads l LEFT JOIN lead_minhash m ON m.lead_id = l.id
+        WHERE m.lead_id IS NULL
+    ''')
+    pendientes = cursor.fetchall()
+    for lead_id, source, nombre, titular in pendientes:
+        indexar_lead(cursor, lead_id, source, nombre or '', titular or '')
+    return len(pendientes)
+
+
+def _candidatos_por_buckets(cursor, buckets: List[Tuple[int, int]]) -> Set[int]:
+    condiciones = ' OR '.join(['(banda = ? AND bucket = ?)'] * len(buckets))
+    params = [v for par in buckets for v in par]
+    cursor.execute(f'SELECT DISTINCT lead_id FROM lead_lsh WHERE {condiciones}', params)
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _rankear_candidatos(cursor, firma: List[int], candidatos: Set[int],
+                        umbral: float, limit: int) -> List[Dict]:
+    if not candidatos:
+        return []
+    candidatos = list(candidatos)
+    resultados = []
+    # Lotes para no superar el límite de parámetros de SQLite
+    for i in range(0, len(candidatos), 500):
+        lote = candidatos[i:i + 500]
+        placeholders = ','.join('?' * len(lote))
+        cursor.execute(f'''
+            SELECT m.lead_id, m.firma, l.source, l.project_name
+            FROM lead_minhash m JOIN leads l ON l.id = m.lead_id
+            WHERE m.lead_id IN ({placeholders})
+        ''', lote)
+        for lead_id, blob, source, nombre in cursor.fetchall():
+            similitud = similitud_estimada(firma, _desempaquetar(blob))
+            if similitud >= umbral:
+                resultados.append({
+                    'lead_id': lead_id,
+                    'source': source,
+                    'project_name': nombre,
+                    'similitud': round(similitud, 3),
+                })
+    resultados.sort(key=lambda r: r['similitud'], reverse=True)
+    return resultados[:limit]
+
+
+def buscar_similares(lead_id: int, limit: int = 10, umbral: float = UMBRAL_SIMILITUD) -> List[Dict]:
+    """Busca los leads más parecidos a un lead existente usando los buckets LSH."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT firma FROM lead_minhash WHERE lead_id = ?', (lead_id,))
+        row = cursor.fetchone()
+        if not row:
+            return []
+        firma = _desempaquetar(row[0])
+        candidatos = _candidatos_por_buckets(cursor, buckets_lsh(firma))
+        candidatos.discard(lead_id)
+        return _rankear_candidatos(cursor, firma, candidatos, umbral, limit)
+    finally:
+        conn.close()
+
+
+def buscar_similares_texto(nombre: str, titular: str = '', limit: int = 10,
+                           umbral: float = UMBRAL_SIMILITUD) -> List[Dict]:
+    """Busca leads parecidos a un nombre/titular arbitrario."""
+    firma = calcular_firma(nombre, titular)
+    if firma is None:
+        return []
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        candidatos = _candidatos_por_buckets(cursor, buckets_lsh(firma))
+        return _rankear_candidatos(cursor, firma, candidatos, umbral, limit)
+    finally:
+        conn.close()
+
+
+def vincular_fuentes(umbral: float = UMBRAL_SIMILITUD) -> Dict[str, int]:
+    """
+    Job de vinculación entre fuentes: indexa los leads pendientes y guarda en
+    lead_links los pares de fuentes distintas que comparten algún bucket LSH
+    y superan el umbral de similitud estimada.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        indexados = indexar_pendientes(conn)
+
+        cursor.execute('''
+            WITH buckets AS (
+                SELECT banda, bucket FROM lead_lsh
+                GROUP BY banda, bucket
+                HAVING COUNT(*) <= ? AND COUNT(DISTINCT source) > 1
+            )
+            SELECT DISTINCT x.lead_id, y.lead_id
+            FROM buckets b
+            JOIN lead_lsh x ON x.banda = b.banda AND x.bucket = b.bucket
+            JOIN lead_lsh y ON y.banda = b.banda AND y.bucket = b.bucket
+                AND x.lead_id < y.lead_id AND x.source != y.source
+        ''', (MAX_LEADS_POR_BUCKET,))
+        pares = cursor.fetchall()
+
+        firmas = {}
+        ids = list({lead_id for par in pares for lead_id in par})
+        for i in range(0, len(ids), 500):
+            lote = ids[i:i + 500]
+            placeholders = ','.join('?' * len(lote))
+            cursor.execute(f'SELECT lead_id, firma FROM lead_minhash WHERE lead_id IN ({placeholders})', lote)
+            for lead_id, blob in cursor.fetchall():
+                firmas[lead_id] = _desempaquetar(blob)
+
+        vinculos = []
+        for a, b in pares:
+            similitud = similitud_estimada(firmas[a], firmas[b])
+            if similitud >= umbral:
+                vinculos.append((a, b, similitud))
+
+        cursor.executemany('''
+            INSERT INTO lead_links (lead_id_a, lead_id_b, similitud) VALUES (?, ?, ?)
+            ON CONFLICT(lead_id_a, lead_id_b) DO UPDATE SET similitud = excluded.similitud
+        ''', vinculos)
+        conn.commit()
+
+        return {
+            'leads_indexados': indexados,
+            'pares_candidatos': len(pares),
+            'vinculos': len(vinculos),
+        }
+    finally:
+        conn.close()
+
+
+def get_vinculos(limit: int = 100) -> List[Dict]:
+    """Obtiene los vínculos entre fuentes detectados, ordenados por similitud."""
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT k.lead_id_a, a.source AS source_a, a.project_name AS project_name_a,
+               k.lead_id_b, b.source AS source_b, b.project_name AS project_name_b,
+               k.similitud, k.detected_at
+        FROM lead_links k
+        JOIN leads a ON a.id = k.lead_id_a
+        JOIN leads b ON b.id = k.lead_id_b
+        ORDER BY k.similitud DESC
+        LIMIT ?
+    ''', (limit,))
+    rows = cursor.fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+
+if __name__ == '__main__':
+    resultado = vincular_fuentes()
+    print(f"🔗 Vinculación completada: {resultado['leads_indexados']} leads indexados, "
+          f"{resultado['pares_candidatos']} candidatos, {resultado['vinculos']} vínculos")
@@ -0,0 +1,160 @@
+"""
+Servidor SMTP local de depuración, para probar el envío de emails (backend/correo.py)
+sin conexión: guarda los mensajes recibidos en memoria y los muestra en consola.
+
+- Acepta EHLO/HELO, AUTH PLAIN/LOGIN (cualquier credencial), MAIL, RCPT, DATA,
+  RSET, NOOP y QUIT. No ofrece STARTTLS: usar SMTP_STARTTLS=false.
+- Simula lo que hace un servidor real: cierra conexiones inactivas (--inactividad),
+  rechaza destinatarios con 550 (--rechazar, subcadena de la dirección) y responde
+  errores transitorios 451 al DATA (--errores).
+- Cuenta conexiones y sesiones autenticadas (servidor.conexiones, servidor.logins)
+  para verificar la reutilización del pool.
+
+Uso (desde la raíz del proyecto):
+    python -m backend.smtp_stub_server --puerto 8025 --inactividad 30
+    SMTP_HOST=127.0.0.1 SMTP_PORT=8025 SMTP_STARTTLS=false python -m backend.correo --procesar
+"""
+
+import argparse
+import random
+import socket
+import socketserver
+import threading
+from email import message_from_bytes, policy
+from typing import Tuple
+
+TAMANO_MAXIMO = 10 * 1024 * 1024
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    inactividad = 0.0
+    errores = 0.0
+    rechazar = ''
+    mostrar = False
+
+    def _responder(self, linea: str):
+        self.wfile.write(linea.encode('ascii') + b'\r\n')
+
+    def _leer_linea(self) -> str:
+        return self.rfile.readline(65536).decode('utf-8', 'replace').rstrip('\r\n')
+
+    def handle(self):
+        servidor = self.server
+        if self.inactividad:
+            self.connection.settimeout(self.inactividad)
+        with servidor.lock:
+            servidor.conexiones += 1
+        self._responder('220 stub ESMTP listo')
+        remitente, destinatarios = None, []
+        try:
+            while True:
+                crudo = self.rfile.readline(65536)
+                if not crudo:
+                    return  # el cliente cerró la conexión
+                comando, _, argumento = crudo.decode('utf-8', 'replace').rstrip('\r\n').partition(' ')
+                comando = comando.upper()
+                if comando == 'EHLO':
+                    self._responder('250-stub saluda')
+                    self._responder('250-AUTH PLAIN LOGIN')
+                    self._responder('250-8BITMIME')
+                    self._responder(f'250 SIZE {TAMANO_MAXIMO}')
+                elif comando == 'HELO':
+                    self._responder('250 stub saluda')
+                elif comando == 'AUTH':
+                    if argumento.upper().startswith('LOGIN'):
+                        self._responder('334 VXNlcm5hbWU6')
+                        self._leer_linea()
+                        self._responder('334 UGFzc3dvcmQ6')
+                        self._leer_linea()
+                    with servidor.lock:
+                        servidor.logins += 1
+                    self._responder('235 2.7.0 Autenticado')
+                elif comando == 'MAIL':
+                    remitente, destinatarios = argumento.partition(':')[2].strip(' <>'), []
+                    self._responder('250 2.1.0 OK')
+                elif comando == 'RCPT':
+                    destinatario = argumento.partition(':')[2].strip(' <>')
+                    if self.rechazar and self.rechazar in destinatario:
+                        self._responder('550 5.1.1 Destinatario inexistente')
+                    else:
+                        destinatarios.append(destinatario)
+                        self._responder('250 2.1.5 OK')
+                elif comando == 'DATA':
+                    if not destinatarios:
+                        self._responder('503 5.5.1 Falta RCPT')
+                        continue
+                    self._responder('354 Terminar con <CRLF>.<CRLF>')
+                    lineas = []
+                    while True:
+                        linea_datos = self.rfile.readline(TAMANO_MAXIMO)
+                        if linea_datos in (b'.\r\n', b'.\n', b''):
+                            break
+                        lineas.append(linea_datos[1:] if linea_datos.startswith(b'..') else linea_datos)
+                    with servidor.lock:
+                        fallar = servidor.azar.random() < self.errores
+                    if fallar:
+                        self._responder('451 4.3.0 Error temporal, reintentar')
+                    else:
+                        datos = b''.join(lineas)
+                        with servidor.lock:
+                            servidor.mensajes.append((remitente, list(destinatarios), datos))
+                        if self.mostrar:
+                            mensaje = message_from_bytes(datos, policy=policy.default)
+                            print(f"📨 {remitente} -> {', '.join(destinatarios)}: {mensaje['Subject']} "
+                                  f"({len(datos):,} bytes)")
+                        self._responder('250 2.0.0 Recibido')
+                    remitente, destinatarios = None, []
+                elif comando == 'RSET':
+                    remitente, destinatarios = None, []
+                    self._responder('250 2.0.0 OK')
+                elif comando == 'NOOP':
+                    self._responder('250 2.0.0 OK')
+                elif comando == 'QUIT':
+                    self._responder('221 2.0.0 Adios')
+                    return
+                else:
+                    self._responder('502 5.5.2 Comando no implementado')
+        except (socket.timeout, ConnectionError):
+            return  # conexión inactiva cerrada, como hace un servidor real
+
+
+class _Servidor(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def iniciar_servidor(puerto: int = 0, inactividad: float = 0.0, errores: float = 0.0, rechazar: str = '',
+                     mostrar: bool = False, semilla: int = 0) -> Tuple[_Servidor, int]:
+    """
+    Inicia el servidor en un thread (puerto 0 = puerto libre aleatorio).
+    Retorna (servidor, puerto); los mensajes quedan en servidor.mensajes como
+    (remitente, destinatarios, bytes). Detener con servidor.shutdown().
+    """
+    handler = type('SMTPStubHandler', (_Handler,), {
+        'inactividad': inactividad, 'errores': errores, 'rechazar': rechazar, 'mostrar': mostrar,
+    })
+    servidor = _Servidor(('127.0.0.1', puerto), handler)
+    servidor.lock = threading.Lock()
+    servidor.azar = random.Random(semilla)
+    servidor.mensajes = []
+    servidor.conexiones = 0
+    servidor.logins = 0
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, servidor.server_address[1]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor SMTP local de depuración')
+    parser.add_argument('--puerto', type=int, default=8025)
+    parser.add_argument('--inactividad', type=float, default=0.0,
+                        help='Segundos sin comandos tras los que cierra la conexión (0 = nunca)')
+    parser.add_argument('--errores', type=float, default=0.0, help='Fracción de DATA con 451 (0.1 = 10%%)')
+    parser.add_argument('--rechazar', default='', help='Rechaza con 550 los destinatarios que contengan este texto')
+    args = parser.parse_args()
+
+    servidor, puerto = iniciar_servidor(args.puerto, args.inactividad, args.errores, args.rechazar, mostrar=True)
+    print(f"🧪 Servidor SMTP local en 127.0.0.1:{puerto} (Ctrl+C para detener)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
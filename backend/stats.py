@@ -0,0 +1,159 @@
+"""
+Estadísticas pre-agregadas para el dashboard.
+La tabla lead_stats guarda conteos y sumas de inversión por industria, región,
+estado, fuente y mes. Se mantiene incrementalmente con triggers sobre leads,
+así /stats no depende del tamaño de la tabla.
+"""
+
+import sqlite3
+from typing import Dict, List
+
+from backend.config import DB_PATH
+
+
+def _campo(fila: str, campo: str) -> str:
+    # Campos calientes almacenados como columnas tipadas (ver backend/storage.py)
+    return f"{fila}.{campo}"
+
+
+def _dimensiones(fila: str) -> List[tuple]:
+    """Expresiones SQL (dimensión, valor) para una fila de leads (new/old/alias)."""
+    mes = f'''(CASE
+        WHEN {fila}.date LIKE '__/__/____%' THEN substr({fila}.date, 7, 4) || '-' || substr({fila}.date, 4, 2)
+        WHEN {fila}.date LIKE '____-__-__%' THEN substr({fila}.date, 1, 7)
+        ELSE 'N/A' END)'''
+    return [
+        ("'total'", "'all'"),
+        ("'source'", f"COALESCE({fila}.source, 'N/A')"),
+        ("'industria'", f"COALESCE(NULLIF({_campo(fila, 'industria')}, ''), 'N/A')"),
+        ("'region'", f"COALESCE(NULLIF({_campo(fila, 'region')}, ''), 'N/A')"),
+        ("'estado'", f"COALESCE(NULLIF({_campo(fila, 'estado')}, ''), 'N/A')"),
+        ("'mes'", mes),
+    ]
+
+
+def _inversion(fila: str) -> str:
+    return f"COALESCE({_campo(fila, 'inversion_millones')}, 0)"
+
+
+def _tiene_inversion(fila: str) -> str:
+    return f"(CASE WHEN {_campo(fila, 'inversion_millones')} IS NULL THEN 0 ELSE 1 END)"
+
+
+def _sentencia_delta(fila: str, signo: int) -> str:
+    """INSERT ... ON CONFLICT que suma (signo=1) o resta (signo=-1) una fila a los agregados."""
+    valores = ',\n'.join(
+        f"({dim}, {valor}, {signo}, {signo} * {_inversion(fila)}, {signo} * {_tiene_inversion(fila)})"
+        for dim, valor in _dimensiones(fila)
+    )
+    return f'''
+        INSERT INTO lead_stats (dimension, valor, total, inversion_total, con_inversion)
+        VALUES {valores}
+        ON CONFLICT(dimension, valor) DO UPDATE SET
+            total = total + excluded.total,
+            inversion_total = inversion_total + excluded.inversion_total,
+            con_inversion = con_inversion + excluded.con_inversion;
+    '''
+
+
+def crear_tablas_stats(cursor):
+    """Crea lead_stats y los triggers que la mantienen; la primera vez la recalcula."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'lead_stats'")
+    existia = cursor.fetchone() is not None
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS lead_stats (
+            dimension TEXT NOT NULL,
+            valor TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            inversion_total REAL NOT NULL DEFAULT 0,
+            con_inversion INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dimension, valor)
+        )
+    ''')
+
+    # Los triggers se recrean siempre para que reflejen la definición actual
+    for trigger in ('leads_stats_ai', 'leads_stats_ad', 'leads_stats_au'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+
+    limpiar = 'DELETE FROM lead_stats WHERE total <= 0;'
+    cursor.execute(f'''
+        CREATE TRIGGER leads_stats_ai AFTER INSERT ON leads BEGIN
+            {_sentencia_delta('new', 1)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER leads_stats_ad AFTER DELETE ON leads BEGIN
+            {_sentencia_delta('old', -1)}
+            {limpiar}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER leads_stats_au AFTER UPDATE ON leads BEGIN
+            {_sentencia_delta('old', -1)}
+            {_sentencia_delta('new', 1)}
+            {limpiar}
+        END
+    ''')
+
+    if not existia:
+        recalcular_stats(cursor)
+
+
+def recalcular_stats(cursor):
+    """Recalcula lead_stats desde cero a partir de la tabla leads."""
+    cursor.execute('DELETE FROM lead_stats')
+    selects = '\nUNION ALL\n'.join(
+        f"SELECT {dim} AS dimension, {valor} AS valor, {_inversion('l')} AS inversion, "
+        f"{_tiene_inversion('l')} AS tiene_inversion FROM leads l"
+        for dim, valor in _dimensiones('l')
+    )
+    cursor.execute(f'''
+        INSERT INTO lead_stats (dimension, valor, total, inversion_total, con_inversion)
+        SELECT dimension, valor, COUNT(*), SUM(inversion), SUM(tiene_inversion)
+        FROM ({selects})
+        GROUP BY dimension, valor
+    ''')
+
+
+def get_stats() -> Dict:
+    """
+    Obtiene las estadísticas agregadas agrupadas por dimensión.
+    Retorna {total, inversion_total, por_source, por_industria, por_region, por_estado, por_mes}.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT dimension, valor, total, inversion_total, con_inversion
+        FROM lead_stats
+        ORDER BY dimension, total DESC
+    ''')
+    rows = cursor.fetchall()
+    conn.close()
+
+    stats = {
+        'total': 0,
+        'inversion_total': 0.0,
+        'por_source': [],
+        'por_industria': [],
+        'por_region': [],
+        'por_estado': [],
+        'por_mes': [],
+    }
+    for row in rows:
+        if row['dimension'] == 'total':
+            stats['total'] = row['total']
+            stats['inversion_total'] = round(row['inversion_total'], 2)
+            continue
+        clave = f"por_{row['dimension']}"
+        if clave in stats:
+            stats[clave].append({
+                'valor': row['valor'],
+                'total': row['total'],
+                'inversion_total': round(row['inversion_total'], 2),
+                'con_inversion': row['con_inversion'],
+            })
+
+    stats['por_mes'].sort(key=lambda r: r['valor'])
+    return stats
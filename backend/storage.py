@@ -0,0 +1,355 @@
+"""
+Formato compacto de almacenamiento de raw_data.
+Los campos calientes (los que usan las vistas de lista, filtros y scoring) van en
+columnas tipadas de leads; el resto se guarda como blob msgpack (o JSON si msgpack
+no está instalado) comprimido con zlib en raw_extra. La descripción completa
+vive comprimida en lead_descripciones y se carga solo cuando se pide.
+Los campos derivables (nombre = project_name, fecha_presentacion = date,
+colores de industria) no se almacenan: se reconstruyen al leer.
+
+Migración manual de una BD existente (desde la raíz del proyecto):
+    python -m backend.storage
+"""
+
+import json
+import os
+import sqlite3
+import zlib
+from collections.abc import Mapping
+from typing import Any, Dict, Optional, Tuple
+
+from backend.category_rules import get_categoria_color
+from backend.config import DB_PATH
+
+try:
+    import msgpack
+except ImportError:  # msgpack es opcional (requirements-optional.txt)
+    msgpack = None
+
+# Campos de raw_data almacenados como columnas tipadas de leads
+CAMPOS_HOT = {
+    'codigo_seia': 'TEXT',
+    'titular': 'TEXT',
+    'tipo': 'TEXT',
+    'region': 'TEXT',
+    'comuna': 'TEXT',
+    'estado': 'TEXT',
+    'industria': 'TEXT',
+    'categorias_secundarias': 'TEXT',
+    'inversion_millones': 'REAL',
+    'fecha_ingreso': 'TEXT',
+    'razon_ingreso': 'TEXT',
+    'link_ficha': 'TEXT',
+}
+
+# Campos calientes que no son escalares y se guardan como JSON
+CAMPOS_JSON = {'categorias_secundarias'}
+
+# Columnas de leads necesarias para reconstruir raw_data
+COLUMNAS_RAW = list(CAMPOS_HOT) + ['raw_extra']
+COLUMNAS_RAW_SQL = ', '.join(COLUMNAS_RAW)
+
+# Campos derivables: (project_name, date, industria) -> valor
+_DERIVADOS = {
+    'nombre': lambda nombre, fecha, industria: nombre,
+    'fecha_presentacion': lambda nombre, fecha, industria: fecha,
+    'industria_color': lambda nombre, fecha, industria: get_categoria_color(industria)[0],
+    'industria_color_name': lambda nombre, fecha, industria: get_categoria_color(industria)[1],
+}
+
+_CLAVE_DERIVADOS = '__derivados__'
+
+# Primer byte del blob: formato de serialización
+_FORMATO_JSON = b'\x01'
+_FORMATO_MSGPACK = b'\x02'
+
+_ESCALARES = (str, int, float, type(None))
+
+
+def comprimir(datos: Dict[str, Any]) -> bytes:
+    """Serializa (msgpack o JSON) y comprime con zlib un dict de campos fríos."""
+    if msgpack is not None:
+        return _FORMATO_MSGPACK + zlib.compress(msgpack.packb(datos, use_bin_type=True), 6)
+    payload = json.dumps(datos, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return _FORMATO_JSON + zlib.compress(payload, 6)
+
+
+def descomprimir(blob: Optional[bytes]) -> Dict[str, Any]:
+    """Inverso de comprimir()."""
+    if not blob:
+        return {}
+    formato, payload = blob[:1], zlib.decompress(blob[1:])
+    if formato == _FORMATO_MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("raw_extra fue guardado con msgpack, pero msgpack no está instalado")
+        return msgpack.unpackb(payload, raw=False)
+    return json.loads(payload)
+
+
+def comprimir_texto(texto: str) -> bytes:
+    """Comprime un texto largo (descripción completa) con zlib."""
+    return zlib.compress(texto.encode('utf-8'), 6)
+
+
+def descomprimir_texto(blob: Optional[bytes]) -> Optional[str]:
+    """Inverso de comprimir_texto()."""
+    if blob is None:
+        return None
+    return zlib.decompress(blob).decode('utf-8')
+
+
+def codificar_lead(lead: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Separa el raw_data de un lead en columnas calientes + blob frío.
+    Retorna ({columna: valor, ..., 'raw_extra': bytes}, descripcion_completa).
+    """
+    raw = dict(lead.get('raw_data') or {})
+    descripcion = raw.pop('descripcion_completa', None)
+
+    columnas = {}
+    for campo in CAMPOS_HOT:
+        valor = raw.get(campo)
+        if campo in CAMPOS_JSON and campo in raw:
+            columnas[campo] = json.dumps(raw.pop(campo), ensure_ascii=False)
+        elif campo in raw and isinstance(valor, _ESCALARES):
+            columnas[campo] = raw.pop(campo)
+        else:
+            columnas[campo] = None
+
+    nombre = lead.get('project_name', '')
+    fecha = lead.get('date', '')
+    derivados = [
+        campo for campo, derivar in _DERIVADOS.items()
+        if campo in raw and raw[campo] == derivar(nombre, fecha, columnas['industria'])
+    ]
+    for campo in derivados:
+        raw.pop(campo)
+    if derivados:
+        raw[_CLAVE_DERIVADOS] = derivados
+
+    columnas['raw_extra'] = comprimir(raw) if raw else None
+    return columnas, descripcion
+
+
+def campos_frios(row: Mapping, descripcion: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Campos de raw_data que no viven en columnas calientes: blob raw_extra,
+    derivados y descripción completa. La fila debe incluir project_name, date,
+    industria y raw_extra.
+    """
+    raw = descomprimir(row['raw_extra'])
+    for campo in raw.pop(_CLAVE_DERIVADOS, []):
+        raw[campo] = _DERIVADOS[campo](row['project_name'], row['date'], row['industria'])
+    if descripcion:
+        raw['descripcion_completa'] = descripcion
+    return raw
+
+
+def reconstruir_raw_data(row: Mapping, descripcion: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Reconstruye el raw_data original a partir de una fila de leads
+    (debe incluir project_name, date y COLUMNAS_RAW).
+    """
+    raw = campos_frios(row, descripcion)
+    for campo in CAMPOS_HOT:
+        valor = row[campo]
+        if valor is not None:
+            raw[campo] = json.loads(valor) if campo in CAMPOS_JSON else valor
+    return raw
+
+
+class RawDataPerezoso(Mapping):
+    """
+    raw_data de una fila de leads que se decodifica solo si se usa: los campos
+    calientes se leen directo de las columnas; el blob raw_extra, los derivados y
+    la descripción completa (blob comprimido) se descomprimen la primera vez que
+    se pide otro campo o se recorre el mapping. dict(raw) da un dict normal.
+    """
+
+    __slots__ = ('_row', '_descripcion', '_datos')
+
+    def __init__(self, row: Mapping, descripcion: Optional[bytes] = None):
+        self._row = row
+        self._descripcion = descripcion
+        self._datos: Optional[Dict[str, Any]] = None
+
+    def _completo(self) -> Dict[str, Any]:
+        if self._datos is None:
+            self._datos = reconstruir_raw_data(self._row, descomprimir_texto(self._descripcion))
+            self._row = self._descripcion = None
+        return self._datos
+
+    def __getitem__(self, campo: str) -> Any:
+        # Un campo caliente en NULL puede estar igual en el blob (valor no escalar)
+        if self._datos is None and campo in CAMPOS_HOT:
+            valor = self._row[campo]
+            if valor is not None:
+                return json.loads(valor) if campo in CAMPOS_JSON else valor
+        return self._completo()[campo]
+
+    def get(self, campo: str, default: Any = None) -> Any:
+        try:
+            return self[campo]
+        except KeyError:
+            return default
+
+    def __contains__(self, campo: object) -> bool:
+        if self._datos is None and campo in CAMPOS_HOT and self._row[campo] is not None:
+            return True
+        return campo in self._completo()
+
+    def __iter__(self):
+        return iter(self._completo())
+
+    def __len__(self) -> int:
+        return len(self._completo())
+
+    def __repr__(self) -> str:
+        return f'RawDataPerezoso({self._completo()!r})'
+
+
+def sql_campos_calientes_json(alias: str = 'l') -> str:
+    """
+    Expresión SQL que arma en SQLite el objeto JSON con los campos calientes
+    no nulos (json_patch sobre {} descarta los null), sin pasar por Python.
+    """
+    pares = ', '.join(
+        f"'{campo}', json({alias}.{campo})" if campo in CAMPOS_JSON else f"'{campo}', {alias}.{campo}"
+        for campo in CAMPOS_HOT
+    )
+    return f"json_patch('{{}}', json_object({pares}))"
+
+
+def crear_tablas_storage(cursor):
+    """Agrega las columnas calientes a leads y crea la tabla de descripciones."""
+    cursor.execute('PRAGMA table_info(leads)')
+    existentes = {row[1] for row in cursor.fetchall()}
+    for columna, tipo in list(CAMPOS_HOT.items()) + [('raw_extra', 'BLOB')]:
+        if columna not in existentes:
+            cursor.execute(f'ALTER TABLE leads ADD COLUMN {columna} {tipo}')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS lead_descripciones (
+            lead_id INTEGER PRIMARY KEY,
+            descripcion BLOB NOT NULL
+        )
+    ''')
+
+    # Las descripciones se eliminan junto con su lead
+    cursor.execute('DROP TRIGGER IF EXISTS leads_descripciones_ad')
+    cursor.execute('''
+        CREATE TRIGGER leads_descripciones_ad AFTER DELETE ON leads BEGIN
+            DELETE FROM lead_descripciones WHERE lead_id = old.id;
+        END
+    ''')
+
+
+def guardar_descripcion(cursor, lead_id: int, descripcion: Optional[str]):
+    """
+    Guarda (o reemplaza) la descripción completa de un lead, comprimida.
+    Como SQLite no puede descomprimirla, el índice FTS se actualiza desde aquí.
+    Ignora descripciones vacías.
+    """
+    if descripcion:
+        cursor.execute('''
+            INSERT INTO lead_descripciones (lead_id, descripcion) VALUES (?, ?)
+            ON CONFLICT(lead_id) DO UPDATE SET descripcion = excluded.descripcion
+        ''', (lead_id, comprimir_texto(descripcion)))
+        cursor.execute('''
+            UPDATE leads_fts SET descripcion_completa = ? WHERE rowid = ?
+        ''', (descripcion, lead_id))
+
+
+def migrar_filas_legacy(cursor, batch_size: int = 1000) -> int:
+    """
+    Convierte las filas con raw_data JSON al formato compacto
+    (columnas calientes + raw_extra + lead_descripciones) y deja raw_data en NULL.
+    Retorna la cantidad de filas migradas.
+    """
+    migradas = 0
+    asignaciones = ', '.join(f'{c} = ?' for c in COLUMNAS_RAW)
+    while True:
+        cursor.execute('''
+            SELECT id, project_name, date, raw_data FROM leads
+            WHERE raw_data IS NOT NULL
+            LIMIT ?
+        ''', (batch_size,))
+        filas = cursor.fetchall()
+        if not filas:
+            break
+
+        for lead_id, project_name, date, raw_data in filas:
+            try:
+                data = json.loads(raw_data) if raw_data else {}
+            except ValueError:
+                data = {}
+            columnas, descripcion = codificar_lead({
+                'project_name': project_name, 'date': date, 'raw_data': data
+            })
+            cursor.execute(f'''
+                UPDATE leads SET {asignaciones}, raw_data = NULL WHERE id = ?
+            ''', [columnas[c] for c in COLUMNAS_RAW] + [lead_id])
+            guardar_descripcion(cursor, lead_id, descripcion)
+        migradas += len(filas)
+    return migradas
+
+
+def _bytes_datos_leads(db_path: str) -> Optional[int]:
+    """
+    Bytes ocupados por los datos de leads (tabla + descripciones), vía dbstat.
+    Retorna None si SQLite no fue compilado con dbstat.
+    """
+    if not os.path.exists(db_path):
+        return 0
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.execute('''
+            SELECT COALESCE(SUM(pgsize), 0) FROM dbstat
+            WHERE name IN ('leads', 'lead_descripciones')
+        ''')
+        return cursor.fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+
+
+def migrar_storage(vacuum: bool = True) -> Dict[str, Optional[int]]:
+    """
+    Job de migración al formato compacto: convierte las filas pendientes,
+    ejecuta VACUUM y reporta el tamaño antes/después (archivo completo y
+    datos de leads, este último solo si SQLite incluye dbstat).
+    """
+    from backend.database import init_db
+
+    tamano_antes = os.path.getsize(DB_PATH) if os.path.exists(DB_PATH) else 0
+    datos_antes = _bytes_datos_leads(DB_PATH)
+
+    # init_db agrega las columnas y ya migra las filas pendientes
+    migradas = init_db()['filas_migradas']
+
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        migradas += migrar_filas_legacy(conn.cursor())
+        conn.commit()
+        if vacuum:
+            conn.execute('VACUUM')
+    finally:
+        conn.close()
+
+    return {
+        'filas_migradas': migradas,
+        'bytes_antes': tamano_antes,
+        'bytes_despues': os.path.getsize(DB_PATH),
+        'bytes_leads_antes': datos_antes,
+        'bytes_leads_despues': _bytes_datos_leads(DB_PATH),
+    }
+
+
+if __name__ == '__main__':
+    resultado = migrar_storage()
+    print(f"📦 Migración completada: {resultado['filas_migradas']} filas convertidas")
+    print(f"   Tamaño BD: {resultado['bytes_antes']:,} → {resultado['bytes_despues']:,} bytes")
+    if resultado['bytes_leads_antes'] is not None:
+        print(f"   Datos de leads: {resultado['bytes_leads_antes']:,} → "
+              f"{resultado['bytes_leads_despues']:,} bytes")
@@ -0,0 +1,240 @@
+"""
+Vocabulario normalizado de estados SEIA e industrias.
+
+Los textos libres ("En Calificación", " en calificación") se canonizan a una clave
+(minúsculas, sin espacios extremos ni repetidos) y cada clave tiene un id en las
+tablas estados / industrias, con banderas precalculadas a partir de
+backend/scoring_rules.py: is_valido, is_excluido, is_aprobado y score del estado;
+is_estrategica y monto mínimo de la industria.
+
+leads guarda estado_id e industria_id (y estado_changes, estado_anterior_id y
+estado_nuevo_id) junto al texto original, así los filtros comparan enteros y
+banderas en SQL; el scoring usa info_estado / info_industria, memoizadas por texto.
+"""
+
+import functools
+import sqlite3
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from backend.config import DB_PATH
+from backend.scoring_rules import (
+    ESTADOS_VALIDOS, ESTADOS_EXCLUIDOS, SCORE_ESTADO,
+    INDUSTRIAS_ESTRATEGICAS, MONTO_MINIMO_USD_MM, MONTO_MINIMO_ESTRATEGICAS_USD_MM
+)
+
+# Texto de la explicación del score según la etapa (el primero que aparece en el estado)
+_ETAPAS = [
+    ('calificación', 'etapa temprana'),
+    ('admitido', 'en tramitación'),
+    ('aprobado', 'aprobado'),
+]
+
+
+class InfoEstado(NamedTuple):
+    clave: str
+    is_valido: bool
+    is_excluido: bool
+    is_aprobado: bool
+    score: int
+    etapa: str
+
+    @property
+    def is_elegible(self) -> bool:
+        """Válido y no excluido: pasa el filtro de estado del scoring."""
+        return self.is_valido and not self.is_excluido
+
+
+class InfoIndustria(NamedTuple):
+    clave: str
+    is_estrategica: bool
+    monto_minimo: float
+
+
+@functools.lru_cache(maxsize=4096)
+def clave(texto: Optional[str]) -> str:
+    """Clave canónica de un estado o industria: minúsculas y espacios normalizados."""
+    if not texto:
+        return ''
+    return ' '.join(str(texto).split()).lower()
+
+
+def _contiene(clave_texto: str, reglas) -> bool:
+    return any(clave(regla) in clave_texto for regla in reglas)
+
+
+@functools.lru_cache(maxsize=1024)
+def info_estado(texto: Optional[str]) -> InfoEstado:
+    """Banderas del estado (las reglas de scoring_rules se comparan por subcadena)."""
+    clave_estado = clave(texto)
+    score = next((puntos for estado, puntos in SCORE_ESTADO.items() if clave(estado) in clave_estado), 0)
+    etapa = next((texto_etapa for buscado, texto_etapa in _ETAPAS if buscado in clave_estado), '')
+    return InfoEstado(
+        clave=clave_estado,
+        is_valido=bool(clave_estado) and _contiene(clave_estado, ESTADOS_VALIDOS),
+        is_excluido=bool(clave_estado) and _contiene(clave_estado, ESTADOS_EXCLUIDOS),
+        is_aprobado='aprobado' in clave_estado,
+        score=score,
+        etapa=etapa,
+    )
+
+
+_ESTRATEGICAS = {clave(industria) for industria in INDUSTRIAS_ESTRATEGICAS}
+
+
+@functools.lru_cache(maxsize=1024)
+def info_industria(texto: Optional[str]) -> InfoIndustria:
+    """Si la industria es estratégica y el monto mínimo de inversión que le corresponde."""
+    clave_industria = clave(texto)
+    estrategica = clave_industria in _ESTRATEGICAS
+    return InfoIndustria(
+        clave=clave_industria,
+        is_estrategica=estrategica,
+        monto_minimo=MONTO_MINIMO_ESTRATEGICAS_USD_MM if estrategica else MONTO_MINIMO_USD_MM,
+    )
+
+
+# --- Tablas ---
+
+def _banderas_estado(nombre: str) -> tuple:
+    info = info_estado(nombre)
+    return info.is_valido, info.is_excluido, info.is_aprobado, info.score
+
+
+def _banderas_industria(nombre: str) -> tuple:
+    info = info_industria(nombre)
+    return info.is_estrategica, info.monto_minimo
+
+
+# tabla -> (función de banderas, columnas de banderas)
+_TABLAS = {
+    'estados': (_banderas_estado, ('is_valido', 'is_excluido', 'is_aprobado', 'score')),
+    'industrias': (_banderas_industria, ('is_estrategica', 'monto_minimo')),
+}
+
+# (tabla, clave) -> id, solo con filas ya confirmadas en la BD
+_IDS: Dict[Tuple[str, str], int] = {}
+_lock = threading.Lock()
+
+
+def _columnas(cursor, tabla: str) -> set:
+    cursor.execute(f'PRAGMA table_info({tabla})')
+    return {row[1] for row in cursor.fetchall()}
+
+
+def crear_tablas_vocabulario(cursor):
+    """
+    Crea estados e industrias, las columnas de id en leads y estado_changes, y
+    recalcula las banderas (las reglas de scoring pueden haber cambiado).
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS estados (
+            id INTEGER PRIMARY KEY,
+            clave TEXT NOT NULL UNIQUE,
+            nombre TEXT NOT NULL,
+            is_valido INTEGER NOT NULL DEFAULT 0,
+            is_excluido INTEGER NOT NULL DEFAULT 0,
+            is_aprobado INTEGER NOT NULL DEFAULT 0,
+            score INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS industrias (
+            id INTEGER PRIMARY KEY,
+            clave TEXT NOT NULL UNIQUE,
+            nombre TEXT NOT NULL,
+            is_estrategica INTEGER NOT NULL DEFAULT 0,
+            monto_minimo REAL
+        )
+    ''')
+
+    nuevas = {
+        'leads': [('estado_id', 'estados'), ('industria_id', 'industrias')],
+        'estado_changes': [('estado_anterior_id', 'estados'), ('estado_nuevo_id', 'estados')],
+    }
+    for tabla, columnas in nuevas.items():
+        existentes = _columnas(cursor, tabla)
+        for columna, referencia in columnas:
+            if columna not in existentes:
+                cursor.execute(f'ALTER TABLE {tabla} ADD COLUMN {columna} INTEGER REFERENCES {referencia}(id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_leads_estado_id ON leads(estado_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_leads_industria_id ON leads(industria_id)')
+
+    for tabla, (banderas, columnas) in _TABLAS.items():
+        cursor.execute(f'SELECT id, nombre FROM {tabla}')
+        asignaciones = ', '.join(f'{c} = ?' for c in columnas)
+        cursor.executemany(f'UPDATE {tabla} SET {asignaciones} WHERE id = ?',
+                           [(*banderas(nombre), id_) for id_, nombre in cursor.fetchall()])
+
+    with _lock:
+        _IDS.clear()
+
+
+def _obtener_id(cursor, tabla: str, texto: Optional[str]) -> Optional[int]:
+    """Id de la clave del texto en la tabla, creándola si no existe (None si el texto está vacío)."""
+    clave_texto = clave(texto)
+    if not clave_texto:
+        return None
+    banderas, columnas = _TABLAS[tabla]
+    cursor.execute(f'''
+        INSERT INTO {tabla} (clave, nombre, {', '.join(columnas)})
+        VALUES (?, ?, {', '.join('?' * len(columnas))})
+        ON CONFLICT(clave) DO NOTHING
+    ''', (clave_texto, ' '.join(str(texto).split()), *banderas(texto)))
+    cursor.execute(f'SELECT id FROM {tabla} WHERE clave = ?', (clave_texto,))
+    return cursor.fetchone()[0]
+
+
+def _id(tabla: str, texto: Optional[str]) -> Optional[int]:
+    clave_texto = clave(texto)
+    if not clave_texto:
+        return None
+    id_ = _IDS.get((tabla, clave_texto))
+    if id_ is not None:
+        return id_
+    # En una conexión propia y confirmada de inmediato: el id sigue valiendo aunque
+    # la transacción de quien lo pide se revierta. Llamar antes de empezar a escribir.
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        id_ = _obtener_id(conn.cursor(), tabla, texto)
+        conn.commit()
+    finally:
+        conn.close()
+    with _lock:
+        _IDS[(tabla, clave_texto)] = id_
+    return id_
+
+
+def id_estado(texto: Optional[str]) -> Optional[int]:
+    """Id del estado (memoizado; lo crea con sus banderas si es nuevo)."""
+    return _id('estados', texto)
+
+
+def id_industria(texto: Optional[str]) -> Optional[int]:
+    """Id de la industria (memoizado; la crea con sus banderas si es nueva)."""
+    return _id('industrias', texto)
+
+
+def completar_ids(cursor) -> int:
+    """
+    Asigna estado_id / industria_id a las filas que no lo tienen (BD anteriores al
+    vocabulario o escritas por otro camino). Retorna la cantidad de filas actualizadas.
+    """
+    actualizadas = 0
+    for tabla_leads, columna_texto, columna_id, tabla in [
+        ('leads', 'estado', 'estado_id', 'estados'),
+        ('leads', 'industria', 'industria_id', 'industrias'),
+        ('estado_changes', 'estado_anterior', 'estado_anterior_id', 'estados'),
+        ('estado_changes', 'estado_nuevo', 'estado_nuevo_id', 'estados'),
+    ]:
+        cursor.execute(f'''
+            SELECT DISTINCT {columna_texto} FROM {tabla_leads}
+            WHERE {columna_id} IS NULL AND {columna_texto} IS NOT NULL AND TRIM({columna_texto}) != ''
+        ''')
+        for (texto,) in cursor.fetchall():
+            id_ = _obtener_id(cursor, tabla, texto)
+            cursor.execute(f'''
+                UPDATE {tabla_leads} SET {columna_id} = ? WHERE {columna_texto} = ? AND {columna_id} IS NULL
+            ''', (id_, texto))
+            actualizadas += cursor.rowcount
+    return actualizadas
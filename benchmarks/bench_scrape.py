@@ -0,0 +1,195 @@
+"""
+Benchmark end-to-end del scraper SEIA contra el servidor de replay
+(scrapers/replay_server.py), sin tocar el sitio real.
+
+Mide cada fase por separado (listado, fichas, normalización, guardado) y luego
+run_seia completo (pipeline con guardado por lotes). Por fase reporta tiempo,
+throughput, requests, bytes, tiempo de CPU y memoria pico (tracemalloc).
+
+Si el archivo de fixtures no existe se graba uno sintético desde
+scrapers/seia/stub_server.py.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_scrape --proyectos 200 --latencia 0.05 --jitter 0.02 --errores 0.01
+    python -m benchmarks.bench_scrape --archivo data/fixtures/seia --sin-limite --json resultado.json
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# La BD del benchmark es temporal: DB_PATH debe fijarse antes de importar backend
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench_scrape_'), 'bench.db')
+
+from backend.change_detection import IndiceProyectosSeia  # noqa: E402
+from backend.database import clear_all_data, init_db, save_leads  # noqa: E402
+from scrapers.grabacion import ARCHIVO_DEFAULT, ArchivoFixtures, grabar_en  # noqa: E402
+from scrapers.replay_server import ConfigReplay, iniciar_servidor  # noqa: E402
+from scrapers.seia import scraper as seia  # noqa: E402
+from scrapers.servicios import RateLimiter, Servicios  # noqa: E402
+
+TAMANO_LOTE = 25
+
+
+class _ContadorBytes:
+    """Hook de sesión que suma los bytes de cada respuesta."""
+
+    def __init__(self):
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, response, *args, **kwargs):
+        with self._lock:
+            self.bytes += len(response.content)
+        return response
+
+
+def grabar_desde_stub(directorio: str, proyectos: int) -> ArchivoFixtures:
+    """Graba un archivo de fixtures sintético desde el servidor que simula el SEIA."""
+    from scrapers.seia.stub_server import Simulacion, iniciar_servidor as iniciar_stub
+
+    servidor, base_url = iniciar_stub(simulacion=Simulacion(total_proyectos=proyectos, tasa_max=10000,
+                                                            rafaga=10000, latencia=0.0))
+    archivo = ArchivoFixtures(directorio)
+    try:
+        session = grabar_en(Servicios(limiter=RateLimiter(tasa_inicial=1000, tasa_max=10000)).sesion(), archivo)
+        seia.run_seia(existing_projects={}, session=session, base_url=base_url, max_proyectos=proyectos)
+    finally:
+        servidor.shutdown()
+        archivo.escribir_indice()
+    return archivo
+
+
+def nueva_sesion(sin_limite: bool):
+    limiter = RateLimiter(tasa_inicial=1000, tasa_max=10000) if sin_limite else RateLimiter()
+    servicios = Servicios(limiter=limiter)
+    session = servicios.sesion()
+    contador = _ContadorBytes()
+    session.hooks['response'].append(contador)
+    return servicios, session, contador
+
+
+def _requests(servicios: Servicios) -> int:
+    return int(sum(m.get('requests', 0) for m in servicios.resumen_hosts().values()))
+
+
+@contextmanager
+def medir(resultados: dict, fase: str, servicios: Servicios, contador: _ContadorBytes):
+    """Registra tiempo, CPU, requests, bytes y memoria pico de una fase."""
+    datos = {}
+    requests_inicio, bytes_inicio = _requests(servicios), contador.bytes
+    memoria_inicio = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    cpu_inicio, inicio = time.process_time(), time.perf_counter()
+    yield datos
+    segundos = time.perf_counter() - inicio
+    cpu = time.process_time() - cpu_inicio
+    pico = tracemalloc.get_traced_memory()[1] - memoria_inicio
+    items = datos.get('items', 0)
+    resultados[fase] = {
+        'items': items,
+        'segundos': round(segundos, 4),
+        'items_por_segundo': round(items / segundos, 1) if segundos > 0 else None,
+        'requests': _requests(servicios) - requests_inicio,
+        'bytes': contador.bytes - bytes_inicio,
+        'cpu_segundos': round(cpu, 4),
+        'memoria_pico_mb': round(pico / 1024 / 1024, 2),
+    }
+
+
+def correr(archivo: ArchivoFixtures, proyectos: int, config: ConfigReplay, sin_limite: bool, workers: int) -> dict:
+    servidor, base_url = iniciar_servidor(archivo, config=config)
+    seia._PRIMERA_EJECUCION = False  # la espera inicial es para el sitio real
+    init_db()
+    resultados = {}
+    tracemalloc.start()
+    try:
+        servicios, session, contador = nueva_sesion(sin_limite)
+        etapas = {'listado': {'paginas': 0, 'nuevos': 0, 'actualizados': 0, 'cambios_estado': 0},
+                  'descripciones': 0}
+
+        with medir(resultados, 'listado', servicios, contador) as fase:
+            indice = IndiceProyectosSeia.desde_proyectos({})
+            listado = list(seia._listar_proyectos(indice, [], [], etapas, session=session, base_url=base_url,
+                                                  max_proyectos=proyectos))
+            fase['items'] = len(listado)
+
+        with medir(resultados, 'fichas', servicios, contador) as fase:
+            con_descripcion = list(seia._con_descripciones(iter(listado), etapas, session=session,
+                                                           max_workers=workers))
+            fase['items'] = len(con_descripcion)
+
+        with medir(resultados, 'normalizacion', servicios, contador) as fase:
+            leads = [seia._a_lead(proyecto) for proyecto in con_descripcion]
+            fase['items'] = len(leads)
+
+        with medir(resultados, 'guardado', servicios, contador) as fase:
+            fase['items'] = sum(save_leads('seia', leads[i:i + TAMANO_LOTE])
+                                for i in range(0, len(leads), TAMANO_LOTE))
+
+        # Pipeline completo con una sesión nueva (el limitador parte de cero) y la BD vacía
+        clear_all_data()
+        del listado, con_descripcion, leads
+        servicios, session, contador = nueva_sesion(sin_limite)
+        with medir(resultados, 'run_seia', servicios, contador) as fase:
+            resultado = seia.run_seia(existing_projects={}, session=session, base_url=base_url,
+                                      max_proyectos=proyectos, max_workers=workers,
+                                      store_callback=lambda lote, *_: save_leads('seia', lote) if lote else 0)
+            fase['items'] = resultado['guardados']
+    finally:
+        tracemalloc.stop()
+        servidor.shutdown()
+
+    return {
+        'config': {
+            'proyectos': proyectos, 'latencia': config.latencia, 'jitter': config.jitter,
+            'tasa_errores': config.tasa_errores, 'tasa_cortes': config.tasa_cortes,
+            'sin_limite': sin_limite, 'workers': workers, 'respuestas_grabadas': len(archivo),
+        },
+        'fases': resultados,
+        'servidor': dict(config.estadisticas),
+    }
+
+
+def imprimir(reporte: dict):
+    print(f"\n📊 Scrape SEIA contra replay ({reporte['config']})")
+    print(f"{'fase':<14}{'items':>7}{'seg':>9}{'items/s':>10}{'req':>6}{'KB':>9}{'CPU s':>8}{'MB pico':>9}")
+    for fase, r in reporte['fases'].items():
+        print(f"{fase:<14}{r['items']:>7}{r['segundos']:>9.3f}{(r['items_por_segundo'] or 0):>10.1f}"
+              f"{r['requests']:>6}{r['bytes'] / 1024:>9.0f}{r['cpu_segundos']:>8.3f}{r['memoria_pico_mb']:>9.2f}")
+    print(f"servidor: {reporte['servidor']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark end-to-end de run_seia contra fixtures grabados')
+    parser.add_argument('--archivo', default=ARCHIVO_DEFAULT,
+                        help='Archivo de fixtures (si no existe se graba uno sintético)')
+    parser.add_argument('--proyectos', type=int, default=200)
+    parser.add_argument('--latencia', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--errores', type=float, default=0.0, help='Probabilidad de 503 por request')
+    parser.add_argument('--cortes', type=float, default=0.0, help='Probabilidad de cortar la conexión')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--sin-limite', action='store_true',
+                        help='Limitador sin techo práctico: mide el costo propio del scraper')
+    parser.add_argument('--json', help='Escribir el reporte en este archivo')
+    args = parser.parse_args()
+
+    archivo = ArchivoFixtures(args.archivo)
+    if not len(archivo):
+        directorio = tempfile.mkdtemp(prefix='fixtures_seia_')
+        print(f"🧪 {args.archivo} no existe: grabando fixtures sintéticos en {directorio}...")
+        archivo = grabar_desde_stub(directorio, args.proyectos)
+
+    config = ConfigReplay(args.latencia, args.jitter, args.errores, tasa_cortes=args.cortes)
+    reporte = correr(archivo, args.proyectos, config, args.sin_limite, args.workers)
+    imprimir(reporte)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, indent=2)
+        print(f"💾 Reporte en {args.json}")
@@ -0,0 +1,74 @@
+"""
+Benchmark de serialización de /leads: ruta anterior (dicts + jsonable_encoder +
+json estándar, lo que hacía FastAPI por defecto) contra la ruta passthrough con
+orjson (backend/serialization.py).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_serialization --leads 10000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+# La BD del benchmark es temporal: DB_PATH debe fijarse antes de importar backend
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench_serialization_'), 'bench.db')
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from backend.database import (  # noqa: E402
+    init_db, save_leads, get_latest_leads, get_latest_leads_json
+)
+from backend.serialization import respuesta_lista  # noqa: E402
+from benchmarks.datos import generar_leads  # noqa: E402
+
+def ruta_anterior(n: int) -> bytes:
+    """Dicts por fila + jsonable_encoder + json.dumps (JSONResponse por defecto)."""
+    leads = get_latest_leads(n, include_descripcion=True)
+    contenido = jsonable_encoder({'leads': leads, 'total': len(leads)})
+    return json.dumps(contenido, ensure_ascii=False, allow_nan=False,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def ruta_passthrough(n: int) -> bytes:
+    """JSON armado en SQLite + blob frío con orjson, sin jsonable_encoder."""
+    return respuesta_lista('leads', get_latest_leads_json(n, include_descripcion=True)).body
+
+
+def medir(funcion, n: int, repeticiones: int) -> tuple:
+    """Retorna (mejor tiempo en segundos, cuerpo de la última ejecución)."""
+    mejor, cuerpo = float('inf'), b''
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cuerpo = funcion(n)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, cuerpo
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de serialización de /leads')
+    parser.add_argument('--leads', type=int, default=10000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    init_db()
+    save_leads('seia', generar_leads(args.leads))
+
+    t_anterior, cuerpo_anterior = medir(ruta_anterior, args.leads, args.repeticiones)
+    t_nuevo, cuerpo_nuevo = medir(ruta_passthrough, args.leads, args.repeticiones)
+
+    if json.loads(cuerpo_anterior) != json.loads(cuerpo_nuevo):
+        raise SystemExit('❌ Las dos rutas producen JSON distinto')
+
+    print(f"📊 Serialización de {args.leads:,} leads (mejor de {args.repeticiones})")
+    print(f"   Anterior (jsonable_encoder + json): {t_anterior * 1000:8.1f} ms  "
+          f"{len(cuerpo_anterior):,} bytes")
+    print(f"   Passthrough (SQLite + orjson):      {t_nuevo * 1000:8.1f} ms  "
+          f"{len(cuerpo_nuevo):,} bytes")
+    print(f"   Speedup: {t_anterior / t_nuevo:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Datos sintéticos compartidos por los benchmarks: leads con la forma de los
+leads SEIA, filas crudas del API del listado y montos de inversión en los
+formatos que devuelve el sitio. Todo es determinista (semilla fija).
+"""
+
+import random
+
+REGIONES = ['Región de Antofagasta', 'Región Metropolitana', 'Región del Biobío', 'Región de Atacama']
+ESTADOS = ['En Calificación', 'Aprobado', 'Rechazado', 'Desistido']
+INDUSTRIAS = ['Energía', 'Minería', 'BESS', 'Inmobiliario', 'Infraestructura']
+
+
+def generar_leads(n: int, seed: int = 0) -> list:
+    """Genera n leads sintéticos con la forma de los leads SEIA."""
+    rng = random.Random(seed)
+    leads = []
+    for i in range(n):
+        nombre = f"Proyecto {rng.choice(['Fotovoltaico', 'Eólico', 'Minero', 'Portuario'])} {i}"
+        fecha = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2020, 2025)}"
+        inversion = round(rng.uniform(0.5, 900), 2)
+        raw_data = {
+            'codigo_seia': str(100000 + i),
+            'nombre': nombre,
+            'titular': rng.choice(['Enel Chile S.A.', 'Codelco', 'AES Andes', 'Colbún S.A.']),
+            'tipo': rng.choice(['DIA', 'EIA']),
+            'region': rng.choice(REGIONES),
+            'comuna': rng.choice(['Calama', 'Santiago', 'Copiapó', 'Concepción']),
+            'inversion': inversion,
+            'inversion_formato': f"{inversion:,.2f}",
+            'inversion_millones': inversion,
+            'fecha_presentacion': fecha,
+            'fecha_ingreso': fecha,
+            'estado': rng.choice(ESTADOS),
+            'industria': rng.choice(INDUSTRIAS),
+            'categorias_secundarias': rng.sample(INDUSTRIAS, 2),
+            'tipo_proyecto': 'Energía',
+            'razon_ingreso': 'Letra c del artículo 3',
+            'link_ficha': f"https://seia.sea.gob.cl/expediente/ficha/fichaPrincipal.php?id_expediente={i}",
+            'descripcion_completa': 'El proyecto consiste en la construcción y operación de ' * 8,
+        }
+        leads.append({
+            'project_name': nombre,
+            'date': fecha,
+            'sector': raw_data['tipo_proyecto'],
+            'description': f"Titular: {raw_data['titular']}. Estado: {raw_data['estado']}.",
+            'raw_data': raw_data,
+        })
+    return leads
+
+
+# Formatos de inversión tal como los devuelve INVERSION_MM_FORMAT
+_FORMATOS_INVERSION = ['{:.0f}.000', '{:.3f}', '{:,.4f}', '{:.2f}', 'US$ {:.1f} MM', '']
+
+
+def generar_inversiones(n: int, seed: int = 0) -> list:
+    """Genera n strings de inversión con formato chileno (miles con punto, decimales con coma)."""
+    rng = random.Random(seed)
+    inversiones = []
+    for _ in range(n):
+        formato = rng.choice(_FORMATOS_INVERSION)
+        valor = formato.format(rng.uniform(0.1, 5000))
+        inversiones.append(valor.replace(',', '_').replace('.', ',').replace('_', '.') if '{:,' in formato else valor)
+    return inversiones
+
+
+def generar_filas_api(n: int, seed: int = 0) -> dict:
+    """Genera la respuesta JSON del listado del SEIA ({data: [...]}) con n filas."""
+    rng = random.Random(seed)
+    inversiones = generar_inversiones(n, seed)
+    data = []
+    for i in range(n):
+        data.append({
+            'EXPEDIENTE_ID': str(2160000000 + i),
+            'EXPEDIENTE_NOMBRE': f"Parque {rng.choice(['Fotovoltaico', 'Eólico', 'Minero', 'Portuario', 'Solar BESS'])} {i}",
+            'EXPEDIENTE_URL_PPAL': f"/expediente/expediente.php?id_expediente={2160000000 + i}",
+            'EXPEDIENTE_URL_FICHA': f"https://seia.sea.gob.cl/expediente/ficha/fichaPrincipal.php?id_expediente={2160000000 + i}",
+            'TITULAR': rng.choice(['Enel Chile S.A.', 'Codelco', 'AES Andes', 'Colbún S.A.']),
+            'WORKFLOW_DESCRIPCION': rng.choice(['DIA', 'EIA']),
+            'REGION_NOMBRE': rng.choice(REGIONES),
+            'COMUNA_NOMBRE': rng.choice(['Calama', 'Santiago', 'Copiapó', 'Concepción']),
+            'INVERSION_MM': str(round(rng.uniform(0.1, 5000), 4)),
+            'INVERSION_MM_FORMAT': inversiones[i],
+            'FECHA_PRESENTACION': 1735700000 - i * 60,
+            'FECHA_PRESENTACION_FORMAT': f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2020, 2025)}",
+            'ESTADO_PROYECTO': rng.choice(ESTADOS),
+            'TIPO_PROYECTO': rng.choice(['Centrales generadoras de energía', 'Proyectos de desarrollo minero',
+                                         'Puertos', 'Proyectos inmobiliarios']),
+            'SECTOR_ECONOMICO': rng.choice(['ENERGÍA', 'MINERÍA', 'INFRAESTRUCTURA PORTUARIA', '']),
+            'RAZON_INGRESO': 'Letra c del artículo 3',
+        })
+    return {'data': data}
@@ -0,0 +1,330 @@
+"""
+Suite de benchmarks de los caminos calientes del backend, con datos sintéticos
+de 1k/10k/100k leads. Cada tamaño corre en un subproceso con su propia BD
+temporal (DB_PATH se lee al importar backend) y los resultados se escriben en
+JSON para compararlos entre commits.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.suite --salida bench_base.json                 # 1k, 10k, 100k
+    python -m benchmarks.suite --tamanos 1000 10000 --casos save_leads get_latest_leads
+    python -m benchmarks.suite --comparar bench_base.json bench_nuevo.json --umbral 0.15
+
+--comparar termina con código 1 si algún caso quedó más lento que el umbral.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+TAMANOS_DEFAULT = [1000, 10000, 100000]
+# Límite de /leads y get_latest_leads en la API
+LIMITE_LEADS = 50000
+
+# nombre -> preparar(n) que retorna (función a medir, items procesados por llamada)
+CASOS: Dict[str, Callable] = {}
+
+
+def caso(nombre: str):
+    def registrar(preparar):
+        CASOS[nombre] = preparar
+        return preparar
+    return registrar
+
+
+# --- Casos CPU (no tocan la BD) ---
+
+@caso('clasificar_proyecto')
+def _clasificar(n):
+    from backend.category_rules import clasificar_proyecto
+    from benchmarks.datos import generar_filas_api
+    filas = generar_filas_api(n)['data']
+    pares = [(f['EXPEDIENTE_NOMBRE'], f"{f['SECTOR_ECONOMICO']} {f['TIPO_PROYECTO']}") for f in filas]
+    return (lambda: [clasificar_proyecto(nombre, descripcion) for nombre, descripcion in pares]), n
+
+
+@caso('parse_inversion_millones')
+def _parse_inversion(n):
+    from benchmarks.datos import generar_inversiones
+    from scrapers.seia.inversion import _parsear_texto, parse_inversion_millones
+    valores = generar_inversiones(n)
+
+    def parsear():
+        # Cache fría en cada repetición: mide el parser, no los aciertos de la cache
+        _parsear_texto.cache_clear()
+        return [parse_inversion_millones(v) for v in valores]
+    return parsear, n
+
+
+@caso('parse_inversion_millones_cache')
+def _parse_inversion_cache(n):
+    from benchmarks.datos import generar_inversiones
+    from scrapers.seia.inversion import parse_inversion_millones
+    valores = generar_inversiones(n)
+    # Desde la segunda repetición los textos repetidos (o todos, si caben en la cache) son aciertos
+    return (lambda: [parse_inversion_millones(v) for v in valores]), n
+
+
+@caso('parsear_inversiones')
+def _parsear_inversiones(n):
+    from benchmarks.datos import generar_inversiones
+    from scrapers.seia.inversion import parsear_inversiones
+    valores = generar_inversiones(n)
+    # Lote completo; desde UMBRAL_LOTE sin cache y vectorizado si hay pandas y pyarrow
+    return (lambda: parsear_inversiones(valores)), n
+
+
+@caso('parse_listado_json')
+def _parse_listado(n):
+    from benchmarks.datos import generar_filas_api
+    from scrapers.seia.scraper import parse_listado_json
+    datos = generar_filas_api(n)
+    return (lambda: parse_listado_json(datos)), n
+
+
+@caso('filtrar_elegibles')
+def _filtrar(n):
+    from backend.database import get_all_leads_for_markdown
+    from backend.scoring import filtrar_elegibles
+    leads = get_all_leads_for_markdown()
+    return (lambda: filtrar_elegibles(leads)), len(leads)
+
+
+@caso('get_top_proyectos')
+def _top(n):
+    from backend.database import get_all_leads_for_markdown
+    from backend.scoring import get_top_proyectos
+    leads = get_all_leads_for_markdown()
+    return (lambda: get_top_proyectos(leads, 20)), len(leads)
+
+
+@caso('get_top_proyectos_iter')
+def _top_iter(n):
+    from backend.database import iter_leads
+    from backend.scoring import get_top_proyectos
+    # Incluye la lectura de la BD: es el camino de /top-projects y /export/markdown
+    return (lambda: get_top_proyectos(iter_leads({'estado_elegible': True}, orden='fuente'), 20)), n
+
+
+# --- Casos de BD (la BD ya tiene n leads, ver preparar_bd) ---
+
+@caso('get_latest_leads')
+def _latest(n):
+    from backend.database import get_latest_leads
+    limite = min(n, LIMITE_LEADS)
+    return (lambda: get_latest_leads(limite, include_descripcion=True)), limite
+
+
+@caso('get_existing_seia_projects')
+def _existing(n):
+    from backend.database import get_existing_seia_projects
+    return get_existing_seia_projects, n
+
+
+@caso('get_seia_project_index')
+def _indice(n):
+    from backend.database import get_seia_project_index
+    return get_seia_project_index, n
+
+
+# --- Handlers vía cliente ASGI (incluye middleware: compresión, Cache-Control) ---
+
+_CLIENTES = []
+
+
+def _cliente():
+    from fastapi.testclient import TestClient
+    from backend.config import API_SECRET
+    from backend.main import app
+    cliente = TestClient(app, headers={'X-API-Key': API_SECRET} if API_SECRET else None)
+    cliente.__enter__()  # ejecuta el startup (init_db); se cierra en correr_tamano
+    _CLIENTES.append(cliente)
+    return cliente
+
+
+@caso('GET /leads')
+def _endpoint_leads(n):
+    cliente = _cliente()
+    limite = min(n, LIMITE_LEADS)
+
+    def pedir():
+        respuesta = cliente.get('/leads', params={'limit': limite})
+        respuesta.raise_for_status()
+        return respuesta.content
+    return pedir, limite
+
+
+@caso('GET /export/markdown')
+def _endpoint_markdown(n):
+    cliente = _cliente()
+
+    def pedir():
+        respuesta = cliente.get('/export/markdown')
+        respuesta.raise_for_status()
+        return respuesta.content
+    return pedir, n
+
+
+# --- Medición ---
+
+def medir(funcion: Callable, min_repeticiones: int = 3, max_repeticiones: int = 20,
+          presupuesto: float = 2.0) -> Dict:
+    """Repite la función hasta min_repeticiones y mientras quede presupuesto (segundos)."""
+    tiempos: List[float] = []
+    inicio_total = time.perf_counter()
+    while len(tiempos) < max_repeticiones:
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+        if len(tiempos) >= min_repeticiones and time.perf_counter() - inicio_total > presupuesto:
+            break
+    return {
+        'mejor_s': round(min(tiempos), 6),
+        'mediana_s': round(statistics.median(tiempos), 6),
+        'repeticiones': len(tiempos),
+    }
+
+
+def preparar_bd(n: int) -> Dict:
+    """Crea la BD con n leads sintéticos; el propio guardado se mide como caso save_leads."""
+    from backend.database import init_db, save_leads
+    from benchmarks.datos import generar_leads
+    init_db()
+    leads = generar_leads(n)
+    inicio = time.perf_counter()
+    for i in range(0, n, 1000):
+        save_leads('seia', leads[i:i + 1000])
+    segundos = time.perf_counter() - inicio
+    return {'mejor_s': round(segundos, 6), 'mediana_s': round(segundos, 6), 'repeticiones': 1}
+
+
+def correr_tamano(n: int, casos: List[str]) -> Dict:
+    """Corre los casos para un tamaño (en este proceso: DB_PATH ya apunta a una BD temporal)."""
+    resultados = {}
+
+    def registrar(nombre, medicion, items):
+        medicion['n'] = n
+        medicion['items'] = items
+        medicion['us_por_item'] = round(medicion['mejor_s'] / items * 1e6, 3) if items else None
+        resultados[f'{nombre}@{n}'] = medicion
+        print(f"   {nombre:<32} n={n:<7} {medicion['mejor_s'] * 1000:10.2f} ms  "
+              f"(mediana {medicion['mediana_s'] * 1000:.2f} ms, {medicion['repeticiones']} rep.)", file=sys.stderr)
+
+    registrar('save_leads', preparar_bd(n), n)
+    try:
+        for nombre in casos:
+            if nombre == 'save_leads':
+                continue
+            funcion, items = CASOS[nombre](n)
+            registrar(nombre, medir(funcion), items)
+    finally:
+        # El portal de cada TestClient es un thread que impediría terminar el proceso
+        while _CLIENTES:
+            _CLIENTES.pop().__exit__(None, None, None)
+    return resultados
+
+
+def _commit_actual() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def correr_suite(tamanos: List[int], casos: List[str]) -> Dict:
+    resultados = {}
+    for n in tamanos:
+        print(f"📊 {n:,} leads...", file=sys.stderr)
+        with tempfile.TemporaryDirectory(prefix='bench_suite_') as directorio:
+            salida = os.path.join(directorio, 'resultado.json')
+            env = {**os.environ, 'DB_PATH': os.path.join(directorio, 'bench.db')}
+            subprocess.run([sys.executable, '-m', 'benchmarks.suite', '--_tamano', str(n),
+                            '--_salida', salida, '--casos', *casos], env=env, check=True,
+                           stdout=subprocess.DEVNULL)
+            with open(salida, 'r', encoding='utf-8') as f:
+                resultados.update(json.load(f))
+    return {
+        'meta': {
+            'commit': _commit_actual(),
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'tamanos': tamanos,
+        },
+        'resultados': resultados,
+    }
+
+
+def comparar(base: Dict, nuevo: Dict, umbral: float) -> int:
+    """Imprime la diferencia caso por caso; retorna la cantidad de regresiones."""
+    print(f"📊 {base['meta'].get('commit') or 'base'} -> {nuevo['meta'].get('commit') or 'nuevo'} "
+          f"(umbral {umbral:.0%}, mejor tiempo)")
+    regresiones = 0
+    for clave in sorted(set(base['resultados']) | set(nuevo['resultados'])):
+        antes = base['resultados'].get(clave)
+        despues = nuevo['resultados'].get(clave)
+        if not antes or not despues:
+            print(f"   {clave:<40} {'(solo en ' + ('nuevo' if despues else 'base') + ')':>30}")
+            continue
+        razon = despues['mejor_s'] / antes['mejor_s'] if antes['mejor_s'] else float('inf')
+        marca = '  '
+        if razon > 1 + umbral:
+            marca = '❌'
+            regresiones += 1
+        elif razon < 1 - umbral:
+            marca = '✅'
+        print(f"{marca} {clave:<40} {antes['mejor_s'] * 1000:10.2f} ms -> {despues['mejor_s'] * 1000:10.2f} ms  "
+              f"{(razon - 1) * 100:+7.1f}%")
+    print(f"{'❌' if regresiones else '✅'} {regresiones} regresiones")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks de los caminos calientes del backend')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=TAMANOS_DEFAULT)
+    parser.add_argument('--casos', nargs='+', default=['save_leads', *CASOS], help='Subconjunto de casos')
+    parser.add_argument('--salida', help='Archivo JSON de resultados (default: stdout)')
+    parser.add_argument('--comparar', nargs=2, metavar=('BASE', 'NUEVO'))
+    parser.add_argument('--umbral', type=float, default=0.10, help='Variación tolerada al comparar (0.10 = 10%%)')
+    parser.add_argument('--_tamano', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--_salida', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.comparar:
+        with open(args.comparar[0], 'r', encoding='utf-8') as f:
+            base = json.load(f)
+        with open(args.comparar[1], 'r', encoding='utf-8') as f:
+            nuevo = json.load(f)
+        sys.exit(1 if comparar(base, nuevo, args.umbral) else 0)
+
+    desconocidos = [c for c in args.casos if c != 'save_leads' and c not in CASOS]
+    if desconocidos:
+        parser.error(f"Casos desconocidos: {desconocidos}. Disponibles: save_leads, {', '.join(CASOS)}")
+
+    if args._tamano:
+        # Subproceso: un tamaño, BD temporal ya fijada en DB_PATH
+        resultados = correr_tamano(args._tamano, args.casos)
+        with open(args._salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f)
+        return
+
+    reporte = correr_suite(args.tamanos, args.casos)
+    contenido = json.dumps(reporte, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(contenido)
+        print(f"💾 Resultados en {args.salida}", file=sys.stderr)
+    else:
+        print(contenido)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,9 +15,9 @@ export default function ReportButton() {
       const response = await generateReport();
       setResult({
         success: response.status === 'success',
-        message: response.email_sent 
-          ? '✅ Reporte generado y enviado por email'
-          : '⚠️ Reporte generado pero no se pudo enviar por email',
+        message: response.email_queued 
+          ? '✅ Reporte generado; el email está en cola de envío'
+          : '⚠️ Reporte generado pero no se pudo encolar el email',
       });
     } catch (error: any) {
       setResult({
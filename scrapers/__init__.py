@@ -1,3 +1,3 @@
-# Este archivo existe solo para que Python reconozca scrapers como paquete
-# Los scrapers se importan explícitamente en backend/main.py
-
+# Paquete de scrapers. Cada fuente es un ScraperPlugin (scrapers/framework.py);
+# backend/main.py los obtiene de scrapers/registro.py, que también carga los
+# plugins externos declarados como entry point en 'masterscraper.scrapers'
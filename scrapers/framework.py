@@ -0,0 +1,201 @@
+"""
+Framework de scrapers: cada fuente es un ScraperPlugin con las etapas
+discover -> fetch -> parse -> normalize -> store.
+
+El ejecutar() por defecto encadena las etapas en un pipeline: discover produce
+unidades de trabajo (páginas, documentos...), fetch corre en un pool de threads
+con un máximo de requests en vuelo, y los leads normalizados se guardan por lotes
+a medida que llegan. Una fuente nueva solo implementa las etapas y obtiene
+concurrencia, sesión compartida con rate limit, cache y guardado por lotes.
+
+Las fuentes con una lógica propia más rica (detección de cambios, pools de
+procesos) pueden sobrescribir ejecutar() y seguir usando el mismo Contexto.
+"""
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from backend.logs import en_contexto
+from scrapers.servicios import Metricas, Servicios
+
+logger = logging.getLogger(__name__)
+
+
+class Contexto:
+    """Estado de una ejecución: servicios compartidos, hooks de progreso/cancelación y métricas."""
+
+    def __init__(self, source: str, servicios: Servicios, run_id: Optional[int] = None,
+                 progress_callback: Optional[Callable[[int, str], None]] = None,
+                 cancel_callback: Optional[Callable[[], bool]] = None):
+        self.source = source
+        self.run_id = run_id
+        self.servicios = servicios
+        self.metricas = Metricas()
+        self.progress_callback = progress_callback
+        self.cancel_callback = cancel_callback
+
+    @property
+    def sesion(self):
+        return self.servicios.sesion()
+
+    @property
+    def cache(self):
+        return self.servicios.cache
+
+    def progreso(self, percent: int, mensaje: str):
+        logger.debug(mensaje, extra={'percent': percent})
+        if self.progress_callback:
+            self.progress_callback(percent, mensaje)
+
+    def cancelado(self) -> bool:
+        return bool(self.cancel_callback and self.cancel_callback())
+
+
+def resultado_scraper(total_leads: int = 0, estado_changes: int = 0, field_changes: int = 0,
+                      cancelado: bool = False, metricas: Optional[Dict] = None) -> Dict:
+    """
+    Forma uniforme del resultado de ejecutar() para todas las fuentes.
+    En metricas, 'paginas' (del listado) y 'fichas' (detalles/documentos descargados)
+    se exponen además en /metrics como histogramas por ejecución.
+    """
+    return {
+        'total_leads': total_leads,
+        'estado_changes': estado_changes,
+        'field_changes': field_changes,
+        'cancelado': cancelado,
+        'metricas': metricas or {},
+    }
+
+
+class ScraperPlugin:
+    """
+    Clase base de un scraper.
+
+    Atributos de clase:
+        nombre: clave de la fuente (la de /scrape/{source} y de la columna leads.source de runs)
+        etiqueta: nombre legible
+        max_concurrencia: fetch simultáneos en el pipeline por defecto
+        tamano_lote: leads por llamada a store()
+        cache_ttl: segundos que se cachea la respuesta de fetch (0 = sin cache)
+    """
+
+    nombre: str = ''
+    etiqueta: str = ''
+    max_concurrencia: int = 4
+    tamano_lote: int = 100
+    cache_ttl: float = 0
+
+    # --- Etapas (las fuentes implementan discover, fetch y parse) ---
+
+    def discover(self, ctx: Contexto) -> Iterable[Any]:
+        """Produce las unidades de trabajo (urls, páginas, ids). Puede ser un generador."""
+        raise NotImplementedError
+
+    def fetch(self, unidad: Any, ctx: Contexto) -> Any:
+        """Descarga una unidad (se ejecuta en un thread; usar ctx.sesion)."""
+        raise NotImplementedError
+
+    def parse(self, respuesta: Any, unidad: Any, ctx: Contexto) -> Iterable[Dict]:
+        """Extrae los registros crudos de una respuesta."""
+        raise NotImplementedError
+
+    def normalize(self, registro: Dict, ctx: Contexto) -> Optional[Dict]:
+        """Convierte un registro en lead {source, project_name, date, sector, description, raw_data}. None lo descarta."""
+        return registro
+
+    def store(self, leads: List[Dict], ctx: Contexto) -> int:
+        """Guarda un lote de leads y retorna cuántos se insertaron."""
+        from backend.database import save_leads
+        return save_leads(self.nombre, leads)
+
+    # --- Ejecución ---
+
+    def _fetch_con_cache(self, unidad: Any, ctx: Contexto) -> Any:
+        if self.cache_ttl > 0:
+            clave = (self.nombre, repr(unidad))
+            cacheada = ctx.cache.obtener(clave)
+            if cacheada is not None:
+                ctx.metricas.contar('fetch', cache_hits=1)
+                return cacheada
+        with ctx.metricas.medir('fetch'):
+            respuesta = self.fetch(unidad, ctx)
+        if self.cache_ttl > 0 and respuesta is not None:
+            ctx.cache.guardar(clave, respuesta, self.cache_ttl)
+        return respuesta
+
+    def ejecutar(self, ctx: Contexto) -> Dict:
+        """
+        Pipeline por defecto. Mantiene hasta max_concurrencia fetch en vuelo mientras
+        parse/normalize procesan lo que ya llegó, y guarda cada tamano_lote leads.
+        """
+        inicio = time.perf_counter()
+        guardados = 0
+        lote: List[Dict] = []
+        descubiertas = self.discover(ctx)
+        # Si discover retorna una lista se conoce el total; con un generador el avance es aproximado
+        total = len(descubiertas) if hasattr(descubiertas, '__len__') else None
+        unidades = iter(descubiertas)
+        en_vuelo = {}
+        procesadas = 0
+        agotado = False
+
+        def vaciar_lote():
+            nonlocal guardados, lote
+            if lote:
+                with ctx.metricas.medir('store'):
+                    n = self.store(lote, ctx)
+                ctx.metricas.contar('store', filas=n)
+                guardados += n
+                lote = []
+
+        ctx.progreso(0, f"Iniciando {self.etiqueta or self.nombre}...")
+        fetch = en_contexto(self._fetch_con_cache)  # los logs de los fetch llevan el run_id
+        with ThreadPoolExecutor(max_workers=self.max_concurrencia) as hilos:
+            try:
+                while en_vuelo or not agotado:
+                    if ctx.cancelado():
+                        vaciar_lote()
+                        ctx.progreso(0, "Cancelado")
+                        return resultado_scraper(guardados, cancelado=True, metricas=ctx.metricas.como_dict())
+
+                    # Rellenar la ventana de fetch en vuelo
+                    while not agotado and len(en_vuelo) < self.max_concurrencia:
+                        try:
+                            unidad = next(unidades)
+                        except StopIteration:
+                            agotado = True
+                            break
+                        en_vuelo[hilos.submit(fetch, unidad, ctx)] = unidad
+
+                    if not en_vuelo:
+                        break
+
+                    listos, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                    for futuro in listos:
+                        unidad = en_vuelo.pop(futuro)
+                        respuesta = futuro.result()
+                        procesadas += 1
+                        with ctx.metricas.medir('parse'):
+                            registros = list(self.parse(respuesta, unidad, ctx) or [])
+                        with ctx.metricas.medir('normalize'):
+                            for registro in registros:
+                                lead = self.normalize(registro, ctx)
+                                if lead is not None:
+                                    lote.append(lead)
+                        ctx.metricas.incrementar('registros', len(registros))
+                        if len(lote) >= self.tamano_lote:
+                            vaciar_lote()
+                    pendientes = (total - procesadas) if total is not None else len(en_vuelo) + (0 if agotado else self.max_concurrencia)
+                    ctx.progreso(int(95 * procesadas / max(1, procesadas + pendientes)),
+                                 f"{procesadas} unidades procesadas, {guardados + len(lote)} leads")
+
+                vaciar_lote()
+            finally:
+                for futuro in en_vuelo:
+                    futuro.cancel()
+
+        ctx.metricas.incrementar('total_segundos', time.perf_counter() - inicio)
+        ctx.progreso(100, f"Completado: {guardados} leads nuevos")
+        return resultado_scraper(guardados, metricas=ctx.metricas.como_dict())
@@ -0,0 +1,131 @@
+"""
+Grabación de las respuestas HTTP de un scraper en un archivo de fixtures, para
+reproducirlas después sin conexión (scrapers/replay_server.py) y medir el
+scraper contra ellas (benchmarks/bench_scrape.py).
+
+El archivo es un directorio:
+    indice.json             {origen, respuestas: {clave: {archivo, status, content_type, bytes}}}
+    respuestas/<sha1>.gz    cuerpo de cada respuesta, comprimido con gzip
+
+La clave de una respuesta es método + path + query ordenada + cuerpo del request
+(form ordenado), sin el host: así el servidor de replay la encuentra aunque el
+request llegue a localhost.
+
+Uso (desde la raíz del proyecto):
+    python -m scrapers.grabacion --salida data/fixtures/seia --max-proyectos 100
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import requests
+
+ARCHIVO_DEFAULT = os.path.join('data', 'fixtures', 'seia')
+
+
+def clave_request(metodo: str, url: str, cuerpo=None) -> str:
+    """Clave estable de un request (sin host)."""
+    partes = urlparse(url)
+    query = urlencode(sorted(parse_qsl(partes.query, keep_blank_values=True)))
+    if isinstance(cuerpo, bytes):
+        cuerpo = cuerpo.decode('utf-8', errors='replace')
+    form = urlencode(sorted(parse_qsl(cuerpo or '', keep_blank_values=True)))
+    return f"{metodo.upper()} {partes.path}?{query} {form}".rstrip()
+
+
+class ArchivoFixtures:
+    """Lectura y escritura de un archivo de fixtures (thread-safe al grabar)."""
+
+    def __init__(self, directorio: str = ARCHIVO_DEFAULT):
+        self.directorio = directorio
+        self.origen: Optional[str] = None
+        self.respuestas: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        ruta_indice = os.path.join(directorio, 'indice.json')
+        if os.path.exists(ruta_indice):
+            with open(ruta_indice, 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+            self.origen = indice.get('origen')
+            self.respuestas = indice.get('respuestas', {})
+
+    def __len__(self):
+        return len(self.respuestas)
+
+    def guardar(self, clave: str, status: int, content_type: str, cuerpo: bytes, origen: str):
+        nombre = hashlib.sha1(clave.encode('utf-8')).hexdigest() + '.gz'
+        os.makedirs(os.path.join(self.directorio, 'respuestas'), exist_ok=True)
+        with open(os.path.join(self.directorio, 'respuestas', nombre), 'wb') as f:
+            f.write(gzip.compress(cuerpo, compresslevel=6))
+        with self._lock:
+            self.origen = self.origen or origen
+            self.respuestas[clave] = {
+                'archivo': nombre,
+                'status': status,
+                'content_type': content_type,
+                'bytes': len(cuerpo),
+            }
+
+    def escribir_indice(self):
+        os.makedirs(self.directorio, exist_ok=True)
+        with self._lock:
+            indice = {'origen': self.origen, 'respuestas': self.respuestas}
+        with open(os.path.join(self.directorio, 'indice.json'), 'w', encoding='utf-8') as f:
+            json.dump(indice, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+    def leer(self, clave: str) -> Optional[Tuple[Dict, bytes]]:
+        """Retorna (metadatos, cuerpo) o None si la clave no está grabada."""
+        meta = self.respuestas.get(clave)
+        if meta is None:
+            return None
+        with open(os.path.join(self.directorio, 'respuestas', meta['archivo']), 'rb') as f:
+            return meta, gzip.decompress(f.read())
+
+
+def grabar_en(session: requests.Session, archivo: ArchivoFixtures):
+    """
+    Agrega a la sesión un hook que guarda cada respuesta en el archivo.
+    Solo se graban respuestas 2xx/404 (los 429/5xx son transitorios y la sesión los reintenta).
+    """
+    def hook(response, *args, **kwargs):
+        if not (200 <= response.status_code < 300 or response.status_code == 404):
+            return response
+        request = response.request
+        partes = urlparse(request.url)
+        archivo.guardar(
+            clave_request(request.method, request.url, request.body),
+            response.status_code,
+            response.headers.get('Content-Type', 'application/octet-stream'),
+            response.content,
+            f"{partes.scheme}://{partes.netloc}",
+        )
+        return response
+
+    session.hooks['response'].append(hook)
+    return session
+
+
+if __name__ == '__main__':
+    from scrapers.seia.scraper import SEIA_BASE_URL, run_seia
+    from scrapers.servicios import Servicios
+
+    parser = argparse.ArgumentParser(description='Graba las respuestas del SEIA en un archivo de fixtures')
+    parser.add_argument('--salida', default=ARCHIVO_DEFAULT)
+    parser.add_argument('--base-url', default=SEIA_BASE_URL)
+    parser.add_argument('--max-proyectos', type=int, default=100)
+    args = parser.parse_args()
+
+    archivo = ArchivoFixtures(args.salida)
+    session = grabar_en(Servicios().sesion(), archivo)
+    try:
+        resultado = run_seia(existing_projects={}, session=session, base_url=args.base_url,
+                             max_proyectos=args.max_proyectos)
+    finally:
+        archivo.escribir_indice()
+    total_bytes = sum(r['bytes'] for r in archivo.respuestas.values())
+    print(f"💾 {len(archivo)} respuestas grabadas en {args.salida} ({total_bytes / 1024:.0f} KB)")
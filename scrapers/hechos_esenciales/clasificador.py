@@ -0,0 +1,93 @@
+"""
+Clasificador de Hechos Esenciales por keywords.
+Todas las keywords se compilan en una sola expresión regular con un grupo con
+nombre por tipo de evento, así cada documento se recorre una única vez sin
+importar cuántas keywords haya.
+"""
+
+import re
+import unicodedata
+from typing import Dict, List
+
+from backend.category_rules import CLASIFICACION_SEGUNDOS
+from backend.metrics import instrumentar
+
+# Tipos de evento -> (categoría, keywords). Las keywords se escriben sin tildes
+# y en minúsculas; el texto se normaliza igual antes de buscar.
+EVENTOS = {
+    'fusion': ('M&A', [
+        'fusion', 'fusionar', 'fusionara', 'absorcion', 'absorbida', 'absorbente',
+    ]),
+    'adquisicion': ('M&A', [
+        'adquisicion', 'adquirir', 'adquirio', 'compra de acciones', 'compraventa de acciones',
+        'toma de control', 'tomar el control', 'contrato de compraventa', 'participacion controladora',
+    ]),
+    'opa': ('M&A', [
+        'oferta publica de adquisicion', 'opa',
+    ]),
+    'venta_activos': ('M&A', [
+        'venta de activos', 'enajenacion', 'desinversion', 'venta de su participacion',
+    ]),
+    'joint_venture': ('M&A', [
+        'joint venture', 'asociacion estrategica', 'pacto de accionistas',
+    ]),
+    'emision_bonos': ('Financiamiento', [
+        'emision de bonos', 'colocacion de bonos', 'linea de bonos', 'bonos corporativos',
+        'efectos de comercio',
+    ]),
+    'credito': ('Financiamiento', [
+        'credito sindicado', 'contrato de credito', 'financiamiento', 'refinanciamiento',
+        'project finance', 'prestamo',
+    ]),
+    'aumento_capital': ('Financiamiento', [
+        'aumento de capital', 'emision de acciones', 'colocacion de acciones',
+    ]),
+}
+
+CATEGORIA_DEFAULT = 'Otro'
+
+_PATRON = re.compile(
+    '|'.join(
+        f"(?P<{tipo}>\\b(?:{'|'.join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))})\\b)"
+        for tipo, (_, keywords) in EVENTOS.items()
+    )
+)
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sin tildes y con espacios colapsados."""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', texto.lower())
+
+
+@instrumentar(CLASIFICACION_SEGUNDOS)
+def clasificar_evento(materia: str, texto: str = '') -> Dict:
+    """
+    Clasifica un hecho esencial. La materia (título) pesa más que el cuerpo.
+    Retorna {tipo_evento, categoria_evento, eventos: {tipo: puntaje}, keywords: [...]}.
+    """
+    puntajes: Dict[str, int] = {}
+    keywords: List[str] = []
+    for fuente, peso in ((materia, 3), (texto, 1)):
+        for match in _PATRON.finditer(normalizar(fuente)):
+            tipo = match.lastgroup
+            puntajes[tipo] = puntajes.get(tipo, 0) + peso
+            if match.group() not in keywords:
+                keywords.append(match.group())
+
+    if not puntajes:
+        return {
+            'tipo_evento': None,
+            'categoria_evento': CATEGORIA_DEFAULT,
+            'eventos': {},
+            'keywords': [],
+        }
+
+    tipo_evento = max(puntajes, key=puntajes.get)
+    return {
+        'tipo_evento': tipo_evento,
+        'categoria_evento': EVENTOS[tipo_evento][0],
+        'eventos': puntajes,
+        'keywords': keywords,
+    }
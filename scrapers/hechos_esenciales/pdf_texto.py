@@ -0,0 +1,86 @@
+"""
+Extracción de texto de los PDF adjuntos a los Hechos Esenciales.
+Se ejecuta en un pool de procesos (la extracción es CPU-bound), por eso las
+funciones son de nivel de módulo y reciben/retornan solo tipos serializables.
+
+Usa pypdf si está instalado (requirements-optional.txt). Si no, un extractor
+básico que lee los content streams (sin comprimir o FlateDecode) y toma el
+texto de los operadores Tj/TJ: suficiente para PDF generados desde texto,
+no para documentos escaneados ni fuentes con codificaciones CID.
+"""
+
+import io
+import re
+import zlib
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pypdf es opcional
+    PdfReader = None
+
+# Límite de texto por documento (se guarda como descripción completa)
+MAX_CARACTERES = 20000
+
+_STREAM = re.compile(rb'<<(.*?)>>\s*stream\r?\n(.*?)\r?\nendstream', re.S)
+_TEXTO_TJ = re.compile(rb'\((?:\\.|[^\\)])*\)\s*Tj|\[(?:[^\]]*)\]\s*TJ|T\*|Td|TD|ET', re.S)
+_LITERAL = re.compile(rb'\((?:\\.|[^\\)])*\)', re.S)
+_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f',
+            b'(': b'(', b')': b')', b'\\': b'\\'}
+
+
+def _decodificar_literal(literal: bytes) -> str:
+    """Decodifica un string literal de PDF: (texto con \\escapes)."""
+    contenido = literal[1:-1]
+    salida = bytearray()
+    i = 0
+    while i < len(contenido):
+        c = contenido[i:i + 1]
+        if c == b'\\' and i + 1 < len(contenido):
+            siguiente = contenido[i + 1:i + 2]
+            octal = re.match(rb'[0-7]{1,3}', contenido[i + 1:i + 4])
+            if octal:
+                salida.append(int(octal.group(), 8) & 0xFF)
+                i += 1 + len(octal.group())
+                continue
+            salida += _ESCAPES.get(siguiente, siguiente)
+            i += 2
+            continue
+        salida += c
+        i += 1
+    return salida.decode('latin-1')
+
+
+def _extraer_basico(contenido: bytes) -> str:
+    partes = []
+    for diccionario, datos in _STREAM.findall(contenido):
+        if b'/FlateDecode' in diccionario:
+            try:
+                datos = zlib.decompress(datos)
+            except zlib.error:
+                continue
+        elif b'/Filter' in diccionario:
+            continue  # imágenes u otros filtros no soportados
+        for operador in _TEXTO_TJ.finditer(datos):
+            token = operador.group()
+            if token.endswith(b'Tj') or token.endswith(b'TJ'):
+                partes.append(''.join(_decodificar_literal(l) for l in _LITERAL.findall(token)))
+            else:
+                partes.append('\n')
+    return ''.join(partes)
+
+
+def extraer_texto_pdf(contenido: bytes) -> str:
+    """Extrae el texto de un PDF (bytes). Retorna '' si no se puede leer."""
+    if not contenido or not contenido.startswith(b'%PDF'):
+        return ''
+    try:
+        if PdfReader is not None:
+            lector = PdfReader(io.BytesIO(contenido))
+            texto = '\n'.join(pagina.extract_text() or '' for pagina in lector.pages)
+        else:
+            texto = _extraer_basico(contenido)
+    except Exception:
+        return ''
+    texto = re.sub(r'[ \t]+', ' ', texto)
+    texto = re.sub(r'\s*\n\s*', '\n', texto).strip()
+    return texto[:MAX_CARACTERES]
@@ -0,0 +1,42 @@
+"""
+Plugin Hechos Esenciales (CMF). Sobrescribe ejecutar(): el scraper ya tiene su
+propio pipeline (threads para descargas, procesos para los PDF) y guarda cada
+ventana de documentos a través de store_callback.
+"""
+
+from typing import Dict, List
+
+from backend.database import get_cmf_documentos_procesados, save_cmf_documentos
+from scrapers.framework import Contexto, ScraperPlugin, resultado_scraper
+from scrapers.hechos_esenciales.scraper import run_hechos_esenciales
+
+
+class HechosEsencialesPlugin(ScraperPlugin):
+    nombre = 'hechos_esenciales'
+    etiqueta = 'Hechos Esenciales (CMF)'
+
+    def ejecutar(self, ctx: Contexto) -> Dict:
+        # Guardado incremental: cada ventana de documentos se persiste al procesarse
+        def guardar_lote(leads_lote: List[Dict], documentos_lote: List[Dict]) -> int:
+            with ctx.metricas.medir('store'):
+                guardados = self.store(leads_lote, ctx) if leads_lote else 0
+                save_cmf_documentos(documentos_lote)
+            ctx.metricas.contar('store', filas=guardados + len(documentos_lote))
+            return guardados
+
+        with ctx.metricas.medir('scraper'):
+            result = run_hechos_esenciales(
+                documentos_procesados=get_cmf_documentos_procesados(),
+                progress_callback=ctx.progress_callback,
+                cancel_callback=ctx.cancel_callback,
+                store_callback=guardar_lote,
+                max_workers=self.max_concurrencia,
+                session=ctx.sesion
+            )
+        ctx.metricas.incrementar('paginas', result.get('paginas', 0))
+        ctx.metricas.incrementar('fichas', result.get('total_documentos', 0))
+        ctx.metricas.incrementar('documentos_fallidos', result.get('documentos_fallidos', 0))
+        for categoria, n in result.get('eventos', {}).items():
+            ctx.metricas.incrementar(f'eventos_{categoria}', n)
+        return resultado_scraper(result.get('guardados', 0), cancelado=ctx.cancelado(),
+                                 metricas=ctx.metricas.como_dict())
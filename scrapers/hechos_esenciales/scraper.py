@@ -1,50 +1,375 @@
 """
 Scraper para Hechos Esenciales (CMF - Comisión para el Mercado Financiero).
 Extrae información relevante de proyectos financieros y eventos de M&A.
+
+Pipeline por ventanas de páginas:
+1. Listado paginado, varias páginas en paralelo (sesión HTTP con pool de conexiones)
+2. Descarga de los PDF de los documentos nuevos (concurrencia acotada)
+3. Extracción de texto en un pool de procesos, a medida que llegan las descargas
+4. Clasificación M&A / financiamiento con el matcher compilado (clasificador.py)
+5. Guardado incremental por ventana vía store_callback (por id de documento)
+
+Ejecución sin conexión contra el servidor de fixtures (ver stub_server.py):
+    python -m scrapers.hechos_esenciales.scraper --base-url http://127.0.0.1:8765
 """
-from typing import List, Dict
+import argparse
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set
+from urllib.parse import parse_qs, urljoin, urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from backend.category_rules import clasificar_proyecto
+from backend.logs import configurar_logging, en_contexto
+from scrapers.hechos_esenciales.clasificador import CATEGORIA_DEFAULT, clasificar_evento
+from scrapers.hechos_esenciales.pdf_texto import extraer_texto_pdf
+
+logger = logging.getLogger(__name__)
+
+CMF_BASE_URL = os.getenv('CMF_BASE_URL', 'https://www.cmfchile.cl')
+LISTADO_PATH = '/institucional/hechos/hechos_portada.php'
+DOCUMENTO_PATH = '/sitio/aplic/serdoc/ver_sgd.php'
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'es-CL,es;q=0.9,en;q=0.8',
+}
+
+# Descarga del PDF: tamaño máximo aceptado (los hechos esenciales rara vez superan 1-2 MB)
+MAX_BYTES_DOCUMENTO = 15 * 1024 * 1024
+
+_FECHA = re.compile(r'\d{2}/\d{2}/\d{4}')
+
+
+def crear_sesion(max_conexiones: int = 4) -> requests.Session:
+    """Sesión HTTP con pool de conexiones keep-alive y reintentos ante errores transitorios."""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    reintentos = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=('GET',),
+    )
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max_conexiones, max_retries=reintentos)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def fetch_listado(session: requests.Session, base_url: str, pagina: int) -> str:
+    """Obtiene el HTML de una página del listado de hechos esenciales."""
+    try:
+        response = session.get(f"{base_url}{LISTADO_PATH}", params={'pagina': pagina}, timeout=30)
+        response.raise_for_status()
+        return response.text
+    except requests.exceptions.RequestException as e:
+        raise Exception(f"Error al obtener listado CMF (página {pagina}): {e}")
 
 
-def run_hechos_esenciales() -> List[Dict]:
+def parse_listado(html: str, base_url: str) -> List[Dict]:
+    """
+    Parsea una página del listado. Cada fila: fecha, N° documento, entidad,
+    materia y link al documento. Retorna [{documento_id, fecha, entidad, rut,
+    materia, link_documento}].
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    tabla = soup.find('table', id='listado_hechos') or soup.find('table')
+    if not tabla:
+        return []
+
+    filings = []
+    for tr in tabla.find_all('tr'):
+        celdas = tr.find_all('td')
+        if len(celdas) < 5:
+            continue
+        fecha = celdas[0].get_text(strip=True)
+        if not _FECHA.match(fecha):
+            continue
+
+        link_entidad = celdas[2].find('a')
+        link_doc = celdas[4].find('a')
+        href_doc = link_doc.get('href', '') if link_doc else ''
+        documento_id = celdas[1].get_text(strip=True) or parse_qs(urlparse(href_doc).query).get('s567', [''])[0]
+        if not documento_id:
+            continue
+
+        rut = ''
+        if link_entidad:
+            rut = parse_qs(urlparse(link_entidad.get('href', '')).query).get('rut', [''])[0]
+
+        filings.append({
+            'documento_id': documento_id,
+            'fecha': fecha,
+            'entidad': celdas[2].get_text(strip=True),
+            'rut': rut,
+            'materia': celdas[3].get_text(strip=True),
+            'link_documento': urljoin(base_url, href_doc) if href_doc else '',
+        })
+    return filings
+
+
+def fetch_documento(session: requests.Session, url: str) -> Optional[bytes]:
+    """
+    Descarga el PDF de un documento. Retorna b'' si el hecho no tiene documento y
+    None si la descarga falla (el hecho se clasifica solo por materia y el documento
+    no se registra como procesado, para reintentarlo en la próxima ejecución).
+    """
+    if not url:
+        return b''
+    try:
+        response = session.get(url, timeout=60, stream=True)
+        response.raise_for_status()
+        contenido = bytearray()
+        for chunk in response.iter_content(64 * 1024):
+            contenido += chunk
+            if len(contenido) > MAX_BYTES_DOCUMENTO:
+                logger.warning("Documento demasiado grande, se omite", extra={'url': url})
+                return None
+        return bytes(contenido)
+    except requests.exceptions.RequestException as e:
+        logger.warning("Error al descargar documento", extra={'url': url, 'error': str(e)})
+        return None
+
+
+def construir_lead(filing: Dict, texto: str, clasificacion: Dict) -> Dict:
+    """Normaliza un hecho esencial clasificado al formato de lead."""
+    # Solo entidad + materia: el cuerpo de todo hecho esencial ("Hecho Esencial...")
+    # dispara keywords por substring (p. ej. "sen") y sesga la industria
+    industria = clasificar_proyecto(filing['entidad'], filing['materia'])
+    raw_data = {
+        'documento_id': filing['documento_id'],
+        'entidad': filing['entidad'],
+        'titular': filing['entidad'],
+        'rut': filing['rut'],
+        'materia': filing['materia'],
+        'fecha': filing['fecha'],
+        'link_documento': filing['link_documento'],
+        'tipo': clasificacion['tipo_evento'],
+        'categoria_evento': clasificacion['categoria_evento'],
+        'eventos': clasificacion['eventos'],
+        'keywords': clasificacion['keywords'],
+        'industria': industria['categoria_principal'],
+        'categorias_secundarias': industria['categorias_secundarias'],
+        'industria_color': industria['color'],
+        'industria_color_name': industria['color_name'],
+    }
+    if texto:
+        raw_data['descripcion_completa'] = texto
+
+    return {
+        'source': 'Hechos Esenciales',
+        'project_name': f"{filing['entidad']}: {filing['materia']}",
+        'date': filing['fecha'],
+        'sector': clasificacion['categoria_evento'],
+        'description': f"{filing['entidad']}. {filing['materia']}. Evento: {clasificacion['tipo_evento'] or 'N/A'}.",
+        'raw_data': raw_data,
+    }
+
+
+def run_hechos_esenciales(documentos_procesados: Optional[Set[str]] = None,
+                          progress_callback=None, cancel_callback=None,
+                          store_callback: Optional[Callable[[List[Dict], List[Dict]], int]] = None,
+                          base_url: Optional[str] = None, max_paginas: int = 20,
+                          max_workers: int = 4, procesos_pdf: int = 2,
+                          solo_relevantes: bool = True,
+                          session: Optional[requests.Session] = None) -> Dict:
     """
     Ejecuta el scraper de Hechos Esenciales.
-    Retorna lista de dicts con campos: source, project_name, date, sector, description, raw_data
-    
-    TODO: Implementar scraping del sitio de Hechos Esenciales de la CMF.
-    Por ahora retorna datos de ejemplo.
+    Retorna dict con: {new_leads: [...], documentos: [...], guardados: N, eventos: {categoria: N},
+    paginas: N, total_documentos: N, documentos_fallidos: N}
+
+    Los documentos cuya descarga falló generan su lead (clasificado por materia) pero
+    no van en `documentos`: no quedan como procesados y se reintentan en la próxima
+    ejecución, que actualiza el lead (upsert por documento_id).
+
+    Args:
+        documentos_procesados: ids de documentos ya procesados (no se vuelven a descargar)
+        progress_callback: Función para reportar progreso (recibe porcentaje y mensaje)
+        cancel_callback: Función para verificar si se debe cancelar (retorna True para cancelar)
+        store_callback: Si se indica, se llama por cada ventana con (leads, documentos) y
+            retorna cuántos leads guardó; new_leads y documentos vuelven vacíos.
+            Sin él, todo se acumula y se retorna al final.
+        base_url: Sitio CMF (o el servidor de fixtures para pruebas sin conexión)
+        max_paginas: Máximo de páginas del listado a recorrer
+        max_workers: Conexiones/descargas concurrentes (y páginas por ventana)
+        procesos_pdf: Procesos para extraer texto de los PDF (0 = en el mismo proceso)
+        solo_relevantes: Si es True, solo los eventos M&A/financiamiento generan leads
+        session: Sesión HTTP compartida; si no se indica se crea (y se cierra) una propia
     """
-    print("🔄 Iniciando scraper Hechos Esenciales...")
-    
-    # TODO: Implementar scraping real del sitio de CMF
-    # Por ahora retornamos datos de ejemplo para que el sistema funcione
-    
-    leads = [
-        {
-            'source': 'Hechos Esenciales',
-            'project_name': 'Fusión Empresa A y Empresa B',
-            'date': '2024-01-15',
-            'sector': 'Finanzas',
-            'description': 'Anuncio de fusión entre dos empresas del sector financiero. Valor estimado: USD 150M.',
-            'raw_data': {
-                'tipo': 'Fusión',
-                'valor': 150000000,
-                'moneda': 'USD'
-            }
-        },
-        {
-            'source': 'Hechos Esenciales',
-            'project_name': 'OPA sobre Acciones de Empresa C',
-            'date': '2024-01-14',
-            'sector': 'Tecnología',
-            'description': 'Oferta Pública de Adquisición sobre el 30% de las acciones de Empresa C.',
-            'raw_data': {
-                'tipo': 'OPA',
-                'porcentaje': 30
-            }
+    logger.info("Iniciando scraper Hechos Esenciales")
+
+    base_url = (base_url or CMF_BASE_URL).rstrip('/')
+    procesados = set(documentos_procesados or ())
+    leads_acumulados = []
+    documentos_acumulados = []
+    eventos = {}
+    guardados = 0
+    total_documentos = 0
+    documentos_fallidos = 0
+    paginas_descargadas = 0
+    conocidos_consecutivos = 0
+    max_conocidos_consecutivos = 10  # Detener después de 10 documentos ya procesados seguidos
+
+    def is_cancelled():
+        return cancel_callback and cancel_callback()
+
+    def report_progress(percent, msg):
+        logger.debug(msg, extra={'percent': percent})
+        if progress_callback:
+            progress_callback(percent, msg)
+
+    def resultado(cancelado: bool = False) -> Dict:
+        return {
+            'new_leads': [] if cancelado else leads_acumulados,
+            'documentos': [] if cancelado else documentos_acumulados,
+            'guardados': guardados,
+            'eventos': eventos,
+            'paginas': paginas_descargadas,
+            'total_documentos': total_documentos,
+            'documentos_fallidos': documentos_fallidos,
         }
-    ]
-    
-    print(f"✅ Scraping Hechos Esenciales completado: {len(leads)} leads obtenidos")
-    
-    return leads
 
+    sesion_propia = session is None
+    if sesion_propia:
+        session = crear_sesion(max_workers)
+    hilos = ThreadPoolExecutor(max_workers=max_workers)
+    # spawn: el scraper corre dentro de un thread del servidor, fork no es seguro ahí
+    procesos = (
+        ProcessPoolExecutor(max_workers=procesos_pdf, mp_context=multiprocessing.get_context('spawn'))
+        if procesos_pdf > 0 else None
+    )
+
+    try:
+        report_progress(0, "Obteniendo hechos esenciales...")
+        pagina = 1
+        fin = False
+
+        while not fin and pagina <= max_paginas:
+            if is_cancelled():
+                report_progress(0, "Cancelado")
+                return resultado(cancelado=True)
+
+            # Fase 1: listado de la ventana de páginas, en paralelo
+            ventana = list(range(pagina, min(pagina + max_workers, max_paginas + 1)))
+            report_progress(int((pagina - 1) / max_paginas * 95), f"Páginas {ventana[0]}-{ventana[-1]}...")
+            listados = hilos.map(en_contexto(lambda p: parse_listado(fetch_listado(session, base_url, p), base_url)),
+                                 ventana)
+            paginas_descargadas += len(ventana)
+
+            nuevos = []
+            for filings in listados:
+                if not filings:
+                    fin = True
+                    break
+                for filing in filings:
+                    if filing['documento_id'] in procesados:
+                        conocidos_consecutivos += 1
+                        if conocidos_consecutivos >= max_conocidos_consecutivos:
+                            fin = True
+                            break
+                    else:
+                        conocidos_consecutivos = 0
+                        procesados.add(filing['documento_id'])
+                        nuevos.append(filing)
+                if fin:
+                    break
+            pagina += len(ventana)
+
+            if not nuevos:
+                continue
+
+            # Fase 2 y 3: descargas en threads; cada PDF pasa al pool de procesos apenas llega
+            descargas = hilos.map(en_contexto(lambda f: fetch_documento(session, f['link_documento'])), nuevos)
+            descargados = []
+            if procesos:
+                textos_futuros = []
+                for contenido in descargas:
+                    descargados.append(contenido is not None)
+                    textos_futuros.append(procesos.submit(extraer_texto_pdf, contenido or b''))
+                textos = [futuro.result() for futuro in textos_futuros]
+            else:
+                descargas = list(descargas)
+                descargados = [contenido is not None for contenido in descargas]
+                textos = [extraer_texto_pdf(contenido or b'') for contenido in descargas]
+
+            if is_cancelled():
+                report_progress(0, "Cancelado")
+                return resultado(cancelado=True)
+
+            # Fase 4: clasificación y normalización
+            leads_ventana = []
+            documentos_ventana = []
+            for filing, texto, descargado in zip(nuevos, textos, descargados):
+                clasificacion = clasificar_evento(filing['materia'], texto)
+                categoria = clasificacion['categoria_evento']
+                eventos[categoria] = eventos.get(categoria, 0) + 1
+                relevante = categoria != CATEGORIA_DEFAULT
+                if descargado:
+                    documentos_ventana.append({
+                        'documento_id': filing['documento_id'],
+                        'fecha': filing['fecha'],
+                        'entidad': filing['entidad'],
+                        'materia': filing['materia'],
+                        'tipo_evento': clasificacion['tipo_evento'],
+                        'categoria_evento': categoria,
+                        'relevante': relevante,
+                    })
+                else:
+                    documentos_fallidos += 1
+                if relevante or not solo_relevantes:
+                    leads_ventana.append(construir_lead(filing, texto, clasificacion))
+            total_documentos += len(nuevos)
+
+            # Fase 5: guardado incremental de la ventana
+            if store_callback:
+                guardados += store_callback(leads_ventana, documentos_ventana)
+            else:
+                leads_acumulados.extend(leads_ventana)
+                documentos_acumulados.extend(documentos_ventana)
+
+            n_leads = guardados if store_callback else len(leads_acumulados)
+            report_progress(
+                min(95, int((pagina - 1) / max_paginas * 95)),
+                f"{total_documentos} documentos procesados, {n_leads} eventos relevantes"
+            )
+
+        resumen = ', '.join(f"{cat}: {n}" for cat, n in sorted(eventos.items())) or 'sin documentos nuevos'
+        report_progress(100, f"Completado: {total_documentos} documentos ({resumen})")
+        logger.info("Scraper Hechos Esenciales completado", extra={
+            'documentos': total_documentos, 'paginas': paginas_descargadas, 'eventos': eventos,
+            'documentos_fallidos': documentos_fallidos,
+        })
+        return resultado()
+
+    except Exception as e:
+        logger.error("Error en scraper Hechos Esenciales: %s", e)
+        raise
+    finally:
+        hilos.shutdown(wait=False, cancel_futures=True)
+        if procesos:
+            procesos.shutdown(wait=False, cancel_futures=True)
+        if sesion_propia:
+            session.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scraper de Hechos Esenciales (CMF)')
+    parser.add_argument('--base-url', default=CMF_BASE_URL)
+    parser.add_argument('--max-paginas', type=int, default=20)
+    parser.add_argument('--todos', action='store_true', help='Incluir también eventos no relevantes')
+    args = parser.parse_args()
+
+    configurar_logging()
+    resultado = run_hechos_esenciales(base_url=args.base_url, max_paginas=args.max_paginas,
+                                      solo_relevantes=not args.todos)
+    for lead in resultado['new_leads']:
+        raw = lead['raw_data']
+        print(f"  [{raw['categoria_evento']}/{raw['tipo']}] {lead['date']} {lead['project_name']}")
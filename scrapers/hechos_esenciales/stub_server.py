@@ -0,0 +1,89 @@
+"""
+Servidor HTTP local que imita el sitio de Hechos Esenciales de la CMF a partir
+de las páginas de fixtures/, para ejecutar el scraper sin conexión.
+
+- {LISTADO_PATH}?pagina=N  -> fixtures/listado_N.html (listado vacío si no existe)
+- {DOCUMENTO_PATH}?s567=ID -> fixtures/documentos/ID.pdf (404 si no existe)
+
+Uso (desde la raíz del proyecto):
+    python -m scrapers.hechos_esenciales.stub_server --puerto 8765
+    python -m scrapers.hechos_esenciales.scraper --base-url http://127.0.0.1:8765
+"""
+
+import argparse
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+from urllib.parse import parse_qs, urlparse
+
+from scrapers.hechos_esenciales.scraper import DOCUMENTO_PATH, LISTADO_PATH
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+_LISTADO_VACIO = '''<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8"></head>
+<body><table id="listado_hechos" class="tabla"><tbody></tbody></table></body></html>
+'''
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fixtures_dir = FIXTURES_DIR
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+
+        if url.path == LISTADO_PATH:
+            pagina = params.get('pagina', ['1'])[0]
+            ruta = os.path.join(self.fixtures_dir, f'listado_{int(pagina)}.html')
+            if os.path.exists(ruta):
+                with open(ruta, 'rb') as f:
+                    self._responder(200, f.read(), 'text/html; charset=utf-8')
+            else:
+                self._responder(200, _LISTADO_VACIO.encode('utf-8'), 'text/html; charset=utf-8')
+            return
+
+        if url.path == DOCUMENTO_PATH:
+            documento_id = os.path.basename(params.get('s567', [''])[0])
+            ruta = os.path.join(self.fixtures_dir, 'documentos', f'{documento_id}.pdf')
+            if documento_id and os.path.exists(ruta):
+                with open(ruta, 'rb') as f:
+                    self._responder(200, f.read(), 'application/pdf')
+                return
+
+        self._responder(404, b'Not Found', 'text/plain')
+
+    def _responder(self, status: int, cuerpo: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format, *args):
+        pass  # Silencioso: el scraper ya reporta su progreso
+
+
+def iniciar_servidor(puerto: int = 0, fixtures_dir: str = FIXTURES_DIR) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Inicia el servidor en un thread (puerto 0 = puerto libre aleatorio).
+    Retorna (servidor, base_url); detener con servidor.shutdown().
+    """
+    handler = type('FixturesHandler', (_Handler,), {'fixtures_dir': fixtures_dir})
+    servidor = ThreadingHTTPServer(('127.0.0.1', puerto), handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f'http://127.0.0.1:{servidor.server_address[1]}'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor local de fixtures CMF')
+    parser.add_argument('--puerto', type=int, default=8765)
+    args = parser.parse_args()
+
+    servidor, base_url = iniciar_servidor(args.puerto)
+    print(f"🧪 Servidor de fixtures CMF en {base_url} (Ctrl+C para detener)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
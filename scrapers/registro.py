@@ -0,0 +1,42 @@
+"""
+Registro de scrapers. Incluye los plugins del repositorio y los que otros
+paquetes instalados declaren como entry point en el grupo 'masterscraper.scrapers':
+
+    [project.entry-points."masterscraper.scrapers"]
+    mi_fuente = "mi_paquete.plugin:MiFuentePlugin"
+
+El entry point puede apuntar a una subclase de ScraperPlugin o a una instancia.
+"""
+
+import logging
+from importlib.metadata import entry_points
+from typing import Dict
+
+from scrapers.framework import ScraperPlugin
+
+logger = logging.getLogger(__name__)
+
+GRUPO_ENTRY_POINTS = 'masterscraper.scrapers'
+
+
+def _plugins_incluidos() -> Dict[str, ScraperPlugin]:
+    from scrapers.hechos_esenciales.plugin import HechosEsencialesPlugin
+    from scrapers.seia.plugin import SeiaPlugin
+    return {plugin.nombre: plugin for plugin in (SeiaPlugin(), HechosEsencialesPlugin())}
+
+
+def descubrir_plugins() -> Dict[str, ScraperPlugin]:
+    """Retorna {nombre: plugin}. Un plugin externo con el mismo nombre reemplaza al incluido."""
+    plugins = _plugins_incluidos()
+    for ep in entry_points(group=GRUPO_ENTRY_POINTS):
+        try:
+            cargado = ep.load()
+            plugin = cargado() if isinstance(cargado, type) else cargado
+            if not isinstance(plugin, ScraperPlugin):
+                raise TypeError(f"{ep.value} no es un ScraperPlugin")
+            plugin.nombre = plugin.nombre or ep.name
+            plugins[plugin.nombre] = plugin
+            logger.info("Plugin de scraper cargado: %s (%s)", plugin.nombre, ep.value)
+        except Exception as e:
+            logger.warning("No se pudo cargar el plugin %s: %s", ep.name, e)
+    return plugins
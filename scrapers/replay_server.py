@@ -0,0 +1,149 @@
+"""
+Servidor HTTP local que reproduce un archivo de fixtures grabado con
+scrapers/grabacion.py, con latencia, jitter e inyección de errores configurables.
+
+Las URLs absolutas del sitio original dentro de las respuestas (p. ej. los links a
+las fichas en el JSON del listado) se reescriben al servidor local, así el scraper
+sigue los links sin salir a internet.
+
+Uso (desde la raíz del proyecto):
+    python -m scrapers.replay_server --archivo data/fixtures/seia --latencia 0.08 --jitter 0.04 --errores 0.02
+    python -m scrapers.seia.scraper --base-url http://127.0.0.1:8767
+"""
+
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+from scrapers.grabacion import ARCHIVO_DEFAULT, ArchivoFixtures, clave_request
+
+
+class ConfigReplay:
+    """Latencia y errores a simular, más contadores de lo servido."""
+
+    def __init__(self, latencia: float = 0.0, jitter: float = 0.0, tasa_errores: float = 0.0,
+                 status_error: int = 503, tasa_cortes: float = 0.0, semilla: int = 42):
+        self.latencia = latencia  # segundos por respuesta
+        self.jitter = jitter  # +- segundos (uniforme)
+        self.tasa_errores = tasa_errores  # probabilidad de responder status_error
+        self.status_error = status_error
+        self.tasa_cortes = tasa_cortes  # probabilidad de cerrar la conexión sin responder
+        self._random = random.Random(semilla)
+        self._lock = threading.Lock()
+        self.estadisticas = {'requests': 0, 'servidas': 0, 'bytes': 0, 'errores': 0, 'cortes': 0, 'no_grabadas': 0}
+
+    def sortear(self) -> Tuple[str, float]:
+        """Decide qué pasa con un request: ('ok'|'error'|'corte', demora)."""
+        with self._lock:
+            self.estadisticas['requests'] += 1
+            demora = max(0.0, self.latencia + self._random.uniform(-self.jitter, self.jitter))
+            r = self._random.random()
+            if r < self.tasa_cortes:
+                return 'corte', demora
+            if r < self.tasa_cortes + self.tasa_errores:
+                return 'error', demora
+            return 'ok', demora
+
+    def contar(self, **valores):
+        with self._lock:
+            for nombre, valor in valores.items():
+                self.estadisticas[nombre] += valor
+
+
+class _Handler(BaseHTTPRequestHandler):
+    archivo: ArchivoFixtures = None
+    config: ConfigReplay = None
+    base_url = ''
+    protocol_version = 'HTTP/1.1'  # keep-alive, como el sitio real
+
+    def _servir(self, metodo: str):
+        largo = int(self.headers.get('Content-Length') or 0)
+        cuerpo_request = self.rfile.read(largo) if largo else b''
+        resultado, demora = self.config.sortear()
+        time.sleep(demora)
+
+        if resultado == 'corte':
+            self.config.contar(cortes=1)
+            self.close_connection = True
+            return
+        if resultado == 'error':
+            self.config.contar(errores=1)
+            self._responder(self.config.status_error, b'Error simulado', 'text/plain', {'Retry-After': '1'})
+            return
+
+        grabada = self.archivo.leer(clave_request(metodo, self.path, cuerpo_request))
+        if grabada is None:
+            self.config.contar(no_grabadas=1)
+            self._responder(404, b'No grabado', 'text/plain')
+            return
+        meta, cuerpo = grabada
+        if self.archivo.origen:
+            # Links absolutos al sitio original -> servidor local (también escapados en JSON)
+            cuerpo = cuerpo.replace(self.archivo.origen.encode(), self.base_url.encode())
+            cuerpo = cuerpo.replace(self.archivo.origen.replace('/', '\\/').encode(),
+                                    self.base_url.replace('/', '\\/').encode())
+        self.config.contar(servidas=1, bytes=len(cuerpo))
+        self._responder(meta['status'], cuerpo, meta['content_type'])
+
+    def do_GET(self):
+        self._servir('GET')
+
+    def do_POST(self):
+        self._servir('POST')
+
+    def _responder(self, status: int, cuerpo: bytes, content_type: str, extra_headers: dict = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        for nombre, valor in (extra_headers or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format, *args):
+        pass  # Silencioso: los contadores quedan en ConfigReplay.estadisticas
+
+
+def iniciar_servidor(archivo: ArchivoFixtures, puerto: int = 0,
+                     config: Optional[ConfigReplay] = None) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Inicia el servidor en un thread (puerto 0 = puerto libre aleatorio).
+    Retorna (servidor, base_url); servidor.config tiene los contadores.
+    Detener con servidor.shutdown().
+    """
+    config = config or ConfigReplay()
+    handler = type('ReplayHandler', (_Handler,), {'archivo': archivo, 'config': config})
+    servidor = ThreadingHTTPServer(('127.0.0.1', puerto), handler)
+    servidor.daemon_threads = True
+    handler.base_url = f'http://127.0.0.1:{servidor.server_address[1]}'
+    servidor.config = config
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, handler.base_url
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reproduce un archivo de fixtures HTTP')
+    parser.add_argument('--archivo', default=ARCHIVO_DEFAULT)
+    parser.add_argument('--puerto', type=int, default=8767)
+    parser.add_argument('--latencia', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--errores', type=float, default=0.0, help='Probabilidad de responder --status-error')
+    parser.add_argument('--status-error', type=int, default=503)
+    parser.add_argument('--cortes', type=float, default=0.0, help='Probabilidad de cortar la conexión')
+    args = parser.parse_args()
+
+    archivo = ArchivoFixtures(args.archivo)
+    if not len(archivo):
+        parser.error(f"{args.archivo} no tiene respuestas grabadas (ver python -m scrapers.grabacion)")
+    config = ConfigReplay(args.latencia, args.jitter, args.errores, args.status_error, args.cortes)
+    servidor, base_url = iniciar_servidor(archivo, args.puerto, config)
+    print(f"🎞️  Replay de {len(archivo)} respuestas en {base_url} (Ctrl+C para detener)")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"   {config.estadisticas}")
+    except KeyboardInterrupt:
+        servidor.shutdown()
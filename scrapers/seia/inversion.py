@@ -0,0 +1,152 @@
+"""
+Parseo del monto de inversión del SEIA (INVERSION_MM_FORMAT) a millones de dólares.
+
+El SEIA devuelve valores en MMUS (millones de USD) con formato chileno: punto para
+miles, coma para decimales. Ejemplos de entrada y salida:
+- "1.300,0000" → 1300.0 (punto miles, coma decimal)
+- "64,1092" → 64.1092 (coma es decimal)
+- "0,40" → 0.4 (coma es decimal)
+- "850.000.000" → 850000000.0 (múltiples puntos = miles)
+- "0.40" → 0.4 (un punto sin 3 dígitos después = decimal)
+- "850.000" → 850000.0, ambigua (un punto y 3 dígitos: se toma como miles,
+  pero podría ser 850,0 con punto decimal)
+
+parsear_inversion() memoiza por texto (en un listado los montos se repiten) y
+parsear_inversiones() procesa una página o columna completa, con operaciones de
+strings vectorizadas de pandas si la columna ya viene como Series.
+"""
+
+import functools
+import importlib.util
+import re
+from typing import Any, List, NamedTuple, Optional, Sequence
+
+try:
+    import pandas as pd
+except ImportError:  # pandas es opcional (requirements-optional.txt)
+    pd = None
+
+# Strings respaldados por Arrow (operaciones en C++) si pyarrow está instalado
+_TIPO_TEXTO = 'string[pyarrow]' if importlib.util.find_spec('pyarrow') else object
+
+# Prefijos/sufijos y espacios: "US$ 12,5 MM" -> "12,5"
+_SIMBOLOS = re.compile(r'[US$\s]', re.IGNORECASE)
+_SUFIJO_MM = re.compile(r'MM$', re.IGNORECASE)
+
+# Lotes más grandes (backfills, columnas completas) no pasan por la cache: serían casi todos
+# fallos que además desalojan los montos frecuentes del listado
+UMBRAL_LOTE = 5000
+
+
+class Inversion(NamedTuple):
+    millones: Optional[float]
+    ambigua: bool = False  # un solo punto seguido de 3 dígitos ("850.000"): miles o decimal
+
+
+_SIN_VALOR = Inversion(None)
+
+
+def _limpiar(texto: str) -> str:
+    return _SUFIJO_MM.sub('', _SIMBOLOS.sub('', texto.strip())).strip()
+
+
+@functools.lru_cache(maxsize=8192)
+def _parsear_texto(texto: str) -> Inversion:
+    limpio = _limpiar(texto)
+    if not limpio:
+        return _SIN_VALOR
+
+    num_puntos = limpio.count('.')
+    tiene_coma = ',' in limpio
+    ambigua = False
+
+    if tiene_coma and num_puntos > 0:
+        # Formato completo: "1.300,50" → punto=miles, coma=decimal
+        limpio = limpio.replace('.', '').replace(',', '.')
+    elif tiene_coma:
+        # Solo coma = decimal: "64,1092" → 64.1092
+        limpio = limpio.replace(',', '.')
+    elif num_puntos > 1:
+        # Múltiples puntos = todos son separadores de miles: "850.000.000" → 850000000
+        limpio = limpio.replace('.', '')
+    elif num_puntos == 1:
+        # Un solo punto con exactamente 3 dígitos después → separador de miles (ambiguo);
+        # si no, el punto es decimal ("0.40" → 0.40)
+        entero, decimales = limpio.split('.')
+        if len(decimales) == 3 and decimales.isdigit():
+            limpio = entero + decimales
+            ambigua = True
+
+    try:
+        valor = float(limpio)
+    except ValueError:
+        return _SIN_VALOR
+    return Inversion(valor, ambigua) if valor > 0 else _SIN_VALOR
+
+
+def parsear_inversion(texto: Any) -> Inversion:
+    """Parsea un monto del SEIA; Inversion(None) si está vacío o no es un número positivo."""
+    if not texto or not isinstance(texto, str):
+        return _SIN_VALOR
+    return _parsear_texto(texto)
+
+
+def parse_inversion_millones(texto: Any) -> Optional[float]:
+    """Solo el valor en millones de USD (None si no se puede parsear)."""
+    return parsear_inversion(texto).millones
+
+
+def _parsear_vectorizado(valores: Sequence[Any]) -> List[Inversion]:
+    """Las mismas reglas con operaciones de strings de pandas sobre toda la columna."""
+    if isinstance(valores, pd.Series) and valores.dtype != object:
+        serie = valores.fillna('')
+    else:
+        serie = pd.Series([valor if isinstance(valor, str) else '' for valor in valores],
+                          dtype=_TIPO_TEXTO)
+    limpio = (serie.str.strip()
+              .str.replace(r'(?i)[US$\s]', '', regex=True)
+              .str.replace(r'(?i)MM$', '', regex=True)
+              .str.strip())
+
+    num_puntos = limpio.str.count(r'\.')
+    tiene_coma = limpio.str.contains(',', regex=False).astype(bool)
+    sin_puntos = limpio.str.replace('.', '', regex=False)
+    miles_un_punto = ~tiene_coma & (num_puntos == 1) & limpio.str.fullmatch(r'[^.]*\.\d{3}').astype(bool)
+
+    normalizado = limpio.where(~tiene_coma, limpio.str.replace(',', '.', regex=False))
+    normalizado = normalizado.where(~(tiene_coma & (num_puntos > 0)), sin_puntos.str.replace(',', '.', regex=False))
+    normalizado = normalizado.where(~(~tiene_coma & ((num_puntos > 1) | miles_un_punto)), sin_puntos)
+    numeros = pd.to_numeric(normalizado, errors='coerce').astype('float64')
+
+    resultado = []
+    for valor, vacio, ambigua, numero in zip(serie.tolist(), (limpio == '').tolist(), miles_un_punto.tolist(),
+                                             numeros.tolist()):
+        if vacio:
+            resultado.append(_SIN_VALOR)
+        elif numero != numero:
+            # NaN: float() acepta formas que to_numeric no ("1_000", dígitos no ASCII)
+            resultado.append(_parsear_texto.__wrapped__(valor))
+        else:
+            resultado.append(Inversion(numero, ambigua) if numero > 0 else _SIN_VALOR)
+    return resultado
+
+
+def parsear_inversiones(valores: Sequence[Any], vectorizar: Optional[bool] = None) -> List[Inversion]:
+    """
+    Parsea una columna completa (p. ej. el INVERSION_MM_FORMAT de una página del listado).
+
+    Hasta UMBRAL_LOTE valores usa la cache por texto (las páginas del listado repiten
+    montos entre ejecuciones); con más, la cache solo agrega costo y se parsea directo.
+
+    vectorizar: usar las operaciones de strings de pandas (Arrow si pyarrow está
+    instalado). Por defecto solo si valores ya es una Series de pandas: partiendo de
+    una lista, armar la Series y volver a objetos Python cuesta más que el loop.
+    """
+    if vectorizar is None:
+        vectorizar = pd is not None and isinstance(valores, pd.Series)
+    if vectorizar and pd is not None and len(valores):
+        return _parsear_vectorizado(valores)
+    if len(valores) < UMBRAL_LOTE:
+        return [parsear_inversion(valor) for valor in valores]
+    parsear = _parsear_texto.__wrapped__
+    return [parsear(valor) if valor and isinstance(valor, str) else _SIN_VALOR for valor in valores]
@@ -0,0 +1,70 @@
+"""
+Plugin SEIA. Sobrescribe ejecutar(): el scraper compara cada proyecto con los ya
+guardados (hash de contenido) y además de leads nuevos produce cambios de campos
+y de estado. Todo se entrega por lotes a medida que avanza el pipeline y se
+aplica aquí sobre la BD.
+"""
+
+import logging
+from typing import Dict, List
+
+from backend.database import (
+    get_seia_project_index, save_estado_change, save_field_changes, update_lead_fields
+)
+from scrapers.framework import Contexto, ScraperPlugin, resultado_scraper
+from scrapers.seia.scraper import run_seia
+
+logger = logging.getLogger(__name__)
+
+
+class SeiaPlugin(ScraperPlugin):
+    nombre = 'seia'
+    etiqueta = 'SEIA'
+    max_concurrencia = 4
+    tamano_lote = 25
+
+    def ejecutar(self, ctx: Contexto) -> Dict:
+        # Índice compacto de los proyectos existentes (código, lead_id, estado y hash)
+        existing_projects = get_seia_project_index()
+        logger.info("Encontrados %d proyectos SEIA existentes en BD", len(existing_projects))
+
+        conteo = {'estado_changes': 0, 'field_changes': 0}
+
+        # run_seia mide el guardado como etapa 'guardado' (tiempo, CPU y filas escritas)
+        def guardar_lote(leads: List[Dict], field_changes: List[Dict], estado_changes: List[Dict]) -> int:
+            # Actualizar solo los leads cuyo hash de contenido cambió
+            for change in field_changes:
+                update_lead_fields(change['lead_id'], change['raw_data'], change['content_hash'])
+                save_field_changes(change['lead_id'], change['codigo_seia'],
+                                   change['project_name'], change['cambios'])
+
+            # Registrar los cambios de estado (el lead ya fue actualizado arriba)
+            for change in estado_changes:
+                save_estado_change(change['lead_id'], change['codigo_seia'], change['project_name'],
+                                   change['estado_anterior'], change['estado_nuevo'])
+
+            conteo['field_changes'] += len(field_changes)
+            conteo['estado_changes'] += len(estado_changes)
+            return self.store(leads, ctx) if leads else 0
+
+        with ctx.metricas.medir('scraper'):
+            result = run_seia(
+                existing_projects=existing_projects,
+                progress_callback=ctx.progress_callback,
+                cancel_callback=ctx.cancel_callback,
+                session=ctx.sesion,
+                store_callback=guardar_lote,
+                tamano_lote=self.tamano_lote,
+                max_workers=self.max_concurrencia,
+                metricas=ctx.metricas
+            )
+
+        if conteo['estado_changes']:
+            logger.info("Se detectaron %d cambios de estado", conteo['estado_changes'])
+
+        etapas = result.get('etapas', {})
+        ctx.metricas.incrementar('paginas', etapas.get('listado', {}).get('paginas', 0))
+        ctx.metricas.incrementar('paginas_fallidas', etapas.get('listado', {}).get('paginas_fallidas', 0))
+        ctx.metricas.incrementar('fichas', etapas.get('descripciones', 0))
+        return resultado_scraper(result.get('guardados', 0), conteo['estado_changes'], conteo['field_changes'],
+                                 cancelado=ctx.cancelado(), metricas=ctx.metricas.como_dict())
@@ -2,13 +2,39 @@
 Scraper para SEIA (Sistema de Evaluación de Impacto Ambiental).
 Reutiliza código del proyecto SEIA Scraper original.
 """
+import logging
+import os
+import re
 import time
-from typing import List, Dict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
 import requests
 from bs4 import BeautifulSoup
 
 # Importar clasificación por keywords
 from backend.category_rules import clasificar_proyecto
+from backend.change_detection import IndiceProyectosSeia, calcular_hash_contenido, diff_campos
+from backend.logs import configurar_logging, en_contexto
+from backend.vocabulario import clave as clave_estado
+
+from scrapers.seia.inversion import parsear_inversiones
+from scrapers.servicios import CircuitoAbierto, Metricas, Servicios
+
+logger = logging.getLogger(__name__)
+
+# Sitio del SEIA (o el servidor local de stub_server.py para pruebas sin conexión)
+SEIA_BASE_URL = os.getenv('SEIA_BASE_URL', 'https://seia.sea.gob.cl')
+LISTADO_PATH = '/busqueda/buscarProyectoResumenAction.php'
+
+_ESPACIOS = re.compile(r'\s+')
+
+# Página del listado que falla aun después de los reintentos de la sesión: se vuelve a
+# pedir REINTENTOS_PAGINA veces (pausa que se duplica) y si sigue fallando se salta.
+# Tras MAX_PAGINAS_FALLIDAS páginas saltadas seguidas se termina el listado.
+REINTENTOS_PAGINA = 2
+PAUSA_REINTENTO_PAGINA = 5.0
+MAX_PAGINAS_FALLIDAS = 3
 
 # Variable global para controlar si ya esperamos los 15 segundos iniciales
 _PRIMERA_EJECUCION = True
@@ -31,20 +57,24 @@ SECTOR_TO_INDUSTRIA = {
 }
 
 
-def fetch_datos_listado(pagina: int = 1, registros_por_pagina: int = 100) -> dict:
+def fetch_datos_listado(pagina: int = 1, registros_por_pagina: int = 100, session=None, base_url: str = None) -> dict:
     """
     Obtiene los datos del listado de proyectos del SEIA desde el endpoint API.
     Por defecto obtiene 100 registros por página para mayor eficiencia.
+    Con session se reutiliza una sesión compartida (keep-alive, límite adaptativo,
+    reintentos y métricas).
     """
     global _PRIMERA_EJECUCION
     
-    # ESPERA OBLIGATORIA DE 15 SEGUNDOS antes de la primera request
-    if _PRIMERA_EJECUCION:
-        print("⏳ Esperando 15 segundos para permitir renderizado completo del sitio...")
+    base_url = (base_url or SEIA_BASE_URL).rstrip('/')
+    
+    # ESPERA OBLIGATORIA DE 15 SEGUNDOS antes de la primera request (no aplica al servidor local)
+    if _PRIMERA_EJECUCION and base_url == SEIA_BASE_URL.rstrip('/'):
+        logger.info("Esperando 15 segundos para permitir renderizado completo del sitio")
         time.sleep(15)
         _PRIMERA_EJECUCION = False
     
-    url = "https://seia.sea.gob.cl/busqueda/buscarProyectoResumenAction.php"
+    url = f"{base_url}{LISTADO_PATH}"
     
     start = (pagina - 1) * registros_por_pagina
     offset = (start / 10) + 1
@@ -73,21 +103,23 @@ def fetch_datos_listado(pagina: int = 1, registros_por_pagina: int = 100) -> dic
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
         'Content-Type': 'application/x-www-form-urlencoded',
-        'Referer': 'https://seia.sea.gob.cl/busqueda/buscarProyectoResumen.php',
-        'Origin': 'https://seia.sea.gob.cl'
+        'Referer': f'{base_url}/busqueda/buscarProyectoResumen.php',
+        'Origin': base_url
     }
     
     try:
-        response = requests.post(url, data=data, headers=headers, timeout=30)
+        response = (session or requests).post(url, data=data, headers=headers, timeout=30)
         response.raise_for_status()
         return response.json()
+    except CircuitoAbierto:
+        raise  # el sitio no responde: no tiene sentido reintentar la página
     except requests.exceptions.RequestException as e:
         raise Exception(f"Error al obtener datos del API: {e}")
     except ValueError as e:
         raise Exception(f"Error al parsear JSON: {e}. Respuesta: {response.text[:500]}")
 
 
-def fetch_descripcion_proyecto(url_ficha: str) -> str:
+def fetch_descripcion_proyecto(url_ficha: str, session=None) -> str:
     """
     Obtiene la descripción completa del proyecto desde la ficha del SEIA.
     """
@@ -101,7 +133,7 @@ def fetch_descripcion_proyecto(url_ficha: str) -> str:
     }
     
     try:
-        response = requests.get(url_ficha, headers=headers, timeout=20)
+        response = (session or requests).get(url_ficha, headers=headers, timeout=20)
         response.raise_for_status()
         
         soup = BeautifulSoup(response.text, 'html.parser')
@@ -167,73 +199,17 @@ def fetch_descripcion_proyecto(url_ficha: str) -> str:
         # Limpiar descripción
         if descripcion:
             # Remover espacios múltiples
-            import re
-            descripcion = re.sub(r'\s+', ' ', descripcion).strip()
+            descripcion = _ESPACIOS.sub(' ', descripcion).strip()
         
         return descripcion[:5000] if descripcion else ""  # Limitar a 5000 caracteres
         
+    except CircuitoAbierto:
+        raise  # el sitio no responde: detener la corrida en vez de seguir sin descripciones
     except Exception as e:
-        print(f"⚠️ Error al obtener descripción de {url_ficha}: {e}")
+        logger.warning("Error al obtener descripción", extra={'url': url_ficha, 'error': str(e)})
         return ""
 
 
-def _parse_inversion_millones(inversion_str: str):
-    """
-    Parsea el formato de inversión del SEIA a millones de dólares (float).
-    El SEIA devuelve valores en MMUS (millones de USD) con formato chileno/europeo.
-    
-    Formato chileno: punto para miles, coma para decimales.
-    
-    Ejemplos de entrada y salida esperada:
-    - "850.000" → 850.0 (punto es separador de miles, 3 dígitos después)
-    - "26.500" → 26.5 (punto es separador de miles, 3 dígitos después)
-    - "1.300,0000" → 1300.0 (punto miles, coma decimal)
-    - "64,1092" → 64.1092 (coma es decimal)
-    - "0,40" → 0.4 (coma es decimal)
-    - "850.000.000" → 850000.0 (múltiples puntos = miles)
-    """
-    if not inversion_str or not isinstance(inversion_str, str):
-        return None
-    
-    try:
-        import re
-        
-        # Limpiar: remover prefijos/sufijos como "US$", "MM", espacios
-        inversion_limpia = inversion_str.strip()
-        inversion_limpia = re.sub(r'[US$\s]', '', inversion_limpia, flags=re.IGNORECASE)
-        inversion_limpia = re.sub(r'MM$', '', inversion_limpia, flags=re.IGNORECASE).strip()
-        
-        if not inversion_limpia:
-            return None
-        
-        # Contar puntos y comas
-        num_puntos = inversion_limpia.count('.')
-        tiene_coma = ',' in inversion_limpia
-        
-        if tiene_coma and num_puntos > 0:
-            # Formato europeo completo: "1.300,50" → punto=miles, coma=decimal
-            inversion_limpia = inversion_limpia.replace('.', '').replace(',', '.')
-        elif tiene_coma:
-            # Solo coma = decimal: "64,1092" → 64.1092
-            inversion_limpia = inversion_limpia.replace(',', '.')
-        elif num_puntos > 1:
-            # Múltiples puntos = todos son separadores de miles: "850.000.000" → 850000000
-            inversion_limpia = inversion_limpia.replace('.', '')
-        elif num_puntos == 1:
-            # Un solo punto: determinar si es miles o decimal
-            # Si tiene exactamente 3 dígitos después del punto → separador de miles
-            partes = inversion_limpia.split('.')
-            if len(partes) == 2 and len(partes[1]) == 3 and partes[1].isdigit():
-                # "850.000" → 850000 (punto es miles)
-                inversion_limpia = inversion_limpia.replace('.', '')
-            # Si no, el punto es decimal (ej: "0.40" → 0.40)
-        
-        valor = float(inversion_limpia)
-        return valor if valor > 0 else None
-    except (ValueError, TypeError):
-        return None
-
-
 def _determinar_industria(nombre: str, descripcion: str = "") -> dict:
     """
     Determina la industria del proyecto usando clasificación por keywords.
@@ -251,7 +227,10 @@ def parse_listado_json(datos_json: dict) -> List[Dict[str, str]]:
     if not datos_json or 'data' not in datos_json:
         return proyectos
     
-    for proyecto_raw in datos_json['data']:
+    # Montos de toda la página de una vez (memoizados; vectorizados con pandas en páginas grandes)
+    inversiones = parsear_inversiones([fila.get('INVERSION_MM_FORMAT', '') for fila in datos_json['data']])
+    
+    for proyecto_raw, inversion in zip(datos_json['data'], inversiones):
         sector_economico = proyecto_raw.get('SECTOR_ECONOMICO', '') or proyecto_raw.get('TIPO_PROYECTO', '')
         tipo_proyecto = proyecto_raw.get('TIPO_PROYECTO', '')
         nombre = proyecto_raw.get('EXPEDIENTE_NOMBRE', '')
@@ -268,7 +247,7 @@ def parse_listado_json(datos_json: dict) -> List[Dict[str, str]]:
             'comuna': proyecto_raw.get('COMUNA_NOMBRE', ''),
             'inversion': proyecto_raw.get('INVERSION_MM', ''),
             'inversion_formato': proyecto_raw.get('INVERSION_MM_FORMAT', ''),
-            'inversion_millones': _parse_inversion_millones(proyecto_raw.get('INVERSION_MM_FORMAT', '')),
+            'inversion_millones': inversion.millones,
             'fecha_presentacion': proyecto_raw.get('FECHA_PRESENTACION_FORMAT', '') or proyecto_raw.get('FECHA_PRESENTACION', ''),
             'fecha_ingreso': proyecto_raw.get('FECHA_INGRESO_FORMAT', '') or proyecto_raw.get('FECHA_INGRESO', ''),
             'fecha_presentacion_timestamp': proyecto_raw.get('FECHA_PRESENTACION', ''),
@@ -285,6 +264,10 @@ def parse_listado_json(datos_json: dict) -> List[Dict[str, str]]:
             'industria_color_name': clasificacion['color_name'],
         }
         
+        if inversion.ambigua:
+            # "850.000": se tomó como 850000, pero podría ser 850,0 (ver scrapers/seia/inversion.py)
+            proyecto['inversion_ambigua'] = True
+        
         # Asegurar que el link sea absoluto
         if proyecto['link'] and not proyecto['link'].startswith('http'):
             if proyecto['link'].startswith('/'):
@@ -297,154 +280,370 @@ def parse_listado_json(datos_json: dict) -> List[Dict[str, str]]:
     return proyectos
 
 
-def run_seia(obtener_descripcion: bool = True, existing_projects: dict = None, progress_callback=None, cancel_callback=None) -> Dict:
+def _listar_proyectos(existing_projects: IndiceProyectosSeia, estado_changes: List[Dict], field_changes: List[Dict],
+                      etapas: Dict, session=None, base_url: str = None, is_cancelled=None,
+                      max_proyectos: int = 500, registros_por_pagina: int = 100,
+                      max_duplicados_consecutivos: int = 10,
+                      metricas: Optional[Metricas] = None) -> Iterator[Dict]:
+    """
+    Etapa 1: recorre el listado página a página y produce cada proyecto nuevo apenas
+    se parsea. Los proyectos existentes cuyo hash de contenido cambió se agregan a
+    field_changes (y a estado_changes si cambió el estado).
+    Se detiene tras max_duplicados_consecutivos proyectos ya conocidos seguidos.
+    Una página que falla se reintenta y, si sigue fallando, se salta (ver REINTENTOS_PAGINA).
+    Mide las etapas 'listado' (requests), 'parse' y 'cambios' (hash y diff de los existentes).
+    """
+    metricas = metricas or Metricas()
+    vistos = set()  # evita repetir un proyecto si el listado se desplaza entre páginas
+    duplicados_consecutivos = 0
+    fallidas_consecutivas = 0
+    pagina = 1
+    
+    while etapas['listado']['nuevos'] < max_proyectos:
+        if is_cancelled and is_cancelled():
+            return
+        
+        proyectos_pagina = None
+        for intento in range(REINTENTOS_PAGINA + 1):
+            try:
+                with metricas.medir('listado'):
+                    datos = fetch_datos_listado(pagina=pagina, registros_por_pagina=registros_por_pagina,
+                                                session=session, base_url=base_url)
+                with metricas.medir('parse'):
+                    proyectos_pagina = parse_listado_json(datos)
+                break
+            except CircuitoAbierto:
+                raise
+            except Exception as e:
+                if intento == REINTENTOS_PAGINA:
+                    logger.warning("Página del listado omitida tras %d intentos", intento + 1,
+                                   extra={'pagina': pagina, 'error': str(e)})
+                    break
+                pausa = PAUSA_REINTENTO_PAGINA * 2 ** intento
+                logger.warning("Error en página del listado, reintentando en %.1fs", pausa,
+                               extra={'pagina': pagina, 'intento': intento + 1, 'error': str(e)})
+                time.sleep(pausa)
+                if is_cancelled and is_cancelled():
+                    return
+        etapas['listado']['paginas'] = pagina
+        
+        if proyectos_pagina is None:
+            etapas['listado']['paginas_fallidas'] += 1
+            fallidas_consecutivas += 1
+            if fallidas_consecutivas >= MAX_PAGINAS_FALLIDAS:
+                logger.error("Listado interrumpido: %d páginas seguidas con error", fallidas_consecutivas,
+                             extra={'pagina': pagina})
+                return
+            pagina += 1
+            continue
+        fallidas_consecutivas = 0
+        
+        if not proyectos_pagina:
+            break
+        
+        for proyecto in proyectos_pagina:
+            codigo = str(proyecto.get('codigo_seia', ''))
+            estado_actual = proyecto.get('estado', '')
+            
+            guardado = existing_projects.buscar(codigo) if codigo else None
+            if guardado is not None:
+                with metricas.medir('cambios'):
+                    # Proyecto existente - comparar primero el hash de contenido
+                    lead_id, estado_anterior, hash_guardado = guardado
+                    hash_actual = calcular_hash_contenido(proyecto)
+                    raw_guardado = None
+                    if hash_guardado is None:
+                        raw_guardado = existing_projects.raw_data(lead_id)
+                        hash_guardado = calcular_hash_contenido(raw_guardado)
+                
+                    if hash_actual != hash_guardado:
+                        # Contenido cambió: recién aquí se lee el raw_data guardado
+                        if raw_guardado is None:
+                            raw_guardado = existing_projects.raw_data(lead_id)
+                        # Diff por campo, conservando lo que no viene en el listado
+                        cambios = diff_campos(raw_guardado, proyecto)
+                        raw_actualizado = {**raw_guardado, **proyecto}
+                        field_changes.append({
+                            'lead_id': lead_id,
+                            'codigo_seia': codigo,
+                            'project_name': proyecto.get('nombre', ''),
+                            'cambios': cambios,
+                            'raw_data': raw_actualizado,
+                            'content_hash': hash_actual
+                        })
+                        etapas['listado']['actualizados'] += 1
+                    
+                        # Comparar estados por su clave canónica (memoizada)
+                        if estado_anterior and estado_actual and clave_estado(estado_anterior) != clave_estado(estado_actual):
+                            # ¡Cambio de estado detectado!
+                            logger.info("Cambio de estado: %s", proyecto.get('nombre', 'N/A'),
+                                        extra={'codigo_seia': codigo, 'estado_anterior': estado_anterior,
+                                               'estado_nuevo': estado_actual})
+                        
+                            estado_changes.append({
+                                'lead_id': lead_id,
+                                'codigo_seia': codigo,
+                                'project_name': proyecto.get('nombre', ''),
+                                'estado_anterior': estado_anterior,
+                                'estado_nuevo': estado_actual,
+                                'raw_data': raw_actualizado
+                            })
+                            etapas['listado']['cambios_estado'] += 1
+                
+                duplicados_consecutivos += 1
+                if duplicados_consecutivos >= max_duplicados_consecutivos:
+                    logger.info("Duplicados detectados, deteniendo listado", extra={'pagina': pagina})
+                    return
+            elif codigo not in vistos:
+                # Proyecto nuevo
+                duplicados_consecutivos = 0
+                if codigo:
+                    vistos.add(codigo)
+                etapas['listado']['nuevos'] += 1
+                yield proyecto
+                if etapas['listado']['nuevos'] >= max_proyectos:
+                    return
+        
+        # Si obtuvimos menos de lo esperado, ya no hay más páginas
+        if len(proyectos_pagina) < registros_por_pagina:
+            break
+        
+        pagina += 1
+
+
+def _con_descripciones(proyectos: Iterable[Dict], etapas: Dict, session=None,
+                       max_workers: int = 2, metricas: Optional[Metricas] = None) -> Iterator[Dict]:
+    """
+    Etapa 2: agrega descripcion_completa a cada proyecto. Las fichas se descargan en
+    un pool de threads con una ventana acotada de descargas en vuelo, y los proyectos
+    salen en el mismo orden en que llegaron del listado.
+    Mide 'fichas' (cada descarga, en su thread) y 'fichas_espera' (lo que el pipeline
+    queda bloqueado esperando una ficha que aún no llega).
+    """
+    metricas = metricas or Metricas()
+    hilos = ThreadPoolExecutor(max_workers=max_workers)
+    ventana = deque()
+    
+    @en_contexto  # los logs de cada ficha quedan asociados a la ejecución
+    def descargar(url_ficha: str) -> str:
+        with metricas.medir('fichas'):
+            return fetch_descripcion_proyecto(url_ficha, session)
+    
+    def completar():
+        proyecto, futuro = ventana.popleft()
+        if futuro is not None:
+            with metricas.medir('fichas_espera'):
+                proyecto['descripcion_completa'] = futuro.result()
+            etapas['descripciones'] += 1
+        return proyecto
+    
+    try:
+        for proyecto in proyectos:
+            futuro = None
+            if proyecto.get('link_ficha'):
+                futuro = hilos.submit(descargar, proyecto['link_ficha'])
+            ventana.append((proyecto, futuro))
+            if len(ventana) >= max_workers * 2:
+                yield completar()
+        while ventana:
+            yield completar()
+    finally:
+        hilos.shutdown(wait=False, cancel_futures=True)
+
+
+def _a_lead(proyecto: Dict) -> Dict:
+    """Etapa 3: normaliza un proyecto al formato de lead."""
+    return {
+        'source': 'SEIA',
+        'project_name': proyecto.get('nombre', 'Sin nombre'),
+        'date': proyecto.get('fecha_presentacion', ''),
+        'sector': proyecto.get('tipo_proyecto', proyecto.get('tipo', '')),
+        'description': f"Titular: {proyecto.get('titular', 'N/A')}. Región: {proyecto.get('region', 'N/A')}, {proyecto.get('comuna', 'N/A')}. Inversión: {proyecto.get('inversion_formato', 'N/A')}. Estado: {proyecto.get('estado', 'N/A')}.",
+        'raw_data': proyecto,
+        'content_hash': calcular_hash_contenido(proyecto)
+    }
+
+
+def run_seia(obtener_descripcion: bool = True, existing_projects: Union[IndiceProyectosSeia, Dict] = None, progress_callback=None,
+             cancel_callback=None, session=None,
+             store_callback: Optional[Callable[[List[Dict], List[Dict], List[Dict]], int]] = None,
+             tamano_lote: int = 25, max_workers: int = 4, max_proyectos: int = 500,
+             base_url: str = None, metricas: Optional[Metricas] = None) -> Dict:
     """
     Ejecuta el scraper de SEIA.
-    Retorna dict con: {new_leads: [...], estado_changes: [...]}
+    Retorna dict con: {new_leads: [...], estado_changes: [...], field_changes: [...], guardados: N,
+    etapas: {...}, perfil: {etapa: {wall_segundos, cpu_segundos, requests, bytes, ...}}}
+    
+    Las etapas forman un pipeline de generadores (listado -> descripciones -> lead ->
+    lote): cada proyecto nuevo pasa a buscar su descripción apenas sale del listado y
+    los leads se entregan por lotes, sin esperar a que termine el listado completo.
+    
+    Los proyectos existentes se comparan por hash de contenido; solo los que
+    cambiaron generan un diff por campo en field_changes.
     
     Args:
         obtener_descripcion: Si es True, obtiene la descripción completa de cada proyecto (más lento pero más info)
-        existing_projects: Dict {codigo_seia: {lead_id, estado, project_name, raw_data}} de proyectos existentes
+        existing_projects: Proyectos existentes: el índice compacto de get_seia_project_index()
+            o un dict {codigo_seia: {lead_id, estado, raw_data, content_hash}}
         progress_callback: Función para reportar progreso (recibe porcentaje y mensaje)
         cancel_callback: Función para verificar si se debe cancelar (retorna True para cancelar)
+        session: Sesión HTTP compartida; sin ella se crea una con su propio limitador adaptativo
+        store_callback: Si se indica, se llama por cada lote con (leads, field_changes, estado_changes)
+            detectados desde el lote anterior y retorna cuántos leads guardó; new_leads,
+            estado_changes y field_changes vuelven vacíos. Sin él, todo se acumula y se retorna al final.
+        tamano_lote: Leads por lote entregado a store_callback
+        max_workers: Descargas de fichas concurrentes (el ritmo real lo fija el limitador de la sesión)
+        max_proyectos: Máximo de proyectos nuevos a obtener
+        base_url: Sitio del SEIA (o el servidor local de stub_server.py)
+        metricas: Donde acumular el perfil por etapa (listado, parse, cambios, fichas,
+            fichas_espera, normalizacion, guardado); si no se indica se crea uno
     """
-    print("🔄 Iniciando scraper SEIA...")
-    
-    proyectos_nuevos = []
-    estado_changes = []  # Lista de cambios de estado detectados
-    pagina = 1
-    max_proyectos = 500  # Máximo de proyectos nuevos a obtener
-    registros_por_pagina = 100  # 100 proyectos por página para mayor eficiencia
-    duplicados_consecutivos = 0
-    max_duplicados_consecutivos = 10  # Detener después de 10 duplicados seguidos
+    logger.info("Iniciando scraper SEIA")
     
-    if existing_projects is None:
-        existing_projects = {}
+    if not isinstance(existing_projects, IndiceProyectosSeia):
+        existing_projects = IndiceProyectosSeia.desde_proyectos(existing_projects or {})
+    if session is None:
+        session = Servicios().sesion()
+    metricas = metricas or Metricas()
     
-    existing_codes = set(existing_projects.keys())
+    estado_changes = []  # Cambios de estado detectados desde el último lote
+    field_changes = []  # Proyectos existentes cuyo contenido cambió, desde el último lote
+    leads_acumulados = []
+    estado_acumulados = []
+    field_acumulados = []
+    guardados = 0
+    etapas = {
+        'listado': {'paginas': 0, 'paginas_fallidas': 0, 'nuevos': 0, 'actualizados': 0, 'cambios_estado': 0},
+        'descripciones': 0,
+        'normalizados': 0,
+        'guardados': 0,
+    }
+    ultimo_percent = 0
     
     def is_cancelled():
         return cancel_callback and cancel_callback()
     
     def report_progress(percent, msg):
-        print(msg)
+        nonlocal ultimo_percent
+        ultimo_percent = max(ultimo_percent, percent)  # el total no se conoce de antemano: nunca retroceder
+        logger.debug(msg, extra={'percent': ultimo_percent})
         if progress_callback:
-            progress_callback(percent, msg)
+            progress_callback(ultimo_percent, msg)
+    
+    def resumen_etapas() -> str:
+        listado = etapas['listado']
+        partes = [f"Listado: pág. {listado['paginas']}, {listado['nuevos']} nuevos"]
+        if listado['actualizados']:
+            partes[0] += f", {listado['actualizados']} actualizados"
+        if listado['paginas_fallidas']:
+            partes[0] += f", {listado['paginas_fallidas']} págs. omitidas"
+        if obtener_descripcion:
+            partes.append(f"Descripciones: {etapas['descripciones']}/{listado['nuevos']}")
+        partes.append(f"Guardados: {etapas['guardados']}")
+        return ' · '.join(partes)
+    
+    def percent_actual() -> int:
+        # Listado (hasta 40%) según proyectos nuevos vs el máximo; el resto según leads entregados
+        listado = min(1.0, etapas['listado']['nuevos'] / max_proyectos)
+        entregados = etapas['guardados'] / max(1, etapas['listado']['nuevos'])
+        return int(40 * listado + 55 * entregados * listado)
+    
+    def entregar(lote: List[Dict]):
+        nonlocal guardados
+        # El listado sigue agregando a las mismas listas: se vacían en el lugar
+        fields, estados = list(field_changes), list(estado_changes)
+        field_changes.clear()
+        estado_changes.clear()
+        with metricas.medir('guardado'):
+            if store_callback:
+                insertados = store_callback(lote, fields, estados)
+                guardados += insertados
+                metricas.contar('guardado', filas=insertados + len(fields) + len(estados))
+            else:
+                leads_acumulados.extend(lote)
+                field_acumulados.extend(fields)
+                estado_acumulados.extend(estados)
+        etapas['guardados'] += len(lote)
+        report_progress(percent_actual(), resumen_etapas())
+    
+    def resultado() -> Dict:
+        return {
+            'new_leads': leads_acumulados,
+            'estado_changes': estado_acumulados,
+            'field_changes': field_acumulados,
+            'guardados': guardados,
+            'etapas': etapas,
+            'perfil': metricas.etapas(),
+        }
     
     try:
-        # Fase 1: Obtener listado y detectar cambios de estado (40% del progreso)
         report_progress(0, "Obteniendo proyectos...")
         
-        while len(proyectos_nuevos) < max_proyectos:
-            # Verificar cancelación
-            if is_cancelled():
-                report_progress(0, "Cancelado")
-                return {'new_leads': [], 'estado_changes': estado_changes}
-            
-            progress_fase1 = min(40, int((len(proyectos_nuevos) / max_proyectos) * 40))
-            report_progress(progress_fase1, f"Página {pagina}...")
-            
-            datos = fetch_datos_listado(pagina=pagina, registros_por_pagina=registros_por_pagina)
-            proyectos_pagina = parse_listado_json(datos)
-            
-            if not proyectos_pagina:
-                report_progress(40, "Sin más proyectos")
-                break
-            
-            # Procesar cada proyecto
-            for proyecto in proyectos_pagina:
-                codigo = str(proyecto.get('codigo_seia', ''))
-                estado_actual = proyecto.get('estado', '')
-                
-                if codigo and codigo in existing_codes:
-                    # Proyecto existente - verificar si cambió el estado
-                    proyecto_guardado = existing_projects.get(codigo, {})
-                    estado_anterior = proyecto_guardado.get('estado', '')
-                    
-                    # Comparar estados (normalizar para comparación)
-                    if estado_anterior and estado_actual and estado_anterior.strip().lower() != estado_actual.strip().lower():
-                        # ¡Cambio de estado detectado!
-                        print(f"  🔄 CAMBIO DE ESTADO: {proyecto.get('nombre', 'N/A')}")
-                        print(f"      Antes: {estado_anterior} -> Ahora: {estado_actual}")
-                        
-                        estado_changes.append({
-                            'lead_id': proyecto_guardado.get('lead_id'),
-                            'codigo_seia': codigo,
-                            'project_name': proyecto.get('nombre', ''),
-                            'estado_anterior': estado_anterior,
-                            'estado_nuevo': estado_actual,
-                            'raw_data': proyecto_guardado.get('raw_data', {})
-                        })
-                    
-                    duplicados_consecutivos += 1
-                    if duplicados_consecutivos >= max_duplicados_consecutivos:
-                        report_progress(40, "Duplicados detectados, deteniendo...")
-                        break
-                else:
-                    # Proyecto nuevo
-                    duplicados_consecutivos = 0
-                    proyectos_nuevos.append(proyecto)
-            
-            # Si alcanzamos el límite de duplicados, salir del loop
-            if duplicados_consecutivos >= max_duplicados_consecutivos:
-                break
-            
-            report_progress(progress_fase1, f"Página {pagina}: {len(proyectos_nuevos)} nuevos")
-            
-            # Si obtuvimos menos de lo esperado, ya no hay más páginas
-            if len(proyectos_pagina) < registros_por_pagina:
-                break
-            
-            # Si ya tenemos suficientes, detener
-            if len(proyectos_nuevos) >= max_proyectos:
-                proyectos_nuevos = proyectos_nuevos[:max_proyectos]
-                break
-            
-            pagina += 1
-            time.sleep(0.5)  # Pausa entre páginas
-        
-        cambios_msg = f", {len(estado_changes)} cambios de estado" if estado_changes else ""
-        report_progress(40, f"{len(proyectos_nuevos)} nuevos{cambios_msg}")
+        proyectos = _listar_proyectos(
+            existing_projects, estado_changes, field_changes, etapas,
+            session=session, base_url=base_url, is_cancelled=is_cancelled, max_proyectos=max_proyectos,
+            metricas=metricas
+        )
+        if obtener_descripcion:
+            proyectos = _con_descripciones(proyectos, etapas, session=session, max_workers=max_workers,
+                                           metricas=metricas)
         
-        # Fase 2: Obtener descripciones de proyectos NUEVOS (40% al 95% del progreso)
-        if obtener_descripcion and proyectos_nuevos:
-            report_progress(40, "Obteniendo descripciones...")
-            total_proyectos = len(proyectos_nuevos)
-            for i, proyecto in enumerate(proyectos_nuevos):
-                # Verificar cancelación
+        lote = []
+        try:
+            for proyecto in proyectos:
                 if is_cancelled():
                     report_progress(0, "Cancelado")
-                    return {'new_leads': [], 'estado_changes': estado_changes}
-                
-                if proyecto.get('link_ficha'):
-                    progress_fase2 = 40 + int(((i + 1) / total_proyectos) * 55)
-                    report_progress(progress_fase2, f"Descripción {i+1}/{total_proyectos}")
-                    descripcion = fetch_descripcion_proyecto(proyecto['link_ficha'])
-                    proyecto['descripcion_completa'] = descripcion
-                    time.sleep(0.3)  # Pausa entre requests
+                    return resultado()
+                with metricas.medir('normalizacion'):
+                    lote.append(_a_lead(proyecto))
+                etapas['normalizados'] += 1
+                if len(lote) >= tamano_lote:
+                    entregar(lote)
+                    lote = []
+                elif etapas['normalizados'] % 5 == 0:
+                    report_progress(percent_actual(), resumen_etapas())
+        finally:
+            proyectos.close()
         
-        report_progress(95, "Finalizando...")
+        if is_cancelled():
+            report_progress(0, "Cancelado")
+            return resultado()
         
-        # Fase 3: Normalizar datos (95% al 100%)
-        leads = []
-        for proyecto in proyectos_nuevos:
-            lead = {
-                'source': 'SEIA',
-                'project_name': proyecto.get('nombre', 'Sin nombre'),
-                'date': proyecto.get('fecha_presentacion', ''),
-                'sector': proyecto.get('tipo_proyecto', proyecto.get('tipo', '')),
-                'description': f"Titular: {proyecto.get('titular', 'N/A')}. Región: {proyecto.get('region', 'N/A')}, {proyecto.get('comuna', 'N/A')}. Inversión: {proyecto.get('inversion_formato', 'N/A')}. Estado: {proyecto.get('estado', 'N/A')}.",
-                'raw_data': proyecto
-            }
-            leads.append(lead)
+        # Último lote (también entrega los cambios detectados después del lote anterior)
+        if lote or estado_changes or field_changes:
+            entregar(lote)
         
-        report_progress(100, f"Completado: {len(leads)} nuevos{cambios_msg}")
+        cambios_msg = f", {etapas['listado']['cambios_estado']} cambios de estado" if etapas['listado']['cambios_estado'] else ""
+        if etapas['listado']['actualizados']:
+            cambios_msg += f", {etapas['listado']['actualizados']} actualizados"
+        report_progress(100, f"Completado: {etapas['listado']['nuevos']} nuevos{cambios_msg}")
+        logger.info("Scraper SEIA completado", extra={
+            'nuevos': etapas['listado']['nuevos'], 'actualizados': etapas['listado']['actualizados'],
+            'cambios_estado': etapas['listado']['cambios_estado'], 'paginas': etapas['listado']['paginas'],
+            'paginas_fallidas': etapas['listado']['paginas_fallidas'], 'guardados': etapas['guardados'],
+        })
         
-        return {
-            'new_leads': leads,
-            'estado_changes': estado_changes
-        }
+        return resultado()
         
     except Exception as e:
-        print(f"❌ Error en scraper SEIA: {e}")
+        logger.error("Error en scraper SEIA: %s", e)
         raise
+
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Scraper SEIA')
+    parser.add_argument('--base-url', default=SEIA_BASE_URL)
+    parser.add_argument('--max-proyectos', type=int, default=500)
+    parser.add_argument('--sin-descripcion', action='store_true')
+    args = parser.parse_args()
+    
+    configurar_logging()
+    servicios = Servicios()
+    inicio = time.perf_counter()
+    resultado = run_seia(obtener_descripcion=not args.sin_descripcion, session=servicios.sesion(),
+                         max_proyectos=args.max_proyectos, base_url=args.base_url)
+    print(f"⏱️  {len(resultado['new_leads'])} proyectos en {time.perf_counter() - inicio:.1f}s")
+    for host, metricas in servicios.resumen_hosts().items():
+        print(f"   {host}: {metricas}")
@@ -0,0 +1,210 @@
+"""
+Servidor HTTP local que imita el listado y las fichas del SEIA con proyectos
+sintéticos, y simula un sitio que se satura: limita la tasa de requests (429 con
+Retry-After), se pone más lento con requests concurrentes y puede responder 503.
+Sirve para ver cómo el limitador adaptativo y el circuit breaker de
+scrapers/servicios.py reaccionan, sin golpear seia.sea.gob.cl.
+
+- POST {LISTADO_PATH} (offset/limit como el sitio real) -> JSON {data: [...]}
+- GET  /expediente/ficha/fichaPrincipal.php?id_expediente=ID -> ficha HTML
+
+Uso (desde la raíz del proyecto):
+    python -m scrapers.seia.stub_server --puerto 8766 --tasa-max 20 --latencia 0.05
+    python -m scrapers.seia.scraper --base-url http://127.0.0.1:8766
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from scrapers.seia.scraper import LISTADO_PATH
+
+FICHA_PATH = '/expediente/ficha/fichaPrincipal.php'
+
+_REGIONES = ['Antofagasta', 'Atacama', 'Valparaíso', 'Metropolitana', 'Biobío', 'Los Lagos']
+_TIPOS = ['Centrales generadoras de energía', 'Proyectos de desarrollo minero',
+          'Puertos', 'Proyectos inmobiliarios', 'Plantas de tratamiento de aguas']
+_ESTADOS = ['En Admisión', 'En Calificación', 'Aprobado', 'Rechazado']
+
+
+class Simulacion:
+    """Configuración y contadores de la simulación (compartidos entre threads del servidor)."""
+
+    def __init__(self, total_proyectos: int = 300, tasa_max: float = 20.0, rafaga: int = 5,
+                 retry_after: int = 1, latencia: float = 0.02, tasa_fallas: float = 0.0,
+                 caida: Optional[Tuple[int, int]] = None, semilla: int = 42):
+        self.total_proyectos = total_proyectos
+        self.tasa_max = tasa_max
+        self.rafaga = rafaga
+        self.retry_after = retry_after
+        self.latencia = latencia
+        self.tasa_fallas = tasa_fallas
+        self.caida = caida  # (desde la request N, durante M requests) -> 503
+        self._random = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._tokens = float(rafaga)
+        self._ultimo = time.monotonic()
+        self._en_vuelo = 0
+        self.estadisticas = {'requests': 0, 'atendidas': 0, 'throttled': 0, 'fallas': 0}
+
+    def admitir(self) -> Tuple[int, float]:
+        """Decide la respuesta de una request: (status, latencia simulada)."""
+        with self._lock:
+            self.estadisticas['requests'] += 1
+            n = self.estadisticas['requests']
+            ahora = time.monotonic()
+            # Token bucket: tasa_max requests/s con ráfagas de hasta `rafaga`
+            self._tokens = min(self.rafaga, self._tokens + (ahora - self._ultimo) * self.tasa_max)
+            self._ultimo = ahora
+            if self.caida and self.caida[0] <= n < self.caida[0] + self.caida[1]:
+                self.estadisticas['fallas'] += 1
+                return 503, 0.0
+            if self._tokens < 1:
+                self.estadisticas['throttled'] += 1
+                return 429, 0.0
+            self._tokens -= 1
+            if self.tasa_fallas and self._random.random() < self.tasa_fallas:
+                self.estadisticas['fallas'] += 1
+                return 503, 0.0
+            self._en_vuelo += 1
+            # Más requests simultáneas = respuestas más lentas
+            return 200, self.latencia * self._en_vuelo
+
+    def liberar(self):
+        with self._lock:
+            self._en_vuelo -= 1
+            self.estadisticas['atendidas'] += 1
+
+
+def _proyecto(i: int, base_url: str) -> dict:
+    expediente = 2160000000 - i
+    return {
+        'EXPEDIENTE_ID': str(expediente),
+        'EXPEDIENTE_NOMBRE': f"Proyecto sintético {i} {_TIPOS[i % len(_TIPOS)].split()[-1]}",
+        'EXPEDIENTE_URL_PPAL': f"/expediente/expediente.php?id_expediente={expediente}",
+        'EXPEDIENTE_URL_FICHA': f"{base_url}{FICHA_PATH}?id_expediente={expediente}",
+        'TITULAR': f"Titular {i % 40} SpA",
+        'WORKFLOW_DESCRIPCION': 'DIA' if i % 3 else 'EIA',
+        'REGION_NOMBRE': _REGIONES[i % len(_REGIONES)],
+        'COMUNA_NOMBRE': f"Comuna {i % 25}",
+        'INVERSION_MM': str(round(1 + (i * 37) % 900, 4)),
+        'INVERSION_MM_FORMAT': f"{(i * 37) % 900},{i % 10000:04d}",
+        'FECHA_PRESENTACION': 1735700000 - i * 3600,
+        'FECHA_PRESENTACION_FORMAT': time.strftime('%d/%m/%Y', time.gmtime(1735700000 - i * 3600)),
+        'ESTADO_PROYECTO': _ESTADOS[i % len(_ESTADOS)],
+        'TIPO_PROYECTO': _TIPOS[i % len(_TIPOS)],
+        'SECTOR_ECONOMICO': '',
+        'RAZON_INGRESO': '',
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    simulacion: Simulacion = None
+    base_url = ''
+
+    def _atender(self, generar):
+        status, latencia = self.simulacion.admitir()
+        if status != 200:
+            cuerpo = b'Too Many Requests' if status == 429 else b'Service Unavailable'
+            self._responder(status, cuerpo, 'text/plain', {'Retry-After': str(self.simulacion.retry_after)})
+            return
+        try:
+            time.sleep(latencia)
+            cuerpo, content_type = generar()
+            self._responder(200 if cuerpo is not None else 404, cuerpo or b'Not Found', content_type)
+        finally:
+            self.simulacion.liberar()
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        largo = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(largo).decode('utf-8'))
+        if url.path != LISTADO_PATH:
+            self._responder(404, b'Not Found', 'text/plain')
+            return
+
+        def generar():
+            offset = float(form.get('offset', ['1'])[0])
+            limit = int(form.get('limit', ['100'])[0])
+            inicio = int((offset - 1) * 10)
+            fin = min(self.simulacion.total_proyectos, inicio + limit)
+            data = [_proyecto(i, self.base_url) for i in range(inicio, fin)]
+            return json.dumps({'data': data, 'totalRegistros': self.simulacion.total_proyectos}).encode('utf-8'), 'application/json'
+
+        self._atender(generar)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != FICHA_PATH:
+            self._responder(404, b'Not Found', 'text/plain')
+            return
+        expediente = parse_qs(url.query).get('id_expediente', [''])[0]
+
+        def generar():
+            if not expediente.isdigit():
+                return None, 'text/plain'
+            html = (
+                '<html><body><table><tr><td>Descripción del Proyecto</td>'
+                f'<td>El proyecto {expediente} consiste en la construcción y operación de '
+                'instalaciones productivas, con sus obras anexas y líneas de transmisión.</td>'
+                '</tr></table></body></html>'
+            )
+            return html.encode('utf-8'), 'text/html; charset=utf-8'
+
+        self._atender(generar)
+
+    def _responder(self, status: int, cuerpo: bytes, content_type: str, extra_headers: dict = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        for nombre, valor in (extra_headers or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format, *args):
+        pass  # Silencioso: las estadísticas quedan en Simulacion.estadisticas
+
+
+def iniciar_servidor(puerto: int = 0, simulacion: Optional[Simulacion] = None) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Inicia el servidor en un thread (puerto 0 = puerto libre aleatorio).
+    Retorna (servidor, base_url); servidor.simulacion tiene los contadores.
+    Detener con servidor.shutdown().
+    """
+    simulacion = simulacion or Simulacion()
+    handler = type('SeiaStubHandler', (_Handler,), {'simulacion': simulacion})
+    servidor = ThreadingHTTPServer(('127.0.0.1', puerto), handler)
+    base_url = f'http://127.0.0.1:{servidor.server_address[1]}'
+    handler.base_url = base_url
+    servidor.simulacion = simulacion
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, base_url
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor local que simula el SEIA con throttling')
+    parser.add_argument('--puerto', type=int, default=8766)
+    parser.add_argument('--proyectos', type=int, default=300)
+    parser.add_argument('--tasa-max', type=float, default=20.0, help='Requests por segundo antes de responder 429')
+    parser.add_argument('--rafaga', type=int, default=5)
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--latencia', type=float, default=0.02, help='Latencia base por request en vuelo (s)')
+    parser.add_argument('--tasa-fallas', type=float, default=0.0, help='Probabilidad de responder 503')
+    args = parser.parse_args()
+
+    simulacion = Simulacion(args.proyectos, args.tasa_max, args.rafaga, args.retry_after,
+                            args.latencia, args.tasa_fallas)
+    servidor, base_url = iniciar_servidor(args.puerto, simulacion)
+    print(f"🧪 Servidor SEIA simulado en {base_url} (Ctrl+C para detener)")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"   {simulacion.estadisticas}")
+    except KeyboardInterrupt:
+        servidor.shutdown()
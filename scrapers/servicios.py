@@ -0,0 +1,405 @@
+"""
+Servicios compartidos por todos los scrapers: sesiones HTTP con pool de
+conexiones, limitador adaptativo con circuit breaker por host, cache de
+respuestas y métricas.
+Una sola instancia de Servicios se comparte entre fuentes y ejecuciones, así
+dos scrapers que golpean el mismo host respetan el mismo límite.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend.metrics import contador, histograma
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+# Métricas de Prometheus (GET /metrics) de cada request saliente, por host
+FETCH_SEGUNDOS = histograma('scraper_fetch_duration_seconds', 'Latencia de los requests salientes de los scrapers',
+                            ['host'])
+FETCH_REQUESTS = contador('scraper_fetch_requests_total',
+                          'Requests salientes por host y status (error = conexión o timeout)', ['host', 'status'])
+FETCH_BYTES = contador('scraper_fetch_bytes_total', 'Bytes recibidos en el cuerpo de las respuestas', ['host'])
+FETCH_REINTENTOS = contador('scraper_fetch_retries_total', 'Reintentos de requests salientes', ['host'])
+
+
+def _bytes_respuesta(response: requests.Response, stream: bool) -> int:
+    """Content-Length si viene; si no, el cuerpo ya leído (en streaming no se lee aquí)."""
+    largo = response.headers.get('Content-Length')
+    if largo and largo.isdigit():
+        return int(largo)
+    return 0 if stream else len(response.content)
+
+
+# Etapa que se está midiendo en cada thread: la sesión le atribuye sus requests
+_ETAPA_ACTUAL = threading.local()
+
+# Campos de cada etapa medida con Metricas.medir
+CAMPOS_ETAPA = ('wall_segundos', 'cpu_segundos', 'llamadas', 'requests', 'bytes', 'reintentos', 'cache_hits', 'filas')
+
+
+class Metricas:
+    """
+    Contadores y tiempos acumulados de una ejecución (thread-safe).
+
+    medir(etapa) acumula por etapa el tiempo de pared, el CPU del thread que la
+    ejecuta y la cantidad de llamadas; los requests, bytes y reintentos de la
+    sesión compartida hechos dentro de la etapa (en ese mismo thread) se le
+    atribuyen automáticamente. Las etapas anidadas cuentan también en la externa,
+    pero los requests van solo a la más interna.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores: Dict[str, float] = {}
+        self._etapas: Dict[str, Dict[str, float]] = {}
+
+    def incrementar(self, nombre: str, valor: float = 1):
+        with self._lock:
+            self._contadores[nombre] = self._contadores.get(nombre, 0) + valor
+
+    def contar(self, etapa: str, **valores: float):
+        """Suma valores (requests, bytes, filas...) a los campos de una etapa."""
+        with self._lock:
+            campos = self._etapas.get(etapa)
+            if campos is None:
+                campos = self._etapas[etapa] = dict.fromkeys(CAMPOS_ETAPA, 0)
+            for campo, valor in valores.items():
+                campos[campo] += valor
+
+    @contextmanager
+    def medir(self, etapa: str):
+        """Mide una etapa (tiempo de pared, CPU del thread, llamadas y requests hechos dentro)."""
+        anterior = getattr(_ETAPA_ACTUAL, 'etapa', None)
+        _ETAPA_ACTUAL.etapa = (self, etapa)
+        inicio, cpu_inicio = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            _ETAPA_ACTUAL.etapa = anterior
+            self.contar(etapa, wall_segundos=time.perf_counter() - inicio,
+                        cpu_segundos=time.thread_time() - cpu_inicio, llamadas=1)
+
+    def etapas(self) -> Dict[str, Dict[str, float]]:
+        """{etapa: {wall_segundos, cpu_segundos, llamadas, requests, bytes, reintentos, cache_hits, filas}}"""
+        with self._lock:
+            return {etapa: dict(campos) for etapa, campos in self._etapas.items()}
+
+    def como_dict(self) -> Dict[str, float]:
+        """Contadores sueltos más '<etapa>_segundos' y '<etapa>_llamadas' de cada etapa."""
+        with self._lock:
+            resultado = dict(self._contadores)
+            for etapa, campos in self._etapas.items():
+                resultado[f'{etapa}_segundos'] = campos['wall_segundos']
+                resultado[f'{etapa}_llamadas'] = campos['llamadas']
+        return {k: round(v, 4) if isinstance(v, float) else v for k, v in resultado.items()}
+
+
+def contar_en_etapa(**valores: float):
+    """Atribuye valores a la etapa que se está midiendo en este thread (si hay una)."""
+    actual = getattr(_ETAPA_ACTUAL, 'etapa', None)
+    if actual is not None:
+        metricas, etapa = actual
+        metricas.contar(etapa, **valores)
+
+
+class CircuitoAbierto(requests.exceptions.RequestException):
+    """El host falló demasiadas veces seguidas y el circuit breaker dejó de intentar."""
+
+
+class _EstadoHost:
+    def __init__(self, tasa: float):
+        self.tasa = tasa  # requests por segundo permitidas
+        self.proximo = 0.0  # siguiente turno libre (time.monotonic)
+        self.pausa_hasta = 0.0  # Retry-After
+        self.latencia_ewma: Optional[float] = None
+        self.latencia_base: Optional[float] = None
+        self.ultima_reduccion = 0.0
+        self.fallas_consecutivas = 0
+        self.aperturas = 0  # aperturas seguidas del circuito (sin un éxito entremedio)
+        self.enfriamiento = 0.0
+        self.abierto_hasta = 0.0
+
+
+class RateLimiter:
+    """
+    Limitador adaptativo por host (AIMD sobre la tasa de requests).
+
+    - Cada respuesta sana con latencia normal sube la tasa en `incremento` req/s
+      (antes de la primera señal de congestión la multiplica por `factor_slow_start`).
+    - Un 429, un 5xx, un error de conexión o una latencia suavizada muy por sobre
+      la base observada la multiplican por `factor_reduccion` (a lo más una vez por
+      ventana, para que una ráfaga de 429 concurrentes cuente como una sola señal).
+      Un 500/502/504 suele ser un backend saturado: sus reintentos no van a tasa plena.
+    - Retry-After pausa el host el tiempo indicado.
+    - Circuit breaker: tras `umbral_fallas` fallas seguidas el host se pausa por un
+      enfriamiento que se duplica en cada apertura; luego pasa una request de prueba.
+      Desde la apertura número `max_aperturas` (sin un éxito entremedio) las requests
+      fallan de inmediato con CircuitoAbierto mientras dure el enfriamiento.
+    """
+
+    def __init__(self, tasa_inicial: float = 4.0, tasa_min: float = 0.2, tasa_max: float = 50.0,
+                 incremento: float = 0.25, factor_reduccion: float = 0.5, factor_slow_start: float = 1.1,
+                 factor_latencia: float = 3.0, latencia_congestion_min: float = 0.5,
+                 umbral_fallas: int = 5, enfriamiento_inicial: float = 15.0,
+                 enfriamiento_max: float = 300.0, max_aperturas: int = 3,
+                 max_retry_after: float = 300.0):
+        self.tasa_inicial = tasa_inicial
+        self.tasa_min = tasa_min
+        self.tasa_max = tasa_max
+        self.incremento = incremento
+        self.factor_reduccion = factor_reduccion
+        self.factor_slow_start = factor_slow_start
+        self.factor_latencia = factor_latencia
+        self.latencia_congestion_min = latencia_congestion_min
+        self.umbral_fallas = umbral_fallas
+        self.enfriamiento_inicial = enfriamiento_inicial
+        self.enfriamiento_max = enfriamiento_max
+        self.max_aperturas = max_aperturas
+        self.max_retry_after = max_retry_after
+        self._tasas_iniciales: Dict[str, float] = {}
+        self._hosts: Dict[str, _EstadoHost] = {}
+        self._lock = threading.Lock()
+
+    def configurar(self, host: str, tasa_inicial: float):
+        """Tasa inicial (req/s) para un host; el limitador la ajusta desde ahí."""
+        with self._lock:
+            self._tasas_iniciales[host] = tasa_inicial
+            if host in self._hosts:
+                self._hosts[host].tasa = tasa_inicial
+
+    def _estado(self, host: str) -> _EstadoHost:
+        estado = self._hosts.get(host)
+        if estado is None:
+            estado = _EstadoHost(self._tasas_iniciales.get(host, self.tasa_inicial))
+            self._hosts[host] = estado
+        return estado
+
+    def esperar(self, host: str):
+        """Bloquea hasta que el host admita otra request (reserva el turno antes de dormir)."""
+        with self._lock:
+            estado = self._estado(host)
+            ahora = time.monotonic()
+            if estado.aperturas >= self.max_aperturas and estado.abierto_hasta > ahora:
+                # Ya no se espera: se falla rápido hasta que termine el enfriamiento
+                raise CircuitoAbierto(f"Circuito abierto para {host} ({estado.aperturas} pausas sin recuperarse)")
+            turno = max(ahora, estado.proximo, estado.pausa_hasta, estado.abierto_hasta)
+            estado.proximo = turno + 1.0 / estado.tasa
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+    def registrar(self, host: str, latencia: float, status: Optional[int] = None,
+                  retry_after: Optional[float] = None, error: bool = False):
+        """Informa el resultado de una request para ajustar la tasa y el circuito."""
+        with self._lock:
+            estado = self._estado(host)
+            ahora = time.monotonic()
+            # 429 es throttling de un servidor sano: ajusta la tasa pero no cuenta para el circuito
+            falla = error or (status is not None and status >= 500)
+            sobrecarga = falla or status == 429
+
+            if not error:
+                estado.latencia_ewma = latencia if estado.latencia_ewma is None else 0.8 * estado.latencia_ewma + 0.2 * latencia
+                if estado.latencia_base is None or estado.latencia_ewma < estado.latencia_base:
+                    estado.latencia_base = estado.latencia_ewma
+            congestion = (
+                estado.latencia_ewma is not None and estado.latencia_base is not None
+                and estado.latencia_ewma > max(estado.latencia_base * self.factor_latencia, self.latencia_congestion_min)
+            )
+
+            if sobrecarga or congestion:
+                # Decremento multiplicativo, una vez por ventana (~latencia actual, mínimo 1 s)
+                ventana = max(1.0, estado.latencia_ewma or 0.0)
+                if ahora - estado.ultima_reduccion >= ventana:
+                    estado.tasa = max(self.tasa_min, estado.tasa * self.factor_reduccion)
+                    estado.ultima_reduccion = ahora
+                    estado.proximo = max(estado.proximo, ahora + 1.0 / estado.tasa)
+            elif not falla:
+                if estado.ultima_reduccion == 0.0:
+                    # Slow start: hasta la primera señal de congestión la tasa crece multiplicativamente
+                    estado.tasa = min(self.tasa_max, estado.tasa * self.factor_slow_start)
+                else:
+                    # Incremento aditivo
+                    estado.tasa = min(self.tasa_max, estado.tasa + self.incremento)
+
+            if retry_after:
+                estado.pausa_hasta = max(estado.pausa_hasta, ahora + min(retry_after, self.max_retry_after))
+
+            if falla:
+                estado.fallas_consecutivas += 1
+                if estado.fallas_consecutivas >= self.umbral_fallas and ahora >= estado.abierto_hasta:
+                    estado.enfriamiento = min(self.enfriamiento_max, (estado.enfriamiento * 2) or self.enfriamiento_inicial)
+                    estado.abierto_hasta = ahora + estado.enfriamiento
+                    estado.aperturas += 1
+                    logger.warning("Circuito abierto para %s: pausa de %.1fs", host, estado.enfriamiento,
+                                   extra={'host': host, 'aperturas': estado.aperturas})
+            elif status != 429:
+                estado.fallas_consecutivas = 0
+                estado.aperturas = 0
+                estado.enfriamiento = 0.0
+
+    def estado(self, host: str) -> Dict:
+        with self._lock:
+            estado = self._estado(host)
+            ahora = time.monotonic()
+            return {
+                'tasa_rps': round(estado.tasa, 2),
+                'latencia_ewma': round(estado.latencia_ewma, 4) if estado.latencia_ewma is not None else None,
+                'circuito': 'abierto' if estado.abierto_hasta > ahora else 'cerrado',
+                'fallas_consecutivas': estado.fallas_consecutivas,
+            }
+
+
+def parse_retry_after(valor: Optional[str]) -> Optional[float]:
+    """Retry-After en segundos (acepta segundos o fecha HTTP)."""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        fecha = parsedate_to_datetime(valor)
+        return max(0.0, (fecha - datetime.now(fecha.tzinfo or timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class CacheRespuestas:
+    """Cache LRU en memoria con TTL, para páginas que se piden repetidas en una misma corrida."""
+
+    def __init__(self, max_entradas: int = 512):
+        self.max_entradas = max_entradas
+        self._datos: 'OrderedDict[Any, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave) -> Optional[Any]:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            expira, valor = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor, ttl: float):
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+
+class SesionInstrumentada(requests.Session):
+    """
+    requests.Session que pasa cada request por el limitador adaptativo, reintenta
+    ante errores transitorios (conexión, timeout, 429/5xx) y registra métricas por host.
+    Los listados que se consultan por POST son búsquedas sin efectos, así que también
+    se reintentan.
+    """
+
+    STATUS_REINTENTABLES = (429, 500, 502, 503, 504)
+
+    def __init__(self, servicios: 'Servicios', max_reintentos: int = 4):
+        super().__init__()
+        self._servicios = servicios
+        self.max_reintentos = max_reintentos
+        self.headers.update({'User-Agent': USER_AGENT})
+
+    def request(self, method, url, *args, **kwargs):
+        host = urlparse(url).netloc
+        metricas = self._servicios.metricas_host(host)
+        limiter = self._servicios.limiter
+        fetch_segundos = FETCH_SEGUNDOS.labels(host)
+        for intento in range(self.max_reintentos + 1):
+            ultimo = intento == self.max_reintentos
+            limiter.esperar(host)
+            inicio = time.perf_counter()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                latencia = time.perf_counter() - inicio
+                limiter.registrar(host, latencia, error=True)
+                metricas.incrementar('requests')
+                metricas.incrementar('errores')
+                metricas.incrementar('segundos', latencia)
+                fetch_segundos.observe(latencia)
+                FETCH_REQUESTS.labels(host, 'error').inc()
+                contar_en_etapa(requests=1)
+                if ultimo:
+                    raise
+                metricas.incrementar('reintentos')
+                FETCH_REINTENTOS.labels(host).inc()
+                contar_en_etapa(reintentos=1)
+                continue
+
+            latencia = time.perf_counter() - inicio
+            status = response.status_code
+            retry_after = parse_retry_after(response.headers.get('Retry-After')) if status in (429, 503) else None
+            limiter.registrar(host, latencia, status=status, retry_after=retry_after)
+            metricas.incrementar('requests')
+            metricas.incrementar('segundos', latencia)
+            fetch_segundos.observe(latencia)
+            FETCH_REQUESTS.labels(host, status).inc()
+            if status >= 400:
+                metricas.incrementar(f'http_{status}')
+            if status in self.STATUS_REINTENTABLES and not ultimo:
+                metricas.incrementar('reintentos')
+                FETCH_REINTENTOS.labels(host).inc()
+                contar_en_etapa(requests=1, reintentos=1)
+                response.close()
+                continue
+            recibidos = _bytes_respuesta(response, kwargs.get('stream', False))
+            FETCH_BYTES.labels(host).inc(recibidos)
+            contar_en_etapa(requests=1, bytes=recibidos)
+            return response
+
+
+class Servicios:
+    """Contenedor de los servicios compartidos."""
+
+    def __init__(self, max_conexiones: int = 8, limiter: Optional[RateLimiter] = None):
+        self.limiter = limiter or RateLimiter()
+        self.cache = CacheRespuestas()
+        self._max_conexiones = max_conexiones
+        self._sesion: Optional[SesionInstrumentada] = None
+        self._metricas_host: Dict[str, Metricas] = {}
+        self._lock = threading.Lock()
+
+    def sesion(self) -> SesionInstrumentada:
+        """Sesión compartida (keep-alive, pool por host, límite adaptativo y reintentos)."""
+        with self._lock:
+            if self._sesion is None:
+                sesion = SesionInstrumentada(self)
+                # Sin reintentos de urllib3: los hace la sesión, para que el limitador vea cada 429
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=self._max_conexiones, max_retries=0)
+                sesion.mount('http://', adapter)
+                sesion.mount('https://', adapter)
+                self._sesion = sesion
+            return self._sesion
+
+    def metricas_host(self, host: str) -> Metricas:
+        with self._lock:
+            if host not in self._metricas_host:
+                self._metricas_host[host] = Metricas()
+            return self._metricas_host[host]
+
+    def resumen_hosts(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            hosts = dict(self._metricas_host)
+        return {host: {**m.como_dict(), **self.limiter.estado(host)} for host, m in hosts.items()}
@@ -0,0 +1,25 @@
+"""
+Configuración común de los tests: una BD SQLite temporal por sesión (DB_PATH se
+lee al importar backend.config, por eso se define antes de cualquier import del
+proyecto) y sin archivo de logs.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+_DIRECTORIO = tempfile.mkdtemp(prefix='masterscraper-tests-')
+os.environ['DB_PATH'] = os.path.join(_DIRECTORIO, 'test.db')
+os.environ['LOG_FILE'] = ''
+os.environ['API_SECRET'] = ''
+
+
+@pytest.fixture
+def bd():
+    """BD inicializada y vacía (las tablas de vocabulario se conservan: sus ids están en cache)."""
+    from backend.database import clear_all_data, init_db
+
+    init_db()
+    clear_all_data()
+    return os.environ['DB_PATH']
@@ -0,0 +1,176 @@
+"""
+Outbox de emails y pool SMTP (backend/correo.py) contra el servidor SMTP local
+(backend/smtp_stub_server.py).
+"""
+
+import sqlite3
+import time
+from email import message_from_bytes, policy
+
+import pytest
+
+from backend import correo
+from backend.correo import PoolSMTP, encolar_email, procesar_lote
+from backend.smtp_stub_server import iniciar_servidor
+
+REMITENTE = 'reportes@ejemplo.cl'
+
+
+@pytest.fixture
+def outbox(bd, monkeypatch):
+    conn = sqlite3.connect(bd)
+    conn.execute('DELETE FROM email_outbox')
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(correo, 'EMAIL_FROM', REMITENTE)
+    monkeypatch.setattr(correo, 'SMTP_HOST', '127.0.0.1')
+    monkeypatch.setattr(correo, 'SMTP_STARTTLS', False)
+    monkeypatch.setattr(correo, 'SMTP_TIMEOUT_S', 5)
+    return bd
+
+
+def _smtp(monkeypatch, idle_s: float = 60, **config):
+    servidor, puerto = iniciar_servidor(**config)
+    monkeypatch.setattr(correo, 'SMTP_PORT', puerto)
+    pool = PoolSMTP(tamano=1, idle_s=idle_s)
+    monkeypatch.setattr(correo, '_pool', pool)
+    return servidor, pool
+
+
+def _estados(bd) -> dict:
+    conn = sqlite3.connect(bd)
+    conn.row_factory = sqlite3.Row
+    try:
+        filas = conn.execute('''
+            SELECT id, estado, intentos, error,
+                   (julianday(proximo_intento) - julianday('now')) * 86400 AS espera_s
+            FROM email_outbox
+        ''').fetchall()
+        return {fila['id']: dict(fila) for fila in filas}
+    finally:
+        conn.close()
+
+
+def test_varios_pendientes_salen_como_un_digest(outbox, monkeypatch):
+    servidor, pool = _smtp(monkeypatch)
+    try:
+        ids = [encolar_email('ana@ejemplo.cl', f'Reporte {i}', f'Contenido del reporte {i}') for i in range(3)]
+        ids += [encolar_email('luis@ejemplo.cl', 'Reporte unico', 'Solo uno')]
+        assert procesar_lote() == 4
+    finally:
+        pool.cerrar()
+        servidor.shutdown()
+
+    assert all(estado['estado'] == 'enviado' for estado in _estados(outbox).values())
+    assert len(servidor.mensajes) == 2
+    por_destinatario = {destinatarios[0]: message_from_bytes(datos, policy=policy.default)
+                        for _, destinatarios, datos in servidor.mensajes}
+    digest = por_destinatario['ana@ejemplo.cl']
+    assert digest['Subject'] == 'Reporte 2 (+2 anteriores)'
+    cuerpo = digest.get_content()
+    # El más reciente primero
+    assert cuerpo.index('Contenido del reporte 2') < cuerpo.index('Contenido del reporte 1') \
+        < cuerpo.index('Contenido del reporte 0')
+    assert por_destinatario['luis@ejemplo.cl']['Subject'] == 'Reporte unico'
+    # Una sola conexión para todo el lote
+    assert servidor.conexiones == 1
+
+
+def test_conexion_inactiva_se_verifica_y_se_reconecta(outbox, monkeypatch):
+    # El servidor corta a los 0,3 s sin comandos; el pool verifica con NOOP las que llevan 0,1 s sin uso
+    servidor, pool = _smtp(monkeypatch, idle_s=0.1, inactividad=0.3)
+    try:
+        encolar_email('ana@ejemplo.cl', 'Primero', 'uno')
+        assert procesar_lote() == 1
+        encolar_email('ana@ejemplo.cl', 'Segundo', 'dos')
+        assert procesar_lote() == 1
+        assert servidor.conexiones == 1  # reutilizada: todavía no estaba inactiva
+
+        time.sleep(0.6)
+        encolar_email('ana@ejemplo.cl', 'Tercero', 'tres')
+        assert procesar_lote() == 1
+    finally:
+        pool.cerrar()
+        servidor.shutdown()
+
+    assert servidor.conexiones == 2
+    assert len(servidor.mensajes) == 3
+    assert all(estado['estado'] == 'enviado' and estado['intentos'] == 1 for estado in _estados(outbox).values())
+
+
+def test_conexion_cortada_sin_verificar_se_reintenta_con_otra(outbox, monkeypatch):
+    # Sin NOOP (idle_s alto): el envío falla con SMTPServerDisconnected y se repite con una conexión nueva
+    servidor, pool = _smtp(monkeypatch, idle_s=60, inactividad=0.3)
+    try:
+        encolar_email('ana@ejemplo.cl', 'Primero', 'uno')
+        assert procesar_lote() == 1
+        time.sleep(0.6)
+        encolar_email('ana@ejemplo.cl', 'Segundo', 'dos')
+        assert procesar_lote() == 1
+    finally:
+        pool.cerrar()
+        servidor.shutdown()
+
+    assert servidor.conexiones == 2
+    assert [estado['estado'] for estado in _estados(outbox).values()] == ['enviado', 'enviado']
+
+
+def test_destinatario_rechazado_falla_sin_reintentar(outbox, monkeypatch):
+    servidor, pool = _smtp(monkeypatch, rechazar='inexistente')
+    try:
+        rechazado, = encolar_email('inexistente@ejemplo.cl', 'Reporte', 'x')
+        aceptado, = encolar_email('ana@ejemplo.cl', 'Reporte', 'x')
+        assert procesar_lote() == 2
+    finally:
+        pool.cerrar()
+        servidor.shutdown()
+
+    estados = _estados(outbox)
+    assert estados[rechazado]['estado'] == 'fallido'
+    assert estados[rechazado]['intentos'] == 1
+    assert '550' in estados[rechazado]['error']
+    # La conexión sigue sirviendo (RSET) para el siguiente destinatario
+    assert estados[aceptado]['estado'] == 'enviado'
+    assert servidor.conexiones == 1
+
+
+def test_error_temporal_vuelve_a_pendiente_con_backoff(outbox, monkeypatch):
+    servidor, pool = _smtp(monkeypatch, errores=1.0)
+    try:
+        id_, = encolar_email('ana@ejemplo.cl', 'Reporte', 'x')
+        otro, = encolar_email('luis@ejemplo.cl', 'Reporte', 'x')
+        assert procesar_lote() == 2
+        # El reintento no vence todavía
+        assert procesar_lote() == 0
+    finally:
+        pool.cerrar()
+        servidor.shutdown()
+
+    estado = _estados(outbox)[id_]
+    assert estado['estado'] == 'pendiente'
+    assert estado['intentos'] == 1
+    assert '451' in estado['error']
+    assert correo.BACKOFF_BASE_S - 5 <= estado['espera_s'] <= correo.BACKOFF_BASE_S + 1
+    assert _estados(outbox)[otro]['estado'] == 'pendiente'
+    assert not servidor.mensajes
+    assert servidor.conexiones == 1
+
+
+def test_ultimo_intento_temporal_queda_fallido(outbox, monkeypatch):
+    monkeypatch.setattr(correo, 'EMAIL_MAX_INTENTOS', 2)
+    servidor, pool = _smtp(monkeypatch, errores=1.0)
+    try:
+        id_, = encolar_email('ana@ejemplo.cl', 'Reporte', 'x')
+        procesar_lote()
+        conn = sqlite3.connect(outbox)
+        conn.execute("UPDATE email_outbox SET proximo_intento = datetime('now', '-1 seconds')")
+        conn.commit()
+        conn.close()
+        assert procesar_lote() == 1
+    finally:
+        pool.cerrar()
+        servidor.shutdown()
+
+    estado = _estados(outbox)[id_]
+    assert estado['estado'] == 'fallido'
+    assert estado['intentos'] == 2
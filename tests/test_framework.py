@@ -0,0 +1,124 @@
+"""
+Pipeline por defecto de ScraperPlugin (discover -> fetch -> parse -> normalize -> store)
+con un plugin mínimo que lee el listado de los fixtures CMF (scrapers/hechos_esenciales/stub_server.py).
+"""
+
+import sqlite3
+
+import pytest
+
+from scrapers.framework import Contexto, ScraperPlugin
+from scrapers.hechos_esenciales.scraper import LISTADO_PATH, parse_listado
+from scrapers.hechos_esenciales.stub_server import iniciar_servidor
+from scrapers.servicios import RateLimiter, Servicios
+
+PAGINAS = 3  # la tercera viene vacía
+
+
+class ListadoPlugin(ScraperPlugin):
+    nombre = 'listado_prueba'
+    max_concurrencia = 2
+    tamano_lote = 4
+    cache_ttl = 60
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.fetchs = 0
+
+    def discover(self, ctx):
+        return list(range(1, PAGINAS + 1))
+
+    def fetch(self, pagina, ctx):
+        self.fetchs += 1
+        respuesta = ctx.sesion.get(f'{self.base_url}{LISTADO_PATH}', params={'pagina': pagina}, timeout=10)
+        respuesta.raise_for_status()
+        return respuesta.text
+
+    def parse(self, html, pagina, ctx):
+        return parse_listado(html, self.base_url)
+
+    def normalize(self, filing, ctx):
+        if not filing['materia']:
+            return None
+        return {
+            'source': self.nombre,
+            'project_name': f"{filing['entidad']}: {filing['materia']}",
+            'date': filing['fecha'],
+            'description': filing['materia'],
+            'raw_data': {'documento_id': filing['documento_id'], 'titular': filing['entidad']},
+        }
+
+
+@pytest.fixture
+def base_url():
+    servidor, url = iniciar_servidor()
+    yield url
+    servidor.shutdown()
+
+
+@pytest.fixture
+def servicios():
+    return Servicios(limiter=RateLimiter(tasa_inicial=50))
+
+
+def _leads(bd):
+    conn = sqlite3.connect(bd)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM leads WHERE source = ?', (ListadoPlugin.nombre,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_pipeline_guarda_por_lotes(base_url, servicios, bd):
+    plugin = ListadoPlugin(base_url)
+    progreso = []
+    ctx = Contexto(plugin.nombre, servicios, progress_callback=lambda p, m: progreso.append(p))
+
+    resultado = plugin.ejecutar(ctx)
+
+    assert resultado['total_leads'] == 10
+    assert not resultado['cancelado']
+    assert _leads(bd) == 10
+    etapas = ctx.metricas.etapas()
+    assert etapas['fetch']['llamadas'] == PAGINAS
+    assert etapas['fetch']['requests'] == PAGINAS
+    assert etapas['store']['llamadas'] == 2  # 5 leads por página: se guarda al pasar de 4
+    assert etapas['store']['filas'] == 10
+    assert resultado['metricas']['registros'] == 10
+    assert progreso[0] == 0 and progreso[-1] == 100
+
+
+def test_cache_de_fetch_entre_ejecuciones(base_url, servicios, bd):
+    plugin = ListadoPlugin(base_url)
+    plugin.ejecutar(Contexto(plugin.nombre, servicios))
+    assert plugin.fetchs == PAGINAS
+
+    # Misma instancia de Servicios: las páginas salen de la cache, sin requests
+    ctx = Contexto(plugin.nombre, servicios)
+    resultado = plugin.ejecutar(ctx)
+
+    assert plugin.fetchs == PAGINAS
+    assert ctx.metricas.etapas()['fetch']['cache_hits'] == PAGINAS
+    assert servicios.metricas_host(base_url.split('//')[1]).como_dict()['requests'] == PAGINAS
+    assert resultado['total_leads'] == 10
+    assert _leads(bd) == 10  # upsert por clave natural
+
+
+def test_sin_cache_ttl_siempre_descarga(base_url, servicios, bd):
+    plugin = ListadoPlugin(base_url)
+    plugin.cache_ttl = 0
+    plugin.ejecutar(Contexto(plugin.nombre, servicios))
+    ctx = Contexto(plugin.nombre, servicios)
+    plugin.ejecutar(ctx)
+
+    assert plugin.fetchs == 2 * PAGINAS
+    assert ctx.metricas.etapas()['fetch']['cache_hits'] == 0
+
+
+def test_cancelacion_antes_del_primer_fetch(base_url, servicios, bd):
+    plugin = ListadoPlugin(base_url)
+    resultado = plugin.ejecutar(Contexto(plugin.nombre, servicios, cancel_callback=lambda: True))
+
+    assert resultado['cancelado']
+    assert resultado['total_leads'] == 0
+    assert plugin.fetchs == 0
@@ -0,0 +1,100 @@
+"""
+Scraper de Hechos Esenciales contra el servidor de fixtures (scrapers/hechos_esenciales/stub_server.py):
+dos páginas de listado y diez PDF, sin conexión.
+"""
+
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from backend.database import get_cmf_documentos_procesados, save_cmf_documentos, save_leads
+from scrapers.hechos_esenciales.scraper import run_hechos_esenciales
+from scrapers.hechos_esenciales.stub_server import FIXTURES_DIR, iniciar_servidor
+
+FUENTE = 'Hechos Esenciales'
+DOCUMENTO_FALLIDO = '2025030091111'
+
+
+@pytest.fixture
+def servidor():
+    servidor, base_url = iniciar_servidor()
+    yield base_url
+    servidor.shutdown()
+
+
+def _ejecutar(base_url, documentos_procesados=None):
+    """Ejecución con el guardado por ventana del plugin (leads + documentos procesados)."""
+    def guardar(leads, documentos):
+        guardados = save_leads(FUENTE, leads) if leads else 0
+        save_cmf_documentos(documentos)
+        return guardados
+
+    return run_hechos_esenciales(documentos_procesados=documentos_procesados, store_callback=guardar,
+                                 base_url=base_url, procesos_pdf=0)
+
+
+def _contar(tabla, bd):
+    conn = sqlite3.connect(bd)
+    try:
+        return conn.execute(f'SELECT COUNT(*) FROM {tabla}').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_clasifica_los_documentos_de_los_fixtures(servidor):
+    resultado = run_hechos_esenciales(base_url=servidor, procesos_pdf=0)
+
+    assert resultado['total_documentos'] == 10
+    assert resultado['documentos_fallidos'] == 0
+    assert resultado['eventos'] == {'M&A': 4, 'Financiamiento': 3, 'Otro': 3}
+    assert len(resultado['documentos']) == 10
+    assert len(resultado['new_leads']) == 7
+    assert all(lead['raw_data'].get('descripcion_completa') for lead in resultado['new_leads'])
+
+
+def test_una_segunda_ejecucion_actualiza_en_vez_de_insertar(servidor, bd):
+    primera = _ejecutar(servidor)
+    assert primera['guardados'] == 7
+    assert _contar('leads', bd) == 7
+    assert _contar('cmf_documentos', bd) == 10
+
+    # Incremental: todos los documentos ya están procesados
+    incremental = _ejecutar(servidor, get_cmf_documentos_procesados())
+    assert incremental['total_documentos'] == 0
+
+    # Sin el registro de procesados se vuelven a guardar los mismos leads (upsert por documento_id)
+    repetida = _ejecutar(servidor)
+    assert repetida['guardados'] == 7
+    assert _contar('leads', bd) == 7
+    assert _contar('cmf_documentos', bd) == 10
+
+
+def test_documento_con_descarga_fallida_se_reintenta(tmp_path, bd):
+    fixtures = tmp_path / 'fixtures'
+    shutil.copytree(FIXTURES_DIR, fixtures)
+    os.remove(fixtures / 'documentos' / f'{DOCUMENTO_FALLIDO}.pdf')
+    servidor, base_url = iniciar_servidor(fixtures_dir=str(fixtures))
+    try:
+        resultado = _ejecutar(base_url)
+    finally:
+        servidor.shutdown()
+
+    # El hecho se clasifica por materia y genera su lead, pero no queda como procesado
+    assert resultado['documentos_fallidos'] == 1
+    assert resultado['total_documentos'] == 10
+    procesados = get_cmf_documentos_procesados()
+    assert DOCUMENTO_FALLIDO not in procesados
+    assert len(procesados) == 9
+
+    servidor, base_url = iniciar_servidor()
+    try:
+        reintento = _ejecutar(base_url, procesados)
+    finally:
+        servidor.shutdown()
+
+    assert reintento['total_documentos'] == 1
+    assert reintento['documentos_fallidos'] == 0
+    assert DOCUMENTO_FALLIDO in get_cmf_documentos_procesados()
+    assert _contar('leads', bd) == 7
@@ -0,0 +1,112 @@
+"""
+Parseo de montos de inversión del SEIA (scrapers/seia/inversion.py): los ejemplos
+del docstring y propiedades con hypothesis sobre montos con formato chileno.
+"""
+
+import math
+
+import pytest
+from hypothesis import given, settings, strategies as st
+
+from scrapers.seia.inversion import UMBRAL_LOTE, Inversion, parsear_inversion, parsear_inversiones
+
+try:
+    import pandas as pd
+except ImportError:  # pandas es opcional (requirements-optional.txt)
+    pd = None
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('1.300,0000', Inversion(1300.0)),
+    ('64,1092', Inversion(64.1092)),
+    ('0,40', Inversion(0.4)),
+    ('850.000.000', Inversion(850000000.0)),
+    ('0.40', Inversion(0.4)),
+    ('850.000', Inversion(850000.0, ambigua=True)),
+    ('US$ 12,5 MM', Inversion(12.5)),
+    ('', Inversion(None)),
+    ('0,0000', Inversion(None)),
+    ('sin información', Inversion(None)),
+    (None, Inversion(None)),
+    (12.5, Inversion(None)),
+])
+def test_ejemplos(texto, esperado):
+    assert parsear_inversion(texto) == esperado
+
+
+def _con_miles(entero: int) -> str:
+    """1300000 -> '1.300.000'"""
+    return f'{entero:,}'.replace(',', '.')
+
+
+def formato_seia(entero: int, decimales: str) -> str:
+    """Monto como lo entrega INVERSION_MM_FORMAT: punto de miles y coma decimal."""
+    return _con_miles(entero) + (f',{decimales}' if decimales else '')
+
+
+montos = st.tuples(st.integers(0, 10 ** 12), st.text('0123456789', max_size=4))
+
+
+@given(montos)
+def test_ida_y_vuelta_formato_seia(monto):
+    entero, decimales = monto
+    texto = formato_seia(entero, decimales)
+    valor = float(f'{entero}.{decimales or 0}')
+
+    resultado = parsear_inversion(texto)
+
+    if valor > 0:
+        assert resultado.millones == pytest.approx(valor, rel=1e-12)
+    else:
+        assert resultado.millones is None
+    # Con coma decimal nunca es ambiguo; sin ella, solo un único punto seguido de 3 dígitos
+    assert resultado.ambigua == (not decimales and valor > 0 and entero >= 1000 and entero < 10 ** 6)
+
+
+@given(st.integers(1, 10 ** 12), st.sampled_from(['', ' MM', 'MM']), st.sampled_from(['', 'US$ ', 'US$']))
+def test_prefijos_y_sufijos_no_cambian_el_valor(entero, sufijo, prefijo):
+    texto = formato_seia(entero, '5')
+    assert parsear_inversion(prefijo + texto + sufijo) == parsear_inversion(texto)
+
+
+@given(st.integers(0, 999), st.text('0123456789', min_size=1, max_size=6))
+def test_ambigua_solo_con_un_punto_y_tres_digitos(entero, decimales):
+    resultado = parsear_inversion(f'{entero}.{decimales}')
+    tres_digitos = len(decimales) == 3
+    assert resultado.ambigua == (tres_digitos and resultado.millones is not None)
+    if resultado.millones is not None and not tres_digitos:
+        assert resultado.millones == float(f'{entero}.{decimales}')
+
+
+textos = st.one_of(
+    montos.map(lambda m: formato_seia(*m)),
+    st.text('0123456789.,US$ M', max_size=14),
+    st.text(max_size=10),
+    st.none(),
+)
+
+
+@given(st.lists(textos, max_size=40))
+def test_lote_igual_a_uno_por_uno(valores):
+    assert parsear_inversiones(valores) == [parsear_inversion(valor) for valor in valores]
+
+
+@settings(max_examples=20)
+@given(st.lists(textos, min_size=1, max_size=10))
+def test_lote_grande_sin_cache_igual_a_uno_por_uno(muestra):
+    valores = (muestra * (UMBRAL_LOTE // len(muestra) + 1))[:UMBRAL_LOTE + 1]
+    assert parsear_inversiones(valores) == [parsear_inversion(valor) for valor in valores]
+
+
+def _iguales(a: Inversion, b: Inversion) -> bool:
+    if a.millones is None or b.millones is None:
+        return a == b
+    return a.ambigua == b.ambigua and math.isclose(a.millones, b.millones, rel_tol=1e-12)
+
+
+@pytest.mark.skipif(pd is None, reason='requiere pandas')
+@settings(deadline=None)
+@given(st.lists(textos, min_size=1, max_size=40))
+def test_lote_vectorizado_igual_a_uno_por_uno(valores):
+    vectorizado = parsear_inversiones(valores, vectorizar=True)
+    assert all(_iguales(a, parsear_inversion(v)) for a, v in zip(vectorizado, valores)), valores
@@ -0,0 +1,36 @@
+"""Memoria por run (backend/metrics.py: MuestreoRSS)."""
+
+import time
+
+import pytest
+
+from backend import metrics
+
+pytestmark = pytest.mark.skipif(metrics.rss_actual_mb() is None, reason='requiere /proc/self/statm')
+
+
+def _asignar_y_liberar(mb: int):
+    bloque = bytearray(mb * 1024 * 1024)
+    bloque[::4096] = b'\x01' * len(bloque[::4096])  # tocar cada página para que cuente en el RSS
+    time.sleep(0.2)
+    del bloque
+
+
+def test_pico_es_del_intervalo_y_no_del_proceso():
+    with metrics.MuestreoRSS(intervalo=0.02) as grande:
+        _asignar_y_liberar(150)
+    assert grande.pico_mb - grande.inicio_mb >= 100
+
+    # El siguiente intervalo no hereda el pico anterior (ru_maxrss sí lo haría)
+    with metrics.MuestreoRSS(intervalo=0.02) as chico:
+        time.sleep(0.1)
+    assert chico.pico_mb < grande.pico_mb - 100
+    assert chico.inicio_mb <= chico.pico_mb
+
+
+def test_detener_es_idempotente():
+    memoria = metrics.MuestreoRSS(intervalo=0.02).iniciar()
+    memoria.detener()
+    pico = memoria.pico_mb
+    memoria.detener()
+    assert memoria.pico_mb == pico
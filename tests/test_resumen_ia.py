@@ -0,0 +1,167 @@
+"""
+Reporte con IA en map-reduce (backend/resumen_ia.py) contra el servidor local
+compatible con OpenAI (backend/openai_stub_server.py).
+"""
+
+import sqlite3
+
+import pytest
+from openai import OpenAI
+
+from backend import resumen_ia
+from backend.openai_stub_server import iniciar_servidor
+from backend.resumen_ia import (
+    MARGEN_TOKENS, TOKENS_FINAL, TOKENS_PARCIAL, armar_partes, generar_reporte, rankear_leads
+)
+
+INDUSTRIAS = ['Energía', 'Minería', 'Infraestructura', 'Agua']
+
+
+def _lead(i: int, industria: str) -> dict:
+    return {
+        'id': i,
+        'source': 'SEIA',
+        'project_name': f'Proyecto {i} {industria}',
+        'description': f'Construcción y operación del proyecto {i}, con obras anexas y línea de transmisión. ' * 4,
+        'raw_data': {
+            'industria': industria,
+            'estado': 'En Calificación' if i % 2 else 'Aprobado',
+            'region': 'Antofagasta',
+            'titular': f'Titular {i % 30} SpA',
+            'inversion_millones': float(10 + (i * 37) % 900),
+        },
+    }
+
+
+def _leads(n: int, industrias=INDUSTRIAS) -> list:
+    return [_lead(i, industrias[i % len(industrias)]) for i in range(1, n + 1)]
+
+
+@pytest.fixture
+def cache(bd):
+    conn = sqlite3.connect(bd)
+    conn.execute('DELETE FROM reporte_cache')
+    conn.commit()
+    conn.close()
+
+
+def _stub(**config):
+    # Reintentos del cliente de OpenAI (429/5xx) como en crear_cliente()
+    reintentos = config.pop('reintentos', 3)
+    servidor, base_url = iniciar_servidor(**config)
+    cliente = OpenAI(api_key='prueba', base_url=base_url, max_retries=reintentos, timeout=30)
+    return servidor, cliente
+
+
+def test_partes_dentro_del_presupuesto_de_tokens():
+    presupuesto = 1500
+    rankeados = rankear_leads(_leads(300), limite=300)
+    partes = armar_partes(rankeados, presupuesto)
+
+    assert len(partes) > len(INDUSTRIAS)
+    assert sum(len(parte.lineas) for parte in partes) == 300
+    for parte in partes:
+        contenido = resumen_ia._INSTRUCCIONES_PARTE.format(industria=parte.industria, leads='\n'.join(parte.lineas))
+        assert resumen_ia._tokens_mensajes(resumen_ia._mensajes(contenido)) <= presupuesto - MARGEN_TOKENS
+    # Cada parte es de una sola industria, en orden de id
+    for parte in partes:
+        assert all(parte.industria in linea for linea in parte.lineas)
+
+
+def test_reporte_completo_cabe_en_la_ventana_de_contexto(cache):
+    # El stub responde 400 si un prompt más max_tokens no cabe: ninguna parte puede fallar
+    servidor, cliente = _stub(contexto=resumen_ia.REPORT_CHUNK_TOKENS + TOKENS_FINAL)
+    try:
+        resultado = generar_reporte(_leads(600), cliente)
+    finally:
+        servidor.shutdown()
+
+    assert resultado.leads == 600
+    assert resultado.partes > len(INDUSTRIAS)
+    assert resultado.partes_fallidas == 0
+    assert resultado.partes_en_cache == 0
+    assert resultado.llamadas == servidor.solicitudes
+    assert resultado.texto.startswith('Combinación de')
+
+
+def test_segunda_ejecucion_sale_de_la_cache(cache):
+    servidor, cliente = _stub()
+    try:
+        primera = generar_reporte(_leads(400), cliente)
+        solicitudes = servidor.solicitudes
+        segunda = generar_reporte(_leads(400), cliente)
+    finally:
+        servidor.shutdown()
+
+    assert primera.llamadas == solicitudes > 1
+    # Solo la llamada final (que no se cachea) llega al modelo
+    assert segunda.llamadas == 1
+    assert servidor.solicitudes == solicitudes + 1
+    assert segunda.partes_en_cache == segunda.partes == primera.partes
+    assert segunda.texto == primera.texto
+
+
+def test_un_lead_nuevo_solo_reenvia_su_parte(cache):
+    servidor, cliente = _stub()
+    leads = _leads(400)
+    try:
+        primera = generar_reporte(leads, cliente)
+        segunda = generar_reporte(leads + [_lead(401, 'Agua')], cliente)
+    finally:
+        servidor.shutdown()
+
+    # Solo la última parte de 'Agua' (o una nueva, si no cabía) y la llamada final
+    assert segunda.partes - segunda.partes_en_cache == 1
+    assert segunda.partes_en_cache == primera.partes - (segunda.partes == primera.partes)
+    assert segunda.llamadas == 2
+
+
+def test_errores_transitorios_se_reintentan(cache):
+    servidor, cliente = _stub(errores=0.3, semilla=3, reintentos=6)
+    try:
+        resultado = generar_reporte(_leads(200), cliente)
+    finally:
+        servidor.shutdown()
+
+    assert servidor.errores_enviados > 0
+    assert resultado.partes_fallidas == 0
+    # Cada error (429 o 500) fue una solicitud más que el cliente reintentó
+    assert servidor.solicitudes == resultado.llamadas + servidor.errores_enviados
+
+
+def test_parte_que_falla_siempre_se_omite_y_se_informa(cache):
+    # Una industria con muchos leads arma partes grandes que no caben en una ventana de 3000
+    # tokens (400 context_length_exceeded, sin reintento); las industrias chicas (y el resto de
+    # Minería que queda en la última parte) sí caben
+    leads = _leads(250, ['Minería']) + [_lead(1000 + i, ['Energía', 'Agua'][i % 2]) for i in range(6)]
+    servidor, cliente = _stub(contexto=TOKENS_FINAL + 1000)
+    try:
+        resultado = generar_reporte(leads, cliente)
+    finally:
+        servidor.shutdown()
+
+    assert resultado.partes_fallidas >= 1
+    resumidas = resultado.partes - resultado.partes_fallidas
+    assert resumidas >= 2
+    # Las resumidas y la llamada final; las fallidas no se reintentan
+    assert resultado.llamadas == resumidas + 1
+    assert servidor.solicitudes == resultado.llamadas + resultado.partes_fallidas
+    assert resultado.texto  # el reporte sale con las partes que sí se resumieron
+
+    # Lo fallido no queda en la cache: la próxima ejecución lo vuelve a intentar
+    servidor, cliente = _stub()
+    try:
+        reintento = generar_reporte(leads, cliente)
+    finally:
+        servidor.shutdown()
+    assert reintento.partes_fallidas == 0
+    assert reintento.partes_en_cache == resumidas
+
+
+def test_sin_ninguna_parte_resumida_falla(cache):
+    servidor, cliente = _stub(contexto=TOKENS_PARCIAL)
+    try:
+        with pytest.raises(RuntimeError):
+            generar_reporte(_leads(20), cliente)
+    finally:
+        servidor.shutdown()
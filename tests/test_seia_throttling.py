@@ -0,0 +1,106 @@
+"""
+Limitador adaptativo, reintentos y circuit breaker (scrapers/servicios.py) con el scraper
+SEIA contra el servidor que simula un sitio saturado (scrapers/seia/stub_server.py).
+"""
+
+import pytest
+
+import scrapers.seia.scraper as seia
+from scrapers.seia.scraper import run_seia
+from scrapers.seia.stub_server import Simulacion, iniciar_servidor
+from scrapers.servicios import CircuitoAbierto, RateLimiter, Servicios
+
+HOST = 'seia.test'
+
+
+@pytest.fixture
+def sitio(request):
+    simulacion = request.param if hasattr(request, 'param') else Simulacion()
+    servidor, base_url = iniciar_servidor(simulacion=simulacion)
+    yield simulacion, base_url
+    servidor.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def pausas_cortas(monkeypatch):
+    monkeypatch.setattr(seia, 'PAUSA_REINTENTO_PAGINA', 0.01)
+
+
+def _servicios(**config) -> Servicios:
+    return Servicios(limiter=RateLimiter(**{'tasa_inicial': 50, 'enfriamiento_inicial': 0.05, **config}))
+
+
+@pytest.mark.parametrize('status', [429, 500, 502, 503, 504])
+def test_sobrecarga_reduce_la_tasa(status):
+    limiter = RateLimiter(tasa_inicial=8)
+    limiter.registrar(HOST, 0.01, status=status)
+    assert limiter.estado(HOST)['tasa_rps'] == 4
+
+
+def test_respuestas_sanas_suben_la_tasa():
+    limiter = RateLimiter(tasa_inicial=4, factor_slow_start=2)
+    limiter.registrar(HOST, 0.01, status=200)
+    assert limiter.estado(HOST)['tasa_rps'] == 8
+
+
+def test_5xx_cuenta_para_el_circuito_y_429_no():
+    limiter = RateLimiter(umbral_fallas=3)
+    for _ in range(5):
+        limiter.registrar(HOST, 0.01, status=429)
+    assert limiter.estado(HOST)['circuito'] == 'cerrado'
+    for _ in range(3):
+        limiter.registrar(HOST, 0.01, status=502)
+    assert limiter.estado(HOST)['circuito'] == 'abierto'
+
+
+@pytest.mark.parametrize('sitio', [Simulacion(total_proyectos=60, tasa_max=15, rafaga=3, retry_after=0)],
+                         indirect=True)
+def test_converge_bajo_el_limite_del_sitio(sitio):
+    simulacion, base_url = sitio
+    servicios = _servicios()
+
+    resultado = run_seia(session=servicios.sesion(), base_url=base_url, max_proyectos=60)
+
+    # Todos los proyectos y sus fichas llegan pese a los 429, y la tasa baja desde 50 req/s
+    assert len(resultado['new_leads']) == 60
+    assert resultado['etapas']['descripciones'] == 60
+    assert all(lead['raw_data']['descripcion_completa'] for lead in resultado['new_leads'])
+    assert simulacion.estadisticas['throttled'] > 0
+    host = base_url.split('//')[1]
+    assert servicios.limiter.estado(host)['tasa_rps'] < 50
+    assert servicios.metricas_host(host).como_dict()['reintentos'] == simulacion.estadisticas['throttled']
+
+
+@pytest.mark.parametrize('sitio', [Simulacion(total_proyectos=300, retry_after=0, caida=(2, 6))], indirect=True)
+def test_pagina_que_falla_se_reintenta(sitio):
+    simulacion, base_url = sitio
+    # Los 5 intentos de la sesión sobre la página 2 reciben 503; el reintento de la página la recupera
+    resultado = run_seia(obtener_descripcion=False, session=_servicios(umbral_fallas=100).sesion(),
+                         base_url=base_url, max_proyectos=300)
+
+    assert len(resultado['new_leads']) == 300
+    assert resultado['etapas']['listado']['paginas_fallidas'] == 0
+    assert simulacion.estadisticas['fallas'] == 6
+
+
+@pytest.mark.parametrize('sitio', [Simulacion(total_proyectos=300, retry_after=0, caida=(2, 15))], indirect=True)
+def test_pagina_que_sigue_fallando_se_omite(sitio):
+    simulacion, base_url = sitio
+    resultado = run_seia(obtener_descripcion=False, session=_servicios(umbral_fallas=100).sesion(),
+                         base_url=base_url, max_proyectos=300)
+
+    # Página 2 omitida (3 intentos de 5 requests); la corrida sigue con la 3
+    assert resultado['etapas']['listado']['paginas_fallidas'] == 1
+    assert len(resultado['new_leads']) == 200
+
+
+@pytest.mark.parametrize('sitio', [Simulacion(total_proyectos=300, retry_after=0, caida=(1, 1000))], indirect=True)
+def test_caida_persistente_abre_el_circuito(sitio):
+    simulacion, base_url = sitio
+    servicios = _servicios()
+
+    with pytest.raises(CircuitoAbierto):
+        run_seia(obtener_descripcion=False, session=servicios.sesion(), base_url=base_url)
+
+    # Falla rápido: no insiste más allá de las aperturas del circuito
+    assert simulacion.estadisticas['requests'] < 20